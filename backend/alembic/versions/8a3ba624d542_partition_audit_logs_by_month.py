@@ -0,0 +1,38 @@
+"""Partition audit_logs by month
+
+Revision ID: 8a3ba624d542
+Revises: 8a3ba624d541
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+
+from core.database_migrations import AuditLogPartitionManager
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3ba624d542'
+down_revision = '8a3ba624d541'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # No-op on SQLite; on PostgreSQL rebuilds audit_logs as a range-partitioned
+    # table and creates monthly partitions ahead of the current month
+    bind = op.get_bind()
+    AuditLogPartitionManager(bind.engine).convert_to_partitioned(connection=bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    manager = AuditLogPartitionManager(bind.engine)
+    if not manager.is_partitioned(connection=bind):
+        return
+
+    # Collapse partitions back into a regular table
+    op.execute('ALTER TABLE audit_logs RENAME TO audit_logs_partitioned')
+    op.execute('CREATE TABLE audit_logs (LIKE audit_logs_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    op.execute('INSERT INTO audit_logs SELECT * FROM audit_logs_partitioned')
+    op.execute('DROP TABLE audit_logs_partitioned CASCADE')
+    op.execute('ALTER TABLE audit_logs ADD PRIMARY KEY (id)')
@@ -0,0 +1,29 @@
+"""Add full-text invoice search index
+
+Revision ID: 8a3ba624d543
+Revises: 8a3ba624d542
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+from services.invoice_search import InvoiceSearchIndex
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3ba624d543'
+down_revision = '8a3ba624d542'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # PostgreSQL: tsvector column, triggers and GIN/trigram indexes, backfilled
+    # from existing invoices. SQLite: FTS5 table and triggers.
+    bind = op.get_bind()
+    InvoiceSearchIndex(bind.engine).install(connection=bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    InvoiceSearchIndex(bind.engine).uninstall(connection=bind)
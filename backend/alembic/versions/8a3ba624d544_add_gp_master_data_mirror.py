@@ -0,0 +1,131 @@
+"""Add GP master-data mirror tables
+
+Revision ID: 8a3ba624d544
+Revises: 8a3ba624d543
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3ba624d544'
+down_revision = '8a3ba624d543'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'gp_mirror_vendors',
+        sa.Column('company_db', sa.String(length=15), nullable=False),
+        sa.Column('vendor_id', sa.String(length=15), nullable=False),
+        sa.Column('vendor_name', sa.String(length=65), nullable=False),
+        sa.Column('name_key', sa.String(length=65), nullable=False),
+        sa.Column('status', sa.Integer(), nullable=False),
+        sa.Column('payment_terms', sa.String(length=21), nullable=True),
+        sa.Column('tax_schedule', sa.String(length=15), nullable=True),
+        sa.Column('currency_code', sa.String(length=15), nullable=True),
+        sa.Column('dex_row_ts', sa.DateTime(), nullable=False),
+        sa.Column('synced_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('company_db', 'vendor_id')
+    )
+    op.create_index('ix_gp_mirror_vendors_name_key', 'gp_mirror_vendors', ['company_db', 'name_key'])
+
+    op.create_table(
+        'gp_mirror_purchase_orders',
+        sa.Column('company_db', sa.String(length=15), nullable=False),
+        sa.Column('po_number', sa.String(length=17), nullable=False),
+        sa.Column('vendor_id', sa.String(length=15), nullable=False),
+        sa.Column('po_date', sa.DateTime(), nullable=True),
+        sa.Column('required_date', sa.DateTime(), nullable=True),
+        sa.Column('subtotal', sa.Numeric(precision=19, scale=5), nullable=False),
+        sa.Column('currency_code', sa.String(length=15), nullable=True),
+        sa.Column('status', sa.Integer(), nullable=False),
+        sa.Column('po_type', sa.Integer(), nullable=False),
+        sa.Column('dex_row_ts', sa.DateTime(), nullable=False),
+        sa.Column('synced_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('company_db', 'po_number')
+    )
+    op.create_index('ix_gp_mirror_purchase_orders_vendor', 'gp_mirror_purchase_orders',
+                    ['company_db', 'vendor_id', 'status', 'subtotal'])
+
+    op.create_table(
+        'gp_mirror_po_lines',
+        sa.Column('company_db', sa.String(length=15), nullable=False),
+        sa.Column('po_number', sa.String(length=17), nullable=False),
+        sa.Column('line_number', sa.Integer(), nullable=False),
+        sa.Column('item_number', sa.String(length=31), nullable=True),
+        sa.Column('description', sa.String(length=101), nullable=True),
+        sa.Column('quantity', sa.Numeric(precision=19, scale=5), nullable=False),
+        sa.Column('unit_cost', sa.Numeric(precision=19, scale=5), nullable=False),
+        sa.Column('extended_cost', sa.Numeric(precision=19, scale=5), nullable=False),
+        sa.Column('unit_of_measure', sa.String(length=9), nullable=True),
+        sa.Column('dex_row_ts', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('company_db', 'po_number', 'line_number')
+    )
+
+    op.create_table(
+        'gp_mirror_receipts',
+        sa.Column('company_db', sa.String(length=15), nullable=False),
+        sa.Column('receipt_number', sa.String(length=17), nullable=False),
+        sa.Column('po_number', sa.String(length=17), nullable=False),
+        sa.Column('receipt_date', sa.DateTime(), nullable=True),
+        sa.Column('vendor_id', sa.String(length=15), nullable=False),
+        sa.Column('subtotal', sa.Numeric(precision=19, scale=5), nullable=False),
+        sa.Column('currency_code', sa.String(length=15), nullable=True),
+        sa.Column('receipt_type', sa.Integer(), nullable=False),
+        sa.Column('dex_row_ts', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('company_db', 'receipt_number')
+    )
+    op.create_index('ix_gp_mirror_receipts_po', 'gp_mirror_receipts', ['company_db', 'po_number'])
+
+    op.create_table(
+        'gp_mirror_receipt_lines',
+        sa.Column('company_db', sa.String(length=15), nullable=False),
+        sa.Column('receipt_number', sa.String(length=17), nullable=False),
+        sa.Column('line_number', sa.Integer(), nullable=False),
+        sa.Column('po_number', sa.String(length=17), nullable=False),
+        sa.Column('item_number', sa.String(length=31), nullable=True),
+        sa.Column('description', sa.String(length=101), nullable=True),
+        sa.Column('quantity', sa.Numeric(precision=19, scale=5), nullable=False),
+        sa.Column('unit_cost', sa.Numeric(precision=19, scale=5), nullable=False),
+        sa.Column('extended_cost', sa.Numeric(precision=19, scale=5), nullable=False),
+        sa.Column('dex_row_ts', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('company_db', 'receipt_number', 'line_number')
+    )
+
+    op.create_table(
+        'gp_mirror_sync_state',
+        sa.Column('company_db', sa.String(length=15), nullable=False),
+        sa.Column('source_table', sa.String(length=31), nullable=False),
+        sa.Column('last_row_ts', sa.DateTime(), nullable=True),
+        sa.Column('last_key', sa.String(length=128), nullable=True),
+        sa.Column('rows_synced', sa.Integer(), nullable=False),
+        sa.Column('last_synced_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_reconciled_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('company_db', 'source_table')
+    )
+
+    # Fuzzy vendor-name matching (services.gp_mirror) uses pg_trgm similarity
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_gp_mirror_vendors_name_trgm "
+            "ON gp_mirror_vendors USING gin (name_key gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_gp_mirror_vendors_name_trgm")
+    op.drop_table('gp_mirror_sync_state')
+    op.drop_table('gp_mirror_receipt_lines')
+    op.drop_index('ix_gp_mirror_receipts_po', table_name='gp_mirror_receipts')
+    op.drop_table('gp_mirror_receipts')
+    op.drop_table('gp_mirror_po_lines')
+    op.drop_index('ix_gp_mirror_purchase_orders_vendor', table_name='gp_mirror_purchase_orders')
+    op.drop_table('gp_mirror_purchase_orders')
+    op.drop_index('ix_gp_mirror_vendors_name_key', table_name='gp_mirror_vendors')
+    op.drop_table('gp_mirror_vendors')
@@ -0,0 +1,38 @@
+"""Add ERP vendor mappings
+
+Revision ID: 8a3ba624d546
+Revises: 8a3ba624d545
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3ba624d546'
+down_revision = '8a3ba624d545'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'erp_vendor_mappings',
+        sa.Column('erp_type', sa.String(length=32), nullable=False),
+        sa.Column('company_key', sa.String(length=64), nullable=False),
+        sa.Column('name_key', sa.String(length=65), nullable=False),
+        sa.Column('supplier_name', sa.String(length=255), nullable=False),
+        sa.Column('vendor_ref', sa.String(length=64), nullable=False),
+        sa.Column('vendor_name', sa.String(length=255), nullable=True),
+        sa.Column('source', sa.String(length=16), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('erp_type', 'company_key', 'name_key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('erp_vendor_mappings')
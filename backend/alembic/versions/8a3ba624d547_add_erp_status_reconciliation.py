@@ -0,0 +1,40 @@
+"""Add ERP document status reconciliation
+
+Revision ID: 8a3ba624d547
+Revises: 8a3ba624d546
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3ba624d547'
+down_revision = '8a3ba624d546'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('invoices', sa.Column('erp_status', sa.String(length=32), nullable=True))
+    op.add_column('invoices', sa.Column('erp_status_updated_at', sa.DateTime(timezone=True), nullable=True))
+    # Status changes are applied in bulk by ERP document ID
+    op.create_index('ix_invoices_erp_document_id', 'invoices', ['erp_document_id'])
+
+    op.create_table(
+        'erp_status_watermarks',
+        sa.Column('erp_type', sa.String(length=32), nullable=False),
+        sa.Column('connection_key', sa.String(length=64), nullable=False),
+        sa.Column('watermark', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_polled_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('documents_updated', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('erp_type', 'connection_key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('erp_status_watermarks')
+    op.drop_index('ix_invoices_erp_document_id', table_name='invoices')
+    op.drop_column('invoices', 'erp_status_updated_at')
+    op.drop_column('invoices', 'erp_status')
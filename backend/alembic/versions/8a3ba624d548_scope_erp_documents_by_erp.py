@@ -0,0 +1,38 @@
+"""Record the ERP and connection each invoice was posted to
+
+Revision ID: 8a3ba624d548
+Revises: 8a3ba624d547
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3ba624d548'
+down_revision = '8a3ba624d547'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('invoices', sa.Column('erp_type', sa.String(length=32), nullable=True))
+    op.add_column('invoices', sa.Column('erp_connection_key', sa.String(length=64), nullable=True))
+    # Invoices posted so far went through the outbox and the settings-configured adapters
+    op.execute("""
+        UPDATE invoices SET
+            erp_type = (
+                SELECT erp_sync_outbox.erp_type FROM erp_sync_outbox
+                WHERE erp_sync_outbox.invoice_id = invoices.id AND erp_sync_outbox.status = 'completed'
+                ORDER BY erp_sync_outbox.completed_at DESC
+                LIMIT 1
+            ),
+            erp_connection_key = 'default'
+        WHERE erp_document_id IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('invoices', 'erp_connection_key')
+    op.drop_column('invoices', 'erp_type')
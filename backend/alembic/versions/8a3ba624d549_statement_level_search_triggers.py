@@ -0,0 +1,30 @@
+"""Recompute invoice search documents once per statement
+
+Revision ID: 8a3ba624d549
+Revises: 8a3ba624d548
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+
+from services.invoice_search import InvoiceSearchIndex
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3ba624d549'
+down_revision = '8a3ba624d548'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Replaces the per-row invoice_lines trigger with statement-level triggers
+    # over transition tables; re-installing is idempotent and skips the backfill
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        InvoiceSearchIndex(bind.engine).install(connection=bind)
+
+
+def downgrade() -> None:
+    # The statement-level triggers keep the same documents current; nothing to restore
+    pass
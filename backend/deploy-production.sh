@@ -446,8 +446,8 @@ EXPOSE 8000
 HEALTHCHECK --interval=30s --timeout=10s --start-period=40s --retries=3 \
     CMD curl -f http://localhost:8000/health || exit 1
 
-# Run the application
-CMD ["uvicorn", "src.main:app", "--host", "0.0.0.0", "--port", "8000", "--workers", "4"]
+# Run the application, creating/verifying the schema once per container before the workers start
+CMD ["sh", "-c", "python src/init_db.py && exec uvicorn src.main:app --host 0.0.0.0 --port 8000 --workers 4"]
 EOF
 
 # Create SSL directory
@@ -4,12 +4,13 @@ World-class business intelligence and analytics endpoints
 """
 import logging
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, UTC
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.auth import AuthManager
-from core.database import get_db
+from core.database import get_async_db
+from core.replica_routing import get_async_read_db
 from src.models.user import User
 from services.business_intelligence import advanced_analytics_service, MetricType, TimeGranularity
 from schemas.analytics import (
@@ -29,7 +30,7 @@ router = APIRouter()
 @router.get("/executive-dashboard", response_model=ExecutiveDashboardResponse)
 async def get_executive_dashboard(
     period_days: int = Query(30, ge=1, le=365, description="Number of days for analysis"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(AuthManager.get_current_active_user)
 ):
     """
@@ -63,7 +64,7 @@ async def get_executive_dashboard(
 async def get_kpis(
     metric_type: Optional[MetricType] = Query(None, description="Filter by metric type"),
     period_days: int = Query(30, ge=1, le=365, description="Number of days for analysis"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(AuthManager.get_current_active_user)
 ):
     """
@@ -111,7 +112,7 @@ async def get_kpis(
 async def get_insights(
     impact: Optional[str] = Query(None, description="Filter by impact level (high, medium, low)"),
     category: Optional[str] = Query(None, description="Filter by insight category"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(AuthManager.get_current_active_user)
 ):
     """
@@ -174,7 +175,7 @@ async def get_trend_analysis(
     metric: str = Query("invoice_volume", description="Metric to analyze trends for"),
     granularity: TimeGranularity = Query(TimeGranularity.DAILY, description="Time granularity for analysis"),
     period_days: int = Query(30, ge=7, le=365, description="Number of days for trend analysis"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(AuthManager.get_current_active_user)
 ):
     """
@@ -208,7 +209,7 @@ async def get_trend_analysis(
 async def get_forecasts(
     forecast_type: str = Query("invoice_volume", description="Type of forecast (invoice_volume, cash_flow)"),
     days_ahead: int = Query(30, ge=7, le=90, description="Number of days to forecast ahead"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(AuthManager.get_current_active_user)
 ):
     """
@@ -241,7 +242,7 @@ async def get_forecasts(
 
 @router.get("/risk-assessment", response_model=RiskAssessmentResponse)
 async def get_risk_assessment(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(AuthManager.get_current_active_user)
 ):
     """
@@ -270,7 +271,7 @@ async def get_risk_assessment(
 
 @router.get("/performance-metrics", response_model=PerformanceMetricsResponse)
 async def get_performance_metrics(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(AuthManager.get_current_active_user)
 ):
     """
@@ -314,7 +315,7 @@ async def get_performance_metrics(
 async def generate_custom_report(
     report_type: str = Query(..., description="Type of custom report to generate"),
     format: str = Query("json", description="Report format (json, csv, pdf)"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(AuthManager.get_current_active_user)
 ):
     """
@@ -347,7 +348,7 @@ async def generate_custom_report(
 @router.post("/ml-models/retrain")
 async def retrain_ml_models(
     model_types: List[str] = Query(..., description="Types of models to retrain"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(AuthManager.get_current_active_user)
 ):
     """
@@ -384,7 +385,7 @@ async def retrain_ml_models(
 
 @router.get("/ml-models/health")
 async def get_ml_models_health(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(AuthManager.get_current_active_user)
 ):
     """
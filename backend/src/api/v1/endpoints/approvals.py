@@ -12,6 +12,7 @@ from core.auth import auth_manager
 from src.models.invoice import Invoice, InvoiceStatus
 from src.models.user import User, UserRole
 from schemas.approval import ApprovalResponse, ApprovalListResponse, ApprovalAction
+from services.erp_automation import erp_automation, AutomationRule
 
 router = APIRouter()
 
@@ -90,6 +91,10 @@ async def approve_invoice(
         invoice.approved_by = current_user.id
         invoice.approved_at = datetime.now(UTC)
         
+        # The ERP sync is queued in the approval's own transaction
+        if erp_automation.automation_rules[AutomationRule.AUTO_SYNC_ON_APPROVAL]:
+            erp_automation.enqueue_invoice_sync(invoice, db)
+        
         db.commit()
         
         return {
@@ -199,6 +204,8 @@ async def bulk_approve_invoices(
             invoice.approved_at = datetime.now(UTC)
             if comment:
                 invoice.approval_comment = comment
+            if erp_automation.automation_rules[AutomationRule.AUTO_SYNC_ON_APPROVAL]:
+                erp_automation.enqueue_invoice_sync(invoice, db)
             approved_count += 1
         
         db.commit()
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from fastapi.security import HTTPBearer
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import logging
@@ -7,7 +7,8 @@ from typing import Optional
 import uuid
 
 from core.database import get_db
-from core.auth import auth_manager
+from core.auth import auth_manager, security
+from core.auth_cache import auth_cache
 from schemas.auth import (
     UserLoginRequest,
     UserRegisterRequest,
@@ -282,14 +283,16 @@ async def refresh_token(
 
 @router.post("/logout", response_model=MessageResponse, summary="User Logout")
 async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
     current_user: User = Depends(auth_manager.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Logout user and invalidate tokens"""
     try:
-        # In a production system, you might want to blacklist the token
-        # For now, we'll just return a success message
-        # The client should discard the tokens
+        # Revoke the access token on every replica; the client should still discard its tokens
+        token = credentials.credentials
+        auth_cache.revoke_token(token, auth_manager.verify_token(token))
+        auth_cache.invalidate_user(current_user.id)
         
         return MessageResponse(
             message="Successfully logged out",
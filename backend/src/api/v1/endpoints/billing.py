@@ -8,6 +8,7 @@ from datetime import datetime
 
 from core.database import get_db
 from core.auth import AuthManager
+from core.lazy import LazyService
 from src.models.user import User
 from src.models.company import Company
 from services.billing import StripeService
@@ -27,7 +28,7 @@ from schemas.billing import (
 router = APIRouter()
 
 # Initialize Stripe service
-stripe_service = StripeService()
+stripe_service = LazyService(StripeService)
 
 @router.get("/tiers", response_model=Dict[str, BillingTierResponse])
 async def get_billing_tiers():
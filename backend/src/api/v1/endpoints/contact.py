@@ -8,7 +8,7 @@ from datetime import datetime
 import logging
 import re
 from pydantic import BaseModel, EmailStr, field_validator
-from core.advanced_rate_limiting import rate_limit
+from core.rate_limiter import rate_limit
 from core.database import get_db
 from src.models.contact import ContactSubmission, InquiryType, ContactStatus
 
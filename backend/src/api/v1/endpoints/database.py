@@ -7,11 +7,13 @@ from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from sqlalchemy.orm import Session
 
-from core.database import get_db
+from core.database import async_pool_autotuner, get_db, pool_autotuner
 from core.auth import auth_manager
 from core.database_optimization import db_optimizer, index_manager, db_maintenance
 from core.database_migrations import get_migration_manager, get_data_migration_manager, get_schema_validator
 from core.database_connection import connection_pool, session_manager, db_health_checker
+from core.query_instrumentation import query_instrumentation
+from core.replica_routing import replica_router
 from core.api_design import APIResponse
 from src.models.user import User, UserRole
 
@@ -310,6 +312,8 @@ async def get_connection_pool_status(
     
     try:
         pool_stats = connection_pool.get_stats()
+        pool_stats["serving_pool"] = pool_autotuner.status()
+        pool_stats["async_serving_pool"] = async_pool_autotuner.status()
         
         return APIResponse.success(
             data=pool_stats,
@@ -380,3 +384,45 @@ async def get_database_statistics(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get database statistics: {str(e)}"
         )
+
+@router.get("/query-hotspots", response_model=APIResponse[Dict[str, Any]], status_code=status.HTTP_200_OK)
+async def get_query_hotspots(
+    limit: int = 20,
+    current_user: User = Depends(auth_manager.get_current_user)
+):
+    """
+    Get the endpoints issuing the most queries per request, with N+1 suspects.
+    Requires ADMIN or OWNER role.
+    """
+    if current_user.role not in [UserRole.ADMIN, UserRole.OWNER]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions to view query statistics"
+        )
+    
+    return APIResponse.success(
+        data={
+            "n_plus_one_threshold": query_instrumentation.n_plus_one_threshold,
+            "endpoints": query_instrumentation.report(limit)
+        },
+        message="Query hotspots retrieved successfully"
+    )
+
+@router.get("/replicas", response_model=APIResponse[Dict[str, Any]], status_code=status.HTTP_200_OK)
+async def get_replica_status(
+    current_user: User = Depends(auth_manager.get_current_user)
+):
+    """
+    Get read replica health, replication lag and read routing counters.
+    Requires ADMIN or OWNER role.
+    """
+    if current_user.role not in [UserRole.ADMIN, UserRole.OWNER]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions to view replica status"
+        )
+    
+    return APIResponse.success(
+        data=replica_router.status(),
+        message="Replica status retrieved successfully"
+    )
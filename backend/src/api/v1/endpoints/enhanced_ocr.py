@@ -20,7 +20,7 @@ from src.models.user import User
 from services.world_class_ocr import world_class_ocr_service, ProcessingQuality
 from services.enhanced_three_way_match import enhanced_three_way_match_service, ERPSystem
 from schemas.invoice import InvoiceOCRResponse, InvoiceValidationResponse
-from core.rate_limiting import rate_limit
+from core.rate_limiter import rate_limit
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -1,17 +1,23 @@
 """
 ERP Integration Endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List, Optional
-from datetime import datetime
+from datetime import datetime, UTC
+import json
 import uuid
 
 from core.database import get_db
 from core.auth import auth_manager
+from core.config import settings
 from src.models.user import User, UserRole
 from src.models.audit import AuditLog, AuditAction, AuditResourceType
-from services.erp import ERPIntegrationService, ERPAdapter
+from services.erp import ERPAdapter, erp_integration
+from services.erp_status_sync import (
+    DEFAULT_CONNECTION, company_webhook_secret, erp_status_reconciler, verify_webhook_signature,
+    webhook_timestamp_fresh
+)
 from schemas.erp import (
     ERPConnectionRequest,
     ERPConnectionResponse,
@@ -36,8 +42,8 @@ from schemas.erp import (
 
 router = APIRouter()
 
-# Initialize ERP integration service
-erp_service = ERPIntegrationService()
+# Shared ERP integration service
+erp_service = erp_integration
 
 @router.post("/register", response_model=ERPConnectionResponse)
 async def register_erp_integration(
@@ -108,8 +114,8 @@ async def check_erp_health(
 ):
     """Check ERP system health"""
     try:
-        adapter = erp_service.get_adapter(erp_type.value)
-        health_result = await adapter.health_check()
+        # Served from the health cache; live checks run at most once per TTL
+        health_result = await erp_service.health_check(erp_type.value)
         
         return ERPHealthResponse(
             erp_type=erp_type.value,
@@ -210,8 +216,25 @@ async def get_invoice_status(
     current_user: User = Depends(auth_manager.get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get invoice status from ERP system"""
+    """Get invoice status, as reconciled from the ERP's change feed; asks the ERP only for untracked documents"""
     try:
+        from src.models.invoice import Invoice
+        invoice = db.query(Invoice).filter(
+            Invoice.erp_type == erp_type.value,
+            Invoice.erp_document_id == erp_doc_id,
+            Invoice.company_id == current_user.company_id
+        ).first()
+        if invoice is not None and invoice.erp_status:
+            return ERPStatusResponse(
+                status=invoice.erp_status,
+                erp_doc_id=erp_doc_id,
+                erp_name=erp_type.value,
+                posted_at=invoice.erp_posting_date,
+                last_updated=invoice.erp_status_updated_at,
+                error=invoice.erp_error_message,
+                erp_data={"source": "reconciled"}
+            )
+        
         adapter = erp_service.get_adapter(erp_type.value)
         status_result = await adapter.get_invoice_status(erp_doc_id)
         
@@ -613,6 +636,8 @@ async def post_invoice_to_erp(
             # Update invoice status
             invoice.status = "posted_to_erp"
             invoice.erp_document_id = result["erp_doc_id"]
+            invoice.erp_type = "mock"
+            invoice.erp_connection_key = DEFAULT_CONNECTION
             invoice.posted_to_erp = True
             invoice.erp_posting_date = datetime.now(UTC)
             db.commit()
@@ -774,13 +799,65 @@ async def test_erp_connection(
         )
 
 
-
-
-
-
-
-
-
-
-
-
+@router.get("/webhooks/{erp_type}/secret")
+async def get_erp_webhook_secret(
+    erp_type: str,
+    current_user: User = Depends(auth_manager.get_current_user)
+):
+    """The URL and signing key to configure in the company's ERP for status webhooks"""
+    if current_user.role not in [UserRole.ADMIN, UserRole.OWNER]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions to manage ERP integrations"
+        )
+    secret = company_webhook_secret(current_user.company_id)
+    if secret is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="ERP webhooks are not enabled")
+    return {
+        "url": f"{settings.API_V1_STR}/erp/webhooks/{erp_type}/{current_user.company_id}/status",
+        "secret": secret
+    }
+
+
+@router.post("/webhooks/{erp_type}/status")
+async def reject_unscoped_erp_status_webhook(erp_type: str):
+    """Deliveries that do not name a company cannot be told apart from other tenants' documents"""
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Webhook URL must identify the company: /erp/webhooks/{erp_type}/{{company_id}}/status"
+    )
+
+
+@router.post("/webhooks/{erp_type}/{company_id}/status")
+async def receive_erp_status_webhook(erp_type: str, company_id: uuid.UUID, request: Request):
+    """Document status changes pushed by a company's ERP, signed with the company's webhook key
+
+    The key is ``company_webhook_secret(company_id)`` (see ``/webhooks/{erp_type}/secret``);
+    the signature is the HMAC-SHA256 of ``<timestamp>.<body>``, where the timestamp
+    (Unix seconds, ``X-Webhook-Timestamp``) must be within ``ERP_WEBHOOK_TOLERANCE``
+    seconds of now so captured deliveries cannot be replayed later.
+    """
+    secret = company_webhook_secret(company_id)
+    if secret is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="ERP webhooks are not enabled")
+    
+    timestamp = request.headers.get("X-Webhook-Timestamp")
+    if not webhook_timestamp_fresh(timestamp):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Webhook timestamp is missing or outside the replay window")
+    
+    body = await request.body()
+    signature = request.headers.get("X-Signature") or request.headers.get("X-Hub-Signature-256")
+    if not verify_webhook_signature(secret, body, signature, timestamp):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid webhook signature")
+    
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Webhook body is not valid JSON")
+    
+    try:
+        updated = await erp_status_reconciler.push(erp_type, str(company_id), payload)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"status": "accepted", "documents_updated": updated}
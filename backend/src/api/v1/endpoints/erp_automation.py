@@ -1,17 +1,17 @@
 """
 ERP Automation Endpoints - Fully Automated ERP Integration Management
 """
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List
-from datetime import datetime
-import json
+from datetime import datetime, UTC
 
 from core.database import get_db
 from core.auth import auth_manager
 from src.models.user import User, UserRole
 from src.models.invoice import Invoice, InvoiceStatus
 from src.models.company import Company
+from src.models.erp_sync import ERPSyncJob
 from services.erp_automation import erp_automation, AutomationRule
 
 router = APIRouter()
@@ -19,7 +19,6 @@ router = APIRouter()
 @router.post("/auto-sync/{invoice_id}")
 async def trigger_auto_sync(
     invoice_id: str,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(auth_manager.get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -50,18 +49,23 @@ async def trigger_auto_sync(
                 detail="Invoice must be approved before ERP sync"
             )
         
-        # Trigger automated sync in background
-        background_tasks.add_task(
-            erp_automation.auto_sync_on_approval,
+        # Queue the sync; the ERP workers pick it up as soon as this commits
+        result = await erp_automation.auto_sync_on_approval(
             invoice_id,
             str(current_user.company_id),
             db
         )
+        if result["status"] == "error":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=result["message"]
+            )
         
         return {
             "status": "success",
             "message": "Automated ERP sync initiated",
             "invoice_id": invoice_id,
+            "queued_jobs": result.get("queued_jobs", []),
             "initiated_at": datetime.now(UTC).isoformat()
         }
         
@@ -76,7 +80,6 @@ async def trigger_auto_sync(
 @router.post("/bulk-auto-sync")
 async def trigger_bulk_auto_sync(
     request_data: Dict[str, Any],
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(auth_manager.get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -110,19 +113,17 @@ async def trigger_bulk_auto_sync(
                 detail="Some invoices not found or not approved"
             )
         
-        # Trigger bulk sync in background
+        # Queue every invoice in one transaction
+        queued_jobs = []
         for invoice in invoices:
-            background_tasks.add_task(
-                erp_automation.auto_sync_on_approval,
-                str(invoice.id),
-                str(current_user.company_id),
-                db
-            )
+            queued_jobs.extend(erp_automation.enqueue_invoice_sync(invoice, db))
+        db.commit()
         
         return {
             "status": "success",
             "message": f"Automated ERP sync initiated for {len(invoices)} invoices",
             "invoice_count": len(invoices),
+            "queued_jobs": len(queued_jobs),
             "initiated_at": datetime.now(UTC).isoformat()
         }
         
@@ -195,6 +196,7 @@ async def get_automation_status(
             "automation_rules": automation_status,
             "erp_systems": erp_systems,
             "monitoring_active": erp_automation.monitoring_active,
+            "sync_queue": erp_automation.sync_queue.status(),
             "last_health_check": datetime.now(UTC).isoformat()
         }
         
@@ -249,31 +251,25 @@ async def get_sync_history(
 ):
     """Get ERP sync history for the company"""
     try:
-        # Get recent invoices with ERP sync data
-        invoices = db.query(Invoice).filter(
-            Invoice.company_id == current_user.company_id,
-            Invoice.erp_synced_at.isnot(None)
-        ).order_by(Invoice.erp_synced_at.desc()).limit(limit).all()
+        # Recent outbox entries, one per invoice and ERP system
+        rows = db.query(ERPSyncJob, Invoice).join(Invoice, Invoice.id == ERPSyncJob.invoice_id).filter(
+            ERPSyncJob.company_id == current_user.company_id
+        ).order_by(ERPSyncJob.updated_at.desc()).limit(limit).all()
         
         sync_history = []
-        for invoice in invoices:
-            sync_results = {}
-            if invoice.erp_sync_results:
-                try:
-                    sync_results = json.loads(invoice.erp_sync_results)
-                except:
-                    sync_results = {}
-            
+        for job, invoice in rows:
             sync_history.append({
                 "invoice_id": str(invoice.id),
                 "invoice_number": invoice.invoice_number,
                 "vendor": invoice.supplier_name,
                 "amount": float(invoice.total_amount),
-                "sync_status": invoice.erp_sync_status,
-                "synced_at": invoice.erp_synced_at.isoformat() if invoice.erp_synced_at else None,
-                "retry_count": invoice.erp_retry_count or 0,
-                "erp_systems": list(sync_results.keys()),
-                "sync_results": sync_results
+                "erp_system": job.erp_type,
+                "sync_status": job.status,
+                "queued_at": job.created_at.isoformat() if job.created_at else None,
+                "synced_at": job.completed_at.isoformat() if job.completed_at else None,
+                "attempts": job.attempts,
+                "last_error": job.last_error,
+                "sync_result": job.result or {}
             })
         
         return {
@@ -288,3 +284,41 @@ async def get_sync_history(
             detail=f"Failed to get sync history: {str(e)}"
         )
 
+@router.post("/sync-queue/requeue")
+async def requeue_dead_letters(
+    request_data: Dict[str, Any],
+    current_user: User = Depends(auth_manager.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Retry dead-lettered ERP syncs of the company"""
+    try:
+        if current_user.role not in [UserRole.ADMIN, UserRole.OWNER]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only admins can requeue ERP syncs"
+            )
+        
+        # Only the company's own jobs, whatever ids were sent
+        query = db.query(ERPSyncJob.id).filter(ERPSyncJob.company_id == current_user.company_id)
+        if request_data.get("job_ids"):
+            query = query.filter(ERPSyncJob.id.in_(request_data["job_ids"]))
+        if request_data.get("erp_type"):
+            query = query.filter(ERPSyncJob.erp_type == request_data["erp_type"])
+        job_ids = [job_id for job_id, in query.all()]
+        
+        requeued = await erp_automation.sync_queue.requeue(job_ids) if job_ids else 0
+        
+        return {
+            "status": "success",
+            "message": f"Requeued {requeued} ERP syncs",
+            "requeued": requeued,
+            "requeued_at": datetime.now(UTC).isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to requeue ERP syncs: {str(e)}"
+        )
@@ -2,11 +2,12 @@
 Fraud Detection API Endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from uuid import UUID
 
-from core.database import get_db
+from core.database import get_async_db
 from core.auth import AuthManager
 from src.models.user import User
 from services.fraud_detection import FraudDetectionService, FraudAnalysisResult
@@ -18,7 +19,7 @@ router = APIRouter()
 async def analyze_fraud_risk(
     invoice_id: UUID,
     current_user: User = Depends(AuthManager.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Analyze fraud risk for a specific invoice"""
     try:
@@ -26,10 +27,10 @@ async def analyze_fraud_risk(
         
         # Get invoice
         from src.models.invoice import Invoice
-        invoice = db.query(Invoice).filter(
+        invoice = await db.scalar(select(Invoice).where(
             Invoice.id == invoice_id,
             Invoice.company_id == current_user.company_id
-        ).first()
+        ))
         
         if not invoice:
             raise HTTPException(
@@ -64,7 +65,7 @@ async def analyze_fraud_risk(
 @router.get("/analytics", response_model=FraudAnalyticsResponse)
 async def get_fraud_analytics(
     current_user: User = Depends(AuthManager.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get fraud analytics for the company"""
     try:
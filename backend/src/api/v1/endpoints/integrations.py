@@ -8,13 +8,14 @@ from datetime import datetime, timedelta
 
 from core.database import get_db
 from core.auth import auth_manager
+from core.lazy import LazyService
 from src.models.user import User, UserRole
 from services.erp import ERPIntegrationService
 
 router = APIRouter()
 
 # Initialize ERP integration service
-erp_service = ERPIntegrationService()
+erp_service = LazyService(ERPIntegrationService)
 
 @router.get("/dashboard-data")
 async def get_integration_dashboard_data(
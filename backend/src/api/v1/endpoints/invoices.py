@@ -5,12 +5,16 @@ from datetime import datetime, timedelta
 from uuid import UUID
 
 from core.database import get_db
+from core.replica_routing import get_read_db
+from core.pagination import InvalidCursorError, encode_cursor, estimate_count, keyset_paginate
 from core.auth import auth_manager
 from src.models.invoice import Invoice, InvoiceStatus, InvoiceType
 from src.models.user import User
 from schemas.invoice import InvoiceResponse, InvoiceListResponse, InvoiceCreate, InvoiceUpdate
 from services.invoice_processor import InvoiceProcessor
 from services.workflow import WorkflowEngine
+from services.optimized_queries import INVOICE_KEYSET
+from services.invoice_search import invoice_search
 
 router = APIRouter()
 
@@ -18,7 +22,7 @@ router = APIRouter()
 async def get_recent_invoices(
     limit: int = Query(5, ge=1, le=20, description="Number of recent invoices to return"),
     current_user: User = Depends(auth_manager.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get recent invoices for dashboard display"""
     try:
@@ -54,9 +58,41 @@ async def get_recent_invoices(
             detail=f"Failed to get recent invoices: {str(e)}"
         )
 
+@router.get("/search")
+async def search_invoices(
+    q: str = Query(..., min_length=1, max_length=200, description="Invoice number, supplier or line item text"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    current_user: User = Depends(auth_manager.get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Full-text invoice search with prefix matching and typo tolerance, best match first"""
+    try:
+        hits = invoice_search.search(db, current_user.company_id, q, limit)
+        return {
+            "results": [
+                {
+                    "id": str(hit.invoice.id),
+                    "invoiceNumber": hit.invoice.invoice_number,
+                    "vendor": hit.invoice.supplier_name,
+                    "amount": float(hit.invoice.total_amount),
+                    "date": hit.invoice.invoice_date.isoformat() if hit.invoice.invoice_date else None,
+                    "status": hit.invoice.status.value if hit.invoice.status else "pending",
+                    "rank": hit.rank
+                }
+                for hit in hits
+            ],
+            "total": len(hits)
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to search invoices: {str(e)}"
+        )
+
 @router.get("/", response_model=InvoiceListResponse)
 async def get_invoices(
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    skip: int = Query(0, ge=0, description="Number of records to skip (prefer cursor for deep pages)"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
     status: Optional[InvoiceStatus] = Query(None, description="Filter by invoice status"),
     invoice_type: Optional[InvoiceType] = Query(None, description="Filter by invoice type"),
@@ -64,9 +100,13 @@ async def get_invoices(
     date_from: Optional[datetime] = Query(None, description="Filter from date"),
     date_to: Optional[datetime] = Query(None, description="Filter to date"),
     current_user: User = Depends(auth_manager.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Get paginated list of invoices with filtering options"""
+    """Get paginated list of invoices, newest first, with filtering options
+    
+    Follow ``next_cursor`` to page through results; unlike ``skip`` it costs
+    the same on every page.
+    """
     try:
         query = db.query(Invoice).filter(Invoice.company_id == current_user.company_id)
         
@@ -82,23 +122,34 @@ async def get_invoices(
         if date_to:
             query = query.filter(Invoice.invoice_date <= date_to)
         
-        # Get total count
-        total = query.count()
+        # Exact up to PAGINATION_EXACT_COUNT_LIMIT rows, estimated beyond
+        total, total_is_estimate = estimate_count(db, query)
         
-        # Apply pagination
-        invoices = query.offset(skip).limit(limit).all()
+        if skip and not cursor:
+            invoices = query.order_by(*(column.desc() for column in INVOICE_KEYSET))\
+                .offset(skip).limit(limit + 1).all()
+            has_next = len(invoices) > limit
+            invoices = invoices[:limit]
+            next_cursor = encode_cursor(INVOICE_KEYSET, [invoices[-1].created_at, invoices[-1].id]) \
+                if has_next else None
+        else:
+            page = keyset_paginate(query, INVOICE_KEYSET, cursor, limit)
+            invoices, has_next, next_cursor = page.items, page.has_next, page.next_cursor
         
         return InvoiceListResponse(
             invoices=[InvoiceResponse.from_orm(invoice) for invoice in invoices],
             total=total,
-            skip=skip,
-            limit=limit
+            total_is_estimate=total_is_estimate,
+            skip=0 if cursor else skip,
+            limit=limit,
+            has_next=has_next,
+            next_cursor=next_cursor
         )
+    # ``status`` is the filter parameter here, so codes are spelled out
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to retrieve invoices: {str(e)}"
-        )
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve invoices: {str(e)}")
 
 @router.get("/{invoice_id}", response_model=InvoiceResponse)
 async def get_invoice(
@@ -336,7 +387,7 @@ async def get_invoice_workflow(
 @router.get("/analytics/summary")
 async def get_invoice_analytics(
     current_user: User = Depends(auth_manager.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get invoice analytics summary"""
     try:
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 
 from core.database import get_db
 from core.auth import auth_manager
+from core.lazy import LazyService
 from src.models.user import User, UserRole
 from src.models.invoice import InvoiceType
 from schemas.ocr import OCRProcessResponse, OCRCorrectionRequest, OCRCorrectionResponse, OCRConfigResponse
@@ -21,7 +22,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 ocr_service = SimpleOCRService()
-ml_training_service = MLTrainingService()
+ml_training_service = LazyService(MLTrainingService)
 
 # Re-use UPLOAD_DIR from processing endpoint for consistency
 UPLOAD_DIR = Path("uploads")
@@ -2,15 +2,17 @@
 Invoice Processing Endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, List
 import os
 import uuid
 from pathlib import Path
 
-from core.database import get_db
+from core.database import get_async_db
 from core.auth import auth_manager
 from core.config import settings
+from core.lazy import LazyService
 from src.models.user import User
 from services.invoice_processor import InvoiceProcessor
 from services.simple_ocr import SimpleOCRService
@@ -19,13 +21,15 @@ from schemas.processing import (
     BatchProcessingRequest,
     BatchProcessingResponse,
     ReprocessingRequest,
-    ProcessingStatusResponse
+    ProcessingStatusResponse,
+    BulkImportRequest,
+    BulkImportResponse
 )
 
 router = APIRouter()
 
-# Initialize invoice processor
-processor = InvoiceProcessor()
+# Invoice processor, constructed by the first request that uses it
+processor = LazyService(InvoiceProcessor)
 simple_ocr = SimpleOCRService()
 
 # Ensure upload directory exists
@@ -36,7 +40,7 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 async def process_invoice(
     file: UploadFile = File(...),
     current_user: User = Depends(auth_manager.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Process a single invoice file"""
     try:
@@ -105,7 +109,7 @@ async def process_invoice(
 async def batch_process_invoices(
     files: List[UploadFile] = File(...),
     current_user: User = Depends(auth_manager.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Process multiple invoice files in batch"""
     try:
@@ -174,11 +178,45 @@ async def batch_process_invoices(
             detail=f"Batch processing failed: {str(e)}"
         )
 
+@router.post("/import", response_model=BulkImportResponse)
+async def bulk_import_invoices(
+    request: BulkImportRequest,
+    current_user: User = Depends(auth_manager.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create invoices in bulk from already-extracted data"""
+    if current_user.role not in ["admin", "manager"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions for bulk import"
+        )
+    
+    if len(request.invoices) > settings.INVOICE_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Bulk import cannot exceed {settings.INVOICE_BULK_MAX_ITEMS} invoices"
+        )
+    
+    result = await processor.bulk_import_invoices(
+        items=request.invoices,
+        company_id=str(current_user.company_id),
+        user_id=str(current_user.id),
+        db=db
+    )
+    
+    if result["status"] == "error":
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=result["message"]
+        )
+    
+    return BulkImportResponse(**result)
+
 @router.post("/reprocess", response_model=ProcessingResponse)
 async def reprocess_invoice(
     request: ReprocessingRequest,
     current_user: User = Depends(auth_manager.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reprocess an existing invoice"""
     try:
@@ -223,16 +261,16 @@ async def reprocess_invoice(
 async def get_processing_status(
     invoice_id: str,
     current_user: User = Depends(auth_manager.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get processing status of an invoice"""
     try:
         # Get invoice from database
         from src.models.invoice import Invoice
-        invoice = db.query(Invoice).filter(
+        invoice = await db.scalar(select(Invoice).where(
             Invoice.id == invoice_id,
             Invoice.company_id == current_user.company_id
-        ).first()
+        ))
         
         if not invoice:
             raise HTTPException(
@@ -324,38 +362,28 @@ async def demo_process_invoice(
 @router.get("/queue")
 async def get_processing_queue(
     current_user: User = Depends(auth_manager.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current processing queue for the company"""
     try:
         # Get invoices in various processing stages
         from src.models.invoice import Invoice, InvoiceStatus
         
+        count_invoices = select(func.count(Invoice.id)).where(Invoice.company_id == current_user.company_id)
+        
         # Pending approval
-        pending_approval = db.query(Invoice).filter(
-            Invoice.company_id == current_user.company_id,
-            Invoice.status == InvoiceStatus.PENDING_APPROVAL
-        ).count()
+        pending_approval = await db.scalar(count_invoices.where(Invoice.status == InvoiceStatus.PENDING_APPROVAL))
         
         # Pending ERP posting
-        pending_erp = db.query(Invoice).filter(
-            Invoice.company_id == current_user.company_id,
-            Invoice.status == InvoiceStatus.APPROVED
-        ).count()
+        pending_erp = await db.scalar(count_invoices.where(Invoice.status == InvoiceStatus.APPROVED))
         
         # In error state
-        error_count = db.query(Invoice).filter(
-            Invoice.company_id == current_user.company_id,
-            Invoice.status == InvoiceStatus.ERROR
-        ).count()
+        error_count = await db.scalar(count_invoices.where(Invoice.status == InvoiceStatus.ERROR))
         
         # Processing today
         from datetime import datetime, timedelta
         today = datetime.now().date()
-        processing_today = db.query(Invoice).filter(
-            Invoice.company_id == current_user.company_id,
-            Invoice.created_at >= today
-        ).count()
+        processing_today = await db.scalar(count_invoices.where(Invoice.created_at >= today))
         
         return {
             "status": "success",
@@ -7,7 +7,7 @@ from sqlalchemy import func, and_
 from typing import Dict, Any
 from datetime import datetime, timedelta
 
-from core.database import get_db
+from core.replica_routing import get_read_db
 from core.auth import auth_manager
 from src.models.user import User, UserRole
 from src.models.invoice import Invoice, InvoiceStatus
@@ -18,7 +18,7 @@ router = APIRouter()
 @router.get("/dashboard")
 async def get_dashboard_stats(
     current_user: User = Depends(auth_manager.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> Dict[str, Any]:
     """Get dashboard statistics for the current user's company"""
     try:
@@ -97,7 +97,7 @@ async def get_dashboard_stats(
 @router.get("/processing-metrics")
 async def get_processing_metrics(
     current_user: User = Depends(auth_manager.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> Dict[str, Any]:
     """Get invoice processing metrics"""
     try:
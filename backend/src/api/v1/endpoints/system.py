@@ -13,7 +13,7 @@ from pathlib import Path
 
 from core.database import get_db
 from core.auth import auth_manager
-from core.advanced_rate_limiting import rate_limit
+from core.rate_limiter import rate_limit
 from src.models.user import User, UserRole
 from schemas.system import (
     SystemInfoResponse,
@@ -0,0 +1,153 @@
+"""
+Pure ASGI Middleware Pipeline
+Runs request/response hooks inside a single middleware layer
+"""
+import time
+import logging
+from typing import List, Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Bodies larger than this are not kept for logging
+BODY_CAPTURE_LIMIT = 10000
+
+
+class HTTPContext:
+    """Per-request state shared by the hooks of one pipeline"""
+
+    __slots__ = ("scope", "method", "path", "started", "status_code", "response_headers",
+                 "request_body", "response_body", "_headers")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.method: str = scope["method"]
+        self.path: str = scope["path"]
+        self.started = time.perf_counter()
+        self.status_code: Optional[int] = None
+        self.response_headers: Optional[MutableHeaders] = None
+        self.request_body: Optional[bytearray] = bytearray()
+        self.response_body: Optional[bytearray] = bytearray()
+        self._headers: Optional[Headers] = None
+
+    @property
+    def headers(self) -> Headers:
+        if self._headers is None:
+            self._headers = Headers(scope=self.scope)
+        return self._headers
+
+    @property
+    def state(self) -> dict:
+        """The dict behind ``request.state`` for this request"""
+        return self.scope.setdefault("state", {})
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def client_ip(self) -> str:
+        client = self.scope.get("client")
+        return client[0] if client else "unknown"
+
+
+class MiddlewareHook:
+    """Base class for pipeline hooks
+
+    ``on_request`` runs in pipeline order and may return a response to
+    short-circuit the app. ``on_response`` and ``on_complete`` run in reverse
+    order, innermost first, just as nested middleware would. Hooks are plain
+    synchronous calls so an unused phase costs a method lookup, not a task.
+    """
+
+    capture_bodies = False
+
+    def on_request(self, ctx: HTTPContext) -> Optional[Response]:
+        return None
+
+    def on_response(self, ctx: HTTPContext, headers: MutableHeaders):
+        pass
+
+    def on_complete(self, ctx: HTTPContext):
+        pass
+
+    def on_error(self, ctx: HTTPContext, exc: Exception) -> Optional[Response]:
+        return None
+
+
+def _capture(buffer: Optional[bytearray], chunk: bytes) -> Optional[bytearray]:
+    if buffer is None or len(buffer) + len(chunk) > BODY_CAPTURE_LIMIT:
+        return None
+    buffer.extend(chunk)
+    return buffer
+
+
+class ASGIPipeline:
+    """Single pure ASGI middleware running a list of hooks
+
+    Replaces a stack of ``BaseHTTPMiddleware`` layers, each of which spawns a
+    task and re-streams the response, with one ``send`` wrapper per request.
+    """
+
+    def __init__(self, app: ASGIApp, hooks: Sequence[MiddlewareHook] = ()):
+        self.app = app
+        self.hooks: List[MiddlewareHook] = list(hooks)
+        self._reversed = self.hooks[::-1]
+        self._capture_bodies = any(hook.capture_bodies for hook in self.hooks)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ctx = HTTPContext(scope)
+        capture = self._capture_bodies
+        # Hooks past a short-circuit never saw the request, so they skip the response too
+        active = self._reversed
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                ctx.status_code = message["status"]
+                headers = ctx.response_headers = MutableHeaders(scope=message)
+                for hook in active:
+                    hook.on_response(ctx, headers)
+            elif capture and message["type"] == "http.response.body":
+                ctx.response_body = _capture(ctx.response_body, message.get("body", b""))
+            await send(message)
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                ctx.request_body = _capture(ctx.request_body, message.get("body", b""))
+            return message
+
+        entered = -1
+        try:
+            response = None
+            for hook in self.hooks:
+                entered += 1
+                response = hook.on_request(ctx)
+                if response is not None:
+                    active = self.hooks[entered::-1]
+                    break
+            if response is not None:
+                await response(scope, receive, send_wrapper)
+            else:
+                await self.app(scope, receive_wrapper if capture else receive, send_wrapper)
+        except Exception as exc:
+            active = self.hooks[entered::-1]
+            response = None
+            for hook in active:
+                response = response or hook.on_error(ctx, exc)
+            if response is None or ctx.status_code is not None:
+                raise
+            await response(scope, receive, send_wrapper)
+        finally:
+            for hook in active:
+                try:
+                    hook.on_complete(ctx)
+                except Exception as e:
+                    logger.error(f"{type(hook).__name__}.on_complete failed: {e}")
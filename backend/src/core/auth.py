@@ -2,11 +2,12 @@ from datetime import datetime, timedelta, UTC
 from typing import Optional, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Request, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from .config import settings
 from .database import get_db
+from .auth_cache import auth_cache
 from src.models.user import User, UserStatus, UserRole
 
 # Password hashing context
@@ -52,16 +53,51 @@ class AuthManager:
     
     @staticmethod
     def verify_token(token: str) -> dict:
-        """Verify and decode JWT token"""
+        """Verify and decode JWT token
+        
+        The signature is checked once per token; later calls are served from
+        the verified-token cache until the token expires or is revoked.
+        """
+        payload = auth_cache.get_claims(token)
+        if payload is not None:
+            return payload
+        
         try:
+            if auth_cache.is_revoked(token):
+                raise JWTError("Token has been revoked")
             payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-            return payload
         except JWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        
+        auth_cache.put_claims(token, payload)
+        return payload
+    
+    @staticmethod
+    def request_claims(request: Request, token: str) -> dict:
+        """Claims for ``token``, reusing the ones verified earlier in this request"""
+        verified = getattr(request.state, "auth_claims", None)
+        if verified is not None and verified[0] == token:
+            return verified[1]
+        payload = AuthManager.verify_token(token)
+        request.state.auth_claims = (token, payload)
+        return payload
+    
+    @staticmethod
+    def load_principal(db: Session, user_id: str) -> Optional[User]:
+        """Load the user for a verified token, from the principal cache when possible"""
+        snapshot = auth_cache.get_principal(user_id)
+        if snapshot is not None:
+            # Attach a copy to this session without a query; relationships still lazy-load
+            return db.merge(snapshot, load=False)
+        
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is not None and user.is_active:
+            auth_cache.put_principal(user)
+        return user
     
     @staticmethod
     def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
@@ -83,12 +119,13 @@ class AuthManager:
     
     @staticmethod
     def get_current_user(
+        request: Request,
         credentials: HTTPAuthorizationCredentials = Depends(security),
         db: Session = Depends(get_db)
     ) -> User:
         """Get current authenticated user from JWT token"""
         token = credentials.credentials
-        payload = AuthManager.verify_token(token)
+        payload = AuthManager.request_claims(request, token)
         
         user_id: str = payload.get("sub")
         if user_id is None:
@@ -98,7 +135,7 @@ class AuthManager:
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = AuthManager.load_principal(db, user_id)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,277 @@
+"""
+Verified-token and principal caches for the authentication path
+
+A JWT is signature-checked once per process and its claims cached until the
+token expires (or the cache TTL, whichever is sooner). The authenticated user
+is cached as a detached snapshot and merged into the request's session without
+a query. Entries are evicted when a user or company row changes, when a token
+is revoked at logout, and on every replica via a Redis pub/sub channel.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire individually"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def token_digest(token: str) -> str:
+    """Cache key for a token; raw tokens are never published or kept as keys"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _seconds_until(exp: Any) -> Optional[float]:
+    if exp is None:
+        return None
+    try:
+        return float(exp) - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+class AuthCache:
+    """Verified-token claims and user principal snapshots with cluster-wide eviction"""
+
+    def __init__(self, maxsize: int = None, token_ttl: float = None, principal_ttl: float = None,
+                 channel: str = None):
+        maxsize = maxsize or settings.AUTH_TOKEN_CACHE_SIZE
+        token_ttl = token_ttl or settings.AUTH_TOKEN_CACHE_TTL_SECONDS
+        self.channel = channel or settings.AUTH_CACHE_INVALIDATION_CHANNEL
+        self._claims = TTLCache(maxsize, token_ttl)
+        self._principals = TTLCache(maxsize, principal_ttl or settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS)
+        # Revocations must outlive the token itself, so they are not bounded by the claims TTL
+        self._revoked = TTLCache(maxsize, settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+        self._company_users: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {"token_hits": 0, "token_misses": 0, "principal_hits": 0, "principal_misses": 0, "evictions": 0}
+
+    # Tokens
+
+    def get_claims(self, token: str) -> Optional[dict]:
+        claims = self._claims.get(token_digest(token))
+        self.stats["token_hits" if claims is not None else "token_misses"] += 1
+        return claims
+
+    def put_claims(self, token: str, claims: dict):
+        self._claims.put(token_digest(token), claims, ttl=_seconds_until(claims.get("exp")))
+
+    def is_revoked(self, token: str) -> bool:
+        return self._revoked.get(token_digest(token)) is not None
+
+    def revoke_token(self, token: str, claims: Optional[dict] = None):
+        """Reject ``token`` from now on, here and on every other replica"""
+        digest = token_digest(token)
+        remaining = _seconds_until((claims or {}).get("exp"))
+        self._revoke_digest(digest, remaining)
+        self._publish({"kind": "token", "id": digest, "ttl": remaining})
+
+    def _revoke_digest(self, digest: str, ttl: Optional[float]):
+        self._claims.pop(digest)
+        self._revoked.put(digest, True, ttl=ttl if ttl is not None else settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+    # Principals
+
+    def get_principal(self, user_id: str):
+        """Detached User snapshot for ``user_id``, or None"""
+        snapshot = self._principals.get(str(user_id))
+        self.stats["principal_hits" if snapshot is not None else "principal_misses"] += 1
+        return snapshot
+
+    def put_principal(self, user):
+        """Cache a detached copy of a loaded User row"""
+        mapper = sa_inspect(type(user))
+        values = {attr.key: getattr(user, attr.key) for attr in mapper.column_attrs}
+        snapshot = type(user)(**values)
+        make_transient_to_detached(snapshot)
+
+        user_id, company_id = str(user.id), str(user.company_id)
+        self._principals.put(user_id, snapshot)
+        with self._lock:
+            self._company_users.setdefault(company_id, set()).add(user_id)
+
+    def invalidate_user(self, user_id: str, publish: bool = True):
+        self._evict_user(str(user_id))
+        if publish:
+            self._publish({"kind": "user", "id": str(user_id)})
+
+    def invalidate_company(self, company_id: str, publish: bool = True):
+        self._evict_company(str(company_id))
+        if publish:
+            self._publish({"kind": "company", "id": str(company_id)})
+
+    def _evict_user(self, user_id: str):
+        if self._principals.pop(user_id) is not None:
+            self.stats["evictions"] += 1
+
+    def _evict_company(self, company_id: str):
+        with self._lock:
+            user_ids = self._company_users.pop(company_id, set())
+        for user_id in user_ids:
+            self._evict_user(user_id)
+
+    def clear(self):
+        self._claims.clear()
+        self._principals.clear()
+        with self._lock:
+            self._company_users.clear()
+
+    # Cluster-wide invalidation
+
+    def _apply(self, message: Dict[str, Any]):
+        kind, value = message.get("kind"), message.get("id")
+        if kind == "user":
+            self._evict_user(value)
+        elif kind == "company":
+            self._evict_company(value)
+        elif kind == "token":
+            self._revoke_digest(value, message.get("ttl"))
+
+    def _publish(self, message: Dict[str, Any]):
+        if self._redis is None or self._loop is None or self._loop.is_closed():
+            return
+        payload = json.dumps(message)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        # Invalidations come from request handlers on the loop and from sync endpoints in the threadpool
+        if running is self._loop:
+            self._loop.create_task(self._send(payload))
+        else:
+            asyncio.run_coroutine_threadsafe(self._send(payload), self._loop)
+
+    async def _send(self, payload: str):
+        try:
+            await self._redis.publish(self.channel, payload)
+        except Exception as e:
+            logger.warning(f"Failed to publish auth cache invalidation: {e}")
+
+    async def start(self, redis_client):
+        """Subscribe to invalidations published by other replicas"""
+        if self._task is not None:
+            return
+        self._redis = redis_client
+        self._loop = asyncio.get_running_loop()
+        pubsub = redis_client.pubsub()
+        await pubsub.subscribe(self.channel)
+        self._task = self._loop.create_task(self._listen(pubsub))
+        logger.info(f"Auth cache listening for invalidations on {self.channel}")
+
+    async def _listen(self, pubsub):
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                try:
+                    self._apply(json.loads(message["data"]))
+                except Exception as e:
+                    logger.warning(f"Ignoring malformed auth cache invalidation: {e}")
+        finally:
+            await pubsub.unsubscribe(self.channel)
+            await pubsub.close()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self._redis = None
+
+
+# Global auth cache instance
+auth_cache = AuthCache()
+
+
+# Any committed change to a user or company row evicts its cached principals
+# (deactivation, role change, lockout, ...). Changes are collected at flush and
+# applied after commit so a rolled-back transaction evicts nothing.
+
+_TRACKED_TABLES = {"users": "user", "companies": "company"}
+# Keyed by module name: if this module is imported under two names (``core.``
+# and ``src.core.``) each copy registers listeners and must not consume the
+# other's pending evictions
+_INVALIDATIONS_KEY = f"{__name__}.auth_invalidations"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_principal_changes(session: Session, flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        kind = _TRACKED_TABLES.get(getattr(obj, "__tablename__", None))
+        if kind is not None and getattr(obj, "id", None) is not None:
+            session.info.setdefault(_INVALIDATIONS_KEY, set()).add((kind, str(obj.id)))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_principal_changes(session: Session):
+    for kind, value in session.info.pop(_INVALIDATIONS_KEY, ()):
+        if kind == "user":
+            auth_cache.invalidate_user(value)
+        else:
+            auth_cache.invalidate_company(value)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principal_changes(session: Session):
+    session.info.pop(_INVALIDATIONS_KEY, None)
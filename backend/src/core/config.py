@@ -28,12 +28,44 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
+    # Verified-token and principal caches (evicted cluster-wide over Redis pub/sub)
+    AUTH_TOKEN_CACHE_SIZE: int = Field(default=10000, json_schema_extra={"env": "AUTH_TOKEN_CACHE_SIZE"})
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = Field(default=300, json_schema_extra={"env": "AUTH_TOKEN_CACHE_TTL_SECONDS"})
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = Field(default=60, json_schema_extra={"env": "AUTH_PRINCIPAL_CACHE_TTL_SECONDS"})
+    AUTH_CACHE_INVALIDATION_CHANNEL: str = Field(default="auth:invalidate", json_schema_extra={"env": "AUTH_CACHE_INVALIDATION_CHANNEL"})
+    
     # Database
     # Default to local SQLite in development to avoid external dependencies
     # Use a stable subdirectory to avoid permission/path issues
     DATABASE_URL: str = Field(default="sqlite:///./data/app.db", json_schema_extra={"env": "DATABASE_URL"})
     DATABASE_POOL_SIZE: int = 10
     DATABASE_MAX_OVERFLOW: int = 20
+    # Checkout wait before a request fails with 503 instead of queuing behind a saturated pool
+    DATABASE_POOL_TIMEOUT_SECONDS: float = Field(default=5.0, json_schema_extra={"env": "DATABASE_POOL_TIMEOUT_SECONDS"})
+    # Requests allowed to queue for a connection once the pool is at capacity; later ones are shed at once
+    DATABASE_POOL_MAX_WAITING: int = Field(default=20, json_schema_extra={"env": "DATABASE_POOL_MAX_WAITING"})
+    # Pool auto-tuning: capacity (pool size + overflow) moves within these bounds to keep p95 checkout wait on target
+    DATABASE_POOL_AUTOTUNE: bool = Field(default=True, json_schema_extra={"env": "DATABASE_POOL_AUTOTUNE"})
+    DATABASE_POOL_MIN_SIZE: int = Field(default=5, json_schema_extra={"env": "DATABASE_POOL_MIN_SIZE"})
+    DATABASE_POOL_MAX_CONNECTIONS: int = Field(default=60, json_schema_extra={"env": "DATABASE_POOL_MAX_CONNECTIONS"})
+    DATABASE_POOL_TARGET_WAIT_MS: float = Field(default=50.0, json_schema_extra={"env": "DATABASE_POOL_TARGET_WAIT_MS"})
+    DATABASE_POOL_TUNE_INTERVAL_SECONDS: float = Field(default=10.0, json_schema_extra={"env": "DATABASE_POOL_TUNE_INTERVAL_SECONDS"})
+    # Fraction of the server's free connection slots (PostgreSQL max_connections) one process may grow into
+    DATABASE_POOL_DB_CONNECTION_SHARE: float = Field(default=0.5, json_schema_extra={"env": "DATABASE_POOL_DB_CONNECTION_SHARE"})
+    # Tables are created by src/init_db.py (`make init-db`), not by every server start
+    DATABASE_CREATE_SCHEMA_ON_STARTUP: bool = Field(default=False, json_schema_extra={"env": "DATABASE_CREATE_SCHEMA_ON_STARTUP"})
+    QUERY_INSTRUMENTATION_ENABLED: bool = Field(default=True, json_schema_extra={"env": "QUERY_INSTRUMENTATION_ENABLED"})
+    # A statement fingerprint executed more often than this in one request is flagged as N+1
+    QUERY_N_PLUS_ONE_THRESHOLD: int = Field(default=10, json_schema_extra={"env": "QUERY_N_PLUS_ONE_THRESHOLD"})
+    # Read replicas for analytics/list endpoints; empty means every read goes to the primary
+    DATABASE_REPLICA_URLS: List[str] = Field(default=[], json_schema_extra={"env": "DATABASE_REPLICA_URLS"})
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = Field(default=5.0, json_schema_extra={"env": "DATABASE_REPLICA_MAX_LAG_SECONDS"})
+    DATABASE_REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = Field(default=5.0, json_schema_extra={"env": "DATABASE_REPLICA_LAG_CHECK_INTERVAL_SECONDS"})
+    # After a user writes, their reads stay on the primary this long
+    DATABASE_READ_YOUR_WRITES_SECONDS: float = Field(default=10.0, json_schema_extra={"env": "DATABASE_READ_YOUR_WRITES_SECONDS"})
+    DATABASE_REPLICA_WRITE_CHANNEL: str = Field(default="db:writes", json_schema_extra={"env": "DATABASE_REPLICA_WRITE_CHANNEL"})
+    # Listings count rows exactly up to this many, then fall back to the planner's estimate
+    PAGINATION_EXACT_COUNT_LIMIT: int = Field(default=10000, json_schema_extra={"env": "PAGINATION_EXACT_COUNT_LIMIT"})
     
     # Redis
     # Redis is optional in development; features depending on it will degrade gracefully
@@ -155,6 +187,12 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = Field(default=100, json_schema_extra={"env": "RATE_LIMIT_PER_MINUTE"})
     RATE_LIMIT_BURST: int = Field(default=200, json_schema_extra={"env": "RATE_LIMIT_BURST"})
+    # Local pre-admission tier: processes lease quota from Redis in batches.
+    # The error budget is the fraction of a limit one process may hold at once.
+    RATE_LIMIT_LOCAL_TIER_ENABLED: bool = Field(default=True, json_schema_extra={"env": "RATE_LIMIT_LOCAL_TIER_ENABLED"})
+    RATE_LIMIT_ERROR_BUDGET: float = Field(default=0.05, json_schema_extra={"env": "RATE_LIMIT_ERROR_BUDGET"})
+    RATE_LIMIT_MAX_LEASE: int = Field(default=100, json_schema_extra={"env": "RATE_LIMIT_MAX_LEASE"})
+    RATE_LIMIT_RECONCILE_INTERVAL_SECONDS: float = Field(default=1.0, json_schema_extra={"env": "RATE_LIMIT_RECONCILE_INTERVAL_SECONDS"})
     
     # Monitoring
     ENABLE_MONITORING: bool = Field(default=True, json_schema_extra={"env": "ENABLE_MONITORING"})
@@ -194,6 +232,70 @@ class Settings(BaseSettings):
     SAGE_CONFIG: Dict[str, Any] = Field(default={}, json_schema_extra={"env": "SAGE_CONFIG"})
     SAP_CONFIG: Dict[str, Any] = Field(default={}, json_schema_extra={"env": "SAP_CONFIG"})
     
+    # Local GP master-data mirror (vendors, open POs, receipts) used for matching
+    GP_MIRROR_ENABLED: bool = Field(default=False, json_schema_extra={"env": "GP_MIRROR_ENABLED"})
+    GP_MIRROR_SYNC_INTERVAL_SECONDS: float = Field(default=300.0, json_schema_extra={"env": "GP_MIRROR_SYNC_INTERVAL_SECONDS"})
+    GP_MIRROR_BATCH_SIZE: int = Field(default=5000, json_schema_extra={"env": "GP_MIRROR_BATCH_SIZE"})
+    GP_MIRROR_LOOKBACK_SECONDS: float = Field(default=120.0, json_schema_extra={"env": "GP_MIRROR_LOOKBACK_SECONDS"})
+    GP_MIRROR_RECONCILE_INTERVAL_SECONDS: float = Field(default=3600.0, json_schema_extra={"env": "GP_MIRROR_RECONCILE_INTERVAL_SECONDS"})
+    
+    # ERP adapter bulkheads: per-connection concurrency, timeouts and circuit breakers
+    ERP_MAX_CONCURRENT_CALLS: int = Field(default=8, json_schema_extra={"env": "ERP_MAX_CONCURRENT_CALLS"})
+    ERP_MAX_WAITING_CALLS: int = Field(default=32, json_schema_extra={"env": "ERP_MAX_WAITING_CALLS"})
+    ERP_CALL_TIMEOUT_SECONDS: float = Field(default=30.0, json_schema_extra={"env": "ERP_CALL_TIMEOUT_SECONDS"})
+    ERP_HEALTH_TIMEOUT_SECONDS: float = Field(default=5.0, json_schema_extra={"env": "ERP_HEALTH_TIMEOUT_SECONDS"})
+    ERP_HEALTH_CACHE_TTL_SECONDS: float = Field(default=30.0, json_schema_extra={"env": "ERP_HEALTH_CACHE_TTL_SECONDS"})
+    ERP_CIRCUIT_FAILURE_THRESHOLD: int = Field(default=5, json_schema_extra={"env": "ERP_CIRCUIT_FAILURE_THRESHOLD"})
+    ERP_CIRCUIT_RESET_SECONDS: float = Field(default=30.0, json_schema_extra={"env": "ERP_CIRCUIT_RESET_SECONDS"})
+    ERP_HTTP_MAX_CONNECTIONS: int = Field(default=20, json_schema_extra={"env": "ERP_HTTP_MAX_CONNECTIONS"})
+    ERP_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=10, json_schema_extra={"env": "ERP_HTTP_MAX_KEEPALIVE_CONNECTIONS"})
+    # Extra ERP adapters as {"erp_type": "module:ClassName"}, imported when first used (services.erp_adapters)
+    ERP_ADAPTER_PLUGINS: Dict[str, str] = Field(default={}, json_schema_extra={"env": "ERP_ADAPTER_PLUGINS"})
+
+    # Outbox-driven ERP sync: per-ERP worker pools paced to each system's rate limit
+    ERP_SYNC_QUEUE_ENABLED: bool = Field(default=False, json_schema_extra={"env": "ERP_SYNC_QUEUE_ENABLED"})
+    ERP_SYNC_WORKERS: Dict[str, int] = Field(
+        default={"dynamics_gp": 4, "sap": 2, "quickbooks": 2, "xero": 2},
+        json_schema_extra={"env": "ERP_SYNC_WORKERS"}
+    )
+    # Requests per second per target system (QuickBooks Online allows 500/min, Xero 60/min)
+    ERP_SYNC_RATE_LIMITS: Dict[str, float] = Field(
+        default={"dynamics_gp": 10.0, "sap": 5.0, "quickbooks": 8.0, "xero": 1.0},
+        json_schema_extra={"env": "ERP_SYNC_RATE_LIMITS"}
+    )
+    ERP_SYNC_MAX_ATTEMPTS: int = Field(default=8, json_schema_extra={"env": "ERP_SYNC_MAX_ATTEMPTS"})
+    ERP_SYNC_BACKOFF_BASE_SECONDS: float = Field(default=2.0, json_schema_extra={"env": "ERP_SYNC_BACKOFF_BASE_SECONDS"})
+    ERP_SYNC_BACKOFF_MAX_SECONDS: float = Field(default=900.0, json_schema_extra={"env": "ERP_SYNC_BACKOFF_MAX_SECONDS"})
+    ERP_SYNC_LEASE_SECONDS: float = Field(default=300.0, json_schema_extra={"env": "ERP_SYNC_LEASE_SECONDS"})
+    # Fallback poll for jobs enqueued by other replicas (local enqueues wake workers immediately)
+    ERP_SYNC_POLL_INTERVAL_SECONDS: float = Field(default=5.0, json_schema_extra={"env": "ERP_SYNC_POLL_INTERVAL_SECONDS"})
+
+    # Shared supplier -> ERP vendor resolution (services.vendor_resolution)
+    VENDOR_RESOLUTION_PERSIST: bool = Field(default=True, json_schema_extra={"env": "VENDOR_RESOLUTION_PERSIST"})
+    # Minimum name similarity (0-1, trigram + token) for a known vendor to be suggested for a supplier
+    VENDOR_MATCH_THRESHOLD: float = Field(default=0.55, json_schema_extra={"env": "VENDOR_MATCH_THRESHOLD"})
+    # Similarity at which a suggestion is posted to without review; "Acme Widget" and
+    # "North Star Lighting" both score ~0.6 against their nearest known vendor
+    VENDOR_FUZZY_ACCEPT_THRESHOLD: float = Field(default=0.9, json_schema_extra={"env": "VENDOR_FUZZY_ACCEPT_THRESHOLD"})
+    VENDOR_RESOLUTION_CONCURRENCY: int = Field(default=4, json_schema_extra={"env": "VENDOR_RESOLUTION_CONCURRENCY"})
+    # Cached mappings are reloaded from the database this often; corrections (``remember``) are
+    # also published on the channel so other replicas reload that company at once
+    VENDOR_INDEX_TTL_SECONDS: float = Field(default=300.0, json_schema_extra={"env": "VENDOR_INDEX_TTL_SECONDS"})
+    VENDOR_MAPPING_INVALIDATION_CHANNEL: str = Field(default="vendor-mappings:invalidate", json_schema_extra={"env": "VENDOR_MAPPING_INVALIDATION_CHANNEL"})
+
+    # ERP document-status reconciliation (services.erp_status_sync)
+    ERP_STATUS_SYNC_ENABLED: bool = Field(default=False, json_schema_extra={"env": "ERP_STATUS_SYNC_ENABLED"})
+    ERP_STATUS_SYNC_INTERVAL_SECONDS: float = Field(default=300.0, json_schema_extra={"env": "ERP_STATUS_SYNC_INTERVAL_SECONDS"})
+    # Each pass re-reads this far behind the watermark, for changes committed late by the ERP
+    ERP_STATUS_SYNC_OVERLAP_SECONDS: float = Field(default=120.0, json_schema_extra={"env": "ERP_STATUS_SYNC_OVERLAP_SECONDS"})
+    ERP_STATUS_SYNC_PAGE_SIZE: int = Field(default=500, json_schema_extra={"env": "ERP_STATUS_SYNC_PAGE_SIZE"})
+    ERP_STATUS_BATCH_SIZE: int = Field(default=50, json_schema_extra={"env": "ERP_STATUS_BATCH_SIZE"})
+    # Master key for ERP status webhooks; each company signs with a key derived from it
+    # (services.erp_status_sync.company_webhook_secret). Webhooks are disabled while unset
+    ERP_WEBHOOK_SECRET: Optional[str] = Field(default=None, json_schema_extra={"env": "ERP_WEBHOOK_SECRET"})
+    # Deliveries whose signed timestamp is further than this from now are rejected as replays
+    ERP_WEBHOOK_TOLERANCE: int = Field(default=300, json_schema_extra={"env": "ERP_WEBHOOK_TOLERANCE"})
+
     # Cache Configuration
     CACHE_TTL_SECONDS: int = Field(default=3600, json_schema_extra={"env": "CACHE_TTL_SECONDS"})
     CACHE_MAX_SIZE: int = Field(default=1000, json_schema_extra={"env": "CACHE_MAX_SIZE"})
@@ -241,7 +343,28 @@ class Settings(BaseSettings):
     ENABLE_AUDIT_LOGGING: bool = Field(default=True, json_schema_extra={"env": "ENABLE_AUDIT_LOGGING"})
     AUDIT_LOG_RETENTION_DAYS: int = Field(default=365, json_schema_extra={"env": "AUDIT_LOG_RETENTION_DAYS"})
     ENABLE_GDPR_COMPLIANCE: bool = Field(default=True, json_schema_extra={"env": "ENABLE_GDPR_COMPLIANCE"})
-    
+
+    # Audit write pipeline (buffered, bulk-flushed audit rows)
+    AUDIT_ASYNC_WRITES_ENABLED: bool = Field(default=True, json_schema_extra={"env": "AUDIT_ASYNC_WRITES_ENABLED"})
+    AUDIT_BUFFER_SIZE: int = Field(default=10000, json_schema_extra={"env": "AUDIT_BUFFER_SIZE"})
+    AUDIT_FLUSH_BATCH_SIZE: int = Field(default=500, json_schema_extra={"env": "AUDIT_FLUSH_BATCH_SIZE"})
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = Field(default=1.0, json_schema_extra={"env": "AUDIT_FLUSH_INTERVAL_SECONDS"})
+    AUDIT_SPILL_DIR: str = Field(default="data/audit_spill", json_schema_extra={"env": "AUDIT_SPILL_DIR"})
+    AUDIT_SYNC_ACTIONS: List[str] = Field(
+        default=["approve", "reject", "post", "delete", "password_change", "role_change", "subscription_change"],
+        json_schema_extra={"env": "AUDIT_SYNC_ACTIONS"}
+    )
+    AUDIT_PARTITION_MONTHS_AHEAD: int = Field(default=3, json_schema_extra={"env": "AUDIT_PARTITION_MONTHS_AHEAD"})
+    AUDIT_PURGE_BATCH_SIZE: int = Field(default=5000, json_schema_extra={"env": "AUDIT_PURGE_BATCH_SIZE"})
+    # Background upkeep: create upcoming partitions and apply AUDIT_LOG_RETENTION_DAYS (services.audit_maintenance)
+    AUDIT_MAINTENANCE_ENABLED: bool = Field(default=True, json_schema_extra={"env": "AUDIT_MAINTENANCE_ENABLED"})
+    AUDIT_MAINTENANCE_INTERVAL_SECONDS: float = Field(default=21600.0, json_schema_extra={"env": "AUDIT_MAINTENANCE_INTERVAL_SECONDS"})
+
+    # Bulk invoice ingestion (multi-row inserts; COPY on Postgres above the threshold)
+    INVOICE_BULK_BATCH_SIZE: int = Field(default=1000, json_schema_extra={"env": "INVOICE_BULK_BATCH_SIZE"})
+    INVOICE_BULK_COPY_THRESHOLD: int = Field(default=20000, json_schema_extra={"env": "INVOICE_BULK_COPY_THRESHOLD"})
+    INVOICE_BULK_MAX_ITEMS: int = Field(default=10000, json_schema_extra={"env": "INVOICE_BULK_MAX_ITEMS"})
+
     # Performance Monitoring
     ENABLE_PERFORMANCE_MONITORING: bool = Field(default=True, json_schema_extra={"env": "ENABLE_PERFORMANCE_MONITORING"})
     PERFORMANCE_METRICS_INTERVAL_SECONDS: int = Field(default=60, json_schema_extra={"env": "PERFORMANCE_METRICS_INTERVAL_SECONDS"})
@@ -1,9 +1,13 @@
 from sqlalchemy import create_engine, MetaData
 from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
 from .config import settings
+from .pool_tuning import PoolAutotuner, TunableAsyncQueuePool, TunableQueuePool
+from .query_instrumentation import query_instrumentation
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,16 +27,22 @@ if database_url.startswith("sqlite"):
     # SQLite-specific options
     connect_args = {"check_same_thread": False}
 
+# Starting sizes; pool_autotuner resizes the pool from observed checkout waits,
+# and a saturated pool sheds checkouts (503) instead of queueing them
 engine = create_engine(
     database_url,
-    poolclass=QueuePool,
+    poolclass=TunableQueuePool,
     pool_size=settings.DATABASE_POOL_SIZE,
     max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS,
     pool_pre_ping=True,
     echo=settings.DEBUG,
     connect_args=connect_args
 )
 
+query_instrumentation.instrument_engine(engine)
+pool_autotuner = PoolAutotuner(engine)
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -50,6 +60,110 @@ def get_db() -> Session:
     finally:
         db.close()
 
+# Async engine for request handlers. Created on first use so the asyncio
+# driver (asyncpg / aiosqlite) is only imported by processes that need it.
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+# Tunes the async engine's pool once it exists; PostgreSQL's connection limit
+# is read through the sync engine, since the async one needs the event loop
+async_pool_autotuner = PoolAutotuner(None, limit_engine=engine)
+
+def async_database_url(url: str) -> URL:
+    """Swap the sync driver in ``url`` for its asyncio counterpart"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+def create_async_database_engine(url: str) -> AsyncEngine:
+    """Build an async engine with the same pool sizing, timeout and load shedding as the sync one"""
+    async_url = async_database_url(url)
+    options = {"pool_pre_ping": True, "echo": settings.DEBUG}
+    if async_url.get_backend_name() != "sqlite":
+        options.update(
+            poolclass=TunableAsyncQueuePool,
+            pool_size=settings.DATABASE_POOL_SIZE,
+            max_overflow=settings.DATABASE_MAX_OVERFLOW,
+            pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS
+        )
+    async_engine = create_async_engine(async_url, **options)
+    # Async engines run their statements through a sync core engine underneath
+    query_instrumentation.instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_database_engine(database_url)
+        async_pool_autotuner.engine = _async_engine.sync_engine
+    return _async_engine
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Factory for AsyncSessions bound to the shared async engine
+
+    ``expire_on_commit`` is off: reloading an expired attribute would be
+    implicit IO, which an AsyncSession cannot do outside an await.
+    """
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(
+            get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency to get an async database session
+
+    Queries await on the driver instead of blocking the event loop, so one
+    worker can overlap many DB-bound requests.
+    """
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+async def dispose_async_engine():
+    """Close pooled async connections (application shutdown)"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    async_pool_autotuner.engine = None
+    _async_session_factory = None
+
+# asyncpg accepts at most 32767 bind parameters per statement, SQLite (3.32+) 32766
+MAX_BIND_PARAMETERS = 32766
+
+async def upsert_rows(session: AsyncSession, model, values: List[Dict[str, Any]]) -> None:
+    """Insert ``values`` into ``model``'s table, updating rows whose primary key exists
+
+    Uses ``INSERT ... ON CONFLICT DO UPDATE`` on PostgreSQL and SQLite (every
+    value dict must have the same keys), split into statements that stay under
+    the drivers' bind parameter limit; other databases merge row by row.
+    """
+    if not values:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        for value in values:
+            await session.merge(model(**value))
+        return
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    primary_key = [column.name for column in model.__table__.primary_key.columns]
+    rows_per_statement = max(1, MAX_BIND_PARAMETERS // len(values[0]))
+    for start in range(0, len(values), rows_per_statement):
+        statement = insert(model).values(values[start:start + rows_per_statement])
+        statement = statement.on_conflict_do_update(
+            index_elements=primary_key,
+            set_={name: statement.excluded[name] for name in values[0] if name not in primary_key}
+        )
+        await session.execute(statement)
+
 def init_db():
     """Initialize database tables"""
     try:
@@ -10,7 +10,7 @@ from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime, timedelta, UTC
 from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool, StaticPool, NullPool
+from sqlalchemy.pool import StaticPool, NullPool
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError, DisconnectionError
 import threading
@@ -19,9 +19,21 @@ from dataclasses import dataclass
 from enum import Enum
 
 from .config import settings
+from .database import get_async_sessionmaker
+from .pool_tuning import (
+    CheckoutMetrics, PoolSaturatedError, PoolSizeController, PoolTuner, PoolWindow, TunableQueuePool
+)
+from .query_instrumentation import query_instrumentation
 
 logger = logging.getLogger(__name__)
 
+# The pool tuning types are re-exported for callers that configure pools through this module
+__all__ = [
+    "AdvancedConnectionPool", "ConnectionPoolType", "ConnectionStats", "DatabaseHealthChecker",
+    "DatabaseSessionManager", "connection_pool", "db_health_checker", "session_manager",
+    "CheckoutMetrics", "PoolSaturatedError", "PoolSizeController", "PoolTuner", "PoolWindow", "TunableQueuePool"
+]
+
 class ConnectionPoolType(Enum):
     """Connection pool types"""
     QUEUE = "queue"
@@ -51,6 +63,11 @@ class AdvancedConnectionPool:
         self._lock = threading.Lock()
         self._monitoring_active = False
         self._monitoring_thread = None
+        self._stop_monitoring = threading.Event()
+        
+        # Pool auto-tuning
+        self.autotune_enabled = settings.DATABASE_POOL_AUTOTUNE and pool_type == ConnectionPoolType.QUEUE
+        self.tuner = PoolTuner()
         
         # Performance metrics
         self.query_times = []
@@ -68,6 +85,17 @@ class AdvancedConnectionPool:
             # Configure pool based on type
             pool_config = self._get_pool_config()
             
+            if "postgresql" in self.database_url:
+                connect_args = {
+                    "connect_timeout": 10,
+                    "application_name": "ai-erp-saas",
+                    "options": "-c default_transaction_isolation=read committed"
+                }
+            elif "sqlite" in self.database_url:
+                connect_args = {"check_same_thread": False}
+            else:
+                connect_args = {}
+            
             # Create engine with advanced configuration
             self.engine = create_engine(
                 self.database_url,
@@ -75,11 +103,7 @@ class AdvancedConnectionPool:
                 pool_pre_ping=True,
                 echo=settings.DEBUG,
                 echo_pool=settings.DEBUG,
-                connect_args={
-                    "connect_timeout": 10,
-                    "application_name": "ai-erp-saas",
-                    "options": "-c default_transaction_isolation=read committed"
-                }
+                connect_args=connect_args
             )
             
             # Create session factory
@@ -103,10 +127,12 @@ class AdvancedConnectionPool:
         }
         
         if self.pool_type == ConnectionPoolType.QUEUE:
+            # Starting sizes; the monitor thread tunes them from observed checkout waits
             base_config.update({
-                "poolclass": QueuePool,
+                "poolclass": TunableQueuePool,
                 "pool_size": settings.DATABASE_POOL_SIZE,
                 "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+                "pool_timeout": settings.DATABASE_POOL_TIMEOUT_SECONDS,
             })
         elif self.pool_type == ConnectionPoolType.STATIC:
             base_config.update({
@@ -133,11 +159,15 @@ class AdvancedConnectionPool:
                     cursor.execute("SET statement_timeout TO '30s'")
                     cursor.execute("SET lock_timeout TO '10s'")
             elif "sqlite" in self.database_url:
-                # SQLite specific settings
-                with dbapi_connection.cursor() as cursor:
-                    cursor.execute("PRAGMA foreign_keys=ON")
-                    cursor.execute("PRAGMA journal_mode=WAL")
-                    cursor.execute("PRAGMA synchronous=NORMAL")
+                # SQLite specific settings (sqlite3 cursors are not context managers)
+                cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA foreign_keys=ON")
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                cursor.close()
+        
+        # Per-statement timing feeds record_query_time and the request's query stats
+        query_instrumentation.instrument_engine(self.engine, on_query=self.record_query_time)
         
         @event.listens_for(self.engine, "checkout")
         def receive_checkout(dbapi_connection, connection_record, connection_proxy):
@@ -162,15 +192,24 @@ class AdvancedConnectionPool:
             logger.info("Connection pool monitoring started")
     
     def _monitor_pool(self):
-        """Background monitoring of connection pool health"""
+        """Background monitoring and tuning of the connection pool"""
+        interval = settings.DATABASE_POOL_TUNE_INTERVAL_SECONDS
         while self._monitoring_active:
             try:
                 self._update_stats()
                 self._check_pool_health()
-                time.sleep(30)  # Check every 30 seconds
+                if self._stop_monitoring.wait(interval):
+                    break
+                # Tune only on complete windows, never on the empty one at startup
+                if self.autotune_enabled:
+                    self.tune_pool()
             except Exception as e:
                 logger.error(f"Error in pool monitoring: {e}")
-                time.sleep(60)  # Wait longer on error
+                self._stop_monitoring.wait(interval * 2)  # Wait longer on error
+    
+    def tune_pool(self) -> Optional[Dict[str, Any]]:
+        """Run one controller step: resize the pool from the last interval's checkout metrics"""
+        return self.tuner.tune(self.engine)
     
     def _update_stats(self):
         """Update connection pool statistics"""
@@ -230,20 +269,18 @@ class AdvancedConnectionPool:
     
     @asynccontextmanager
     async def get_async_session_context(self):
-        """Get an async database session context"""
-        # This would be implemented with async SQLAlchemy
-        # For now, we'll use the synchronous version
-        session = self.get_session()
-        try:
-            yield session
-        except Exception as e:
-            session.rollback()
-            raise
-        finally:
-            session.close()
+        """Get an AsyncSession on the shared async engine with automatic cleanup"""
+        async with get_async_sessionmaker()() as session:
+            try:
+                yield session
+            except Exception:
+                await session.rollback()
+                raise
     
     def get_stats(self) -> Dict[str, Any]:
         """Get comprehensive connection pool statistics"""
+        pool = self.engine.pool if self.engine else None
+        tunable = isinstance(pool, TunableQueuePool)
         with self._lock:
             return {
                 "pool_type": self.pool_type.value,
@@ -260,20 +297,26 @@ class AdvancedConnectionPool:
                     "avg_query_time": self.avg_query_time,
                     "total_queries": len(self.query_times)
                 },
-                "connection_errors": len(self.connection_errors)
+                "connection_errors": len(self.connection_errors),
+                "capacity": pool.capacity() if tunable else None,
+                "waiting": pool.waiting() if tunable else 0,
+                "checkout_wait": pool.metrics.snapshot() if tunable else None,
+                "auto_tuning": self.tuner.status(self.autotune_enabled)
             }
     
     def record_query_time(self, query_time: float):
         """Record query execution time for performance monitoring"""
-        self.query_times.append(query_time)
-        
-        # Keep only last 1000 query times
-        if len(self.query_times) > 1000:
-            self.query_times = self.query_times[-1000:]
-        
-        # Update statistics
-        self.max_query_time = max(self.max_query_time, query_time)
-        self.avg_query_time = sum(self.query_times) / len(self.query_times)
+        # Called for every statement, possibly from several threads at once
+        with self._lock:
+            self.query_times.append(query_time)
+            
+            # Keep only last 1000 query times
+            if len(self.query_times) > 1000:
+                self.query_times = self.query_times[-1000:]
+            
+            # Update statistics
+            self.max_query_time = max(self.max_query_time, query_time)
+            self.avg_query_time = sum(self.query_times) / len(self.query_times)
     
     def record_connection_error(self, error: Exception):
         """Record connection error for monitoring"""
@@ -289,6 +332,7 @@ class AdvancedConnectionPool:
     def close(self):
         """Close the connection pool and cleanup resources"""
         self._monitoring_active = False
+        self._stop_monitoring.set()
         if self._monitoring_thread:
             self._monitoring_thread.join(timeout=5)
         
@@ -6,19 +6,19 @@ import logging
 import os
 import json
 from typing import Dict, Any, List, Optional, Tuple
-from datetime import datetime
+from datetime import datetime, date, UTC
 from pathlib import Path
-from sqlalchemy import text, MetaData, Table, Column, String, DateTime, Text, JSON
+from contextlib import contextmanager
+from sqlalchemy import text, inspect, MetaData, Table, Column, String, DateTime, Text, JSON
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-import alembic
-from alembic import command
-from alembic.config import Config
-from alembic.runtime.migration import MigrationContext
-from alembic.script import ScriptDirectory
 
 from .database import engine, SessionLocal, Base
 from .config import settings
+from .lazy import lazy_import
+
+# Alembic is loaded by the first migration manager, not by importing this module
+command = lazy_import("alembic.command")
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +28,8 @@ class MigrationManager:
     def __init__(self, engine, alembic_cfg_path: str = "alembic.ini"):
         self.engine = engine
         self.alembic_cfg_path = alembic_cfg_path
+        from alembic.config import Config
+        from alembic.script import ScriptDirectory
         self.alembic_cfg = Config(alembic_cfg_path)
         self.script_dir = ScriptDirectory.from_config(self.alembic_cfg)
         
@@ -62,6 +64,7 @@ class MigrationManager:
         try:
             with SessionLocal() as db:
                 # Get current database revision
+                from alembic.runtime.migration import MigrationContext
                 context = MigrationContext.configure(db.connection())
                 current_rev = context.get_current_revision()
                 
@@ -128,6 +131,9 @@ class MigrationManager:
                 # Run alembic upgrade
                 command.upgrade(self.alembic_cfg, target_revision)
                 
+                # Keep monthly audit partitions created ahead of time
+                partitions_created = get_audit_partition_manager().ensure_future_partitions()
+                
                 # Get status after migration
                 status_after = await self.get_migration_status()
                 
@@ -139,6 +145,7 @@ class MigrationManager:
                     "target_revision": target_revision,
                     "migrations_applied": len(status_after.get("applied_migrations", [])) - 
                                         len(status_before.get("applied_migrations", [])),
+                    "audit_partitions_created": partitions_created,
                     "before_status": status_before,
                     "after_status": status_after,
                     "timestamp": datetime.now(UTC).isoformat()
@@ -568,10 +575,202 @@ class DatabaseSchemaValidator:
         except Exception as e:
             return {"status": "error", "error": str(e)}
 
+class AuditLogPartitionManager:
+    """Monthly range partitioning and partition-based retention for audit_logs.
+
+    Partitioning is only available on PostgreSQL; on other dialects (SQLite in
+    development) every method is a no-op and retention falls back to batched
+    deletes in ``AuditService``.
+    """
+    
+    TABLE_NAME = "audit_logs"
+    PARTITION_PREFIX = "audit_logs_p"
+    
+    def __init__(self, engine):
+        self.engine = engine
+    
+    @property
+    def is_supported(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+    
+    @contextmanager
+    def _connect(self, connection=None):
+        # Alembic revisions pass their own connection; everything else runs in its own transaction
+        if connection is not None:
+            yield connection
+        else:
+            with self.engine.begin() as conn:
+                yield conn
+    
+    @staticmethod
+    def _month_start(day: date) -> date:
+        return date(day.year, day.month, 1)
+    
+    @staticmethod
+    def _next_month(month_start: date) -> date:
+        if month_start.month == 12:
+            return date(month_start.year + 1, 1, 1)
+        return date(month_start.year, month_start.month + 1, 1)
+    
+    @classmethod
+    def partition_name(cls, month_start: date) -> str:
+        return f"{cls.PARTITION_PREFIX}{month_start.year:04d}_{month_start.month:02d}"
+    
+    @classmethod
+    def partition_month(cls, partition_name: str) -> Optional[date]:
+        """Month start encoded in a partition name, or None for non-monthly partitions"""
+        try:
+            year, month = partition_name[len(cls.PARTITION_PREFIX):].split("_")
+            return date(int(year), int(month), 1)
+        except ValueError:
+            return None
+    
+    def _timestamp_column(self, conn) -> str:
+        columns = {column["name"] for column in inspect(conn).get_columns(self.TABLE_NAME)}
+        return "timestamp" if "timestamp" in columns else "created_at"
+    
+    def is_partitioned(self, connection=None) -> bool:
+        if not self.is_supported:
+            return False
+        with self._connect(connection) as conn:
+            return bool(conn.execute(text("""
+                SELECT 1 FROM pg_partitioned_table pt
+                JOIN pg_class c ON c.oid = pt.partrelid
+                WHERE c.relname = :table_name
+            """), {"table_name": self.TABLE_NAME}).scalar())
+    
+    def list_partitions(self, connection=None) -> List[str]:
+        if not self.is_supported:
+            return []
+        with self._connect(connection) as conn:
+            rows = conn.execute(text("""
+                SELECT child.relname
+                FROM pg_inherits i
+                JOIN pg_class parent ON parent.oid = i.inhparent
+                JOIN pg_class child ON child.oid = i.inhrelid
+                WHERE parent.relname = :table_name
+                ORDER BY child.relname
+            """), {"table_name": self.TABLE_NAME}).fetchall()
+            return [row[0] for row in rows]
+    
+    def _create_partition(self, conn, month_start: date) -> str:
+        name = self.partition_name(month_start)
+        conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {self.TABLE_NAME} '
+            f"FOR VALUES FROM ('{month_start.isoformat()}') TO ('{self._next_month(month_start).isoformat()}')"
+        ))
+        return name
+    
+    def convert_to_partitioned(self, connection=None) -> Dict[str, Any]:
+        """Rebuild audit_logs as a table partitioned by month on its timestamp column.
+
+        Existing rows are copied into monthly partitions. The primary key becomes
+        (id, timestamp) as PostgreSQL requires the partition key in unique
+        constraints; foreign keys are not recreated so audit history can outlive
+        the users and companies it references.
+        """
+        if not self.is_supported:
+            return {"status": "skipped", "reason": f"partitioning not supported on {self.engine.dialect.name}"}
+        
+        with self._connect(connection) as conn:
+            if self.is_partitioned(conn):
+                return {"status": "skipped", "reason": "already partitioned"}
+            
+            ts_column = self._timestamp_column(conn)
+            legacy_table = f"{self.TABLE_NAME}_unpartitioned"
+            
+            conn.execute(text(f'ALTER TABLE {self.TABLE_NAME} RENAME TO {legacy_table}'))
+            conn.execute(text(
+                f'CREATE TABLE {self.TABLE_NAME} (LIKE {legacy_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+                f'PARTITION BY RANGE ("{ts_column}")'
+            ))
+            conn.execute(text(f'ALTER TABLE {self.TABLE_NAME} ADD PRIMARY KEY (id, "{ts_column}")'))
+            legacy_indexes = inspect(conn).get_indexes(legacy_table)
+            
+            oldest = conn.execute(text(f'SELECT MIN("{ts_column}") FROM {legacy_table}')).scalar()
+            created = self.ensure_future_partitions(conn, start=oldest.date() if oldest else None)
+            
+            moved = conn.execute(text(f'INSERT INTO {self.TABLE_NAME} SELECT * FROM {legacy_table}')).rowcount
+            conn.execute(text(f'DROP TABLE {legacy_table}'))
+            
+            # Indexes are built after the copy (and once their names are free again)
+            self._recreate_indexes(conn, legacy_indexes)
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS idx_audit_company_ts ON {self.TABLE_NAME} (company_id, "{ts_column}")'))
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS idx_audit_user_ts ON {self.TABLE_NAME} (user_id, "{ts_column}")'))
+            
+            logger.info(f"Converted {self.TABLE_NAME} to monthly partitions ({moved} rows, {len(created)} partitions)")
+            return {"status": "converted", "rows_moved": moved, "partitions_created": created}
+    
+    def _recreate_indexes(self, conn, indexes: List[Dict[str, Any]]):
+        """Recreate the unpartitioned table's secondary indexes on the partitioned parent
+        
+        PostgreSQL builds each one on every partition. Unique indexes would need
+        the partition key and expression indexes are not reflected, so those are
+        logged and left out.
+        """
+        for index in indexes:
+            columns = index.get("column_names") or []
+            if index.get("unique") or not columns or None in columns:
+                logger.warning(f"Not recreating index {index['name']} on partitioned {self.TABLE_NAME}")
+                continue
+            column_list = ", ".join(f'"{column}"' for column in columns)
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS "{index["name"]}" ON {self.TABLE_NAME} ({column_list})'))
+    
+    def ensure_future_partitions(self, connection=None, months_ahead: int = None,
+                                 start: Optional[date] = None) -> List[str]:
+        """Create monthly partitions from ``start`` (default: this month) through ``months_ahead`` months"""
+        if not self.is_supported:
+            return []
+        
+        months_ahead = settings.AUDIT_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+        today = datetime.now(UTC).date()
+        month = self._month_start(min(start, today) if start else today)
+        last_month = self._month_start(today)
+        for _ in range(months_ahead):
+            last_month = self._next_month(last_month)
+        
+        with self._connect(connection) as conn:
+            if not self.is_partitioned(conn):
+                return []
+            existing = set(self.list_partitions(conn))
+            created = []
+            while month <= last_month:
+                name = self.partition_name(month)
+                if name not in existing:
+                    self._create_partition(conn, month)
+                    created.append(name)
+                month = self._next_month(month)
+        
+        if created:
+            logger.info(f"Created audit partitions: {', '.join(created)}")
+        return created
+    
+    def drop_partitions_before(self, cutoff: datetime, connection=None) -> List[str]:
+        """Detach and drop every monthly partition whose whole range ends on or before ``cutoff``"""
+        if not self.is_supported:
+            return []
+        
+        with self._connect(connection) as conn:
+            if not self.is_partitioned(conn):
+                return []
+            dropped = []
+            for name in self.list_partitions(conn):
+                month = self.partition_month(name)
+                if month is None or self._next_month(month) > cutoff.date():
+                    continue
+                conn.execute(text(f'ALTER TABLE {self.TABLE_NAME} DETACH PARTITION "{name}"'))
+                conn.execute(text(f'DROP TABLE "{name}"'))
+                dropped.append(name)
+        
+        if dropped:
+            logger.info(f"Dropped expired audit partitions: {', '.join(dropped)}")
+        return dropped
+
 # Global instances - lazy initialization
 migration_manager = None
 data_migration_manager = None
 schema_validator = None
+audit_partition_manager = None
 
 def get_migration_manager():
     global migration_manager
@@ -590,3 +789,9 @@ def get_schema_validator():
     if schema_validator is None:
         schema_validator = DatabaseSchemaValidator(engine)
     return schema_validator
+
+def get_audit_partition_manager():
+    global audit_partition_manager
+    if audit_partition_manager is None:
+        audit_partition_manager = AuditLogPartitionManager(engine)
+    return audit_partition_manager
@@ -367,6 +367,21 @@ class DatabaseIndexManager:
                         "columns": ["created_at"],
                         "unique": False
                     },
+                    {
+                        # Keyset pagination of invoice listings; INCLUDE lets list
+                        # pages that only need these columns skip the heap
+                        "name": "idx_invoices_company_created_id",
+                        "table": "invoices",
+                        "columns": ["company_id", "created_at DESC", "id DESC"],
+                        "include": ["invoice_number", "supplier_name", "status", "total_amount", "invoice_date"],
+                        "unique": False
+                    },
+                    {
+                        "name": "idx_invoices_company_status_created_id",
+                        "table": "invoices",
+                        "columns": ["company_id", "status", "created_at DESC", "id DESC"],
+                        "unique": False
+                    },
                     {
                         "name": "idx_invoices_supplier_amount",
                         "table": "invoices",
@@ -402,10 +417,11 @@ class DatabaseIndexManager:
                             # Create index
                             columns_str = ", ".join(index_def["columns"])
                             unique_str = "UNIQUE" if index_def["unique"] else ""
+                            include_str = f"INCLUDE ({', '.join(index_def['include'])})" if index_def.get("include") else ""
                             
                             create_query = text(f"""
                                 CREATE {unique_str} INDEX {index_def['name']} 
-                                ON {index_def['table']} ({columns_str})
+                                ON {index_def['table']} ({columns_str}) {include_str}
                             """)
                             
                             db.execute(create_query)
@@ -10,7 +10,8 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from pydantic import ValidationError
-from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError, TimeoutError as SQLAlchemyTimeoutError
+import math
 import uuid
 from datetime import datetime, UTC
 
@@ -122,6 +123,8 @@ class ErrorHandler:
         if not error_id:
             error_id = str(uuid.uuid4())
         
+        headers = None
+        
         # Determine error details
         if isinstance(error, APIError):
             status_code = error.status_code
@@ -138,6 +141,14 @@ class ErrorHandler:
             error_code = "VALIDATION_ERROR"
             message = "Request validation failed"
             details = {"validation_errors": error.errors()}
+        elif isinstance(error, SQLAlchemyTimeoutError):
+            # Connection pool saturated: fail fast so clients back off instead of piling up
+            retry_after = max(1, math.ceil(settings.DATABASE_POOL_TIMEOUT_SECONDS))
+            status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            error_code = "DATABASE_BUSY"
+            message = "Database is at capacity, please retry shortly"
+            details = {"retry_after": retry_after}
+            headers = {"Retry-After": str(retry_after)}
         elif isinstance(error, SQLAlchemyError):
             status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
             error_code = "DATABASE_ERROR"
@@ -171,7 +182,8 @@ class ErrorHandler:
         
         return JSONResponse(
             status_code=status_code,
-            content=error_response
+            content=error_response,
+            headers=headers
         )
     
     @staticmethod
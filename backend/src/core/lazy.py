@@ -0,0 +1,99 @@
+"""
+Deferred imports and on-first-use service singletons
+
+Importing the application should not load OpenCV, NumPy, the Azure SDKs or
+ODBC drivers, nor open clients to external services: most workers never touch
+them, and every import is paid again by each autoscaled pod before it can
+become ready. ``lazy_import`` stands in for a module until an attribute is
+first read, and ``LazyService`` stands in for a module-level service instance
+until it is first used, so existing ``from x import service`` call sites keep
+working unchanged.
+"""
+import importlib
+import threading
+from types import ModuleType
+from typing import Any, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _LazyModule(ModuleType):
+    """Module placeholder that imports the real module on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        # Module-level configuration such as ``stripe.api_key = ...`` must reach the real module
+        setattr(self._load(), name, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> ModuleType:
+    """``name`` imported on first use; a missing package raises ImportError at that point"""
+    return _LazyModule(name)
+
+
+class LazyService(Generic[T]):
+    """Module-level service instance constructed on first attribute access
+
+    Construction is thread-safe and happens once. Reads, writes and deletes
+    of attributes all go to the instance, so ``mock.patch.object`` and
+    runtime reconfiguration behave as they did with an eager instance.
+    """
+
+    def __init__(self, factory: Callable[[], T], name: str = None):
+        self.__dict__["_factory"] = factory
+        self.__dict__["_instance"] = None
+        self.__dict__["_lock"] = threading.Lock()
+        self.__dict__["_name"] = name or getattr(factory, "__name__", repr(factory))
+
+    def get(self) -> T:
+        """The service instance, constructing it if needed (usable as a FastAPI dependency)"""
+        instance = self.__dict__["_instance"]
+        if instance is None:
+            with self.__dict__["_lock"]:
+                instance = self.__dict__["_instance"]
+                if instance is None:
+                    instance = self.__dict__["_factory"]()
+                    self.__dict__["_instance"] = instance
+        return instance
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__dict__["_instance"] is not None
+
+    def reset(self):
+        """Drop the instance so the next use constructs a fresh one"""
+        with self.__dict__["_lock"]:
+            self.__dict__["_instance"] = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self.get(), name, value)
+
+    def __delattr__(self, name: str):
+        delattr(self.get(), name)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<lazy service {self.__dict__['_name']} ({state})>"
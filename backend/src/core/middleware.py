@@ -1,71 +1,64 @@
 from fastapi import Request, HTTPException, status, Depends
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+from starlette.responses import Response
 from typing import Optional
 import logging
 from .database import get_db
 from .auth import auth_manager
+from .asgi_pipeline import HTTPContext, MiddlewareHook
 from src.models.user import User
 from src.models.company import Company
 
 logger = logging.getLogger(__name__)
 
-class MultiTenantMiddleware:
-    """Middleware for multi-tenant support and company isolation"""
+class MultiTenantHook(MiddlewareHook):
+    """Pipeline hook for multi-tenant support and company isolation"""
     
-    def __init__(self, app):
-        self.app = app
+    # Public endpoints (no authentication required)
+    PUBLIC_PATHS = (
+        "/health",
+        "/docs",
+        "/redoc",
+        "/openapi.json",
+        "/api/v1/auth/login",
+        "/api/v1/auth/register",
+        "/api/v1/auth/refresh",
+        "/api/v1/auth/verify-email",
+        "/api/v1/auth/forgot-password",
+        "/api/v1/auth/reset-password"
+    )
     
-    async def __call__(self, scope, receive, send):
-        if scope["type"] == "http":
-            request = Request(scope, receive)
-            
-            # Skip middleware for public endpoints
-            if self._is_public_endpoint(request.url.path):
-                await self.app(scope, receive, send)
-                return
-            
-            # Extract company context from request
-            company_context = await self._extract_company_context(request)
-            
-            # Add company context to request state
-            request.state.company_context = company_context
-            
-            # Add company context to scope for WebSocket support
-            scope["company_context"] = company_context
-            
-            await self.app(scope, receive, send)
-        else:
-            await self.app(scope, receive, send)
-    
-    def _is_public_endpoint(self, path: str) -> bool:
-        """Check if endpoint is public (no authentication required)"""
-        public_paths = [
-            "/health",
-            "/docs",
-            "/redoc",
-            "/openapi.json",
-            "/api/v1/auth/login",
-            "/api/v1/auth/register",
-            "/api/v1/auth/refresh",
-            "/api/v1/auth/verify-email",
-            "/api/v1/auth/forgot-password",
-            "/api/v1/auth/reset-password"
-        ]
-        return any(path.startswith(public_path) for public_path in public_paths)
+    def on_request(self, ctx: HTTPContext) -> Optional[Response]:
+        if ctx.path.startswith(self.PUBLIC_PATHS):
+            return None
+        
+        # Extract company context from request
+        company_context = self._extract_company_context(ctx)
+        
+        # Add company context to request state
+        ctx.state["company_context"] = company_context
+        
+        # Add company context to scope for WebSocket support
+        ctx.scope["company_context"] = company_context
+        return None
     
-    async def _extract_company_context(self, request: Request) -> Optional[dict]:
+    def _extract_company_context(self, ctx: HTTPContext) -> Optional[dict]:
         """Extract company context from request headers or JWT token"""
         try:
             # Try to get company context from JWT token
-            auth_header = request.headers.get("Authorization")
+            auth_header = ctx.headers.get("Authorization")
             if auth_header and auth_header.startswith("Bearer "):
                 token = auth_header.split(" ")[1]
                 payload = auth_manager.verify_token(token)
+                # Request-scoped claims, reused by AuthManager.get_current_user
+                ctx.state["auth_claims"] = (token, payload)
                 user_id = payload.get("sub")
                 company_id = payload.get("company_id")
                 
                 if user_id and company_id:
+                    ctx.state["user_id"] = user_id
+                    ctx.state["company_id"] = company_id
                     return {
                         "user_id": user_id,
                         "company_id": company_id,
@@ -74,7 +67,7 @@ class MultiTenantMiddleware:
                     }
             
             # Try to get company context from custom headers
-            company_id = request.headers.get("X-Company-ID")
+            company_id = ctx.headers.get("X-Company-ID")
             if company_id:
                 return {
                     "company_id": company_id,
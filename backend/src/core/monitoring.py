@@ -117,6 +117,12 @@ class MetricsCollector:
                 "threshold": 80.0,
                 "level": AlertLevel.WARNING,
                 "message": "High database connection pool usage"
+            },
+            {
+                "metric": "database.request.query_count",
+                "threshold": 100.0,
+                "level": AlertLevel.WARNING,
+                "message": "Request issued an excessive number of database queries"
             }
         ]
     
@@ -461,6 +467,22 @@ class DatabaseMonitor:
             {"query_type": self._get_query_type(query)}
         )
     
+    def track_request_queries(
+        self,
+        method: str,
+        path: str,
+        query_count: int,
+        query_time_ms: float,
+        n_plus_one_count: int = 0
+    ):
+        """Track the database work done by one API request"""
+        tags = {"method": method, "path": path}
+        self.metrics_collector.add_metric("database.request.query_count", query_count, MetricType.HISTOGRAM, tags)
+        self.metrics_collector.add_metric("database.request.query_time", query_time_ms, MetricType.HISTOGRAM, tags)
+        
+        if n_plus_one_count:
+            self.metrics_collector.add_metric("database.n_plus_one.total", n_plus_one_count, MetricType.COUNTER, tags)
+    
     def _get_query_type(self, query: str) -> str:
         """Determine query type from SQL"""
         query_upper = query.upper().strip()
@@ -0,0 +1,393 @@
+"""
+Connection pool load shedding and auto-sizing
+
+``TunableQueuePool`` times every checkout, refuses checkouts outright once
+the pool and its wait queue are full, and can be resized without dropping
+connections. ``PoolTuner`` resizes such a pool from the checkout waits of
+the last interval. The serving engines in ``core.database`` (sync, and
+async through ``TunableAsyncQueuePool``) and the monitored pool in
+``core.database_connection`` use them.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, UTC
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool.base import _AsyncConnDialect
+from sqlalchemy.util.queue import AsyncAdaptedQueue
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+class PoolSaturatedError(SQLAlchemyTimeoutError):
+    """Checkout refused without waiting: the pool is at capacity and its wait queue is full"""
+
+class CheckoutMetrics:
+    """Checkout wait times and load for one pool, shared across pool recreation
+
+    Keeps a cumulative fixed-bucket histogram for reporting, plus the waits and
+    peak concurrency of the current tuning window for the size controller.
+    """
+
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self, window_limit: int = 5000):
+        self._lock = threading.Lock()
+        self.bucket_counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.shed = 0
+        self.timeouts = 0
+        self.recent = deque(maxlen=window_limit)
+        self._window_waits = []
+        self._window_limit = window_limit
+        self._window_peak = 0
+        self._window_shed = 0
+
+    def observe(self, wait_seconds: float, checked_out: int):
+        wait_ms = wait_seconds * 1000
+        with self._lock:
+            self.bucket_counts[bisect_left(self.BUCKETS_MS, wait_ms)] += 1
+            self.count += 1
+            self.sum_ms += wait_ms
+            self.recent.append(wait_ms)
+            if len(self._window_waits) < self._window_limit:
+                self._window_waits.append(wait_ms)
+            self._window_peak = max(self._window_peak, checked_out)
+
+    def record_rejection(self, shed: bool):
+        with self._lock:
+            if shed:
+                self.shed += 1
+            else:
+                self.timeouts += 1
+            self._window_shed += 1
+
+    def take_window(self) -> "PoolWindow":
+        """Close the current tuning window and start the next"""
+        with self._lock:
+            window = PoolWindow(
+                checkouts=len(self._window_waits),
+                p95_wait_ms=_percentile(self._window_waits, 95),
+                peak_checked_out=self._window_peak,
+                rejected=self._window_shed
+            )
+            self._window_waits = []
+            self._window_peak = 0
+            self._window_shed = 0
+        return window
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = list(self.recent)
+            bounds = [f"le_{bound}ms" for bound in self.BUCKETS_MS] + ["le_inf"]
+            return {
+                "count": self.count,
+                "sum_ms": round(self.sum_ms, 3),
+                "buckets": dict(zip(bounds, accumulate(self.bucket_counts))),
+                "p50_ms": _percentile(recent, 50),
+                "p95_ms": _percentile(recent, 95),
+                "p99_ms": _percentile(recent, 99),
+                "shed": self.shed,
+                "timeouts": self.timeouts
+            }
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))], 3)
+
+@dataclass
+class PoolWindow:
+    """Load observed on a pool during one tuning interval"""
+    checkouts: int
+    p95_wait_ms: float
+    peak_checked_out: int
+    rejected: int
+
+# The pool whose checkout the current thread or task is inside. A context
+# variable rather than a thread-local: async checkouts of many tasks wait on
+# the same thread.
+_checkout_in_progress: ContextVar[Optional["TunableQueuePool"]] = ContextVar("checkout_in_progress", default=None)
+
+class TunableQueuePool(QueuePool):
+    """QueuePool that times checkouts, sheds load when saturated and can be resized in place"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = CheckoutMetrics()
+        self.max_waiting = settings.DATABASE_POOL_MAX_WAITING
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+
+    def capacity(self) -> int:
+        return self.size() + self._max_overflow
+
+    def waiting(self) -> int:
+        return self._waiting
+
+    def _do_get(self):
+        # QueuePool._do_get retries by calling itself; only the outermost call is measured
+        if _checkout_in_progress.get() is self:
+            return super()._do_get()
+
+        with self._waiting_lock:
+            if self._max_overflow > -1 and self._waiting >= self.max_waiting and self.checkedout() >= self.capacity():
+                self.metrics.record_rejection(shed=True)
+                raise PoolSaturatedError(
+                    f"Connection pool saturated: {self.checkedout()} connections in use, "
+                    f"{self._waiting} requests waiting"
+                )
+            self._waiting += 1
+
+        token = _checkout_in_progress.set(self)
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except SQLAlchemyTimeoutError:
+            self.metrics.record_rejection(shed=False)
+            raise
+        finally:
+            _checkout_in_progress.reset(token)
+            with self._waiting_lock:
+                self._waiting -= 1
+        self.metrics.observe(time.perf_counter() - started, self.checkedout())
+        return record
+
+    def resize(self, pool_size: int, max_overflow: int):
+        """Change pool size and overflow without dropping connections
+
+        ``_overflow`` counts open connections relative to the queue size, so it
+        shifts with the size to keep the number of open connections unchanged.
+        Connections beyond a reduced size are closed as they are returned.
+        """
+        with self._overflow_lock:
+            self._overflow -= pool_size - self._pool.maxsize
+            self._pool.maxsize = pool_size
+            self._max_overflow = max_overflow
+
+    def recreate(self) -> "TunableQueuePool":
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        pool.max_waiting = self.max_waiting
+        return pool
+
+class TunableAsyncQueuePool(TunableQueuePool):
+    """``TunableQueuePool`` for asyncio engines, in place of ``AsyncAdaptedQueuePool``"""
+
+    _is_asyncio = True
+    _queue_class = AsyncAdaptedQueue
+    _dialect = _AsyncConnDialect()
+
+    def resize(self, pool_size: int, max_overflow: int):
+        super().resize(pool_size, max_overflow)
+        # The asyncio.Queue behind the adapter is created on first use with its own bound
+        queue = self._pool.__dict__.get("_queue")
+        if queue is not None:
+            queue._maxsize = pool_size
+
+class PoolSizeController:
+    """Feedback controller for pool capacity
+
+    Capacity grows by half when checkouts wait longer than the target, when
+    requests were rejected, or when peak concurrency neared capacity; it
+    shrinks by a tenth when the pool was mostly idle. Growth is fast and
+    decline slow, so a burst is absorbed immediately and connections are only
+    given back once load has clearly dropped. The persistent pool size follows
+    peak concurrency; the rest of the capacity is overflow.
+    """
+
+    def __init__(self, min_size: int, max_connections: int, target_wait_ms: float):
+        self.min_size = max(1, min_size)
+        self.max_connections = max(self.min_size, max_connections)
+        self.target_wait_ms = target_wait_ms
+
+    def decide(
+        self,
+        pool_size: int,
+        max_overflow: int,
+        window: PoolWindow,
+        db_limit: Optional[int] = None
+    ) -> Tuple[int, int, str]:
+        """New (pool_size, max_overflow) and the reason for the change"""
+        capacity = pool_size + max_overflow
+        ceiling = self.max_connections
+        if db_limit is not None:
+            ceiling = max(self.min_size, min(ceiling, db_limit))
+
+        pressured = (
+            window.rejected > 0
+            or window.p95_wait_ms > self.target_wait_ms
+            or (window.checkouts > 0 and window.peak_checked_out >= 0.9 * capacity)
+        )
+        idle = window.p95_wait_ms <= self.target_wait_ms / 4 and window.peak_checked_out <= 0.5 * capacity
+
+        if capacity > ceiling:
+            new_capacity, reason = ceiling, "limit"
+        elif pressured and capacity < ceiling:
+            new_capacity, reason = min(ceiling, capacity + max(1, math.ceil(capacity / 2))), "grow"
+        elif idle and capacity > self.min_size:
+            new_capacity, reason = max(self.min_size, capacity - max(1, capacity // 10)), "shrink"
+        else:
+            return pool_size, max_overflow, "hold"
+
+        if reason == "grow":
+            new_pool_size = max(pool_size, window.peak_checked_out)
+        else:
+            new_pool_size = max(self.min_size, min(pool_size, window.peak_checked_out or self.min_size))
+        new_pool_size = min(new_pool_size, new_capacity)
+        return new_pool_size, new_capacity - new_pool_size, reason
+
+class PoolTuner:
+    """Applies ``PoolSizeController`` decisions to an engine's ``TunableQueuePool``"""
+
+    def __init__(self, controller: Optional[PoolSizeController] = None):
+        self.size_controller = controller or PoolSizeController(
+            settings.DATABASE_POOL_MIN_SIZE,
+            settings.DATABASE_POOL_MAX_CONNECTIONS,
+            settings.DATABASE_POOL_TARGET_WAIT_MS
+        )
+        self.db_connection_limit = None
+        self.last_tuning = None
+        self.adjustments = 0
+
+    def tune(self, engine: Engine, limit_engine: Optional[Engine] = None) -> Optional[Dict[str, Any]]:
+        """Run one controller step: resize the pool from the last interval's checkout metrics
+
+        ``limit_engine`` reads PostgreSQL's connection limit when ``engine``
+        cannot be queried from a plain thread (the sync core of an async engine).
+        """
+        pool = engine.pool if engine is not None else None
+        if not isinstance(pool, TunableQueuePool):
+            return None
+
+        window = pool.metrics.take_window()
+        if engine.dialect.name == "postgresql":
+            self.db_connection_limit = self._db_connection_limit(limit_engine or engine, pool)
+
+        pool_size, max_overflow = pool.size(), pool._max_overflow
+        new_size, new_overflow, reason = self.size_controller.decide(
+            pool_size, max_overflow, window, self.db_connection_limit
+        )
+        if (new_size, new_overflow) != (pool_size, max_overflow):
+            pool.resize(new_size, new_overflow)
+            self.adjustments += 1
+            logger.info(
+                f"Connection pool {reason}: size {pool_size}+{max_overflow} -> {new_size}+{new_overflow} "
+                f"(p95 wait {window.p95_wait_ms:.1f}ms, peak {window.peak_checked_out}, rejected {window.rejected})"
+            )
+
+        self.last_tuning = {
+            "reason": reason,
+            "pool_size": new_size,
+            "max_overflow": new_overflow,
+            "p95_wait_ms": window.p95_wait_ms,
+            "peak_checked_out": window.peak_checked_out,
+            "checkouts": window.checkouts,
+            "rejected": window.rejected,
+            "at": datetime.now(UTC).isoformat()
+        }
+        return self.last_tuning
+
+    def _db_connection_limit(self, engine: Engine, pool: TunableQueuePool) -> Optional[int]:
+        """Most connections this pool may hold without exhausting PostgreSQL's max_connections
+
+        Our current connections plus our share of the server's free slots, so
+        several application processes growing together still leave headroom.
+        """
+        try:
+            with engine.connect() as connection:
+                free_slots = connection.execute(text("""
+                    SELECT current_setting('max_connections')::int
+                         - current_setting('superuser_reserved_connections')::int
+                         - (SELECT count(*) FROM pg_stat_activity)
+                """)).scalar()
+        except Exception as e:
+            logger.warning(f"Could not read database connection limit: {e}")
+            return self.db_connection_limit
+
+        open_connections = pool.checkedout() + pool.checkedin()
+        return open_connections + max(0, int(free_slots * settings.DATABASE_POOL_DB_CONNECTION_SHARE))
+
+    def status(self, enabled: bool) -> Dict[str, Any]:
+        return {
+            "enabled": enabled,
+            "min_size": self.size_controller.min_size,
+            "max_connections": self.size_controller.max_connections,
+            "target_wait_ms": self.size_controller.target_wait_ms,
+            "db_connection_limit": self.db_connection_limit,
+            "adjustments": self.adjustments,
+            "last_decision": self.last_tuning
+        }
+
+
+class PoolAutotuner:
+    """Background task tuning one engine's pool every ``DATABASE_POOL_TUNE_INTERVAL_SECONDS``
+
+    Used for the serving engines, whose pools have no monitor thread of their
+    own. Each step runs in a worker thread since reading PostgreSQL's
+    connection limit checks out a connection. ``engine`` may be attached after
+    start (the async engine is created on first use); until then steps are
+    skipped.
+    """
+
+    def __init__(self, engine: Optional[Engine], tuner: Optional[PoolTuner] = None,
+                 limit_engine: Optional[Engine] = None):
+        self.engine = engine
+        self.limit_engine = limit_engine
+        self.tuner = tuner or PoolTuner()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _tune_loop(self, interval: float):
+        while True:
+            # Tune only on complete windows, never on the empty one at startup
+            await asyncio.sleep(interval)
+            if self.engine is None:
+                continue
+            try:
+                await asyncio.to_thread(self.tuner.tune, self.engine, self.limit_engine)
+            except Exception as e:
+                logger.error(f"Connection pool tuning failed: {e}")
+
+    async def start(self, interval: float = None):
+        if self._task is not None or (self.engine is not None and not isinstance(self.engine.pool, TunableQueuePool)):
+            return
+        interval = interval or settings.DATABASE_POOL_TUNE_INTERVAL_SECONDS
+        self._task = asyncio.get_running_loop().create_task(self._tune_loop(interval))
+        logger.info(f"Connection pool auto-tuning every {interval:.0f}s")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        pool = self.engine.pool if self.engine is not None else None
+        tunable = isinstance(pool, TunableQueuePool)
+        return {
+            "pool_size": pool.size() if tunable else None,
+            "capacity": pool.capacity() if tunable else None,
+            "checked_out": pool.checkedout() if tunable else None,
+            "waiting": pool.waiting() if tunable else 0,
+            "checkout_wait": pool.metrics.snapshot() if tunable else None,
+            "auto_tuning": self.tuner.status(self._task is not None)
+        }
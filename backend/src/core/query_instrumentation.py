@@ -0,0 +1,233 @@
+"""
+Per-request SQL instrumentation with N+1 detection
+
+Engine event hooks time every statement and attribute it to the request being
+served through a context variable, which follows the request into the sync
+threadpool and into SQLAlchemy's async greenlets. Statements are reduced to
+fingerprints (literals, bind parameters and IN-lists stripped), so a loop that
+issues the same query once per row shows up as one fingerprint executed many
+times: the N+1 pattern.
+"""
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from .asgi_pipeline import HTTPContext, MiddlewareHook
+from .config import settings
+from .monitoring import database_monitor
+
+logger = logging.getLogger(__name__)
+
+# Endpoint key of requests no route matched (404s, scanners); raw paths would
+# fill the endpoint table with one entry per probed URL
+UNMATCHED_ENDPOINT = "<unmatched>"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_BIND_PARAMETER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Normalize a SQL statement so executions differing only in values compare equal"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _BIND_PARAMETER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+class QueryStats:
+    """Statements executed while serving one request"""
+
+    __slots__ = ("count", "total_time", "fingerprints")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        # fingerprint -> [executions, seconds]
+        self.fingerprints: Dict[str, List[float]] = {}
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        entry = self.fingerprints.get(statement)
+        if entry is None:
+            # Keyed by raw statement until the request completes; fingerprinting
+            # is deferred so the hot path is a dict lookup
+            self.fingerprints[statement] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def by_fingerprint(self) -> Dict[str, List[float]]:
+        merged: Dict[str, List[float]] = {}
+        for statement, (count, elapsed) in self.fingerprints.items():
+            entry = merged.setdefault(fingerprint(statement), [0, 0.0])
+            entry[0] += count
+            entry[1] += elapsed
+        return merged
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Fingerprints executed more than ``threshold`` times, most frequent first"""
+        suspects = [(fp, int(count)) for fp, (count, _) in self.by_fingerprint().items() if count > threshold]
+        return sorted(suspects, key=lambda item: item[1], reverse=True)
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Stats of the request being served, or None outside a request"""
+    return _current_stats.get()
+
+
+class QueryInstrumentation:
+    """Statement timing hooks and per-endpoint query aggregates"""
+
+    MAX_ENDPOINTS = 500
+
+    def __init__(self, n_plus_one_threshold: int = None, enabled: bool = None):
+        self.n_plus_one_threshold = n_plus_one_threshold or settings.QUERY_N_PLUS_ONE_THRESHOLD
+        self.enabled = settings.QUERY_INSTRUMENTATION_ENABLED if enabled is None else enabled
+        self.endpoints: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    # Engine hooks
+
+    def instrument_engine(self, engine: Engine, on_query: Callable[[float], None] = None):
+        """Time every statement on ``engine``; ``on_query`` receives the duration in seconds"""
+        if not self.enabled:
+            return
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["query_started"].pop()
+            stats = _current_stats.get()
+            if stats is not None:
+                stats.record(statement, elapsed)
+            database_monitor.track_query_performance(statement, elapsed * 1000)
+            if on_query is not None:
+                on_query(elapsed)
+
+        @event.listens_for(engine, "handle_error")
+        def _handle_error(exception_context):
+            started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+            if started:
+                started.pop()
+
+    # Request scope
+
+    def begin_request(self):
+        return _current_stats.set(QueryStats())
+
+    def end_request(self, token, method: str, endpoint: str) -> QueryStats:
+        stats = _current_stats.get()
+        _current_stats.reset(token)
+        suspects = stats.repeated(self.n_plus_one_threshold)
+        self._aggregate(f"{method} {endpoint}", stats, suspects)
+        database_monitor.track_request_queries(method, endpoint, stats.count, stats.total_time * 1000, len(suspects))
+
+        if suspects:
+            statement, count = suspects[0]
+            logger.warning(
+                f"Possible N+1 query pattern in {method} {endpoint}: statement executed {count} times",
+                extra={"method": method, "path": endpoint, "query_count": stats.count,
+                       "repeated_count": count, "fingerprint": statement[:500]}
+            )
+        return stats
+
+    def _aggregate(self, key: str, stats: QueryStats, suspects: List[Tuple[str, int]]):
+        with self._lock:
+            entry = self.endpoints.get(key)
+            if entry is None:
+                if len(self.endpoints) >= self.MAX_ENDPOINTS:
+                    return
+                entry = self.endpoints[key] = {
+                    "requests": 0, "queries": 0, "query_time_ms": 0.0, "max_queries": 0,
+                    "n_plus_one_requests": 0, "worst_fingerprint": None, "worst_count": 0
+                }
+            entry["requests"] += 1
+            entry["queries"] += stats.count
+            entry["query_time_ms"] += stats.total_time * 1000
+            entry["max_queries"] = max(entry["max_queries"], stats.count)
+            if suspects:
+                entry["n_plus_one_requests"] += 1
+                if suspects[0][1] > entry["worst_count"]:
+                    entry["worst_fingerprint"], entry["worst_count"] = suspects[0]
+
+    def report(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Endpoints ordered by average queries per request"""
+        with self._lock:
+            rows = [
+                {
+                    "endpoint": key,
+                    "requests": entry["requests"],
+                    "avg_queries": entry["queries"] / entry["requests"],
+                    "max_queries": entry["max_queries"],
+                    "avg_query_time_ms": entry["query_time_ms"] / entry["requests"],
+                    "n_plus_one_requests": entry["n_plus_one_requests"],
+                    "worst_fingerprint": entry["worst_fingerprint"],
+                    "worst_count": entry["worst_count"]
+                }
+                for key, entry in self.endpoints.items()
+            ]
+        rows.sort(key=lambda row: row["avg_queries"], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+
+
+# Global instrumentation instance
+query_instrumentation = QueryInstrumentation()
+
+
+class QueryInstrumentationHook(MiddlewareHook):
+    """Opens a query-stats scope per request and reports it on completion
+
+    In debug mode the counts are also returned as ``X-DB-*`` response headers.
+    """
+
+    def __init__(self, instrumentation: QueryInstrumentation = None, expose_headers: bool = None):
+        self.instrumentation = instrumentation or query_instrumentation
+        self.expose_headers = settings.DEBUG if expose_headers is None else expose_headers
+
+    def on_request(self, ctx: HTTPContext):
+        if self.instrumentation.enabled:
+            ctx.state["query_stats_token"] = self.instrumentation.begin_request()
+        return None
+
+    def on_response(self, ctx: HTTPContext, headers: MutableHeaders):
+        stats = _current_stats.get()
+        if not self.expose_headers or stats is None:
+            return
+        headers["X-DB-Query-Count"] = str(stats.count)
+        headers["X-DB-Query-Time-Ms"] = f"{stats.total_time * 1000:.2f}"
+        suspects = stats.repeated(self.instrumentation.n_plus_one_threshold)
+        if suspects:
+            headers["X-DB-N-Plus-One"] = str(suspects[0][1])
+
+    def on_complete(self, ctx: HTTPContext):
+        token = ctx.state.pop("query_stats_token", None)
+        if token is None:
+            return
+        route = ctx.scope.get("route")
+        # Route templates keep ids out of the endpoint key
+        endpoint = getattr(route, "path", None) or UNMATCHED_ENDPOINT
+        self.instrumentation.end_request(token, ctx.method, endpoint)
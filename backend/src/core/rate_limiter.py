@@ -1,307 +1,815 @@
 """
-Advanced Rate Limiting System
-Implements multiple rate limiting strategies for enterprise security
+Rate Limiting Engine
+Single engine, policy table and middleware for all rate limiting
 """
+import re
 import time
-import json
-from typing import Optional, Dict, Any, List
+import uuid
+import asyncio
+import functools
+import inspect
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple, Type
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
-import redis
+import redis.asyncio as redis
 from .config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-class RateLimiter:
-    """Advanced rate limiting with multiple strategies"""
+# Each strategy runs as a single server-side script so the read-modify-write
+# is atomic and costs one round-trip. Scripts read the clock with TIME so every
+# replica agrees on "now". All return {allowed, remaining, reset_time, current}.
+
+FIXED_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1])
+local window_end = (math.floor(now / window) + 1) * window
+
+local current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIREAT', KEYS[1], window_end)
+end
+
+local allowed = 0
+if current <= limit then allowed = 1 end
+return {allowed, math.max(0, limit - current), window_end, current}
+"""
+
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local member = ARGV[3]
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local current = redis.call('ZCARD', KEYS[1])
+
+local allowed = 0
+local reset_time = now + window
+if current < limit then
+    redis.call('ZADD', KEYS[1], now, member)
+    current = current + 1
+    allowed = 1
+else
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    if oldest[2] then reset_time = tonumber(oldest[2]) + window end
+end
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+
+return {allowed, math.max(0, limit - current), math.ceil(reset_time), current}
+"""
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'last_refill')
+local tokens = tonumber(state[1]) or capacity
+local last_refill = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last_refill) * refill_rate)
+
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'last_refill', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity / refill_rate) * 1000) + 1000)
+
+local reset_time = now + (capacity - tokens) / refill_rate
+return {allowed, math.floor(tokens), math.ceil(reset_time), math.floor(capacity - tokens)}
+"""
+
+LEAKY_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local leak_rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'level', 'last_leak')
+local level = tonumber(state[1]) or 0
+local last_leak = tonumber(state[2]) or now
+level = math.max(0, level - math.max(0, now - last_leak) * leak_rate)
+
+local allowed = 0
+if level + 1 <= capacity then
+    level = level + 1
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'level', tostring(level), 'last_leak', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity / leak_rate) * 1000) + 1000)
+
+local reset_time = now + level / leak_rate
+return {allowed, math.max(0, capacity - math.ceil(level)), math.ceil(reset_time), math.ceil(level)}
+"""
+
+
+# Lease scripts hand out a batch of quota in one call for the local
+# pre-admission tier (LocalRateLimitTier). They share keys with the
+# per-request scripts above. Each returns {granted, remaining, reset_time};
+# a release script gives back what a process did not use.
+
+FIXED_WINDOW_LEASE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1])
+local window_end = (math.floor(now / window) + 1) * window
+
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local granted = math.max(0, math.min(requested, limit - current))
+if granted > 0 then
+    current = redis.call('INCRBY', KEYS[1], granted)
+    if current == granted then
+        redis.call('EXPIREAT', KEYS[1], window_end)
+    end
+end
+return {granted, math.max(0, limit - current), window_end}
+"""
+
+FIXED_WINDOW_RELEASE_SCRIPT = """
+local unused = tonumber(ARGV[1])
+local window_end = tonumber(ARGV[2])
+local t = redis.call('TIME')
+if tonumber(t[1]) >= window_end then return 0 end
+local current = redis.call('DECRBY', KEYS[1], unused)
+if current < 0 then redis.call('SET', KEYS[1], 0, 'KEEPTTL') end
+return unused
+"""
+
+SLIDING_WINDOW_LEASE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local prefix = ARGV[4]
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local current = redis.call('ZCARD', KEYS[1])
+local granted = math.max(0, math.min(requested, limit - current))
+for i = 1, granted do
+    redis.call('ZADD', KEYS[1], now, prefix .. ':' .. i)
+end
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+
+local reset_time = now + window
+if granted == 0 then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    if oldest[2] then reset_time = tonumber(oldest[2]) + window end
+end
+return {granted, math.max(0, limit - current - granted), math.ceil(reset_time)}
+"""
+
+SLIDING_WINDOW_RELEASE_SCRIPT = """
+local prefix = ARGV[1]
+local first = tonumber(ARGV[2])
+local last = tonumber(ARGV[3])
+local released = 0
+for i = first, last do
+    released = released + redis.call('ZREM', KEYS[1], prefix .. ':' .. i)
+end
+return released
+"""
+
+TOKEN_BUCKET_LEASE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'last_refill')
+local tokens = tonumber(state[1]) or capacity
+local last_refill = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last_refill) * refill_rate)
+
+local granted = math.max(0, math.min(requested, math.floor(tokens)))
+tokens = tokens - granted
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'last_refill', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity / refill_rate) * 1000) + 1000)
+
+local reset_time = now + math.max(0, 1 - tokens) / refill_rate
+return {granted, math.floor(tokens), math.ceil(reset_time)}
+"""
+
+TOKEN_BUCKET_RELEASE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local unused = tonumber(ARGV[2])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if not tokens then return 0 end
+redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(capacity, tokens + unused)))
+return unused
+"""
+
+@dataclass
+class QuotaLease:
+    """A batch of quota leased from Redis and spent locally"""
+    strategy: str
+    redis_key: str
+    limit: int
+    granted: int
+    remaining: int          # global remaining right after the lease was taken
+    reset_time: int
+    expires_at: float       # time.monotonic() deadline
+    used: int = 0
+    window_end: int = 0
+    member_prefix: str = ""
+    capacity: float = 0
     
-    def __init__(self):
-        self.redis_client = redis.from_url(settings.REDIS_URL)
-        self.strategies = {
-            "fixed_window": self._fixed_window_limit,
-            "sliding_window": self._sliding_window_limit,
-            "token_bucket": self._token_bucket_limit,
-            "leaky_bucket": self._leaky_bucket_limit
-        }
+    @property
+    def available(self) -> int:
+        return self.granted - self.used
+
+
+class LocalRateLimitTier:
+    """Per-process pre-admission tier that leases quota from Redis in batches
     
-    def _get_client_identifier(self, request: Request) -> str:
-        """Get unique identifier for rate limiting"""
-        # Try to get user ID from JWT token first
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            # In a real implementation, decode JWT to get user ID
-            # For now, use IP + user agent as fallback
-            pass
-        
-        # Fallback to IP + User Agent
-        ip_address = request.client.host
-        user_agent = request.headers.get("User-Agent", "")
-        return f"{ip_address}:{hash(user_agent)}"
-    
-    def _fixed_window_limit(self, key: str, limit: int, window: int) -> Dict[str, Any]:
-        """Fixed window rate limiting"""
-        current_window = int(time.time() // window)
-        window_key = f"rate_limit:fixed:{key}:{current_window}"
-        
-        current = self.redis_client.incr(window_key)
-        if current == 1:
-            self.redis_client.expire(window_key, window)
-        
-        return {
-            "allowed": current <= limit,
-            "limit": limit,
-            "remaining": max(0, limit - current),
-            "reset_time": (current_window + 1) * window,
-            "current": current
-        }
+    A process takes up to ``limit * error_budget`` requests' worth of quota in
+    one script call and admits requests from it without network I/O. Leases
+    expire quickly (sliding windows and buckets) or at the window boundary
+    (fixed windows); a reconcile loop returns unused quota so other replicas
+    can spend it. Small limits (e.g. login attempts) get leases of one and stay
+    exact. Leaky bucket is not leasable since batching defeats its smoothing.
+    """
     
-    def _sliding_window_limit(self, key: str, limit: int, window: int) -> Dict[str, Any]:
-        """Sliding window rate limiting"""
-        now = time.time()
-        window_start = now - window
-        
-        # Use sorted set to track requests
-        zset_key = f"rate_limit:sliding:{key}"
-        
-        # Remove old entries
-        self.redis_client.zremrangebyscore(zset_key, 0, window_start)
-        
-        # Count current requests
-        current = self.redis_client.zcard(zset_key)
-        
-        if current < limit:
-            # Add current request
-            self.redis_client.zadd(zset_key, {str(now): now})
-            self.redis_client.expire(zset_key, window)
-            current += 1
-        
-        return {
-            "allowed": current <= limit,
-            "limit": limit,
-            "remaining": max(0, limit - current),
-            "reset_time": int(now + window),
-            "current": current
+    LEASABLE_STRATEGIES = ("fixed_window", "sliding_window", "token_bucket")
+    
+    def __init__(self, redis_client: redis.Redis, error_budget: float = None,
+                 max_lease: int = None, reconcile_interval: float = None):
+        self.redis_client = redis_client
+        self.error_budget = error_budget if error_budget is not None else settings.RATE_LIMIT_ERROR_BUDGET
+        self.max_lease = max_lease or settings.RATE_LIMIT_MAX_LEASE
+        self.reconcile_interval = reconcile_interval or settings.RATE_LIMIT_RECONCILE_INTERVAL_SECONDS
+        self._lease_scripts = {
+            "fixed_window": redis_client.register_script(FIXED_WINDOW_LEASE_SCRIPT),
+            "sliding_window": redis_client.register_script(SLIDING_WINDOW_LEASE_SCRIPT),
+            "token_bucket": redis_client.register_script(TOKEN_BUCKET_LEASE_SCRIPT),
         }
+        self._release_scripts = {
+            "fixed_window": redis_client.register_script(FIXED_WINDOW_RELEASE_SCRIPT),
+            "sliding_window": redis_client.register_script(SLIDING_WINDOW_RELEASE_SCRIPT),
+            "token_bucket": redis_client.register_script(TOKEN_BUCKET_RELEASE_SCRIPT),
+        }
+        self._leases: Dict[str, QuotaLease] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self.stats = {"local_admits": 0, "local_denials": 0, "leases": 0, "released": 0}
     
-    def _token_bucket_limit(self, key: str, capacity: int, refill_rate: float) -> Dict[str, Any]:
-        """Token bucket rate limiting"""
-        bucket_key = f"rate_limit:bucket:{key}"
-        now = time.time()
-        
-        # Get current bucket state
-        bucket_data = self.redis_client.hgetall(bucket_key)
-        
-        if not bucket_data:
-            # Initialize bucket
-            tokens = capacity
-            last_refill = now
-        else:
-            tokens = float(bucket_data.get(b"tokens", capacity))
-            last_refill = float(bucket_data.get(b"last_refill", now))
+    def supports(self, strategy: str) -> bool:
+        return strategy in self.LEASABLE_STRATEGIES
+    
+    def lease_size(self, limit: int) -> int:
+        return max(1, min(self.max_lease, int(limit * self.error_budget)))
+    
+    async def check(self, strategy: str, redis_key: str, limit: int, **params) -> Dict[str, Any]:
+        """Admit or reject one request, leasing more quota from Redis only when needed"""
+        self._ensure_reconciler()
         
-        # Calculate tokens to add based on time passed
-        time_passed = now - last_refill
-        tokens_to_add = time_passed * refill_rate
-        tokens = min(capacity, tokens + tokens_to_add)
+        result = self._admit_locally(redis_key)
+        if result is not None:
+            return result
         
-        # Check if request can be processed
-        if tokens >= 1:
-            tokens -= 1
-            allowed = True
+        lock = self._locks.setdefault(redis_key, asyncio.Lock())
+        async with lock:
+            # Another coroutine may have refreshed the lease while we waited
+            result = self._admit_locally(redis_key)
+            if result is not None:
+                return result
+            
+            stale = self._leases.pop(redis_key, None)
+            if stale is not None:
+                await self._release(stale)
+            
+            lease = await self._acquire(strategy, redis_key, limit, params)
+            self._leases[redis_key] = lease
+            return self._consume(lease)
+    
+    def _admit_locally(self, redis_key: str) -> Optional[Dict[str, Any]]:
+        lease = self._leases.get(redis_key)
+        if lease is None or lease.expires_at <= time.monotonic():
+            return None
+        if lease.available > 0 or lease.granted == 0:
+            return self._consume(lease)
+        return None
+    
+    def _consume(self, lease: QuotaLease) -> Dict[str, Any]:
+        allowed = lease.available > 0
+        if allowed:
+            lease.used += 1
+            self.stats["local_admits"] += 1
         else:
-            allowed = False
-        
-        # Update bucket state
-        self.redis_client.hset(bucket_key, mapping={
-            "tokens": tokens,
-            "last_refill": now
-        })
-        self.redis_client.expire(bucket_key, 3600)  # 1 hour
-        
+            self.stats["local_denials"] += 1
+        remaining = lease.remaining + lease.available
         return {
             "allowed": allowed,
-            "limit": capacity,
-            "remaining": int(tokens),
-            "reset_time": int(now + (capacity - tokens) / refill_rate),
-            "current": int(capacity - tokens)
+            "limit": lease.limit,
+            "remaining": remaining,
+            "reset_time": lease.reset_time,
+            "current": max(0, lease.limit - remaining)
         }
     
-    def _leaky_bucket_limit(self, key: str, capacity: int, leak_rate: float) -> Dict[str, Any]:
-        """Leaky bucket rate limiting"""
-        bucket_key = f"rate_limit:leaky:{key}"
-        now = time.time()
+    async def _acquire(self, strategy: str, redis_key: str, limit: int, params: Dict[str, Any]) -> QuotaLease:
+        requested = self.lease_size(limit)
+        script = self._lease_scripts[strategy]
+        member_prefix = ""
         
-        # Get current bucket state
-        bucket_data = self.redis_client.hgetall(bucket_key)
+        if strategy == "fixed_window":
+            args = [limit, params["window"], requested]
+        elif strategy == "sliding_window":
+            member_prefix = uuid.uuid4().hex
+            args = [limit, params["window"], requested, member_prefix]
+        else:
+            args = [limit, params["refill_rate"], requested]
         
-        if not bucket_data:
-            # Initialize bucket
-            level = 0
-            last_leak = now
+        granted, remaining, reset_time = await script(keys=[redis_key], args=args)
+        granted, remaining, reset_time = int(granted), int(remaining), int(reset_time)
+        self.stats["leases"] += 1
+        
+        # Denials are cached briefly so a client over its limit does not cost a round-trip per request
+        if granted == 0 or strategy == "token_bucket":
+            ttl = self.reconcile_interval
+        elif strategy == "fixed_window":
+            ttl = reset_time - time.time()
         else:
-            level = float(bucket_data.get(b"level", 0))
-            last_leak = float(bucket_data.get(b"last_leak", now))
+            # Leased sliding-window entries are timestamped now; spend them well inside the window
+            ttl = min(self.reconcile_interval, params["window"] * self.error_budget)
+        if granted == 0:
+            ttl = min(ttl, max(0.0, reset_time - time.time()))
         
-        # Calculate leaked amount
-        time_passed = now - last_leak
-        leaked = time_passed * leak_rate
-        level = max(0, level - leaked)
+        return QuotaLease(
+            strategy=strategy,
+            redis_key=redis_key,
+            limit=limit,
+            granted=granted,
+            remaining=remaining,
+            reset_time=reset_time,
+            expires_at=time.monotonic() + max(ttl, 0.01),
+            window_end=reset_time if strategy == "fixed_window" else 0,
+            member_prefix=member_prefix,
+            capacity=limit
+        )
+    
+    async def _release(self, lease: QuotaLease):
+        """Return quota a process leased but did not spend"""
+        unused = lease.available
+        if unused <= 0:
+            return
         
-        # Check if request can be processed
-        if level < capacity:
-            level += 1
-            allowed = True
+        if lease.strategy == "fixed_window":
+            args = [unused, lease.window_end]
+        elif lease.strategy == "sliding_window":
+            args = [lease.member_prefix, lease.used + 1, lease.granted]
         else:
-            allowed = False
+            args = [lease.capacity, unused]
         
-        # Update bucket state
-        self.redis_client.hset(bucket_key, mapping={
-            "level": level,
-            "last_leak": now
-        })
-        self.redis_client.expire(bucket_key, 3600)  # 1 hour
+        try:
+            await self._release_scripts[lease.strategy](keys=[lease.redis_key], args=args)
+            self.stats["released"] += unused
+        except Exception as e:
+            logger.warning(f"Failed to release rate limit lease for {lease.redis_key}: {e}")
+    
+    async def reconcile(self):
+        """Return unused quota from expired leases and drop idle keys"""
+        now = time.monotonic()
+        for redis_key, lease in list(self._leases.items()):
+            if lease.expires_at <= now:
+                self._leases.pop(redis_key, None)
+                await self._release(lease)
+        for redis_key in [key for key, lock in self._locks.items() if key not in self._leases and not lock.locked()]:
+            self._locks.pop(redis_key, None)
+    
+    def _ensure_reconciler(self):
+        if self._reconcile_task is None or self._reconcile_task.done():
+            self._reconcile_task = asyncio.get_running_loop().create_task(self._reconcile_loop())
+    
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Rate limit lease reconciliation failed: {e}")
+    
+    async def stop(self):
+        """Stop reconciling and hand all unused quota back to Redis"""
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
+            try:
+                await self._reconcile_task
+            except asyncio.CancelledError:
+                pass
+            self._reconcile_task = None
+        for lease in list(self._leases.values()):
+            await self._release(lease)
+        self._leases.clear()
+        self._locks.clear()
+
+
+class RateLimitExceeded(HTTPException):
+    """Raised when a request is over its rate limit policy"""
+    def __init__(self, detail: str = "Rate limit exceeded", retry_after: int = 60,
+                 headers: Optional[Dict[str, str]] = None):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={**(headers or {}), "Retry-After": str(retry_after)}
+        )
+
+
+class RateLimitStrategy:
+    """Base class for rate limiting strategies
+    
+    A strategy names one of the server-side scripts above and the ARGV it
+    needs. New strategies are plugged in with ``register_strategy``.
+    """
+    
+    name: str = ""
+    script_source: str = ""
+    key_prefix: str = ""
+    
+    def __init__(self, limit: int, window: int):
+        self.limit = limit
+        self.window = window
+    
+    def script_args(self) -> list:
+        """ARGV for one direct script call"""
+        raise NotImplementedError
+    
+    def lease_params(self) -> Dict[str, Any]:
+        """Keyword arguments for LocalRateLimitTier.check"""
+        return {"window": self.window}
+
+
+class FixedWindowStrategy(RateLimitStrategy):
+    """Fixed window rate limiting strategy"""
+    
+    name = "fixed_window"
+    script_source = FIXED_WINDOW_SCRIPT
+    key_prefix = "rate_limit:fixed"
+    
+    def script_args(self) -> list:
+        return [self.limit, self.window]
+
+
+class SlidingWindowStrategy(RateLimitStrategy):
+    """Sliding window rate limiting strategy"""
+    
+    name = "sliding_window"
+    script_source = SLIDING_WINDOW_SCRIPT
+    key_prefix = "rate_limit:sliding"
+    
+    def script_args(self) -> list:
+        # Members must be unique or concurrent requests in the same microsecond collapse into one
+        return [self.limit, self.window, uuid.uuid4().hex]
+
+
+class TokenBucketStrategy(RateLimitStrategy):
+    """Token bucket rate limiting strategy"""
+    
+    name = "token_bucket"
+    script_source = TOKEN_BUCKET_SCRIPT
+    key_prefix = "rate_limit:bucket"
+    
+    def __init__(self, limit: int, window: int, refill_rate: float = None):
+        super().__init__(limit, window)
+        self.refill_rate = refill_rate or (limit / window)  # tokens per second
+    
+    def script_args(self) -> list:
+        return [self.limit, self.refill_rate, 1]
+    
+    def lease_params(self) -> Dict[str, Any]:
+        return {"refill_rate": self.refill_rate}
+
+
+class LeakyBucketStrategy(RateLimitStrategy):
+    """Leaky bucket rate limiting strategy"""
+    
+    name = "leaky_bucket"
+    script_source = LEAKY_BUCKET_SCRIPT
+    key_prefix = "rate_limit:leaky"
+    
+    def __init__(self, limit: int, window: int, leak_rate: float = None):
+        super().__init__(limit, window)
+        self.leak_rate = leak_rate or (limit / window)  # requests drained per second
+    
+    def script_args(self) -> list:
+        return [self.limit, self.leak_rate]
+
+
+STRATEGIES: Dict[str, Type[RateLimitStrategy]] = {}
+
+
+def register_strategy(strategy_class: Type[RateLimitStrategy]) -> Type[RateLimitStrategy]:
+    """Make a strategy available to every RateLimitEngine"""
+    STRATEGIES[strategy_class.name] = strategy_class
+    return strategy_class
+
+
+for _strategy_class in (FixedWindowStrategy, SlidingWindowStrategy, TokenBucketStrategy, LeakyBucketStrategy):
+    register_strategy(_strategy_class)
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """A named limit and the identity it is counted against
+    
+    ``scope`` is one of ``ip``, ``user``, ``company`` or ``global``; user and
+    company scopes fall back to the client IP for anonymous requests.
+    """
+    name: str
+    strategy: RateLimitStrategy
+    scope: str = "ip"
+
+
+DEFAULT_POLICIES: Dict[str, RateLimitPolicy] = {
+    policy.name: policy for policy in (
+        # Middleware policies
+        RateLimitPolicy("per_ip", SlidingWindowStrategy(limit=100, window=3600)),
+        RateLimitPolicy("per_user", SlidingWindowStrategy(limit=200, window=3600), scope="user"),
+        RateLimitPolicy("auth", SlidingWindowStrategy(limit=10, window=300)),
+        RateLimitPolicy("auth_login", FixedWindowStrategy(limit=5, window=300)),
+        RateLimitPolicy("auth_register", FixedWindowStrategy(limit=3, window=3600)),
+        RateLimitPolicy("upload", SlidingWindowStrategy(limit=20, window=3600), scope="user"),
+        RateLimitPolicy("processing", TokenBucketStrategy(limit=10, window=10, refill_rate=1.0), scope="user"),
+        RateLimitPolicy("erp_sync", SlidingWindowStrategy(limit=100, window=3600), scope="user"),
+        # Endpoint policies applied with @rate_limit
+        RateLimitPolicy("global_api", FixedWindowStrategy(limit=1000, window=3600), scope="global"),
+        RateLimitPolicy("ocr_processing", TokenBucketStrategy(limit=50, window=3600, refill_rate=0.02), scope="user"),
+        RateLimitPolicy("ocr_batch", FixedWindowStrategy(limit=10, window=3600), scope="user"),
+        RateLimitPolicy("user_api", FixedWindowStrategy(limit=500, window=3600), scope="user"),
+        RateLimitPolicy("user_uploads", FixedWindowStrategy(limit=100, window=3600), scope="user"),
+        RateLimitPolicy("contact_form", FixedWindowStrategy(limit=3, window=3600)),
+        RateLimitPolicy("contact_form_daily", FixedWindowStrategy(limit=10, window=86400)),
+    )
+}
+
+# Path prefix -> policy name; the longest prefix wins and None exempts the path
+DEFAULT_ROUTES: List[Tuple[str, Optional[str]]] = [
+    ("/health", None),
+    ("/api/v1/health", None),
+    ("/api/v1/auth/login", "auth_login"),
+    ("/api/v1/auth/register", "auth_register"),
+    ("/api/v1/auth", "auth"),
+    ("/api/v1/processing/upload", "upload"),
+    ("/api/v1/ocr/extract", "upload"),
+    ("/api/v1/processing/process", "processing"),
+    ("/api/v1/erp/", "erp_sync"),
+    ("/api/v1", "per_user"),
+]
+
+
+class PolicyRouter:
+    """Resolves a request path to its policy
+    
+    Routes are compiled once into a single anchored regex of escaped prefixes,
+    longest first, so resolution is one ``match`` and a list lookup.
+    """
+    
+    def __init__(self, routes: List[Tuple[str, Optional[str]]], policies: Dict[str, RateLimitPolicy],
+                 default: Optional[str] = "per_ip"):
+        ordered = sorted(routes, key=lambda route: len(route[0]), reverse=True)
+        self._targets = [policies[name] if name else None for _, name in ordered]
+        self._pattern = re.compile("|".join(f"({re.escape(prefix)})" for prefix, _ in ordered)) if ordered else None
+        self._default = policies[default] if default else None
+    
+    def resolve(self, path: str) -> Optional[RateLimitPolicy]:
+        match = self._pattern.match(path) if self._pattern else None
+        if match is None:
+            return self._default
+        return self._targets[match.lastindex - 1]
+
+
+def _fail_open(policy: RateLimitPolicy) -> Dict[str, Any]:
+    limit = policy.strategy.limit
+    return {
+        "allowed": True,
+        "limit": limit,
+        "remaining": limit,
+        "reset_time": int(time.time()) + policy.strategy.window,
+        "current": 0
+    }
+
+
+class RateLimitEngine:
+    """Single rate limiting engine behind the middleware and ``@rate_limit``
+    
+    Policies and the path router are built once. Leasable strategies go through
+    the LocalRateLimitTier, so most requests are decided without touching
+    Redis; the rest are one EVALSHA. Without Redis, or on Redis errors, the
+    engine fails open.
+    """
+    
+    def __init__(self, redis_client: Optional[redis.Redis] = None,
+                 policies: Optional[Dict[str, RateLimitPolicy]] = None,
+                 routes: Optional[List[Tuple[str, Optional[str]]]] = None,
+                 local_tier: Optional[LocalRateLimitTier] = None):
+        self.policies = dict(policies or DEFAULT_POLICIES)
+        self.routes = list(routes if routes is not None else DEFAULT_ROUTES)
+        self.router = PolicyRouter(self.routes, self.policies)
+        self.redis_client = None
+        self.local_tier = None
+        self._scripts: Dict[str, Any] = {}
+        if redis_client is not None:
+            self.bind(redis_client, local_tier)
+    
+    def bind(self, redis_client: redis.Redis, local_tier: Optional[LocalRateLimitTier] = None):
+        """Attach a Redis client and register every strategy's script on it
         
-        return {
-            "allowed": allowed,
-            "limit": capacity,
-            "remaining": max(0, capacity - int(level)),
-            "reset_time": int(now + level / leak_rate),
-            "current": int(level)
+        Pass ``local_tier=False`` to always call the scripts directly.
+        """
+        if local_tier is None and settings.RATE_LIMIT_LOCAL_TIER_ENABLED:
+            local_tier = LocalRateLimitTier(redis_client)
+        self._scripts = {
+            name: redis_client.register_script(strategy_class.script_source)
+            for name, strategy_class in STRATEGIES.items()
         }
+        self.local_tier = local_tier or None
+        self.redis_client = redis_client
+    
+    def add_policy(self, policy: RateLimitPolicy, *prefixes: str):
+        """Register a policy, optionally routing path prefixes to it"""
+        self.policies[policy.name] = policy
+        self.routes.extend((prefix, policy.name) for prefix in prefixes)
+        self.router = PolicyRouter(self.routes, self.policies)
+    
+    def get_policy(self, name: str) -> Optional[RateLimitPolicy]:
+        return self.policies.get(name)
     
-    def check_rate_limit(self, request: Request, strategy: str = "sliding_window", 
-                        **kwargs) -> Dict[str, Any]:
-        """Check rate limit for request"""
+    async def check(self, policy: RateLimitPolicy, identity: str) -> Dict[str, Any]:
+        """Count one request against ``policy`` for ``identity``"""
+        if self.redis_client is None:
+            return _fail_open(policy)
+        
+        strategy = policy.strategy
+        redis_key = f"{strategy.key_prefix}:{policy.name}:{identity}"
         try:
-            identifier = self._get_client_identifier(request)
-            endpoint = request.url.path
-            
-            # Create unique key for this endpoint
-            key = f"{identifier}:{endpoint}"
-            
-            # Get strategy function
-            if strategy not in self.strategies:
-                raise ValueError(f"Unknown rate limiting strategy: {strategy}")
-            
-            strategy_func = self.strategies[strategy]
-            
-            # Apply rate limiting
-            result = strategy_func(key, **kwargs)
-            
-            # Add headers for client information
-            result["headers"] = {
-                "X-RateLimit-Limit": str(result["limit"]),
-                "X-RateLimit-Remaining": str(result["remaining"]),
-                "X-RateLimit-Reset": str(result["reset_time"]),
-                "X-RateLimit-Strategy": strategy
+            if self.local_tier is not None and self.local_tier.supports(strategy.name):
+                return await self.local_tier.check(strategy.name, redis_key, strategy.limit, **strategy.lease_params())
+            allowed, remaining, reset_time, current = await self._scripts[strategy.name](
+                keys=[redis_key], args=strategy.script_args()
+            )
+            return {
+                "allowed": bool(allowed),
+                "limit": strategy.limit,
+                "remaining": int(remaining),
+                "reset_time": int(reset_time),
+                "current": int(current)
             }
-            
-            return result
-            
         except Exception as e:
-            logger.error(f"Rate limiting error: {e}")
+            logger.error(f"Rate limiting error for policy {policy.name}: {e}")
             # Fail open - allow request if rate limiting fails
-            return {
-                "allowed": True,
-                "limit": 1000,
-                "remaining": 999,
-                "reset_time": int(time.time() + 3600),
-                "current": 1,
-                "headers": {},
-                "error": str(e)
-            }
+            return _fail_open(policy)
     
-    def get_rate_limit_config(self, endpoint: str) -> Dict[str, Any]:
-        """Get rate limit configuration for endpoint"""
-        configs = {
-            "/api/v1/auth/login": {
-                "strategy": "fixed_window",
-                "limit": 5,
-                "window": 300  # 5 minutes
-            },
-            "/api/v1/auth/register": {
-                "strategy": "fixed_window",
-                "limit": 3,
-                "window": 3600  # 1 hour
-            },
-            "/api/v1/processing/process": {
-                "strategy": "token_bucket",
-                "capacity": 10,
-                "refill_rate": 1.0  # 1 request per second
-            },
-            "/api/v1/erp/": {
-                "strategy": "sliding_window",
-                "limit": 100,
-                "window": 3600  # 1 hour
-            },
-            "default": {
-                "strategy": "sliding_window",
-                "limit": 1000,
-                "window": 3600  # 1 hour
-            }
-        }
+    async def enforce(self, policy_name: str, request: Optional[Request] = None,
+                      identity: Optional[str] = None) -> Dict[str, Any]:
+        """Check a request against a named policy and raise if it is exceeded"""
+        policy = self.policies.get(policy_name)
+        if policy is None:
+            logger.warning(f"Unknown rate limit policy: {policy_name}")
+            return {"allowed": True}
         
-        # Find matching config
-        for pattern, config in configs.items():
-            if endpoint.startswith(pattern):
-                return config
+        if identity is None:
+            identity = client_identity(request.scope, policy.scope) if request is not None else "anonymous"
+        result = await self.check(policy, identity)
+        if not result["allowed"]:
+            raise RateLimitExceeded(
+                detail=f"Rate limit exceeded. {result['limit']} requests per {policy.strategy.window} seconds allowed.",
+                retry_after=max(result["reset_time"] - int(time.time()), 1),
+                headers=rate_limit_headers(result)
+            )
+        return result
+
+
+def client_identity(scope: Dict[str, Any], policy_scope: str) -> str:
+    """Identity a policy is counted against, read straight from the ASGI scope"""
+    if policy_scope == "global":
+        return "global"
+    
+    state = scope.get("state") or {}
+    if policy_scope == "user" and state.get("user_id"):
+        return f"user:{state['user_id']}"
+    if policy_scope == "company" and state.get("company_id"):
+        return f"company:{state['company_id']}"
+    
+    for name, value in scope.get("headers", ()):
+        if name == b"x-forwarded-for":
+            return f"ip:{value.decode('latin-1').split(',')[0].strip()}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def rate_limit_headers(result: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "X-RateLimit-Limit": str(result["limit"]),
+        "X-RateLimit-Remaining": str(result["remaining"]),
+        "X-RateLimit-Reset": str(result["reset_time"])
+    }
+
+
+# Global rate limiting engine; Redis is attached during application startup
+rate_limiter = RateLimitEngine()
+
+
+def configure_rate_limiter(redis_client: redis.Redis, local_tier: Optional[LocalRateLimitTier] = None) -> RateLimitEngine:
+    """Attach Redis to the global engine used by the middleware and decorators"""
+    rate_limiter.bind(redis_client, local_tier)
+    return rate_limiter
+
+
+def rate_limit(policy_name: Optional[str] = None, *, requests: Optional[int] = None, window: int = 3600):
+    """Decorator for rate limiting endpoints
+    
+    Use a named policy (``@rate_limit("contact_form")``) or an ad-hoc sliding
+    window (``@rate_limit(requests=10, window=3600)``) keyed by the endpoint.
+    The endpoint must take a ``Request`` or a ``current_user`` to key the limit
+    on; one without either is rejected at decoration time, and a call where
+    neither is available raises rather than skipping the limit.
+    """
+    def decorator(func):
+        parameters = inspect.signature(func).parameters.values()
+        if not any(param.annotation is Request or param.name in ("request", "current_user") for param in parameters):
+            raise TypeError(
+                f"@rate_limit on {func.__qualname__} needs a Request or current_user parameter to key the limit on"
+            )
+        name = policy_name
+        if name is None:
+            name = f"endpoint:{func.__module__}.{func.__qualname__}"
+            rate_limiter.add_policy(RateLimitPolicy(name, SlidingWindowStrategy(limit=requests, window=window), scope="user"))
         
-        return configs["default"]
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request = kwargs.get("request")
+            if not isinstance(request, Request):
+                request = next((arg for arg in args if isinstance(arg, Request)), None)
+            # Endpoints without a Request parameter are counted per authenticated user
+            current_user = kwargs.get("current_user")
+            identity = f"user:{current_user.id}" if getattr(current_user, "id", None) else None
+            if request is None and identity is None:
+                raise RuntimeError(f"@rate_limit on {func.__qualname__} called without a Request or current_user")
+            await rate_limiter.enforce(name, request=request, identity=identity)
+            return await func(*args, **kwargs)
+        return wrapper
+    return decorator
 
-# Global rate limiter instance
-rate_limiter = RateLimiter()
 
 class RateLimitMiddleware:
-    """Rate limiting middleware for FastAPI"""
+    """Pure ASGI rate limiting middleware
+    
+    Resolves the path to a precompiled policy, checks it through the engine and
+    adds X-RateLimit-* headers. Exempt paths pass straight through.
+    """
     
-    def __init__(self, app):
+    def __init__(self, app, engine: Optional[RateLimitEngine] = None):
         self.app = app
+        self.engine = engine
     
     async def __call__(self, scope, receive, send):
         if scope["type"] != "http":
             await self.app(scope, receive, send)
             return
         
-        request = Request(scope, receive)
-        
-        # Skip rate limiting for health checks
-        if request.url.path in ["/health", "/health/ready"]:
+        engine = self.engine or rate_limiter
+        policy = engine.router.resolve(scope["path"])
+        if policy is None:
             await self.app(scope, receive, send)
             return
         
-        # Get rate limit config
-        config = rate_limiter.get_rate_limit_config(request.url.path)
-        
-        # Check rate limit
-        result = rate_limiter.check_rate_limit(request, **config)
+        result = await engine.check(policy, client_identity(scope, policy.scope))
+        headers = rate_limit_headers(result)
         
         if not result["allowed"]:
+            retry_after = max(result["reset_time"] - int(time.time()), 1)
             response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
                     "error": "Rate limit exceeded",
-                    "message": f"Too many requests. Limit: {result['limit']}, "
-                              f"Remaining: {result['remaining']}, "
-                              f"Reset time: {result['reset_time']}",
-                    "retry_after": result["reset_time"] - int(time.time())
-                }
+                    "message": f"Rate limit exceeded. {result['limit']} requests per "
+                               f"{policy.strategy.window} seconds allowed.",
+                    "retry_after": retry_after
+                },
+                headers={**headers, "Retry-After": str(retry_after)}
             )
-            
-            # Add rate limit headers
-            for header, value in result["headers"].items():
-                response.headers[header] = value
-            
             await response(scope, receive, send)
             return
         
-        # Add rate limit headers to successful responses
+        raw_headers = [(name.encode(), value.encode()) for name, value in headers.items()]
+        
         async def send_wrapper(message):
             if message["type"] == "http.response.start":
-                headers = list(message.get("headers", []))
-                for header, value in result["headers"].items():
-                    headers.append([header.encode(), str(value).encode()])
-                message["headers"] = headers
+                message["headers"] = list(message.get("headers", [])) + raw_headers
             await send(message)
         
         await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,358 @@
+"""
+Read-replica routing for read-only request handlers
+
+Analytics, list, search and export endpoints take their session from
+``get_read_db`` / ``get_async_read_db``. Those sessions read from a replica
+and send anything that writes to the primary. A replica is used only while its
+replication lag is under ``DATABASE_REPLICA_MAX_LAG_SECONDS``. Once a user's
+request writes to the primary, that user's reads stay on the primary for
+``DATABASE_READ_YOUR_WRITES_SECONDS``, on every worker (writes are announced
+over Redis pub/sub).
+"""
+import asyncio
+import itertools
+import json
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+from .asgi_pipeline import HTTPContext, MiddlewareHook
+from .auth_cache import TTLCache
+from .config import settings
+from .database import create_async_database_engine, engine as primary_engine, get_async_engine
+from .query_instrumentation import query_instrumentation
+
+logger = logging.getLogger(__name__)
+
+# Seconds of replay lag on a Postgres standby; an idle standby that has replayed
+# everything it received reports zero rather than the age of the last commit
+POSTGRES_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+_READ_ONLY_TEXT = re.compile(r"^\s*(SELECT|EXPLAIN|SHOW|PRAGMA)\b", re.IGNORECASE)
+
+
+def is_write(statement) -> bool:
+    """Whether a statement has to run on the primary"""
+    if statement is None:
+        return False
+    if isinstance(statement, TextClause):
+        # Raw SQL is only trusted on a replica when it plainly reads
+        return not _READ_ONLY_TEXT.match(statement.text)
+    return bool(getattr(statement, "is_dml", False))
+
+
+class Replica:
+    """One read replica, its engines and its last measured lag"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.lag: Optional[float] = None
+        self.healthy = True
+        self.checked_at: Optional[float] = None
+        self._engine: Optional[Engine] = None
+        self._async_engine: Optional[AsyncEngine] = None
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            options = {"pool_pre_ping": True}
+            if self.url.startswith("sqlite"):
+                options["connect_args"] = {"check_same_thread": False}
+            else:
+                options.update(pool_size=settings.DATABASE_POOL_SIZE, max_overflow=settings.DATABASE_MAX_OVERFLOW)
+            self._engine = create_engine(self.url, **options)
+            query_instrumentation.instrument_engine(self._engine)
+        return self._engine
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        if self._async_engine is None:
+            self._async_engine = create_async_database_engine(self.url)
+        return self._async_engine
+
+    def measure_lag(self) -> float:
+        with self.engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                return float(conn.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+            # Other backends have no replication status to report; reaching them is enough
+            conn.execute(text("SELECT 1"))
+            return 0.0
+
+    async def dispose(self):
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+        if self._engine is not None:
+            self._engine.dispose()
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica chosen for it and writes to the primary
+
+    Flushes and DML statements always go to the primary, and once the session
+    has written, its later reads follow so they see their own changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        primary, replica = self.info["primary"], self.info.get("replica")
+        if replica is None or self._flushing or self.info.get("wrote"):
+            return primary
+        if is_write(clause):
+            self.info["wrote"] = True
+            return primary
+        return replica
+
+
+class ReplicaRouter:
+    """Chooses between the primary and healthy replicas for read-only sessions"""
+
+    def __init__(self, replica_urls: List[str] = None, max_lag: float = None, sticky_seconds: float = None,
+                 lag_check_interval: float = None, channel: str = None):
+        urls = settings.DATABASE_REPLICA_URLS if replica_urls is None else replica_urls
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag = settings.DATABASE_REPLICA_MAX_LAG_SECONDS if max_lag is None else max_lag
+        self.lag_check_interval = lag_check_interval or settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL_SECONDS
+        self.channel = channel or settings.DATABASE_REPLICA_WRITE_CHANNEL
+        self._sticky = TTLCache(settings.AUTH_TOKEN_CACHE_SIZE,
+                                settings.DATABASE_READ_YOUR_WRITES_SECONDS if sticky_seconds is None else sticky_seconds)
+        self._round_robin = itertools.count()
+
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self.stats = {"replica_reads": 0, "primary_reads": 0, "sticky_reads": 0, "lagging_skips": 0}
+
+    # Routing
+
+    def choose(self, sticky_key: Optional[str] = None) -> Optional[Replica]:
+        """Replica for a read-only session, or None to read from the primary"""
+        if not self.replicas:
+            return None
+        if sticky_key is not None and self._sticky.get(str(sticky_key)) is not None:
+            self.stats["sticky_reads"] += 1
+            return None
+
+        candidates = []
+        for replica in self.replicas:
+            if not replica.healthy:
+                continue
+            if replica.lag is not None and replica.lag > self.max_lag:
+                self.stats["lagging_skips"] += 1
+                continue
+            candidates.append(replica)
+
+        if not candidates:
+            self.stats["primary_reads"] += 1
+            return None
+        self.stats["replica_reads"] += 1
+        return candidates[next(self._round_robin) % len(candidates)]
+
+    def read_session(self, sticky_key: Optional[str] = None, primary: Engine = None) -> RoutingSession:
+        replica = self.choose(sticky_key)
+        return RoutingSession(
+            autoflush=False, expire_on_commit=False,
+            info={"primary": primary or primary_engine, "replica": replica.engine if replica else None}
+        )
+
+    def async_read_session(self, sticky_key: Optional[str] = None, primary: AsyncEngine = None) -> AsyncSession:
+        replica = self.choose(sticky_key)
+        primary = primary or get_async_engine()
+        return AsyncSession(
+            sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False,
+            info={"primary": primary.sync_engine, "replica": replica.async_engine.sync_engine if replica else None}
+        )
+
+    # Read-your-writes
+
+    def mark_write(self, sticky_key: str, publish: bool = True):
+        """Keep ``sticky_key``'s reads on the primary until replicas have caught up"""
+        if not self.replicas:
+            return
+        self._sticky.put(str(sticky_key), True)
+        if publish:
+            self._publish({"key": str(sticky_key)})
+
+    def is_sticky(self, sticky_key: str) -> bool:
+        return self._sticky.get(str(sticky_key)) is not None
+
+    # Lag monitoring
+
+    def refresh_lag(self):
+        """Probe every replica; unreachable ones are skipped until they answer again"""
+        for replica in self.replicas:
+            try:
+                replica.lag = replica.measure_lag()
+                if not replica.healthy:
+                    logger.info(f"Read replica {self._label(replica)} is reachable again")
+                replica.healthy = True
+            except Exception as e:
+                if replica.healthy:
+                    logger.warning(f"Read replica {self._label(replica)} unavailable, reading from primary: {e}")
+                replica.healthy = False
+            replica.checked_at = time.time()
+
+    async def _lag_loop(self):
+        while True:
+            await asyncio.to_thread(self.refresh_lag)
+            await asyncio.sleep(self.lag_check_interval)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "replicas": [
+                {"replica": self._label(replica), "healthy": replica.healthy, "lag_seconds": replica.lag,
+                 "checked_at": replica.checked_at}
+                for replica in self.replicas
+            ],
+            "max_lag_seconds": self.max_lag,
+            "stats": dict(self.stats)
+        }
+
+    @staticmethod
+    def _label(replica: Replica) -> str:
+        # Never expose credentials in logs or status output
+        return replica.engine.url.render_as_string(hide_password=True)
+
+    # Cluster-wide stickiness
+
+    def _publish(self, message: Dict[str, Any]):
+        if self._redis is None or self._loop is None or self._loop.is_closed():
+            return
+        payload = json.dumps(message)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        # Writes are noticed on the loop (async sessions) and in the threadpool (sync endpoints)
+        if running is self._loop:
+            self._loop.create_task(self._send(payload))
+        else:
+            asyncio.run_coroutine_threadsafe(self._send(payload), self._loop)
+
+    async def _send(self, payload: str):
+        try:
+            await self._redis.publish(self.channel, payload)
+        except Exception as e:
+            logger.warning(f"Failed to publish read-your-writes marker: {e}")
+
+    async def _listen(self, pubsub):
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                try:
+                    self.mark_write(json.loads(message["data"])["key"], publish=False)
+                except Exception as e:
+                    logger.warning(f"Ignoring malformed read-your-writes marker: {e}")
+        finally:
+            await pubsub.unsubscribe(self.channel)
+            await pubsub.close()
+
+    async def start(self, redis_client=None):
+        """Start lag monitoring and, with Redis, cross-worker stickiness"""
+        if not self.replicas or self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._tasks.append(self._loop.create_task(self._lag_loop()))
+        if redis_client is not None:
+            self._redis = redis_client
+            pubsub = redis_client.pubsub()
+            await pubsub.subscribe(self.channel)
+            self._tasks.append(self._loop.create_task(self._listen(pubsub)))
+        logger.info(f"Routing read-only sessions across {len(self.replicas)} replica(s)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+        self._redis = None
+        for replica in self.replicas:
+            await replica.dispose()
+
+
+# Global replica router instance
+replica_router = ReplicaRouter()
+
+
+def _sticky_key(request: Request) -> Optional[str]:
+    return getattr(request.state, "user_id", None)
+
+
+def get_read_db(request: Request) -> Session:
+    """Dependency to get a read-only session (replica when healthy and caught up)"""
+    db = replica_router.read_session(_sticky_key(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    """Async variant of ``get_read_db``"""
+    async with replica_router.async_read_session(_sticky_key(request)) as db:
+        yield db
+
+
+# Requests that write to the primary make their user sticky. The scope is a
+# mutable dict so writes made in the threadpool or in async greenlets (which
+# run in copies of the request's context) are still seen by the request.
+
+_request_scope: ContextVar[Optional[dict]] = ContextVar("replica_request_scope", default=None)
+
+
+def _note_write():
+    scope = _request_scope.get()
+    if scope is None or scope["wrote"]:
+        return
+    scope["wrote"] = True
+    if scope["user_id"] is not None:
+        replica_router.mark_write(scope["user_id"])
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flush(session: Session, flush_context):
+    _note_write()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_orm_dml(orm_execute_state):
+    if is_write(orm_execute_state.statement):
+        _note_write()
+
+
+class ReadYourWritesHook(MiddlewareHook):
+    """Tracks whether a request wrote to the primary, on behalf of its user
+
+    Runs after ``MultiTenantHook``, which identifies the user.
+    """
+
+    def on_request(self, ctx: HTTPContext):
+        if replica_router.replicas:
+            ctx.state["replica_scope_token"] = _request_scope.set(
+                {"user_id": ctx.state.get("user_id"), "wrote": False}
+            )
+        return None
+
+    def on_complete(self, ctx: HTTPContext):
+        token = ctx.state.pop("replica_scope_token", None)
+        if token is not None:
+            _request_scope.reset(token)
@@ -2,18 +2,17 @@
 Advanced Security Headers Middleware
 Implements comprehensive security headers for production deployment
 """
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response as StarletteResponse
+from starlette.datastructures import MutableHeaders
 import logging
 
+from .asgi_pipeline import HTTPContext, MiddlewareHook
+
 logger = logging.getLogger(__name__)
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Advanced security headers middleware for production security"""
+class SecurityHeadersHook(MiddlewareHook):
+    """Advanced security headers hook for production security"""
     
-    def __init__(self, app, csp_policy: str = None):
-        super().__init__(app)
+    def __init__(self, csp_policy: str = None):
         self.csp_policy = csp_policy or (
             "default-src 'self'; "
             "script-src 'self' 'unsafe-inline' 'unsafe-eval'; "
@@ -25,12 +24,9 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             "base-uri 'self'; "
             "form-action 'self'"
         )
-    
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
         
         # Security Headers
-        security_headers = {
+        self.security_headers = {
             # Prevent XSS attacks
             "X-Content-Type-Options": "nosniff",
             "X-Frame-Options": "DENY",
@@ -66,9 +62,15 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             "Pragma": "no-cache",
             "Expires": "0",
         }
-        
-        # Add security headers to response
-        for header, value in security_headers.items():
-            response.headers[header] = value
-        
-        return response
+        # Encoded once; applying them is a list filter and extend per response
+        self._raw_headers = [
+            (header.lower().encode("latin-1"), value.encode("latin-1"))
+            for header, value in self.security_headers.items()
+        ]
+        self._header_names = {name for name, _ in self._raw_headers}
+    
+    def on_response(self, ctx: HTTPContext, headers: MutableHeaders):
+        # Add security headers to response, replacing any the app set
+        raw = headers.raw
+        raw[:] = [item for item in raw if item[0] not in self._header_names]
+        raw.extend(self._raw_headers)
@@ -0,0 +1,14 @@
+"""
+SQLite stand-ins for PostgreSQL column types
+
+The models declare PostgreSQL's ``UUID`` type. Local SQLite databases (``init_db``)
+and the ERP load simulation store it as 32-character hex text; importing this
+module registers that rule with SQLAlchemy's compiler.
+"""
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
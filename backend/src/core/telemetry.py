@@ -1,14 +1,8 @@
 import logging
-from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
-from opentelemetry.instrumentation.redis import RedisInstrumentor
-from opentelemetry.instrumentation.celery import CeleryInstrumentor
 from .config import settings
-import sentry_sdk
-from sentry_sdk.integrations.fastapi import FastApiIntegration
+
+# SDKs and instrumentors are imported by the functions that use them, so
+# importing this module (and the app) stays cheap
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +12,8 @@ def setup_telemetry():
     # Setup Sentry if DSN is provided
     if settings.SENTRY_DSN:
         try:
+            import sentry_sdk
+            from sentry_sdk.integrations.fastapi import FastApiIntegration
             sentry_sdk.init(
                 dsn=settings.SENTRY_DSN,
                 environment=settings.ENVIRONMENT,
@@ -31,6 +27,10 @@ def setup_telemetry():
     
     # Setup OpenTelemetry
     try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        
         # Create tracer provider
         provider = TracerProvider()
         trace.set_tracer_provider(provider)
@@ -61,6 +61,7 @@ def setup_telemetry():
 def instrument_app(app):
     """Instrument FastAPI app with OpenTelemetry"""
     try:
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
         FastAPIInstrumentor.instrument_app(app)
         logger.info("FastAPI instrumentation enabled")
     except Exception as e:
@@ -69,6 +70,7 @@ def instrument_app(app):
 def instrument_sqlalchemy():
     """Instrument SQLAlchemy with OpenTelemetry"""
     try:
+        from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
         SQLAlchemyInstrumentor().instrument()
         logger.info("SQLAlchemy instrumentation enabled")
     except Exception as e:
@@ -77,6 +79,7 @@ def instrument_sqlalchemy():
 def instrument_redis():
     """Instrument Redis with OpenTelemetry"""
     try:
+        from opentelemetry.instrumentation.redis import RedisInstrumentor
         RedisInstrumentor().instrument()
         logger.info("Redis instrumentation enabled")
     except Exception as e:
@@ -85,6 +88,7 @@ def instrument_redis():
 def instrument_celery():
     """Instrument Celery with OpenTelemetry"""
     try:
+        from opentelemetry.instrumentation.celery import CeleryInstrumentor
         CeleryInstrumentor().instrument()
         logger.info("Celery instrumentation enabled")
     except Exception as e:
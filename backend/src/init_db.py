@@ -0,0 +1,52 @@
+"""
+Create the database schema outside the request server
+
+Run once per deploy (after ``alembic upgrade head`` on PostgreSQL), or via
+``make init-db`` for local SQLite databases:
+
+    python src/init_db.py
+
+Keeping DDL out of application startup lets new server processes become ready
+without touching the schema or racing each other to create it.
+"""
+import logging
+import sys
+from pathlib import Path
+
+# Ensure both import roots (``core.*`` and ``src.*``) resolve when run as a script
+src_directory_path = Path(__file__).resolve().parent
+for path in (src_directory_path, src_directory_path.parent):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import core.sqlite_types  # noqa: F401 - UUID columns on local SQLite databases
+
+logger = logging.getLogger(__name__)
+
+
+def create_schema(bind=None):
+    """Create missing tables, plus the FTS5 invoice search index on SQLite
+
+    On PostgreSQL the search index is created by migration.
+    """
+    from sqlalchemy import inspect
+    # Models declare their tables on ``src.core.database.Base``; importing the
+    # package registers all of them (``core.database`` is a separate module copy)
+    import src.models  # noqa: F401
+    from src.core.database import Base, engine
+    from services.invoice_search import InvoiceSearchIndex
+
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    logger.info("Database tables created/verified")
+
+    if bind.dialect.name == "sqlite":
+        if inspect(bind).has_table("invoices"):
+            InvoiceSearchIndex(bind).install()
+        else:
+            logger.warning("Invoices table missing; invoice search index not installed")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    create_schema()
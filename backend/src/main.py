@@ -11,6 +11,7 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+import asyncio
 import time
 import logging
 from contextlib import asynccontextmanager
@@ -18,16 +19,19 @@ import redis.asyncio as redis
 
 from core.config import settings
 from core.telemetry import setup_telemetry
-from src.core.middleware import MultiTenantMiddleware
-from core.security_headers import SecurityHeadersMiddleware
-from core.rate_limiting import RateLimitingMiddleware, AdvancedRateLimiter
+from core.middleware import MultiTenantHook
+from core.security_headers import SecurityHeadersHook
+from core.rate_limiter import RateLimitMiddleware, configure_rate_limiter
+from core.auth_cache import auth_cache
+from core.query_instrumentation import QueryInstrumentationHook
+from core.replica_routing import ReadYourWritesHook, replica_router
 from core.health_checks import HealthChecker
 from core.api_middleware import create_api_middleware_stack
 from core.api_documentation import create_openapi_schema, create_enhanced_docs_routes
 from core.error_handling import register_error_handlers
 from api.v1.api import api_router
-from core.database import engine, get_db
-from core.database import Base
+from core.database import get_db, async_pool_autotuner, dispose_async_engine, pool_autotuner
+from services.audit_writer import audit_writer
 from sqlalchemy import text
 
 # Configure logging
@@ -61,32 +65,109 @@ async def lifespan(app: FastAPI):
     # Initialize health checker
     health_checker = HealthChecker(redis_client)
     
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created/verified")
+    # Schema creation is a deploy step (src/init_db.py) so replicas start
+    # serving without DDL; local setups can opt back in
+    if settings.DATABASE_CREATE_SCHEMA_ON_STARTUP:
+        from init_db import create_schema
+        await asyncio.to_thread(create_schema)
     
     # Setup telemetry
     setup_telemetry()
     logger.info("Telemetry setup complete")
     
+    # Start the buffered audit writer (replays rows spilled by a previous shutdown)
+    if settings.AUDIT_ASYNC_WRITES_ENABLED:
+        await audit_writer.start()
+    
+    # Resize the serving pools (sync and async) from observed checkout waits
+    if settings.DATABASE_POOL_AUTOTUNE:
+        await pool_autotuner.start()
+        await async_pool_autotuner.start()
+    
+    # Keep upcoming audit partitions created and apply the audit retention policy
+    audit_maintenance = None
+    if settings.AUDIT_MAINTENANCE_ENABLED:
+        from services.audit_maintenance import audit_maintenance
+        await audit_maintenance.start()
+    
     # Store shared resources in app state
     app.state.redis_client = redis_client
     app.state.health_checker = health_checker
     
     # Configure rate limiting if Redis is available
+    rate_limiter = None
+    resolver = None
     if redis_client:
-        rate_limiter = AdvancedRateLimiter(redis_client)
-        # Update the middleware with the rate limiter
-        for middleware in app.user_middleware:
-            if hasattr(middleware, 'rate_limiter'):
-                middleware.rate_limiter = rate_limiter
-                break
+        rate_limiter = configure_rate_limiter(redis_client)
+        # Evict cached tokens/principals when other replicas log out or change users
+        await auth_cache.start(redis_client)
+        # Reload vendor mappings corrected on other replicas
+        from services.vendor_resolution import vendor_resolver
+        resolver = vendor_resolver.get()
+        await resolver.start(redis_client)
+    
+    # Replica lag probes run without Redis; stickiness is then per worker
+    await replica_router.start(redis_client)
+    
+    # Keep the local GP vendor/PO mirror current so matching does not query GP
+    gp_master_data = None
+    if settings.GP_MIRROR_ENABLED:
+        from services.gp_mirror import gp_master_data
+        await gp_master_data.start()
+    
+    # Consume the ERP sync outbox (jobs are queued when invoices are approved)
+    erp_sync_queue = None
+    if settings.ERP_SYNC_QUEUE_ENABLED:
+        from services.erp_automation import erp_automation
+        erp_sync_queue = erp_automation.sync_queue
+        await erp_sync_queue.start()
+    
+    # Reconcile invoice ERP statuses in bulk from each ERP's change feed
+    erp_status_reconciler = None
+    if settings.ERP_STATUS_SYNC_ENABLED:
+        from services.erp_status_sync import erp_status_reconciler
+        await erp_status_reconciler.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down AI ERP SaaS application...")
     
+    # Flush buffered audit rows (spilled to disk if the database is unavailable)
+    await audit_writer.stop()
+    await pool_autotuner.stop()
+    await async_pool_autotuner.stop()
+    
+    # Hand unused rate limit leases back before the connection goes away
+    if rate_limiter and rate_limiter.local_tier:
+        await rate_limiter.local_tier.stop()
+    
+    await auth_cache.stop()
+    if resolver is not None:
+        await resolver.stop()
+    await replica_router.stop()
+    if audit_maintenance is not None:
+        await audit_maintenance.stop()
+    if gp_master_data is not None:
+        await gp_master_data.stop()
+    if erp_sync_queue is not None:
+        await erp_sync_queue.stop()
+    if erp_status_reconciler is not None:
+        await erp_status_reconciler.stop()
+    
+    # Hand unused GP document numbers back and close the GP connection pools
+    # (blocking ODBC calls); only workers that used GP have it loaded
+    gp_integration = sys.modules.get("services.dynamics_gp_integration")
+    if gp_integration is not None and gp_integration.dynamics_gp_integration.is_loaded:
+        await asyncio.to_thread(gp_integration.dynamics_gp_integration.get().close)
+    
+    # Close the pooled HTTP clients shared by the ERP adapters
+    from services.erp import close_shared_adapters
+    await close_shared_adapters()
+    
+    # Close pooled async database connections
+    await dispose_async_engine()
+    
     # Close Redis connection
     if redis_client:
         await redis_client.close()
@@ -105,12 +186,6 @@ app = FastAPI(
 # Set custom OpenAPI schema
 app.openapi = lambda: create_openapi_schema(app)
 
-# Add security headers middleware (first for maximum security)
-app.add_middleware(SecurityHeadersMiddleware, csp_policy=settings.CSP_POLICY)
-
-# Add multi-tenant middleware
-app.add_middleware(MultiTenantMiddleware)
-
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -129,11 +204,18 @@ app.add_middleware(
 # Add GZIP compression middleware
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
-# Add rate limiting middleware (will be configured in lifespan)
-app.add_middleware(RateLimitingMiddleware, rate_limiter=None)
+# Add rate limiting middleware (Redis is attached to the engine in lifespan)
+app.add_middleware(RateLimitMiddleware)
 
-# Create enhanced API middleware stack
-app = create_api_middleware_stack(app)
+# Create enhanced API middleware pipeline (outermost); tenant context and
+# security headers run as hooks in the same pure ASGI layer
+app = create_api_middleware_stack(
+    app,
+    QueryInstrumentationHook(),
+    MultiTenantHook(),
+    ReadYourWritesHook(),
+    SecurityHeadersHook(csp_policy=settings.CSP_POLICY)
+)
 
 # Register error handlers
 register_error_handlers(app)
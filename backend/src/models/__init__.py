@@ -8,6 +8,12 @@ from .contact import ContactSubmission, InquiryType, ContactStatus
 from .subscription import Subscription, SubscriptionStatus, SubscriptionType, SLA, PaymentMethod, BillingHistory
 from .purchase_order import PurchaseOrder
 from .receipt import Receipt
+from .gp_mirror import (
+    GPMirrorVendor, GPMirrorPurchaseOrder, GPMirrorPurchaseOrderLine, GPMirrorReceipt, GPMirrorReceiptLine,
+    GPMirrorSyncState
+)
+from .erp_sync import ERPSyncJob, ERPSyncJobStatus, ERPStatusWatermark
+from .vendor_mapping import ERPVendorMapping
 
 __all__ = [
     "User",
@@ -33,5 +39,15 @@ __all__ = [
     "PaymentMethod",
     "BillingHistory",
     "PurchaseOrder",
-    "Receipt"
+    "Receipt",
+    "GPMirrorVendor",
+    "GPMirrorPurchaseOrder",
+    "GPMirrorPurchaseOrderLine",
+    "GPMirrorReceipt",
+    "GPMirrorReceiptLine",
+    "GPMirrorSyncState",
+    "ERPSyncJob",
+    "ERPSyncJobStatus",
+    "ERPStatusWatermark",
+    "ERPVendorMapping"
 ]
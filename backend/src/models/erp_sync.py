@@ -0,0 +1,73 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, JSON, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+import enum
+from src.core.database import Base
+
+
+class ERPSyncJobStatus(str, enum.Enum):
+    """Lifecycle of one outbox entry"""
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    # The ERP accepted the request but the invoice needs a person (e.g. a match discrepancy)
+    NEEDS_REVIEW = "needs_review"
+    DEAD_LETTER = "dead_letter"
+
+
+class ERPSyncJob(Base):
+    """Outbox entry: one approved invoice to be pushed to one ERP system
+
+    Rows are written in the same transaction that approves the invoice and
+    consumed by the per-ERP workers of ``services.erp_sync_queue``.
+    """
+    __tablename__ = "erp_sync_outbox"
+    __table_args__ = (
+        # Workers claim the oldest due job for their ERP
+        Index("ix_erp_sync_outbox_due", "erp_type", "status", "next_attempt_at"),
+        {'extend_existing': True}
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # "<erp_type>:<invoice_id>"; also sent to ERPs that deduplicate requests
+    idempotency_key = Column(String(128), nullable=False, unique=True)
+    invoice_id = Column(UUID(as_uuid=True), ForeignKey("invoices.id", ondelete="CASCADE"), nullable=False, index=True)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False)
+    erp_type = Column(String(32), nullable=False)
+
+    status = Column(String(20), nullable=False, default=ERPSyncJobStatus.PENDING.value)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # Lease held by the worker processing the job; an expired lease makes it claimable again
+    locked_by = Column(String(64), nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+
+    last_error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<ERPSyncJob(idempotency_key='{self.idempotency_key}', status='{self.status}')>"
+
+
+class ERPStatusWatermark(Base):
+    """How far document-status reconciliation has read one ERP connection's changes
+
+    ``connection_key`` is ``default`` for the settings-configured adapter of
+    an ERP type, or the company ID for a company's registered connection.
+    """
+    __tablename__ = "erp_status_watermarks"
+    __table_args__ = {'extend_existing': True}
+
+    erp_type = Column(String(32), primary_key=True)
+    connection_key = Column(String(64), primary_key=True)
+    # Latest ERP-side modification time applied locally
+    watermark = Column(DateTime(timezone=True), nullable=True)
+    last_polled_at = Column(DateTime(timezone=True), nullable=True)
+    documents_updated = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ERPStatusWatermark(erp_type='{self.erp_type}', connection_key='{self.connection_key}')>"
@@ -0,0 +1,122 @@
+from sqlalchemy import Column, DateTime, Index, Integer, Numeric, String
+from sqlalchemy.sql import func
+from src.core.database import Base
+
+
+class GPMirrorVendor(Base):
+    """Local copy of a GP vendor master record (PM00200)"""
+    __tablename__ = "gp_mirror_vendors"
+    __table_args__ = (
+        # Exact and prefix lookups on the normalized name; PostgreSQL also gets a trigram index
+        Index("ix_gp_mirror_vendors_name_key", "company_db", "name_key"),
+        {'extend_existing': True}
+    )
+
+    company_db = Column(String(15), primary_key=True)
+    vendor_id = Column(String(15), primary_key=True)
+    vendor_name = Column(String(65), nullable=False)
+    name_key = Column(String(65), nullable=False)
+    status = Column(Integer, nullable=False, default=1)
+    payment_terms = Column(String(21), nullable=True)
+    tax_schedule = Column(String(15), nullable=True)
+    currency_code = Column(String(15), nullable=True)
+    dex_row_ts = Column(DateTime, nullable=False)
+    synced_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<GPMirrorVendor(company_db='{self.company_db}', vendor_id='{self.vendor_id}')>"
+
+
+class GPMirrorPurchaseOrder(Base):
+    """Local copy of an open GP purchase order header (POP10100)"""
+    __tablename__ = "gp_mirror_purchase_orders"
+    __table_args__ = (
+        Index("ix_gp_mirror_purchase_orders_vendor", "company_db", "vendor_id", "status", "subtotal"),
+        {'extend_existing': True}
+    )
+
+    company_db = Column(String(15), primary_key=True)
+    po_number = Column(String(17), primary_key=True)
+    vendor_id = Column(String(15), nullable=False)
+    po_date = Column(DateTime, nullable=True)
+    required_date = Column(DateTime, nullable=True)
+    subtotal = Column(Numeric(19, 5), nullable=False, default=0)
+    currency_code = Column(String(15), nullable=True)
+    status = Column(Integer, nullable=False)
+    po_type = Column(Integer, nullable=False, default=1)
+    dex_row_ts = Column(DateTime, nullable=False)
+    synced_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<GPMirrorPurchaseOrder(company_db='{self.company_db}', po_number='{self.po_number}')>"
+
+
+class GPMirrorPurchaseOrderLine(Base):
+    """Local copy of a GP purchase order line (POP10110)"""
+    __tablename__ = "gp_mirror_po_lines"
+    __table_args__ = {'extend_existing': True}
+
+    company_db = Column(String(15), primary_key=True)
+    po_number = Column(String(17), primary_key=True)
+    line_number = Column(Integer, primary_key=True)
+    item_number = Column(String(31), nullable=True)
+    description = Column(String(101), nullable=True)
+    quantity = Column(Numeric(19, 5), nullable=False, default=0)
+    unit_cost = Column(Numeric(19, 5), nullable=False, default=0)
+    extended_cost = Column(Numeric(19, 5), nullable=False, default=0)
+    unit_of_measure = Column(String(9), nullable=True)
+    dex_row_ts = Column(DateTime, nullable=False)
+
+
+class GPMirrorReceipt(Base):
+    """Local copy of a GP receipt/shipment header (POP10300)"""
+    __tablename__ = "gp_mirror_receipts"
+    __table_args__ = (
+        Index("ix_gp_mirror_receipts_po", "company_db", "po_number"),
+        {'extend_existing': True}
+    )
+
+    company_db = Column(String(15), primary_key=True)
+    receipt_number = Column(String(17), primary_key=True)
+    po_number = Column(String(17), nullable=False)
+    receipt_date = Column(DateTime, nullable=True)
+    vendor_id = Column(String(15), nullable=False)
+    subtotal = Column(Numeric(19, 5), nullable=False, default=0)
+    currency_code = Column(String(15), nullable=True)
+    receipt_type = Column(Integer, nullable=False, default=1)
+    dex_row_ts = Column(DateTime, nullable=False)
+
+
+class GPMirrorReceiptLine(Base):
+    """Local copy of a GP receipt line (POP10310)"""
+    __tablename__ = "gp_mirror_receipt_lines"
+    __table_args__ = {'extend_existing': True}
+
+    company_db = Column(String(15), primary_key=True)
+    receipt_number = Column(String(17), primary_key=True)
+    line_number = Column(Integer, primary_key=True)
+    po_number = Column(String(17), nullable=False)
+    item_number = Column(String(31), nullable=True)
+    description = Column(String(101), nullable=True)
+    quantity = Column(Numeric(19, 5), nullable=False, default=0)
+    unit_cost = Column(Numeric(19, 5), nullable=False, default=0)
+    extended_cost = Column(Numeric(19, 5), nullable=False, default=0)
+    dex_row_ts = Column(DateTime, nullable=False)
+
+
+class GPMirrorSyncState(Base):
+    """Change-tracking watermark for one mirrored GP table in one company database"""
+    __tablename__ = "gp_mirror_sync_state"
+    __table_args__ = {'extend_existing': True}
+
+    company_db = Column(String(15), primary_key=True)
+    source_table = Column(String(31), primary_key=True)
+    # Keyset position: the last (DEX_ROW_TS, key) copied
+    last_row_ts = Column(DateTime, nullable=True)
+    last_key = Column(String(128), nullable=True)
+    rows_synced = Column(Integer, nullable=False, default=0)
+    last_synced_at = Column(DateTime(timezone=True), nullable=True)
+    last_reconciled_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<GPMirrorSyncState(company_db='{self.company_db}', source_table='{self.source_table}')>"
@@ -63,9 +63,16 @@ class Invoice(Base):
     
     # ERP integration
     posted_to_erp = Column(Boolean, default=False, nullable=False)
-    erp_document_id = Column(String(255), nullable=True)
+    erp_document_id = Column(String(255), nullable=True, index=True)
+    # ERP and connection the document was posted to: document IDs are only unique within them
+    # (connection key as in ERPStatusWatermark: "default" or the company's registered connection)
+    erp_type = Column(String(32), nullable=True)
+    erp_connection_key = Column(String(64), nullable=True)
     erp_posting_date = Column(DateTime(timezone=True), nullable=True)
     erp_error_message = Column(Text, nullable=True)
+    # Document status as last reported by the ERP (reconciled by services.erp_status_sync)
+    erp_status = Column(String(32), nullable=True)
+    erp_status_updated_at = Column(DateTime(timezone=True), nullable=True)
     
     # OCR and AI data
     ocr_data = Column(JSON, default=dict, nullable=False)
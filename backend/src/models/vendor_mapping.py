@@ -0,0 +1,30 @@
+from sqlalchemy import Column, DateTime, Float, JSON, String
+from sqlalchemy.sql import func
+from src.core.database import Base
+
+
+class ERPVendorMapping(Base):
+    """Remembered supplier name -> ERP vendor resolution for one ERP company
+
+    Keyed by the normalized supplier name (``services.vendor_resolution.vendor_name_key``);
+    written through by ``VendorResolver`` whenever a supplier is resolved.
+    """
+    __tablename__ = "erp_vendor_mappings"
+    __table_args__ = {'extend_existing': True}
+
+    erp_type = Column(String(32), primary_key=True)
+    # ERP-side company: GP company database, BC/Xero company ID, QuickBooks realm
+    company_key = Column(String(64), primary_key=True)
+    name_key = Column(String(65), primary_key=True)
+    supplier_name = Column(String(255), nullable=False)
+    vendor_ref = Column(String(64), nullable=False)
+    vendor_name = Column(String(255), nullable=True)
+    # How it was first resolved: existing, created or derived (fuzzy matches are not remembered)
+    source = Column(String(16), nullable=False)
+    score = Column(Float, nullable=False, default=1.0)
+    details = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ERPVendorMapping(erp_type='{self.erp_type}', name_key='{self.name_key}', vendor_ref='{self.vendor_ref}')>"
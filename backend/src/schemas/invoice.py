@@ -38,9 +38,11 @@ class InvoiceListResponse(BaseModel):
     """Invoice list response schema"""
     invoices: List[InvoiceResponse] = Field(..., description="List of invoices")
     total: int = Field(..., description="Total number of invoices")
-    page: int = Field(..., ge=1, description="Current page")
-    size: int = Field(..., ge=1, le=100, description="Page size")
+    total_is_estimate: bool = Field(default=False, description="Total is a planner estimate for large result sets")
+    skip: int = Field(default=0, ge=0, description="Records skipped (offset pagination)")
+    limit: int = Field(..., ge=1, description="Page size")
     has_next: bool = Field(..., description="Has next page")
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor for the next page")
 
 class InvoiceCreate(BaseModel):
     """Invoice creation schema"""
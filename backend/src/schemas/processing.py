@@ -105,4 +105,19 @@ class ReprocessingRequest(BaseModel):
     """Reprocessing request schema"""
     invoice_id: str = Field(..., description="Invoice ID")
     reason: str = Field(..., description="Reprocessing reason")
-    reset_data: bool = Field(default=False, description="Reset extracted data")
\ No newline at end of file
+    reset_data: bool = Field(default=False, description="Reset extracted data")
+class BulkImportRequest(BaseModel):
+    """Bulk invoice import request schema"""
+    invoices: List[Dict[str, Any]] = Field(..., min_length=1, description="Extracted invoice data, in the OCR result shape")
+
+class BulkImportResponse(BaseModel):
+    """Bulk invoice import response schema"""
+    status: str = Field(..., description="Import status")
+    total: int = Field(..., description="Invoices submitted")
+    created: int = Field(..., description="Invoices created")
+    rejected: int = Field(..., description="Invoices rejected by validation")
+    duplicates: int = Field(..., description="Created invoices flagged as duplicates")
+    lines: int = Field(..., description="Line items created")
+    method: str = Field(..., description="Write method used (insert or copy)")
+    invoices: List[Dict[str, Any]] = Field(default_factory=list, description="Created invoices")
+    errors: List[Dict[str, Any]] = Field(default_factory=list, description="Validation errors per rejected invoice")
@@ -1,63 +1,36 @@
 # Services package
-# Import only the working services to avoid import issues
-from .simple_ocr import SimpleOCRService
-
-# Try to import other services, but don't fail if they have issues
-try:
-    from .ocr import OCRService
-    _OCR_AVAILABLE = True
-except ImportError:
-    _OCR_AVAILABLE = False
+# Only the simple OCR service is imported eagerly. The others are imported on
+# first access (``from services import StripeService``), so importing any one
+# service module does not load the SDKs (Azure, Stripe, Alembic) behind all of them.
+import importlib
 
-try:
-    from .erp import (
-        ERPAdapter, 
-        MockERPAdapter, 
-        MicrosoftDynamicsGPAdapter, 
-        Dynamics365BCAdapter, 
-        XeroAdapter,
-        QuickBooksAdapter,
-        SageAdapter,
-        SAPAdapter,
-        ERPIntegrationService
-    )
-    _ERP_AVAILABLE = True
-except ImportError:
-    _ERP_AVAILABLE = False
-
-try:
-    from .workflow import WorkflowEngine
-    _WORKFLOW_AVAILABLE = True
-except ImportError:
-    _WORKFLOW_AVAILABLE = False
+from .simple_ocr import SimpleOCRService
 
-try:
-    from .billing import StripeService
-    _BILLING_AVAILABLE = True
-except ImportError:
-    _BILLING_AVAILABLE = False
+_LAZY_EXPORTS = {
+    "OCRService": ".ocr",
+    "ERPAdapter": ".erp_adapters",
+    "MockERPAdapter": ".erp_adapters",
+    "MicrosoftDynamicsGPAdapter": ".erp_adapters.dynamics_gp",
+    "Dynamics365BCAdapter": ".erp_adapters.d365_bc",
+    "XeroAdapter": ".erp_adapters.xero",
+    "ERPIntegrationService": ".erp",
+    "WorkflowEngine": ".workflow",
+    "StripeService": ".billing",
+    "AuditService": ".audit",
+}
 
-try:
-    from .audit import AuditService
-    _AUDIT_AVAILABLE = True
-except ImportError:
-    _AUDIT_AVAILABLE = False
+__all__ = ["SimpleOCRService", *_LAZY_EXPORTS]
 
-# Always available
-__all__ = ["SimpleOCRService"]
 
-# Conditionally add available services
-if _OCR_AVAILABLE:
-    __all__.append("OCRService")
-if _ERP_AVAILABLE:
-    __all__.extend([
-        "ERPAdapter", "MockERPAdapter", "MicrosoftDynamicsGPAdapter", 
-        "Dynamics365BCAdapter", "XeroAdapter", "QuickBooksAdapter",
-        "SageAdapter", "SAPAdapter", "ERPIntegrationService"
-    ])
-if _WORKFLOW_AVAILABLE:
-    __all__.append("WorkflowEngine")
-if _BILLING_AVAILABLE:
-    __all__.append("StripeService")
-if _AUDIT_AVAILABLE:
-    __all__.append("AuditService")
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        module = importlib.import_module(module_name, __name__)
+    except ImportError as e:
+        # Services with missing optional dependencies are simply unavailable
+        raise AttributeError(f"{name} is unavailable: {e}") from e
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
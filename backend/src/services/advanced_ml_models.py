@@ -3,11 +3,12 @@ Advanced ML Models for Invoice Processing
 Enterprise-grade machine learning models for GL coding, fraud detection, and approval recommendations
 """
 import logging
-import numpy as np
 from typing import Dict, Any, List
 from datetime import datetime
 from dataclasses import dataclass
 
+from core.lazy import LazyService
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -74,7 +75,7 @@ class AdvancedMLService:
         )
 
 # Global instance
-advanced_ml_service = AdvancedMLService()
+advanced_ml_service = LazyService(AdvancedMLService)
 
 
 
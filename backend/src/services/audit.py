@@ -1,17 +1,19 @@
 """
 Audit Service for compliance and security tracking
 """
+import asyncio
 import logging
 from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, UTC
 import uuid
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc
+from sqlalchemy import and_, or_, desc, select
 
 from src.models.audit import AuditLog, AuditAction, AuditResourceType
 from src.models.user import User
 from src.models.company import Company
 from src.models.invoice import Invoice
+from services.audit_writer import audit_writer
 from core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -31,36 +33,38 @@ class AuditService:
                           resource_id: uuid.UUID, user: User, company_id: uuid.UUID,
                           details: Dict[str, Any] = None, ip_address: str = None,
                           user_agent: str = None, request_method: str = None,
-                          request_path: str = None, request_id: str = None) -> AuditLog:
-        """Log an audit event"""
+                          request_path: str = None, request_id: str = None,
+                          sync: Optional[bool] = None) -> AuditLog:
+        """Log an audit event
+
+        Events are handed to the buffered audit writer unless the action is
+        compliance-critical (``AUDIT_SYNC_ACTIONS``), ``sync=True`` is passed, or
+        the writer is not running; those are committed in the caller's session.
+        """
         try:
-            # Determine risk level
-            risk_level = self._determine_risk_level(action)
-            
-            # Determine data classification
-            data_classification = self._determine_data_classification(resource_type, action)
-            
-            # Create audit log entry
-            audit_log = AuditLog(
-                action=action,
-                resource_type=resource_type,
-                resource_id=resource_id,
+            row = audit_writer.build_row(
+                action, resource_type, resource_id, company_id,
                 user_id=user.id if user else None,
-                company_id=company_id,
                 details=details or {},
                 ip_address=ip_address,
                 user_agent=user_agent,
                 request_method=request_method,
                 request_path=request_path,
                 request_id=request_id,
-                risk_level=risk_level,
-                data_classification=data_classification
+                risk_level=self._determine_risk_level(action),
+                data_classification=self._determine_data_classification(resource_type, action),
+                compliance_tags=self._compliance_tags(action, resource_type)
             )
             
-            # Add compliance tags based on action and resource
-            self._add_compliance_tags(audit_log, action, resource_type)
+            if sync is None:
+                sync = not settings.AUDIT_ASYNC_WRITES_ENABLED or audit_writer.requires_sync(action)
+            
+            if not sync and audit_writer.enqueue(row):
+                logger.debug(f"Audit log queued: {action.value} on {resource_type.value}:{resource_id}")
+                return AuditLog(**row)
             
             # Save to database
+            audit_log = AuditLog(**row)
             db.add(audit_log)
             db.commit()
             db.refresh(audit_log)
@@ -100,8 +104,8 @@ class AuditService:
         else:
             return "public"
     
-    def _add_compliance_tags(self, audit_log: AuditLog, action: AuditAction, resource_type: AuditResourceType):
-        """Add compliance tags based on action and resource type"""
+    def _compliance_tags(self, action: AuditAction, resource_type: AuditResourceType) -> List[str]:
+        """Compliance tags for an action on a resource type"""
         tags = []
         
         # GDPR compliance tags
@@ -116,8 +120,13 @@ class AuditService:
         if action in [AuditAction.LOGIN, AuditAction.LOGOUT, AuditAction.ROLE_CHANGE]:
             tags.extend(["soc2", "access_control"])
         
-        # Add tags to audit log
-        for tag in tags:
+        return tags
+    
+    def _add_compliance_tags(self, audit_log: AuditLog, action: AuditAction, resource_type: AuditResourceType):
+        """Add compliance tags based on action and resource type"""
+        if audit_log.compliance_tags is None:
+            audit_log.compliance_tags = []
+        for tag in self._compliance_tags(action, resource_type):
             audit_log.add_compliance_tag(tag)
     
     async def get_audit_trail(self, db: Session, company_id: uuid.UUID,
@@ -359,27 +368,76 @@ class AuditService:
         return output.getvalue()
     
     async def cleanup_old_logs(self, db: Session, company_id: uuid.UUID,
-                              retention_days: int = 2555) -> int:
-        """Clean up old audit logs based on retention policy (default: 7 years)"""
+                              retention_days: int = 2555,
+                              batch_size: int = None) -> int:
+        """Clean up old audit logs based on retention policy (default: 7 years)
+        
+        Rows are deleted in bounded batches, each committed separately, so no single
+        statement holds long locks; on partitioned tables the timestamp predicate
+        restricts each batch to the expired partitions.
+        """
         cutoff_date = datetime.now(UTC) - timedelta(days=retention_days)
+        batch_size = batch_size or settings.AUDIT_PURGE_BATCH_SIZE
         
-        # Count logs to be deleted
-        count = db.query(AuditLog).filter(
-            and_(
-                AuditLog.company_id == company_id,
-                AuditLog.timestamp < cutoff_date
-            )
-        ).count()
-        
-        # Delete old logs
-        deleted = db.query(AuditLog).filter(
-            and_(
-                AuditLog.company_id == company_id,
-                AuditLog.timestamp < cutoff_date
-            )
-        ).delete()
-        
-        db.commit()
+        deleted = self._delete_in_batches(
+            db,
+            and_(AuditLog.company_id == company_id, AuditLog.timestamp < cutoff_date),
+            batch_size
+        )
         
         logger.info(f"Cleaned up {deleted} old audit logs for company {company_id}")
         return deleted
+    
+    async def apply_retention_policy(self, db: Session, retention_days: int = None,
+                                     batch_size: int = None) -> Dict[str, Any]:
+        """Apply the platform-wide audit retention policy (see ``purge_expired_logs``)
+        
+        The purge runs batched deletes and partition drops, so it runs on a worker
+        thread instead of blocking the event loop.
+        """
+        return await asyncio.to_thread(self.purge_expired_logs, db, retention_days, batch_size)
+    
+    def purge_expired_logs(self, db: Session, retention_days: int = None,
+                           batch_size: int = None, partition_manager=None) -> Dict[str, Any]:
+        """Apply the platform-wide audit retention policy
+        
+        On partitioned PostgreSQL storage expired months are detached and dropped
+        as whole partitions; rows in the boundary month (and everything on SQLite)
+        are removed with the batched delete fallback. Synchronous so the scheduled
+        job in ``services.audit_maintenance`` can run it off the event loop.
+        """
+        retention_days = retention_days or settings.AUDIT_LOG_RETENTION_DAYS
+        cutoff_date = datetime.now(UTC) - timedelta(days=retention_days)
+        batch_size = batch_size or settings.AUDIT_PURGE_BATCH_SIZE
+        
+        if partition_manager is None:
+            # Imported here: the migrations module pulls in Alembic
+            from core.database_migrations import get_audit_partition_manager
+            partition_manager = get_audit_partition_manager()
+        dropped_partitions = partition_manager.drop_partitions_before(cutoff_date)
+        
+        deleted = self._delete_in_batches(db, AuditLog.timestamp < cutoff_date, batch_size)
+        
+        logger.info(
+            f"Audit retention ({retention_days} days): dropped {len(dropped_partitions)} partitions, "
+            f"deleted {deleted} rows"
+        )
+        return {
+            "cutoff_date": cutoff_date.isoformat(),
+            "dropped_partitions": dropped_partitions,
+            "deleted_rows": deleted
+        }
+    
+    def _delete_in_batches(self, db: Session, condition, batch_size: int) -> int:
+        """Delete matching audit rows in batches of at most ``batch_size``"""
+        deleted = 0
+        while True:
+            batch_ids = select(AuditLog.id).where(condition).limit(batch_size)
+            batch_deleted = db.query(AuditLog).filter(
+                AuditLog.id.in_(batch_ids)
+            ).delete(synchronize_session=False)
+            db.commit()
+            
+            deleted += batch_deleted
+            if batch_deleted < batch_size:
+                return deleted
@@ -0,0 +1,112 @@
+"""
+Scheduled audit log upkeep
+
+Creates the upcoming monthly ``audit_logs`` partitions and applies the
+platform retention policy (``AUDIT_LOG_RETENTION_DAYS``) on a fixed interval.
+Partitions otherwise only come from migrations, so a gap between deploys
+longer than ``AUDIT_PARTITION_MONTHS_AHEAD`` would leave audit inserts with
+no partition to land in. Each pass runs in a worker thread because partition
+DDL and the batched purge use the synchronous engine.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AuditMaintenance:
+    """Periodically ensures future audit partitions and purges expired audit rows"""
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None, partition_manager=None,
+                 audit_service=None):
+        self._session_factory = session_factory
+        self._partition_manager = partition_manager
+        self._audit_service = audit_service
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"runs": 0, "partitions_created": 0, "partitions_dropped": 0, "rows_deleted": 0,
+                      "failures": 0}
+
+    def _session(self) -> Session:
+        if self._session_factory is None:
+            from core.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    @property
+    def partition_manager(self):
+        if self._partition_manager is None:
+            # Imported here: the migrations module pulls in Alembic
+            from core.database_migrations import get_audit_partition_manager
+            self._partition_manager = get_audit_partition_manager()
+        return self._partition_manager
+
+    @property
+    def audit_service(self):
+        if self._audit_service is None:
+            from services.audit import AuditService
+            self._audit_service = AuditService()
+        return self._audit_service
+
+    def run_once(self) -> Dict[str, Any]:
+        """Create upcoming partitions, then apply retention; a failure in one does not skip the other"""
+        self.stats["runs"] += 1
+        result: Dict[str, Any] = {"partitions_created": [], "retention": None}
+
+        try:
+            result["partitions_created"] = self.partition_manager.ensure_future_partitions()
+            self.stats["partitions_created"] += len(result["partitions_created"])
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.error(f"Creating future audit partitions failed: {e}")
+
+        session = self._session()
+        try:
+            retention = self.audit_service.purge_expired_logs(session, partition_manager=self.partition_manager)
+            self.stats["partitions_dropped"] += len(retention["dropped_partitions"])
+            self.stats["rows_deleted"] += retention["deleted_rows"]
+            result["retention"] = retention
+        except Exception as e:
+            session.rollback()
+            self.stats["failures"] += 1
+            logger.error(f"Audit retention purge failed: {e}")
+        finally:
+            session.close()
+        return result
+
+    async def _maintenance_loop(self, interval: float):
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.error(f"Audit maintenance pass failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def start(self, interval: float = None):
+        """Run a pass now and then every ``interval`` seconds in the background"""
+        if self._task is not None:
+            return
+        interval = interval or settings.AUDIT_MAINTENANCE_INTERVAL_SECONDS
+        self._task = asyncio.get_running_loop().create_task(self._maintenance_loop(interval))
+        logger.info(f"Audit partition and retention maintenance every {interval:.0f}s")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {"running": self._task is not None, "stats": dict(self.stats)}
+
+
+audit_maintenance = AuditMaintenance()
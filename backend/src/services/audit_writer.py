@@ -0,0 +1,341 @@
+"""
+Asynchronous, batched audit log writer
+
+Audit rows are appended to an in-memory ring buffer and written in bulk by a
+background task once the buffer reaches the flush batch size or the flush
+interval elapses. Rows that cannot be written (database unavailable, process
+shutting down) are spilled to disk as JSON lines and replayed on next start.
+Compliance-critical actions bypass the buffer and are written synchronously in
+the caller's transaction (see ``AuditWriter.requires_sync``).
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from src.models.audit import AuditLog, AuditAction, AuditResourceType
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_UUID_COLUMNS = ("id", "resource_id", "user_id", "company_id")
+# Rows waiting on a session's commit; module-qualified so copies of this module
+# imported under another name keep their own
+_AFTER_COMMIT_KEY = f"{__name__}.audit_rows"
+
+
+class AuditWriter:
+    """Buffers audit rows and flushes them with multi-row inserts"""
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None,
+                 buffer_size: int = None, batch_size: int = None,
+                 flush_interval: float = None, spill_dir: str = None,
+                 sync_actions: List[str] = None):
+        self._session_factory = session_factory
+        self.buffer_size = buffer_size or settings.AUDIT_BUFFER_SIZE
+        self.batch_size = batch_size or settings.AUDIT_FLUSH_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.AUDIT_FLUSH_INTERVAL_SECONDS
+        self.spill_dir = Path(spill_dir or settings.AUDIT_SPILL_DIR)
+        self.sync_actions = set(sync_actions if sync_actions is not None else settings.AUDIT_SYNC_ACTIONS)
+
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._overflow_flush: Optional[asyncio.Future] = None
+        self._running = False
+
+        self.stats = {
+            "enqueued": 0,
+            "flushed": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "inline_flushes": 0,
+            "overflow_flushes": 0,
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def requires_sync(self, action: AuditAction) -> bool:
+        """Whether an action must be written synchronously in the request transaction"""
+        return action.value in self.sync_actions
+
+    @staticmethod
+    def build_row(action: AuditAction, resource_type: AuditResourceType,
+                  resource_id: Any, company_id: Any, user_id: Any = None,
+                  **fields: Any) -> Dict[str, Any]:
+        """Build a complete audit row; timestamps are taken at event time, not flush time"""
+        row = {
+            "id": uuid.uuid4(),
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": _as_uuid(resource_id),
+            "user_id": _as_uuid(user_id) if user_id else None,
+            "company_id": _as_uuid(company_id),
+            "timestamp": datetime.now(UTC),
+            "session_id": None,
+            "ip_address": None,
+            "user_agent": None,
+            "request_method": None,
+            "request_path": None,
+            "request_id": None,
+            "details": {},
+            "old_values": None,
+            "new_values": None,
+            "risk_level": None,
+            "compliance_tags": [],
+            "data_classification": None,
+        }
+        row.update({key: value for key, value in fields.items() if value is not None})
+        return row
+
+    def enqueue(self, row: Dict[str, Any]) -> bool:
+        """Queue a row for the next bulk flush.
+
+        Returns False when the writer is not running, in which case the caller
+        is expected to write the row itself.
+        """
+        if not self._running:
+            return False
+
+        with self._lock:
+            self._buffer.append(row)
+            pending = len(self._buffer)
+            self.stats["enqueued"] += 1
+
+        if pending >= self.buffer_size:
+            self._flush_full_buffer()
+        elif pending >= self.batch_size:
+            self._wake()
+        return True
+
+    def enqueue_after_commit(self, session: Session, rows: List[Dict[str, Any]]) -> bool:
+        """Queue rows once ``session`` commits; a rollback discards them.
+
+        Keeps buffered audit entries for writes that never landed out of the
+        log. Returns False when the writer is not running, in which case the
+        caller should add the rows to its own transaction.
+        """
+        if not self._running:
+            return False
+        session.info.setdefault(_AFTER_COMMIT_KEY, []).append((self, rows))
+        return True
+
+    def _enqueue_committed(self, rows: List[Dict[str, Any]]):
+        # The writer stopped between the caller's write and its commit: keep the rows on disk for replay
+        leftover = [row for row in rows if not self.enqueue(row)]
+        if leftover:
+            self._spill(leftover)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _flush_full_buffer(self):
+        """Drain a full buffer without doing database I/O on the event loop
+
+        Async callers hand the flush to the default executor (one at a time);
+        threads off the loop flush inline, which applies backpressure to that
+        thread instead of dropping audit rows.
+        """
+        if self._loop is not None and self._on_loop():
+            if self._overflow_flush is None or self._overflow_flush.done():
+                self.stats["overflow_flushes"] += 1
+                self._overflow_flush = self._loop.run_in_executor(None, self.flush)
+        else:
+            self.stats["inline_flushes"] += 1
+            self.flush()
+
+    def _wake(self):
+        if self._loop is None or self._wakeup is None:
+            return
+        if self._on_loop():
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            count = min(limit, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def flush(self) -> int:
+        """Write all buffered rows; rows from failed batches are spilled to disk"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                rows = self._drain(self.batch_size)
+                if not rows:
+                    break
+                try:
+                    self._write_rows(rows)
+                    written += len(rows)
+                except Exception as e:
+                    self.stats["flush_errors"] += 1
+                    logger.error(f"Audit flush of {len(rows)} rows failed, spilling to disk: {e}")
+                    self._spill(rows)
+        return written
+
+    def _write_rows(self, rows: List[Dict[str, Any]]):
+        # executemany over a Core insert is rendered as batched multi-row
+        # INSERT ... VALUES statements by SQLAlchemy 2.0 ("insertmanyvalues")
+        session = self._new_session()
+        try:
+            session.execute(insert(AuditLog.__table__), rows)
+            session.commit()
+            self.stats["flushed"] += len(rows)
+            self.stats["flushes"] += 1
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _new_session(self) -> Session:
+        if self._session_factory is None:
+            from src.core.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def _spill(self, rows: List[Dict[str, Any]]):
+        """Append rows to a spill file and fsync it"""
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            spill_path = self.spill_dir / f"audit-{os.getpid()}-{int(time.time() * 1000)}.jsonl"
+            with open(spill_path, "a", encoding="utf-8") as spill_file:
+                for row in rows:
+                    spill_file.write(json.dumps(row, default=_json_default) + "\n")
+                spill_file.flush()
+                os.fsync(spill_file.fileno())
+            self.stats["spilled"] += len(rows)
+            logger.warning(f"Spilled {len(rows)} audit rows to {spill_path}")
+        except Exception as e:
+            logger.critical(f"Failed to spill {len(rows)} audit rows to disk: {e}")
+
+    def replay_spilled(self) -> int:
+        """Write rows from spill files left by a previous run, deleting each file once stored"""
+        if not self.spill_dir.exists():
+            return 0
+
+        replayed = 0
+        for spill_path in sorted(self.spill_dir.glob("audit-*.jsonl")):
+            try:
+                with open(spill_path, encoding="utf-8") as spill_file:
+                    rows = [_row_from_json(json.loads(line)) for line in spill_file if line.strip()]
+                for start in range(0, len(rows), self.batch_size):
+                    self._write_rows(rows[start:start + self.batch_size])
+                spill_path.unlink()
+                replayed += len(rows)
+            except Exception as e:
+                logger.error(f"Failed to replay audit spill file {spill_path}: {e}")
+                break
+
+        if replayed:
+            self.stats["replayed"] += replayed
+            logger.info(f"Replayed {replayed} spilled audit rows")
+        return replayed
+
+    async def start(self):
+        """Replay spilled rows and start the background flush task"""
+        if self._running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await self._loop.run_in_executor(None, self.replay_spilled)
+        self._running = True
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info("Audit writer started")
+
+    async def stop(self):
+        """Stop the flush task and write (or spill) everything still buffered"""
+        if not self._running:
+            return
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._overflow_flush is not None:
+            await self._overflow_flush
+            self._overflow_flush = None
+        await self._loop.run_in_executor(None, self.flush)
+        logger.info("Audit writer stopped")
+
+    async def _flush_loop(self):
+        while self._running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self.pending():
+                await self._loop.run_in_executor(None, self.flush)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "pending": self.pending(), "running": self._running}
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed_rows(session: Session):
+    for writer, rows in session.info.pop(_AFTER_COMMIT_KEY, ()):
+        writer._enqueue_committed(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_uncommitted_rows(session: Session):
+    session.info.pop(_AFTER_COMMIT_KEY, None)
+
+
+def _as_uuid(value: Any) -> Any:
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return value
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _row_from_json(data: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(data)
+    for column in _UUID_COLUMNS:
+        if row.get(column):
+            row[column] = _as_uuid(row[column])
+    row["action"] = AuditAction(row["action"])
+    row["resource_type"] = AuditResourceType(row["resource_type"])
+    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+
+# Global audit writer instance
+audit_writer = AuditWriter()
@@ -3,7 +3,6 @@ Azure AD / Office 365 Authentication Service
 Enterprise SSO integration with Microsoft ecosystem
 """
 import logging
-import msal
 import requests
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
@@ -11,10 +10,13 @@ import uuid
 from sqlalchemy.orm import Session
 
 from core.config import settings
+from core.lazy import LazyService, lazy_import
 from src.models.user import User, UserRole, UserStatus
 from src.models.company import Company, CompanyStatus
 from core.auth import auth_manager
 
+msal = lazy_import("msal")
+
 logger = logging.getLogger(__name__)
 
 class AzureADService:
@@ -544,8 +546,8 @@ class SAMLService:
         
         return user
 
-# Global service instances
-azure_ad_service = AzureADService()
+# Global service instances; the MSAL client is built on first use
+azure_ad_service = LazyService(AzureADService)
 office365_service = Office365Service()
 active_directory_service = ActiveDirectoryService()
 saml_service = SAMLService()
@@ -4,14 +4,16 @@ Billing Service with Stripe integration for subscription management
 import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
-import stripe
 from sqlalchemy.orm import Session
 
 from core.config import settings
+from core.lazy import lazy_import
 from src.models.company import Company, CompanyStatus, CompanyTier
 from src.models.user import User
 from src.models.audit import AuditLog, AuditAction, AuditResourceType
 
+stripe = lazy_import("stripe")
+
 logger = logging.getLogger(__name__)
 
 class StripeService:
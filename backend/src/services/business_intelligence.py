@@ -4,23 +4,24 @@ World-class analytics, reporting, and predictive insights for the AI ERP SaaS pl
 """
 import logging
 import asyncio
-import pandas as pd
-import numpy as np
 from typing import Dict, Any, List, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, UTC
 from dataclasses import dataclass, asdict
 from enum import Enum
 import json
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, desc, asc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, or_, desc, asc, select
 
 from src.models.invoice import Invoice, InvoiceStatus, InvoiceType
 from src.models.company import Company
 from src.models.user import User
 from src.models.audit import AuditLog
 from core.config import settings
+from core.lazy import LazyService, lazy_import
 from services.advanced_ml_models import advanced_ml_service
 
+np = lazy_import("numpy")
+
 logger = logging.getLogger(__name__)
 
 class MetricType(Enum):
@@ -68,19 +69,20 @@ class AdvancedAnalyticsService:
         self.insight_engine = InsightEngine()
         self.forecasting_engine = ForecastingEngine()
         
-    async def get_executive_dashboard(self, company_id: str, db: Session, period_days: int = 30) -> Dict[str, Any]:
+    async def get_executive_dashboard(self, company_id: str, db: AsyncSession, period_days: int = 30) -> Dict[str, Any]:
         """Get comprehensive executive dashboard data"""
         try:
             end_date = datetime.now(UTC)
             start_date = end_date - timedelta(days=period_days)
             
-            # Get all KPIs in parallel
-            kpis = await asyncio.gather(
-                self._calculate_financial_kpis(company_id, start_date, end_date, db),
-                self._calculate_operational_kpis(company_id, start_date, end_date, db),
-                self._calculate_compliance_kpis(company_id, start_date, end_date, db),
-                self._calculate_performance_kpis(company_id, start_date, end_date, db)
-            )
+            # An AsyncSession runs one statement at a time, so the KPI groups are
+            # awaited in turn; the event loop serves other requests meanwhile
+            kpis = [
+                await self._calculate_financial_kpis(company_id, start_date, end_date, db),
+                await self._calculate_operational_kpis(company_id, start_date, end_date, db),
+                await self._calculate_compliance_kpis(company_id, start_date, end_date, db),
+                await self._calculate_performance_kpis(company_id, start_date, end_date, db)
+            ]
             
             # Flatten KPIs
             all_kpis = []
@@ -119,29 +121,29 @@ class AdvancedAnalyticsService:
             logger.error(f"Failed to generate executive dashboard: {e}")
             return {"error": str(e)}
     
-    async def _calculate_financial_kpis(self, company_id: str, start_date: datetime, end_date: datetime, db: Session) -> List[KPI]:
+    async def _calculate_financial_kpis(self, company_id: str, start_date: datetime, end_date: datetime, db: AsyncSession) -> List[KPI]:
         """Calculate financial KPIs"""
         kpis = []
         
         try:
             # Total invoice volume
-            total_volume = db.query(func.sum(Invoice.total_amount)).filter(
+            total_volume = await db.scalar(select(func.sum(Invoice.total_amount)).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date
                 )
-            ).scalar() or 0
+            )) or 0
             
             # Previous period comparison
             prev_start = start_date - (end_date - start_date)
-            prev_volume = db.query(func.sum(Invoice.total_amount)).filter(
+            prev_volume = await db.scalar(select(func.sum(Invoice.total_amount)).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= prev_start,
                     Invoice.created_at < start_date
                 )
-            ).scalar() or 0
+            )) or 0
             
             volume_change = ((total_volume - prev_volume) / prev_volume * 100) if prev_volume > 0 else 0
             
@@ -155,13 +157,13 @@ class AdvancedAnalyticsService:
             ))
             
             # Average invoice amount
-            avg_amount = db.query(func.avg(Invoice.total_amount)).filter(
+            avg_amount = await db.scalar(select(func.avg(Invoice.total_amount)).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date
                 )
-            ).scalar() or 0
+            )) or 0
             
             kpis.append(KPI(
                 name="Average Invoice Amount",
@@ -171,14 +173,14 @@ class AdvancedAnalyticsService:
             ))
             
             # Payment cycle efficiency
-            approved_invoices = db.query(Invoice).filter(
+            approved_invoices = (await db.scalars(select(Invoice).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.status == InvoiceStatus.APPROVED,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date
                 )
-            ).all()
+            ))).all()
             
             if approved_invoices:
                 avg_processing_time = np.mean([
@@ -196,7 +198,7 @@ class AdvancedAnalyticsService:
                 ))
             
             # Cost savings from automation
-            auto_approved_count = db.query(func.count(Invoice.id)).filter(
+            auto_approved_count = await db.scalar(select(func.count(Invoice.id)).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.status == InvoiceStatus.APPROVED,
@@ -204,15 +206,15 @@ class AdvancedAnalyticsService:
                     Invoice.created_at <= end_date,
                     Invoice.auto_approved == True
                 )
-            ).scalar() or 0
+            )) or 0
             
-            total_invoices = db.query(func.count(Invoice.id)).filter(
+            total_invoices = await db.scalar(select(func.count(Invoice.id)).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date
                 )
-            ).scalar() or 0
+            )) or 0
             
             automation_rate = (auto_approved_count / total_invoices * 100) if total_invoices > 0 else 0
             
@@ -230,19 +232,19 @@ class AdvancedAnalyticsService:
         
         return kpis
     
-    async def _calculate_operational_kpis(self, company_id: str, start_date: datetime, end_date: datetime, db: Session) -> List[KPI]:
+    async def _calculate_operational_kpis(self, company_id: str, start_date: datetime, end_date: datetime, db: AsyncSession) -> List[KPI]:
         """Calculate operational KPIs"""
         kpis = []
         
         try:
             # Invoice processing volume
-            total_processed = db.query(func.count(Invoice.id)).filter(
+            total_processed = await db.scalar(select(func.count(Invoice.id)).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date
                 )
-            ).scalar() or 0
+            )) or 0
             
             kpis.append(KPI(
                 name="Invoices Processed",
@@ -252,14 +254,14 @@ class AdvancedAnalyticsService:
             ))
             
             # Processing accuracy (based on OCR confidence)
-            invoices_with_confidence = db.query(Invoice).filter(
+            invoices_with_confidence = (await db.scalars(select(Invoice).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date,
                     Invoice.ocr_confidence.isnot(None)
                 )
-            ).all()
+            ))).all()
             
             if invoices_with_confidence:
                 avg_confidence = np.mean([inv.ocr_confidence for inv in invoices_with_confidence])
@@ -273,14 +275,14 @@ class AdvancedAnalyticsService:
                 ))
             
             # Approval rate
-            approved_count = db.query(func.count(Invoice.id)).filter(
+            approved_count = await db.scalar(select(func.count(Invoice.id)).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.status == InvoiceStatus.APPROVED,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date
                 )
-            ).scalar() or 0
+            )) or 0
             
             approval_rate = (approved_count / total_processed * 100) if total_processed > 0 else 0
             
@@ -294,13 +296,13 @@ class AdvancedAnalyticsService:
             ))
             
             # Supplier diversity
-            unique_suppliers = db.query(func.count(func.distinct(Invoice.supplier_name))).filter(
+            unique_suppliers = await db.scalar(select(func.count(func.distinct(Invoice.supplier_name))).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date
                 )
-            ).scalar() or 0
+            )) or 0
             
             kpis.append(KPI(
                 name="Active Suppliers",
@@ -314,28 +316,28 @@ class AdvancedAnalyticsService:
         
         return kpis
     
-    async def _calculate_compliance_kpis(self, company_id: str, start_date: datetime, end_date: datetime, db: Session) -> List[KPI]:
+    async def _calculate_compliance_kpis(self, company_id: str, start_date: datetime, end_date: datetime, db: AsyncSession) -> List[KPI]:
         """Calculate compliance KPIs"""
         kpis = []
         
         try:
             # Fraud detection rate
-            high_risk_invoices = db.query(func.count(Invoice.id)).filter(
+            high_risk_invoices = await db.scalar(select(func.count(Invoice.id)).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date,
                     Invoice.fraud_score > 0.7
                 )
-            ).scalar() or 0
+            )) or 0
             
-            total_invoices = db.query(func.count(Invoice.id)).filter(
+            total_invoices = await db.scalar(select(func.count(Invoice.id)).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date
                 )
-            ).scalar() or 0
+            )) or 0
             
             fraud_detection_rate = (high_risk_invoices / total_invoices * 100) if total_invoices > 0 else 0
             
@@ -347,15 +349,15 @@ class AdvancedAnalyticsService:
             ))
             
             # Audit trail completeness
-            invoices_with_audit = db.query(func.count(func.distinct(Invoice.id))).join(
+            invoices_with_audit = await db.scalar(select(func.count(func.distinct(Invoice.id))).join(
                 AuditLog, AuditLog.resource_id == Invoice.id
-            ).filter(
+            ).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date
                 )
-            ).scalar() or 0
+            )) or 0
             
             audit_completeness = (invoices_with_audit / total_invoices * 100) if total_invoices > 0 else 0
             
@@ -368,14 +370,14 @@ class AdvancedAnalyticsService:
             ))
             
             # Policy compliance rate
-            compliant_invoices = db.query(func.count(Invoice.id)).filter(
+            compliant_invoices = await db.scalar(select(func.count(Invoice.id)).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date,
                     Invoice.status != InvoiceStatus.REJECTED
                 )
-            ).scalar() or 0
+            )) or 0
             
             compliance_rate = (compliant_invoices / total_invoices * 100) if total_invoices > 0 else 0
             
@@ -392,7 +394,7 @@ class AdvancedAnalyticsService:
         
         return kpis
     
-    async def _calculate_performance_kpis(self, company_id: str, start_date: datetime, end_date: datetime, db: Session) -> List[KPI]:
+    async def _calculate_performance_kpis(self, company_id: str, start_date: datetime, end_date: datetime, db: AsyncSession) -> List[KPI]:
         """Calculate performance KPIs"""
         kpis = []
         
@@ -435,7 +437,7 @@ class AdvancedAnalyticsService:
         
         return kpis
     
-    async def _get_predictive_insights(self, company_id: str, db: Session) -> Dict[str, Any]:
+    async def _get_predictive_insights(self, company_id: str, db: AsyncSession) -> Dict[str, Any]:
         """Get predictive insights using ML models"""
         try:
             # Get cash flow prediction
@@ -443,12 +445,12 @@ class AdvancedAnalyticsService:
             cash_flow_prediction = await advanced_ml_service.predict_cash_flow(company_data)
             
             # Get approval likelihood for pending invoices
-            pending_invoices = db.query(Invoice).filter(
+            pending_invoices = (await db.scalars(select(Invoice).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.status == InvoiceStatus.PENDING
                 )
-            ).limit(10).all()
+            ).limit(10))).all()
             
             approval_predictions = []
             for invoice in pending_invoices:
@@ -482,21 +484,21 @@ class AdvancedAnalyticsService:
             logger.error(f"Failed to get predictive insights: {e}")
             return {"error": str(e)}
     
-    async def _analyze_trends(self, company_id: str, start_date: datetime, end_date: datetime, db: Session) -> Dict[str, Any]:
+    async def _analyze_trends(self, company_id: str, start_date: datetime, end_date: datetime, db: AsyncSession) -> Dict[str, Any]:
         """Analyze trends in invoice processing"""
         try:
             # Daily invoice volume trend
-            daily_volumes = db.query(
+            daily_volumes = (await db.execute(select(
                 func.date(Invoice.created_at).label('date'),
                 func.count(Invoice.id).label('count'),
                 func.sum(Invoice.total_amount).label('volume')
-            ).filter(
+            ).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= start_date,
                     Invoice.created_at <= end_date
                 )
-            ).group_by(func.date(Invoice.created_at)).order_by('date').all()
+            ).group_by(func.date(Invoice.created_at)).order_by('date'))).all()
             
             trend_data = []
             for row in daily_volumes:
@@ -527,37 +529,37 @@ class AdvancedAnalyticsService:
             logger.error(f"Failed to analyze trends: {e}")
             return {"error": str(e)}
     
-    async def _assess_risks(self, company_id: str, db: Session) -> Dict[str, Any]:
+    async def _assess_risks(self, company_id: str, db: AsyncSession) -> Dict[str, Any]:
         """Assess business risks"""
         try:
             # High-value invoice risk
-            high_value_invoices = db.query(func.count(Invoice.id)).filter(
+            high_value_invoices = await db.scalar(select(func.count(Invoice.id)).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.total_amount > 10000,
                     Invoice.status == InvoiceStatus.PENDING
                 )
-            ).scalar() or 0
+            )) or 0
             
             # Supplier concentration risk
-            supplier_volumes = db.query(
+            supplier_volumes = (await db.execute(select(
                 Invoice.supplier_name,
                 func.sum(Invoice.total_amount).label('volume')
-            ).filter(
+            ).where(
                 Invoice.company_id == company_id
-            ).group_by(Invoice.supplier_name).order_by(desc('volume')).limit(5).all()
+            ).group_by(Invoice.supplier_name).order_by(desc('volume')).limit(5))).all()
             
             total_volume = sum(row.volume for row in supplier_volumes)
             top_supplier_concentration = (supplier_volumes[0].volume / total_volume * 100) if supplier_volumes and total_volume > 0 else 0
             
             # Processing backlog risk
-            pending_count = db.query(func.count(Invoice.id)).filter(
+            pending_count = await db.scalar(select(func.count(Invoice.id)).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.status == InvoiceStatus.PENDING,
                     Invoice.created_at < datetime.now(UTC) - timedelta(days=7)
                 )
-            ).scalar() or 0
+            )) or 0
             
             risk_level = "LOW"
             if high_value_invoices > 10 or top_supplier_concentration > 60 or pending_count > 20:
@@ -594,16 +596,16 @@ class AdvancedAnalyticsService:
         
         return risks
     
-    async def _get_company_data_for_prediction(self, company_id: str, db: Session) -> Dict[str, Any]:
+    async def _get_company_data_for_prediction(self, company_id: str, db: AsyncSession) -> Dict[str, Any]:
         """Get company data for ML predictions"""
         try:
             # Get historical cash flow data
-            invoices = db.query(Invoice).filter(
+            invoices = (await db.scalars(select(Invoice).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= datetime.now(UTC) - timedelta(days=90)
                 )
-            ).all()
+            ))).all()
             
             total_volume = sum(inv.total_amount for inv in invoices)
             pending_amount = sum(inv.total_amount for inv in invoices if inv.status == InvoiceStatus.PENDING)
@@ -710,18 +712,18 @@ class AdvancedAnalyticsService:
 class InsightEngine:
     """AI-powered insight generation engine"""
     
-    async def generate_insights(self, company_id: str, db: Session) -> List[Insight]:
+    async def generate_insights(self, company_id: str, db: AsyncSession) -> List[Insight]:
         """Generate AI-powered business insights"""
         insights = []
         
         try:
             # Get recent invoice data for analysis
-            recent_invoices = db.query(Invoice).filter(
+            recent_invoices = (await db.scalars(select(Invoice).where(
                 and_(
                     Invoice.company_id == company_id,
                     Invoice.created_at >= datetime.now(UTC) - timedelta(days=30)
                 )
-            ).all()
+            ))).all()
             
             if not recent_invoices:
                 return insights
@@ -933,4 +935,4 @@ class ForecastingEngine:
         return await advanced_ml_service.predict_cash_flow(company_data, days_ahead)
 
 # Global instance
-advanced_analytics_service = AdvancedAnalyticsService()
+advanced_analytics_service = LazyService(AdvancedAnalyticsService)
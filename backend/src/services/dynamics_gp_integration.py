@@ -17,8 +17,9 @@ Enterprise Features:
 
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional, Tuple, Union
-from datetime import datetime, timedelta
+from functools import partial
+from typing import Dict, Any, List, Optional, Tuple, Union, Callable
+from datetime import datetime, timedelta, UTC
 from decimal import Decimal, ROUND_HALF_UP
 from dataclasses import dataclass, asdict
 from enum import Enum
@@ -27,7 +28,6 @@ import json
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 import httpx
-import pyodbc
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
@@ -35,11 +35,38 @@ from src.models.invoice import Invoice
 from src.models.purchase_order import PurchaseOrder
 from src.models.receipt import Receipt
 from core.config import settings
+from core.lazy import LazyService, lazy_import
 from services.audit import AuditService
 from services.enhanced_three_way_match import EnhancedThreeWayMatchService, MatchStatus, VarianceDetail
+from services.gp_connection_pool import GPConnectionPool, GPDatabaseExecutor, is_disconnect_error
+from services.gp_document_numbers import GPDocumentNumberAllocator
+from services.gp_econnect import (
+    DISTRIBUTION_PAYABLES, DISTRIBUTION_PURCHASES, DISTRIBUTION_TAX, EConnectBatchPoster, EConnectDistribution,
+    EConnectDocument, EConnectServiceTransport, build_econnect_xml
+)
+from services.vendor_resolution import VendorMatch, vendor_resolver
+
+# The ODBC driver is optional; it is only needed once a GP database is queried
+pyodbc = lazy_import("pyodbc")
 
 logger = logging.getLogger(__name__)
 
+PO_STATUS_DESCRIPTIONS = {
+    1: "New",
+    2: "Released",
+    3: "Change Order",
+    4: "Received",
+    5: "Closed",
+    6: "Canceled"
+}
+
+RECEIPT_TYPE_DESCRIPTIONS = {
+    1: "Shipment",
+    2: "Invoice",
+    3: "Shipment/Invoice",
+    4: "Return"
+}
+
 class GPModule(Enum):
     """Dynamics GP modules"""
     PAYABLES_MANAGEMENT = "PM"
@@ -139,8 +166,17 @@ class GPMatchResult:
 class DynamicsGPIntegration:
     """World-class Dynamics GP integration service"""
     
-    def __init__(self):
-        self.connection_pools = {}  # Connection pooling per company DB
+    def __init__(self, connector: Optional[Callable[[str], Any]] = None, master_data=None, econnect_transport=None,
+                 vendor_resolver=None):
+        # Opens a DB-API connection from an ODBC connection string; pyodbc unless
+        # replaced (e.g. by services.gp_mock_backend in tests)
+        self._connector = connector or self._odbc_connect
+        # Local mirror of vendors, POs and receipts (services.gp_mirror); when
+        # attached and synced, matching lookups are answered without querying GP
+        self.master_data = master_data
+        # Shared supplier -> vendor mappings (services.vendor_resolution); when
+        # attached, a supplier is looked up in GP once per company database
+        self.vendor_resolver = vendor_resolver
         self.web_service_client = None
         self.econnect_client = None
         self.three_way_matcher = EnhancedThreeWayMatchService()
@@ -155,9 +191,37 @@ class DynamicsGPIntegration:
             "domain": settings.DYNAMICS_GP_CONFIG.get("domain"),
             "timeout": settings.DYNAMICS_GP_CONFIG.get("timeout", 30),
             "retry_attempts": 3,
-            "connection_pool_size": 5
+            "connection_pool_size": settings.DYNAMICS_GP_CONFIG.get("connection_pool_size", 5),
+            "pool_timeout": settings.DYNAMICS_GP_CONFIG.get("pool_timeout", 30),
+            "pool_recycle_seconds": settings.DYNAMICS_GP_CONFIG.get("pool_recycle_seconds", 1800),
+            "pool_ping_after_seconds": settings.DYNAMICS_GP_CONFIG.get("pool_ping_after_seconds", 30),
+            "odbc_threads": settings.DYNAMICS_GP_CONFIG.get("odbc_threads", 16),
+            "document_number_block_size": settings.DYNAMICS_GP_CONFIG.get("document_number_block_size", 100),
+            "econnect_batch_size": settings.DYNAMICS_GP_CONFIG.get("econnect_batch_size", 50),
+            "econnect_batch_prefix": settings.DYNAMICS_GP_CONFIG.get("econnect_batch_prefix", "AIAP")
         }
         
+        # Pooled connections per company DB; every ODBC call runs on the executor's threads
+        self.gp_executor = GPDatabaseExecutor(max_workers=self.gp_config["odbc_threads"])
+        self.connection_pools = self.gp_executor.pools
+        self._system_pool = None
+        # Document numbers are reserved from SY00500 in blocks, not one row lock per posting
+        self.document_numbers = GPDocumentNumberAllocator(
+            self.gp_executor, block_size=self.gp_config["document_number_block_size"]
+        )
+        
+        # eConnect posting in multi-document batches; the Integration Service unless replaced
+        # (e.g. by services.gp_mock_backend in tests)
+        if econnect_transport is None and self.gp_config["econnect_server"]:
+            econnect_transport = EConnectServiceTransport(
+                self.gp_config["econnect_server"], timeout=max(self.gp_config["timeout"], 120)
+            )
+        self.econnect = EConnectBatchPoster(
+            econnect_transport,
+            batch_size=self.gp_config["econnect_batch_size"],
+            max_attempts=self.gp_config["retry_attempts"]
+        ) if econnect_transport is not None else None
+        
         # Tolerance settings for matching
         self.gp_tolerances = {
             "price_tolerance_percentage": 2.0,
@@ -205,57 +269,53 @@ class DynamicsGPIntegration:
         """Get all available GP company databases"""
         
         # Connect to DYNAMICS system database
-        connection_string = (
-            f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-            f"SERVER={self.gp_config['server']};"
-            f"DATABASE=DYNAMICS;"
-            f"Trusted_Connection=yes;"
-        )
+        if self._system_pool is None:
+            self._system_pool = self._build_pool("DYNAMICS", self.gp_config["server"], "DYNAMICS", max_size=1)
         
         try:
-            conn = pyodbc.connect(connection_string, timeout=self.gp_config["timeout"])
-            cursor = conn.cursor()
-            
-            # Query company information from DYNAMICS database
-            query = """
-            SELECT 
-                CMPANYID,
-                CMPNYNAM,
-                DB_Name,
-                SERVER,
-                ACTIVE,
-                CURNCYID,
-                MCACTIVE
-            FROM SY01500 
-            WHERE ACTIVE = 1
-            ORDER BY CMPNYNAM
-            """
-            
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            
-            companies = []
-            for row in rows:
-                company = GPCompanyDatabase(
-                    company_id=row.CMPANYID.strip(),
-                    company_name=row.CMPNYNAM.strip(),
-                    database_name=row.DB_Name.strip(),
-                    server_name=row.SERVER.strip(),
-                    is_active=bool(row.ACTIVE),
-                    fiscal_year=datetime.now().year,  # Would query from fiscal calendar
-                    base_currency=row.CURNCYID.strip(),
-                    functional_currency=row.CURNCYID.strip(),
-                    reporting_currency=row.CURNCYID.strip(),
-                    multi_currency_enabled=bool(row.MCACTIVE)
-                )
-                companies.append(company)
-                
-            conn.close()
-            return companies
-            
+            return await self.gp_executor.run_on(self._system_pool, self._query_company_databases)
         except Exception as e:
             logger.error(f"Failed to get GP company databases: {e}")
             raise
+    
+    def _query_company_databases(self, conn) -> List[GPCompanyDatabase]:
+        cursor = conn.cursor()
+        
+        # Query company information from DYNAMICS database
+        query = """
+        SELECT 
+            CMPANYID,
+            CMPNYNAM,
+            DB_Name,
+            SERVER,
+            ACTIVE,
+            CURNCYID,
+            MCACTIVE
+        FROM SY01500 
+        WHERE ACTIVE = 1
+        ORDER BY CMPNYNAM
+        """
+        
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        
+        companies = []
+        for row in rows:
+            company = GPCompanyDatabase(
+                company_id=row.CMPANYID.strip(),
+                company_name=row.CMPNYNAM.strip(),
+                database_name=row.DB_Name.strip(),
+                server_name=row.SERVER.strip(),
+                is_active=bool(row.ACTIVE),
+                fiscal_year=datetime.now().year,  # Would query from fiscal calendar
+                base_currency=row.CURNCYID.strip(),
+                functional_currency=row.CURNCYID.strip(),
+                reporting_currency=row.CURNCYID.strip(),
+                multi_currency_enabled=bool(row.MCACTIVE)
+            )
+            companies.append(company)
+            
+        return companies
             
     async def process_invoice_without_po(
         self,
@@ -494,102 +554,174 @@ class DynamicsGPIntegration:
     ) -> Optional[GPPurchaseOrder]:
         """Find matching purchase order in GP Purchase Order Processing module"""
         
-        conn = await self._get_connection(company_db)
+        if await self._master_data_ready(company_db):
+            try:
+                po_data = await self.master_data.find_purchase_order(invoice_data, company_db, po_number)
+                # A PO entered since the last sync is still found by number (a key lookup in GP)
+                if po_data is not None or not po_number:
+                    return po_data
+            except Exception as e:
+                logger.warning(f"GP mirror PO lookup failed, querying GP: {e}")
         
         try:
-            cursor = conn.cursor()
+            return await self._run_gp(company_db, self._query_purchase_order, invoice_data, company_db, po_number)
+        except Exception as e:
+            logger.error(f"Error finding GP purchase order: {e}")
+            return None
+    
+    def _query_purchase_order(
+        self,
+        conn,
+        invoice_data: Dict[str, Any],
+        company_db: str,
+        po_number: Optional[str]
+    ) -> Optional[GPPurchaseOrder]:
+        cursor = conn.cursor()
+        
+        # Build PO search query
+        if po_number:
+            # Direct PO number search
+            po_query = """
+            SELECT 
+                h.PONUMBER,
+                h.VENDORID,
+                h.DOCDATE,
+                h.REQDATE,
+                h.SUBTOTAL,
+                h.CURNCYID,
+                h.POSTATUS,
+                h.POTYPE
+            FROM POP10100 h
+            WHERE h.PONUMBER = ? AND h.POSTATUS IN (1, 2, 3, 4)
+            """
+            cursor.execute(po_query, po_number)
+        else:
+            # Smart search by vendor and amount
+            vendor_name = invoice_data.get("vendor_name", "")
+            invoice_amount = float(invoice_data.get("total_amount", 0))
             
-            # Build PO search query
-            if po_number:
-                # Direct PO number search
-                po_query = """
-                SELECT 
-                    h.PONUMBER,
-                    h.VENDORID,
-                    h.DOCDATE,
-                    h.REQDATE,
-                    h.SUBTOTAL,
-                    h.CURNCYID,
-                    h.POSTATUS,
-                    h.POTYPE
-                FROM POP10100 h
-                WHERE h.PONUMBER = ? AND h.POSTATUS IN (1, 2, 3, 4)
-                """
-                cursor.execute(po_query, po_number)
-            else:
-                # Smart search by vendor and amount
-                vendor_name = invoice_data.get("vendor_name", "")
-                invoice_amount = float(invoice_data.get("total_amount", 0))
-                
-                # First, find vendor ID
-                vendor_query = """
-                SELECT VENDORID FROM PM00200 
-                WHERE VENDNAME LIKE ? OR VENDORID LIKE ?
-                """
-                vendor_pattern = f"%{vendor_name}%"
-                cursor.execute(vendor_query, vendor_pattern, vendor_pattern)
-                vendor_row = cursor.fetchone()
-                
-                if not vendor_row:
-                    return None
-                    
-                vendor_id = vendor_row.VENDORID.strip()
-                
-                # Search for PO by vendor and amount range
-                po_query = """
-                SELECT TOP 5
-                    h.PONUMBER,
-                    h.VENDORID,
-                    h.DOCDATE,
-                    h.REQDATE,
-                    h.SUBTOTAL,
-                    h.CURNCYID,
-                    h.POSTATUS,
-                    h.POTYPE
-                FROM POP10100 h
-                WHERE h.VENDORID = ? 
-                    AND h.POSTATUS IN (1, 2, 3, 4)
-                    AND h.SUBTOTAL BETWEEN ? AND ?
-                ORDER BY ABS(h.SUBTOTAL - ?) ASC
-                """
-                
-                amount_tolerance = invoice_amount * 0.2  # 20% tolerance
-                min_amount = invoice_amount - amount_tolerance
-                max_amount = invoice_amount + amount_tolerance
-                
-                cursor.execute(po_query, vendor_id, min_amount, max_amount, invoice_amount)
+            # First, find vendor ID
+            vendor_query = """
+            SELECT VENDORID FROM PM00200 
+            WHERE VENDNAME LIKE ? OR VENDORID LIKE ?
+            """
+            vendor_pattern = f"%{vendor_name}%"
+            cursor.execute(vendor_query, vendor_pattern, vendor_pattern)
+            vendor_row = cursor.fetchone()
             
-            po_row = cursor.fetchone()
-            if not po_row:
+            if not vendor_row:
                 return None
                 
-            # Get PO line items
-            line_items = await self._get_po_line_items(po_row.PONUMBER, cursor)
-            
-            # Get shipments for this PO
-            shipments = await self._get_po_shipments_summary(po_row.PONUMBER, cursor)
+            vendor_id = vendor_row.VENDORID.strip()
             
-            po_data = GPPurchaseOrder(
-                po_number=po_row.PONUMBER.strip(),
-                vendor_id=po_row.VENDORID.strip(),
-                po_date=po_row.DOCDATE,
-                required_date=po_row.REQDATE,
-                total_amount=Decimal(str(po_row.SUBTOTAL)),
-                currency_code=po_row.CURNCYID.strip(),
-                status=self._get_po_status_description(po_row.POSTATUS),
-                type_id=po_row.POTYPE,
-                company_db=company_db,
-                line_items=line_items,
-                shipments=shipments
-            )
+            # Search for PO by vendor and amount range
+            po_query = """
+            SELECT TOP 5
+                h.PONUMBER,
+                h.VENDORID,
+                h.DOCDATE,
+                h.REQDATE,
+                h.SUBTOTAL,
+                h.CURNCYID,
+                h.POSTATUS,
+                h.POTYPE
+            FROM POP10100 h
+            WHERE h.VENDORID = ? 
+                AND h.POSTATUS IN (1, 2, 3, 4)
+                AND h.SUBTOTAL BETWEEN ? AND ?
+            ORDER BY ABS(h.SUBTOTAL - ?) ASC
+            """
             
-            return po_data
+            amount_tolerance = invoice_amount * 0.2  # 20% tolerance
+            min_amount = invoice_amount - amount_tolerance
+            max_amount = invoice_amount + amount_tolerance
             
-        except Exception as e:
-            logger.error(f"Error finding GP purchase order: {e}")
+            cursor.execute(po_query, vendor_id, min_amount, max_amount, invoice_amount)
+        
+        po_row = cursor.fetchone()
+        if not po_row:
             return None
-        finally:
-            conn.close()
+            
+        # Get PO line items
+        line_items = self._get_po_line_items(po_row.PONUMBER, cursor)
+        
+        # Get shipments for this PO
+        shipments = self._get_po_shipments_summary(po_row.PONUMBER, cursor)
+        
+        po_data = GPPurchaseOrder(
+            po_number=po_row.PONUMBER.strip(),
+            vendor_id=po_row.VENDORID.strip(),
+            po_date=po_row.DOCDATE,
+            required_date=po_row.REQDATE,
+            total_amount=Decimal(str(po_row.SUBTOTAL)),
+            currency_code=po_row.CURNCYID.strip(),
+            status=self._get_po_status_description(po_row.POSTATUS),
+            type_id=po_row.POTYPE,
+            company_db=company_db,
+            line_items=line_items,
+            shipments=shipments
+        )
+        
+        return po_data
+    
+    def _get_po_line_items(self, po_number: str, cursor) -> List[Dict[str, Any]]:
+        """PO lines from POP10110"""
+        cursor.execute("""
+            SELECT ORD, ITEMNMBR, ITEMDESC, QTYORDER, UNITCOST, EXTDCOST, UOFM
+            FROM POP10110
+            WHERE PONUMBER = ?
+            ORDER BY ORD
+        """, po_number)
+        return [
+            {
+                "line_number": row.ORD,
+                "item_number": row.ITEMNMBR.strip(),
+                "description": row.ITEMDESC.strip(),
+                "quantity": Decimal(str(row.QTYORDER)),
+                "unit_price": Decimal(str(row.UNITCOST)),
+                "total": Decimal(str(row.EXTDCOST)),
+                "unit_of_measure": row.UOFM.strip()
+            }
+            for row in cursor.fetchall()
+        ]
+    
+    def _get_po_shipments_summary(self, po_number: str, cursor) -> List[Dict[str, Any]]:
+        """Receipt headers against a PO from POP10300"""
+        cursor.execute("""
+            SELECT POPRCTNM, RECEIPTDATE, SUBTOTAL, POPTYPE
+            FROM POP10300
+            WHERE PONUMBER = ?
+            ORDER BY RECEIPTDATE
+        """, po_number)
+        return [
+            {
+                "receipt_number": row.POPRCTNM.strip(),
+                "receipt_date": row.RECEIPTDATE,
+                "total_amount": Decimal(str(row.SUBTOTAL)),
+                "status": self._get_receipt_status_description(row.POPTYPE)
+            }
+            for row in cursor.fetchall()
+        ]
+    
+    def _get_shipment_line_items(self, receipt_number: str, cursor) -> List[Dict[str, Any]]:
+        """Receipt lines from POP10310"""
+        cursor.execute("""
+            SELECT RCPTLNNM, ITEMNMBR, ITEMDESC, QTYSHPPD, UNITCOST, EXTDCOST
+            FROM POP10310
+            WHERE POPRCTNM = ?
+            ORDER BY RCPTLNNM
+        """, receipt_number)
+        return [
+            {
+                "line_number": row.RCPTLNNM,
+                "item_number": row.ITEMNMBR.strip(),
+                "description": row.ITEMDESC.strip(),
+                "quantity": Decimal(str(row.QTYSHPPD)),
+                "unit_price": Decimal(str(row.UNITCOST)),
+                "total": Decimal(str(row.EXTDCOST))
+            }
+            for row in cursor.fetchall()
+        ]
             
     async def _find_gp_shipments_for_po(
         self,
@@ -599,59 +731,63 @@ class DynamicsGPIntegration:
     ) -> List[GPShipment]:
         """Find all shipments/receipts for a PO in GP"""
         
-        conn = await self._get_connection(company_db)
-        shipments = []
+        if await self._master_data_ready(company_db):
+            try:
+                return await self.master_data.find_shipments(po_number, company_db, include_all)
+            except Exception as e:
+                logger.warning(f"GP mirror receipt lookup failed, querying GP: {e}")
         
         try:
-            cursor = conn.cursor()
-            
-            # Query shipment/receipt headers
-            shipment_query = """
-            SELECT 
-                h.POPRCTNM,
-                h.PONUMBER,
-                h.RECEIPTDATE,
-                h.VENDORID,
-                h.SUBTOTAL,
-                h.CURNCYID,
-                h.POPTYPE
-            FROM POP10300 h
-            WHERE h.PONUMBER = ?
-                AND h.POPTYPE IN (1, 2, 3)  # Receipt types
-            ORDER BY h.RECEIPTDATE DESC
-            """
-            
-            cursor.execute(shipment_query, po_number)
-            shipment_rows = cursor.fetchall()
-            
-            for row in shipment_rows:
-                # Get line items for each shipment
-                line_items = await self._get_shipment_line_items(row.POPRCTNM, cursor)
-                
-                shipment = GPShipment(
-                    shipment_number=row.POPRCTNM.strip(),
-                    po_number=row.PONUMBER.strip(),
-                    receipt_date=row.RECEIPTDATE,
-                    vendor_id=row.VENDORID.strip(),
-                    total_amount=Decimal(str(row.SUBTOTAL)),
-                    currency_code=row.CURNCYID.strip(),
-                    status=self._get_receipt_status_description(row.POPTYPE),
-                    line_items=line_items
-                )
-                
-                shipments.append(shipment)
-                
-                # If not including all, just get the most recent
-                if not include_all:
-                    break
-                    
-            return shipments
-            
+            return await self._run_gp(company_db, self._query_shipments_for_po, po_number, include_all)
         except Exception as e:
             logger.error(f"Error finding GP shipments: {e}")
             return []
-        finally:
-            conn.close()
+    
+    def _query_shipments_for_po(self, conn, po_number: str, include_all: bool) -> List[GPShipment]:
+        cursor = conn.cursor()
+        shipments = []
+        
+        # Query shipment/receipt headers
+        shipment_query = """
+        SELECT 
+            h.POPRCTNM,
+            h.PONUMBER,
+            h.RECEIPTDATE,
+            h.VENDORID,
+            h.SUBTOTAL,
+            h.CURNCYID,
+            h.POPTYPE
+        FROM POP10300 h
+        WHERE h.PONUMBER = ?
+            AND h.POPTYPE IN (1, 2, 3)  -- Receipt types
+        ORDER BY h.RECEIPTDATE DESC
+        """
+        
+        cursor.execute(shipment_query, po_number)
+        shipment_rows = cursor.fetchall()
+        
+        for row in shipment_rows:
+            # Get line items for each shipment
+            line_items = self._get_shipment_line_items(row.POPRCTNM, cursor)
+            
+            shipment = GPShipment(
+                shipment_number=row.POPRCTNM.strip(),
+                po_number=row.PONUMBER.strip(),
+                receipt_date=row.RECEIPTDATE,
+                vendor_id=row.VENDORID.strip(),
+                total_amount=Decimal(str(row.SUBTOTAL)),
+                currency_code=row.CURNCYID.strip(),
+                status=self._get_receipt_status_description(row.POPTYPE),
+                line_items=line_items
+            )
+            
+            shipments.append(shipment)
+            
+            # If not including all, just get the most recent
+            if not include_all:
+                break
+                
+        return shipments
             
     async def _analyze_three_way_match(
         self,
@@ -879,103 +1015,172 @@ class DynamicsGPIntegration:
     ) -> Dict[str, Any]:
         """Post invoice using eConnect integration"""
         
-        # Build eConnect XML document
-        econnect_xml = self._build_econnect_invoice_xml(match_result, company_db)
+        return (await self.post_invoices_to_gp([match_result], company_db))[0]
+    
+    async def post_invoices_to_gp(
+        self,
+        match_results: List[GPMatchResult],
+        company_db: str
+    ) -> List[Dict[str, Any]]:
+        """Post many matched invoices through eConnect, batched; one result per invoice, in order
         
-        # Submit to eConnect
-        # This would use the actual eConnect COM object or web service
-        # For demonstration, we'll simulate the process
+        Each batch is a single eConnect document, so a month-end run costs one
+        round trip per ``econnect_batch_size`` invoices. Invoices eConnect
+        rejects are reported individually and the rest of their batch is still
+        posted; rejected invoices' voucher numbers are reused.
+        """
+        if not match_results:
+            return []
+        if self.econnect is None:
+            raise RuntimeError("eConnect is not configured (DYNAMICS_GP_CONFIG econnect_server)")
+        
+        vouchers = await self.document_numbers.take(company_db, "PM", len(match_results))
+        batch_number = f"{self.gp_config['econnect_batch_prefix']}{datetime.now(UTC):%y%m%d}"[:15]
+        documents = [
+            self._build_econnect_document(match_result, voucher, batch_number)
+            for match_result, voucher in zip(match_results, vouchers)
+        ]
+        
+        results = await self.econnect.post(self._connection_string(self.gp_config["server"], company_db), documents)
+        
+        rejected = [result.voucher_number for result in results if result.rejected]
+        if rejected:
+            self.document_numbers.release(company_db, "PM", rejected)
+        
+        posting_date = datetime.now(UTC).isoformat()
+        outcomes = []
+        for match_result, document, result in zip(match_results, documents, results):
+            outcome = {
+                "status": "success" if result.posted else "error",
+                "method": "econnect",
+                "match_id": match_result.match_id,
+                "invoice_number": document.document_number,
+                "gp_document_number": document.voucher_number if result.posted else None,
+                "posted_amount": float(document.amount) if result.posted else 0.0,
+                "posting_date": posting_date,
+                "company_database": company_db,
+                "submissions": result.submissions
+            }
+            if not result.posted:
+                outcome["error"] = result.error
+            outcomes.append(outcome)
         
-        return {
-            "status": "success",
-            "method": "econnect",
-            "gp_document_number": f"INV{datetime.now().strftime('%Y%m%d%H%M%S')}",
-            "posted_amount": float(match_result.invoice_data.get("total_amount", 0)),
-            "posting_date": datetime.now(UTC).isoformat(),
-            "company_database": company_db
-        }
+        posted = sum(1 for result in results if result.posted)
+        logger.info(f"eConnect posted {posted}/{len(results)} invoices to {company_db}")
+        return outcomes
+    
+    def _build_econnect_document(
+        self,
+        match_result: GPMatchResult,
+        voucher_number: str,
+        batch_number: str
+    ) -> EConnectDocument:
+        """eConnect payables transaction for a matched invoice"""
+        invoice_data = match_result.invoice_data
+        accounts = match_result.suggested_gl_accounts or {}
+        total_amount = Decimal(str(invoice_data.get("total_amount", 0)))
+        tax_amount = Decimal(str(invoice_data.get("tax_amount", 0) or 0))
+        
+        # Explicit distributions when the accounts are known; otherwise GP applies the vendor's defaults
+        distributions = []
+        payables_account = accounts.get("accounts_payable")
+        expense_account = accounts.get("expense") or next(iter(accounts.get("expense_accounts") or []), None)
+        if payables_account and expense_account:
+            distributions.append(EConnectDistribution(payables_account, DISTRIBUTION_PAYABLES, credit=total_amount))
+            distributions.append(EConnectDistribution(
+                expense_account, DISTRIBUTION_PURCHASES, debit=total_amount - tax_amount
+            ))
+            if tax_amount and accounts.get("tax_account"):
+                distributions.append(EConnectDistribution(accounts["tax_account"], DISTRIBUTION_TAX, debit=tax_amount))
+            elif tax_amount:
+                distributions[1].debit = total_amount
+        
+        return EConnectDocument(
+            key=match_result.match_id,
+            batch_number=batch_number,
+            voucher_number=voucher_number,
+            vendor_id=match_result.po_data.vendor_id if match_result.po_data else invoice_data.get("vendor_id", ""),
+            document_number=str(invoice_data.get("invoice_number", ""))[:20],
+            document_date=invoice_data.get("invoice_date"),
+            amount=total_amount,
+            tax_amount=tax_amount,
+            currency=invoice_data.get("currency", "USD"),
+            description=f"Invoice {invoice_data.get('invoice_number', '')}",
+            distributions=distributions
+        )
         
     def _build_econnect_invoice_xml(
         self,
         match_result: GPMatchResult,
-        company_db: str
+        company_db: str,
+        voucher_number: str = ""
     ) -> str:
         """Build eConnect XML for invoice posting"""
-        
-        # This is a simplified example - real implementation would be much more comprehensive
-        xml_template = """<?xml version="1.0" encoding="utf-8"?>
-        <eConnect>
-            <PMTransactionType>
-                <taPMTransactionInsert>
-                    <VENDORID>{vendor_id}</VENDORID>
-                    <DOCNUMBR>{invoice_number}</DOCNUMBR>
-                    <DOCDATE>{invoice_date}</DOCDATE>
-                    <DOCAMNT>{total_amount}</DOCAMNT>
-                    <CURNCYID>{currency}</CURNCYID>
-                    <COMPANYDB>{company_db}</COMPANYDB>
-                </taPMTransactionInsert>
-            </PMTransactionType>
-        </eConnect>"""
-        
-        return xml_template.format(
-            vendor_id=match_result.po_data.vendor_id if match_result.po_data else "VENDOR001",
-            invoice_number=match_result.invoice_data.get("invoice_number", ""),
-            invoice_date=datetime.now().strftime("%m/%d/%Y"),
-            total_amount=match_result.invoice_data.get("total_amount", 0),
-            currency=match_result.invoice_data.get("currency", "USD"),
-            company_db=company_db
-        )
+        batch_number = f"{self.gp_config['econnect_batch_prefix']}{datetime.now(UTC):%y%m%d}"[:15]
+        return build_econnect_xml([self._build_econnect_document(match_result, voucher_number, batch_number)])
         
     # Helper methods for connection management, data transformation, etc.
     
-    async def _create_connection_pool(self, company: GPCompanyDatabase):
-        """Create connection pool for company database"""
-        connection_string = (
+    @staticmethod
+    def _connection_string(server_name: str, database_name: str) -> str:
+        return (
             f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-            f"SERVER={company.server_name};"
-            f"DATABASE={company.database_name};"
+            f"SERVER={server_name};"
+            f"DATABASE={database_name};"
             f"Trusted_Connection=yes;"
         )
-        
-        # Store connection info (in production, use actual connection pooling)
-        self.connection_pools[company.company_id] = {
-            "connection_string": connection_string,
-            "database_name": company.database_name,
-            "server_name": company.server_name
-        }
-        
-    async def _get_connection(self, company_db: str):
-        """Get database connection for company"""
-        if company_db not in self.connection_pools:
-            raise ValueError(f"No connection pool for company database: {company_db}")
-            
-        pool_info = self.connection_pools[company_db]
-        return pyodbc.connect(
-            pool_info["connection_string"], 
-            timeout=self.gp_config["timeout"]
+    
+    def _odbc_connect(self, connection_string: str):
+        return pyodbc.connect(connection_string, timeout=self.gp_config["timeout"], autocommit=False)
+    
+    def _build_pool(self, name: str, server_name: str, database_name: str, max_size: int = None) -> GPConnectionPool:
+        return GPConnectionPool(
+            name,
+            partial(self._connector, self._connection_string(server_name, database_name)),
+            max_size=max_size or self.gp_config["connection_pool_size"],
+            timeout=self.gp_config["pool_timeout"],
+            recycle_seconds=self.gp_config["pool_recycle_seconds"],
+            ping_after_seconds=self.gp_config["pool_ping_after_seconds"]
+        )
+    
+    async def _create_connection_pool(self, company: GPCompanyDatabase):
+        """Create connection pool for company database (connections open on first use)"""
+        self.gp_executor.register(
+            self._build_pool(company.company_id, company.server_name, company.database_name)
         )
+    
+    async def _run_gp(self, company_db: str, work: Callable[..., Any], *args: Any) -> Any:
+        """Run ``work(connection, *args)`` against a company database on the GP worker threads"""
+        return await self.gp_executor.run(company_db, work, *args)
+    
+    async def _master_data_ready(self, company_db: str) -> bool:
+        if self.master_data is None:
+            return False
+        try:
+            return await self.master_data.is_ready(company_db)
+        except Exception as e:
+            logger.warning(f"GP mirror unavailable, querying GP: {e}")
+            return False
+    
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """Pool usage per company database"""
+        return self.gp_executor.status()
+    
+    def close(self):
+        """Return unreserved document numbers, close pooled GP connections and stop the worker threads"""
+        self.document_numbers.return_unused()
+        if self._system_pool is not None:
+            self._system_pool.close()
+            self._system_pool = None
+        self.gp_executor.close()
         
     def _get_po_status_description(self, status_code: int) -> str:
         """Get PO status description"""
-        status_map = {
-            1: "New",
-            2: "Released",
-            3: "Change Order",
-            4: "Received",
-            5: "Closed",
-            6: "Canceled"
-        }
-        return status_map.get(status_code, f"Unknown({status_code})")
+        return PO_STATUS_DESCRIPTIONS.get(status_code, f"Unknown({status_code})")
         
     def _get_receipt_status_description(self, type_code: int) -> str:
         """Get receipt status description"""
-        type_map = {
-            1: "Shipment",
-            2: "Invoice",
-            3: "Shipment/Invoice",
-            4: "Return"
-        }
-        return type_map.get(type_code, f"Unknown({type_code})")
+        return RECEIPT_TYPE_DESCRIPTIONS.get(type_code, f"Unknown({type_code})")
 
     async def _ensure_vendor_exists(
         self, 
@@ -984,89 +1189,132 @@ class DynamicsGPIntegration:
     ) -> Dict[str, Any]:
         """Ensure vendor exists in GP Payables Management, create if necessary"""
         
-        conn = await self._get_connection(company_db)
-        
-        try:
-            cursor = conn.cursor()
-            
-            # Search for existing vendor
-            vendor_search_query = """
-            SELECT 
-                VENDORID,
-                VENDNAME,
-                VENDSTTS,
-                PMAPRVND,
-                PYMTRMID,
-                TXSCHDUL,
-                CURNCYID
-            FROM PM00200 
-            WHERE VENDNAME LIKE ? OR VENDORID LIKE ?
-            """
-            
-            search_pattern = f"%{supplier_name}%"
-            cursor.execute(vendor_search_query, search_pattern, search_pattern)
-            existing_vendor = cursor.fetchone()
-            
-            if existing_vendor:
-                return {
-                    "vendor_id": existing_vendor.VENDORID.strip(),
-                    "vendor_name": existing_vendor.VENDNAME.strip(),
-                    "status": "existing",
-                    "is_active": existing_vendor.VENDSTTS == 1,
-                    "payment_terms": existing_vendor.PYMTRMID.strip() if existing_vendor.PYMTRMID else "Net 30",
-                    "currency": existing_vendor.CURNCYID.strip() if existing_vendor.CURNCYID else "USD"
-                }
-            
-            # Create new vendor if not found
-            new_vendor_id = self._generate_vendor_id(supplier_name)
-            
-            # Insert into PM00200 (Vendor Master)
-            vendor_insert_query = """
-            INSERT INTO PM00200 (
-                VENDORID, VENDNAME, VNDCHKNM, VENDSTTS, VNDCNTCT,
-                PYMTRMID, TXSCHDUL, CURNCYID, PMAPRVND, CREATDDT,
-                MODIFDT, VADDCDPR, VADCDTRO, VADDCDPR
-            ) VALUES (?, ?, ?, 1, ?, '3', 'STANDARD', 'USD', 0, GETDATE(), GETDATE(), '', '', '')
-            """
-            
-            cursor.execute(
-                vendor_insert_query,
-                new_vendor_id,
-                supplier_name[:64],  # GP field limit
-                supplier_name[:15],  # Check name limit
-                "Accounts Payable"   # Default contact
+        if self.vendor_resolver is not None:
+            match = await self.vendor_resolver.resolve(
+                "dynamics_gp", company_db, supplier_name, lambda name: self._lookup_vendor(name, company_db)
             )
-            
-            # Insert address information (PM00300)
-            address_insert_query = """
-            INSERT INTO PM00300 (
-                VENDORID, ADRSCODE, VNDCNTCT, ADDRESS1, CITY, STATE, ZIPCODE, COUNTRY
-            ) VALUES (?, 'PRIMARY', ?, '', '', '', '', '')
-            """
-            
-            cursor.execute(
-                address_insert_query,
-                new_vendor_id,
-                "Accounts Payable"
+            if match is not None:
+                return self._vendor_record(match)
+        return await self._find_or_create_vendor(supplier_name, company_db)
+    
+    async def ensure_vendors_exist(self, supplier_names: List[str], company_db: str) -> Dict[str, Dict[str, Any]]:
+        """``_ensure_vendor_exists`` for a batch of suppliers (e.g. an upload), keyed by supplier name
+        
+        With a vendor resolver attached, near-duplicate names share one GP
+        lookup and suppliers already mapped cost none.
+        """
+        names = list(dict.fromkeys(supplier_names))
+        matches = {}
+        if self.vendor_resolver is not None:
+            matches = await self.vendor_resolver.resolve_many(
+                "dynamics_gp", company_db, names, lambda name: self._lookup_vendor(name, company_db)
             )
-            
-            conn.commit()
-            
-            return {
-                "vendor_id": new_vendor_id,
-                "vendor_name": supplier_name,
-                "status": "created",
-                "is_active": True,
-                "payment_terms": "Net 30",
-                "currency": "USD"
-            }
-            
+        vendors = {}
+        for name in names:
+            match = matches.get(name)
+            vendors[name] = (self._vendor_record(match) if match is not None
+                             else await self._find_or_create_vendor(name, company_db))
+        return vendors
+    
+    async def _lookup_vendor(self, supplier_name: str, company_db: str) -> VendorMatch:
+        vendor = await self._find_or_create_vendor(supplier_name, company_db)
+        return VendorMatch(vendor["vendor_id"], vendor["vendor_name"], vendor["status"], details=vendor)
+    
+    @staticmethod
+    def _vendor_record(match: VendorMatch) -> Dict[str, Any]:
+        # Only the call that created the vendor reports it as created
+        return {**match.details, "status": "created" if match.source == "created" else "existing"}
+    
+    async def _find_or_create_vendor(self, supplier_name: str, company_db: str) -> Dict[str, Any]:
+        if await self._master_data_ready(company_db):
+            try:
+                vendor = await self.master_data.find_vendor(company_db, supplier_name)
+                if vendor is not None:
+                    return vendor
+            except Exception as e:
+                logger.warning(f"GP mirror vendor lookup failed, querying GP: {e}")
+        
+        # Not mirrored (or new since the last sync): search GP and create the vendor there
+        try:
+            return await self._run_gp(company_db, self._query_ensure_vendor, supplier_name)
         except Exception as e:
             logger.error(f"Failed to ensure vendor exists: {e}")
-            conn.rollback()
             raise
-        finally:
-            conn.close()
+    
+    def _query_ensure_vendor(self, conn, supplier_name: str) -> Dict[str, Any]:
+        cursor = conn.cursor()
+        
+        # Search for existing vendor
+        vendor_search_query = """
+        SELECT 
+            VENDORID,
+            VENDNAME,
+            VENDSTTS,
+            PMAPRVND,
+            PYMTRMID,
+            TXSCHDUL,
+            CURNCYID
+        FROM PM00200 
+        WHERE VENDNAME LIKE ? OR VENDORID LIKE ?
+        """
+        
+        search_pattern = f"%{supplier_name}%"
+        cursor.execute(vendor_search_query, search_pattern, search_pattern)
+        existing_vendor = cursor.fetchone()
+        
+        if existing_vendor:
+            return {
+                "vendor_id": existing_vendor.VENDORID.strip(),
+                "vendor_name": existing_vendor.VENDNAME.strip(),
+                "status": "existing",
+                "is_active": existing_vendor.VENDSTTS == 1,
+                "payment_terms": existing_vendor.PYMTRMID.strip() if existing_vendor.PYMTRMID else "Net 30",
+                "currency": existing_vendor.CURNCYID.strip() if existing_vendor.CURNCYID else "USD"
+            }
+        
+        # Create new vendor if not found
+        new_vendor_id = self._generate_vendor_id(supplier_name)
+        
+        # Insert into PM00200 (Vendor Master)
+        vendor_insert_query = """
+        INSERT INTO PM00200 (
+            VENDORID, VENDNAME, VNDCHKNM, VENDSTTS, VNDCNTCT,
+            PYMTRMID, TXSCHDUL, CURNCYID, PMAPRVND, CREATDDT,
+            MODIFDT, VADDCDPR, VADCDTRO, VADCDPAD
+        ) VALUES (?, ?, ?, 1, ?, '3', 'STANDARD', 'USD', 0, GETDATE(), GETDATE(), '', '', '')
+        """
+        
+        cursor.execute(
+            vendor_insert_query,
+            new_vendor_id,
+            supplier_name[:64],  # GP field limit
+            supplier_name[:15],  # Check name limit
+            "Accounts Payable"   # Default contact
+        )
+        
+        # Insert address information (PM00300)
+        address_insert_query = """
+        INSERT INTO PM00300 (
+            VENDORID, ADRSCODE, VNDCNTCT, ADDRESS1, CITY, STATE, ZIPCODE, COUNTRY
+        ) VALUES (?, 'PRIMARY', ?, '', '', '', '', '')
+        """
+        
+        cursor.execute(
+            address_insert_query,
+            new_vendor_id,
+            "Accounts Payable"
+        )
+        
+        conn.commit()
+        
+        return {
+            "vendor_id": new_vendor_id,
+            "vendor_name": supplier_name,
+            "status": "created",
+            "is_active": True,
+            "payment_terms": "Net 30",
+            "currency": "USD"
+        }
     
     def _generate_vendor_id(self, supplier_name: str) -> str:
         """Generate a unique vendor ID following GP conventions"""
@@ -1086,68 +1334,8 @@ class DynamicsGPIntegration:
     ) -> Dict[str, Any]:
         """Get default GL accounts for invoice posting"""
         
-        conn = await self._get_connection(company_db)
-        
         try:
-            cursor = conn.cursor()
-            
-            # Get vendor's default accounts
-            vendor_accounts_query = """
-            SELECT 
-                ACPURACCT,  -- Accounts Payable Account
-                PMCSHACCT,  -- Cash Account
-                PMDISCCT,   -- Discount Account
-                PMTAXACCT   -- Tax Account
-            FROM PM00200 
-            WHERE VENDORID = ?
-            """
-            
-            cursor.execute(vendor_accounts_query, vendor_id)
-            vendor_accounts = cursor.fetchone()
-            
-            # Get company default accounts if vendor doesn't have specific ones
-            company_defaults_query = """
-            SELECT 
-                APPAYABL,   -- Accounts Payable
-                CSHACCNT,   -- Cash Account
-                PMDISCCT,   -- Purchase Discount
-                PMTAXACCT   -- Purchase Tax
-            FROM PM40100
-            """
-            
-            cursor.execute(company_defaults_query)
-            company_defaults = cursor.fetchone()
-            
-            # Determine expense accounts based on invoice line items
-            expense_accounts = []
-            for line in invoice_data.get("line_items", []):
-                expense_account = self._determine_expense_account(line, company_db)
-                expense_accounts.append(expense_account)
-            
-            return {
-                "accounts_payable": (
-                    vendor_accounts.ACPURACCT.strip() if vendor_accounts and vendor_accounts.ACPURACCT 
-                    else company_defaults.APPAYABL.strip() if company_defaults 
-                    else "2000-00"
-                ),
-                "expense_accounts": expense_accounts,
-                "cash_account": (
-                    vendor_accounts.PMCSHACCT.strip() if vendor_accounts and vendor_accounts.PMCSHACCT
-                    else company_defaults.CSHACCNT.strip() if company_defaults
-                    else "1100-00"
-                ),
-                "discount_account": (
-                    vendor_accounts.PMDISCCT.strip() if vendor_accounts and vendor_accounts.PMDISCCT
-                    else company_defaults.PMDISCCT.strip() if company_defaults
-                    else "5100-00"
-                ),
-                "tax_account": (
-                    vendor_accounts.PMTAXACCT.strip() if vendor_accounts and vendor_accounts.PMTAXACCT
-                    else company_defaults.PMTAXACCT.strip() if company_defaults
-                    else "2200-00"
-                )
-            }
-            
+            return await self._run_gp(company_db, self._query_default_gl_accounts, vendor_id, invoice_data, company_db)
         except Exception as e:
             logger.error(f"Failed to get GL accounts: {e}")
             # Return safe defaults
@@ -1158,8 +1346,66 @@ class DynamicsGPIntegration:
                 "discount_account": "5100-00",
                 "tax_account": "2200-00"
             }
-        finally:
-            conn.close()
+    
+    def _query_default_gl_accounts(self, conn, vendor_id: str, invoice_data: Dict[str, Any], company_db: str) -> Dict[str, Any]:
+        cursor = conn.cursor()
+        
+        # Get vendor's default accounts
+        vendor_accounts_query = """
+        SELECT 
+            ACPURACCT,  -- Accounts Payable Account
+            PMCSHACCT,  -- Cash Account
+            PMDISCCT,   -- Discount Account
+            PMTAXACCT   -- Tax Account
+        FROM PM00200 
+        WHERE VENDORID = ?
+        """
+        
+        cursor.execute(vendor_accounts_query, vendor_id)
+        vendor_accounts = cursor.fetchone()
+        
+        # Get company default accounts if vendor doesn't have specific ones
+        company_defaults_query = """
+        SELECT 
+            APPAYABL,   -- Accounts Payable
+            CSHACCNT,   -- Cash Account
+            PMDISCCT,   -- Purchase Discount
+            PMTAXACCT   -- Purchase Tax
+        FROM PM40100
+        """
+        
+        cursor.execute(company_defaults_query)
+        company_defaults = cursor.fetchone()
+        
+        # Determine expense accounts based on invoice line items
+        expense_accounts = []
+        for line in invoice_data.get("line_items", []):
+            expense_account = self._determine_expense_account(line, company_db)
+            expense_accounts.append(expense_account)
+        
+        return {
+            "accounts_payable": (
+                vendor_accounts.ACPURACCT.strip() if vendor_accounts and vendor_accounts.ACPURACCT 
+                else company_defaults.APPAYABL.strip() if company_defaults 
+                else "2000-00"
+            ),
+            "expense_accounts": expense_accounts,
+            "cash_account": (
+                vendor_accounts.PMCSHACCT.strip() if vendor_accounts and vendor_accounts.PMCSHACCT
+                else company_defaults.CSHACCNT.strip() if company_defaults
+                else "1100-00"
+            ),
+            "discount_account": (
+                vendor_accounts.PMDISCCT.strip() if vendor_accounts and vendor_accounts.PMDISCCT
+                else company_defaults.PMDISCCT.strip() if company_defaults
+                else "5100-00"
+            ),
+            "tax_account": (
+                vendor_accounts.PMTAXACCT.strip() if vendor_accounts and vendor_accounts.PMTAXACCT
+                else company_defaults.PMTAXACCT.strip() if company_defaults
+                else "2200-00"
+            )
+        }
     
     def _determine_expense_account(self, line_item: Dict[str, Any], company_db: str) -> str:
         """Determine appropriate expense account for line item"""
@@ -1270,47 +1516,14 @@ class DynamicsGPIntegration:
         return pm_transaction
     
     async def _generate_document_number(self, doc_type: str, company_db: str) -> str:
-        """Generate unique document number for GP"""
-        
-        conn = await self._get_connection(company_db)
+        """Next unique GP document number, from the block reserved for this company"""
         
         try:
-            cursor = conn.cursor()
-            
-            # Get next number from GP numbering system (SY00500)
-            next_number_query = """
-            SELECT NXTNUMBR FROM SY00500 
-            WHERE SERIES = 4 AND DTAFILNM = 'PM_Transaction_Entry'
-            """
-            
-            cursor.execute(next_number_query)
-            next_number_row = cursor.fetchone()
-            
-            if next_number_row:
-                next_number = next_number_row.NXTNUMBR
-                
-                # Update the next number
-                update_query = """
-                UPDATE SY00500 
-                SET NXTNUMBR = NXTNUMBR + 1 
-                WHERE SERIES = 4 AND DTAFILNM = 'PM_Transaction_Entry'
-                """
-                cursor.execute(update_query)
-                conn.commit()
-                
-                return f"PM{next_number:06d}"
-            else:
-                # Fallback to timestamp-based numbering
-                timestamp = int(datetime.now(UTC).timestamp())
-                return f"PM{timestamp}"
-                
+            return await self.document_numbers.next_number(company_db, doc_type)
         except Exception as e:
+            # No timestamp fallback: a made-up number can collide with GP's own sequence
             logger.error(f"Failed to generate document number: {e}")
-            # Fallback to timestamp-based numbering
-            timestamp = int(datetime.now(UTC).timestamp())
-            return f"PM{timestamp}"
-        finally:
-            conn.close()
+            raise
     
     async def _post_payables_transaction(
         self,
@@ -1319,81 +1532,107 @@ class DynamicsGPIntegration:
     ) -> Dict[str, Any]:
         """Post transaction to GP Payables Management tables"""
         
-        conn = await self._get_connection(company_db)
-        
         try:
-            cursor = conn.cursor()
-            
-            # Insert into PM10000 (Payables Transaction Work)
-            pm_work_insert = """
-            INSERT INTO PM10000 (
-                VENDORID, DOCNUMBR, DOCTYPE, DOCDATE, DUEDATE, DOCAMNT,
-                CURNCYID, PYMTRMID, PSTGDATE, PTDUSRID, CREATDDT, MODIFDT,
-                VCHRNMBR, TRXDSCRN
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, GETDATE(), 'SYSTEM', GETDATE(), GETDATE(), ?, ?)
-            """
-            
-            cursor.execute(
-                pm_work_insert,
-                pm_transaction["vendor_id"],
-                pm_transaction["document_number"],
-                pm_transaction["document_type"],
-                pm_transaction["invoice_date"],
-                pm_transaction["due_date"],
-                pm_transaction["total_amount"],
-                pm_transaction["currency"],
-                pm_transaction["payment_terms"],
-                pm_transaction["invoice_number"],
-                f"Invoice from {pm_transaction['vendor_name']}"
-            )
-            
-            # Insert GL distributions into PM10100 (Payables Distribution Work)
-            for dist in pm_transaction["gl_distributions"]:
-                dist_insert = """
-                INSERT INTO PM10100 (
-                    VENDORID, DOCNUMBR, DOCTYPE, SEQNUMBR, DSTINDX,
-                    ACTINDX, DEBITAMT, CRDTAMNT, DISTTYPE, DSTSQNUM
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
-                """
-                
-                # Get account index (simplified - in production would lookup GL00105)
-                account_index = hash(dist["account"]) % 999999
-                
-                cursor.execute(
-                    dist_insert,
-                    pm_transaction["vendor_id"],
-                    pm_transaction["document_number"],
-                    pm_transaction["document_type"],
-                    dist["sequence"],
-                    dist["sequence"],
-                    account_index,
-                    dist["debit_amount"],
-                    dist["credit_amount"],
-                    dist["sequence"]
-                )
-            
-            conn.commit()
-            
-            return {
-                "status": "success",
-                "document_number": pm_transaction["document_number"],
-                "posted_amount": pm_transaction["total_amount"],
-                "posting_date": datetime.now(UTC).isoformat(),
-                "message": "Transaction posted to Payables Management successfully"
-            }
-            
+            return await self._run_gp(company_db, self._insert_payables_transaction, pm_transaction)
         except Exception as e:
             logger.error(f"Failed to post payables transaction: {e}")
-            conn.rollback()
+            # The insert was rolled back, so its number can go to the next document; after a
+            # lost connection the commit may have landed, so the number is not reused
+            if not is_disconnect_error(e):
+                self.document_numbers.release(company_db, "PM", [pm_transaction["document_number"]])
             return {
                 "status": "error",
                 "error": str(e),
                 "message": "Failed to post transaction to Payables Management"
             }
-        finally:
-            conn.close()
+    
+    async def find_payables_transaction(self, invoice_number: str, total_amount: float, company_db: str) -> Optional[str]:
+        """Document number of a payables invoice already entered for ``invoice_number``
+
+        GP has no request idempotency, so a retried posting checks here first:
+        the previous attempt may have committed before its connection dropped.
+        """
+        return await self._run_gp(company_db, self._query_payables_transaction, invoice_number, total_amount)
+
+    def _query_payables_transaction(self, conn, invoice_number: str, total_amount: float) -> Optional[str]:
+        cursor = conn.cursor()
+        # Work (PM10000) and posted (PM20000) invoices; the vendor's invoice number is kept in VCHRNMBR
+        cursor.execute("""
+        SELECT TOP 1 DOCNUMBR FROM (
+            SELECT DOCNUMBR FROM PM10000 WHERE DOCTYPE = 1 AND VCHRNMBR = ? AND DOCAMNT = ?
+            UNION ALL
+            SELECT DOCNUMBR FROM PM20000 WHERE DOCTYPE = 1 AND VCHRNMBR = ? AND DOCAMNT = ?
+        ) AS entered
+        """, invoice_number, total_amount, invoice_number, total_amount)
+        row = cursor.fetchone()
+        return row[0].strip() if row else None
+
+    def _insert_payables_transaction(self, conn, pm_transaction: Dict[str, Any]) -> Dict[str, Any]:
+        cursor = conn.cursor()
+        
+        # Insert into PM10000 (Payables Transaction Work)
+        pm_work_insert = """
+        INSERT INTO PM10000 (
+            VENDORID, DOCNUMBR, DOCTYPE, DOCDATE, DUEDATE, DOCAMNT,
+            CURNCYID, PYMTRMID, PSTGDATE, PTDUSRID, CREATDDT, MODIFDT,
+            VCHRNMBR, TRXDSCRN
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, GETDATE(), 'SYSTEM', GETDATE(), GETDATE(), ?, ?)
+        """
+        
+        cursor.execute(
+            pm_work_insert,
+            pm_transaction["vendor_id"],
+            pm_transaction["document_number"],
+            pm_transaction["document_type"],
+            pm_transaction["invoice_date"],
+            pm_transaction["due_date"],
+            pm_transaction["total_amount"],
+            pm_transaction["currency"],
+            pm_transaction["payment_terms"],
+            pm_transaction["invoice_number"],
+            f"Invoice from {pm_transaction['vendor_name']}"
+        )
+        
+        # Insert GL distributions into PM10100 (Payables Distribution Work)
+        for dist in pm_transaction["gl_distributions"]:
+            dist_insert = """
+            INSERT INTO PM10100 (
+                VENDORID, DOCNUMBR, DOCTYPE, SEQNUMBR, DSTINDX,
+                ACTINDX, DEBITAMT, CRDTAMNT, DISTTYPE, DSTSQNUM
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+            """
+            
+            # Get account index (simplified - in production would lookup GL00105)
+            account_index = hash(dist["account"]) % 999999
+            
+            cursor.execute(
+                dist_insert,
+                pm_transaction["vendor_id"],
+                pm_transaction["document_number"],
+                pm_transaction["document_type"],
+                dist["sequence"],
+                dist["sequence"],
+                account_index,
+                dist["debit_amount"],
+                dist["credit_amount"],
+                dist["sequence"]
+            )
+        
+        conn.commit()
+        
+        return {
+            "status": "success",
+            "document_number": pm_transaction["document_number"],
+            "posted_amount": pm_transaction["total_amount"],
+            "posting_date": datetime.now(UTC).isoformat(),
+            "message": "Transaction posted to Payables Management successfully"
+        }
+
+def _create_gp_integration() -> DynamicsGPIntegration:
+    return DynamicsGPIntegration(vendor_resolver=vendor_resolver.get())
+
 
-# Create service instance
-dynamics_gp_integration = DynamicsGPIntegration()
+# Service instance, constructed on first use
+dynamics_gp_integration = LazyService(_create_gp_integration)
 
 
@@ -14,7 +14,8 @@ import uuid
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.config import settings
 from src.models.company import Company
@@ -39,7 +40,7 @@ class EmailProcessorService:
         if not self.attachment_dir.exists():
             self.attachment_dir.mkdir(parents=True, exist_ok=True)
 
-    async def check_and_process_emails(self, db: Session):
+    async def check_and_process_emails(self, db: AsyncSession):
         """Check for new emails and process invoice attachments."""
         if not all([self.email_host, self.email_user, self.email_password]):
             logger.warning("Email processing credentials not configured. Skipping email check.")
@@ -67,7 +68,7 @@ class EmailProcessorService:
         except Exception as e:
             logger.error(f"Unexpected error during email processing: {e}", exc_info=True)
 
-    async def _process_single_email(self, mail: imaplib.IMAP4_SSL, email_id: bytes, db: Session):
+    async def _process_single_email(self, mail: imaplib.IMAP4_SSL, email_id: bytes, db: AsyncSession):
         """Process a single email and extract attachments."""
         status, msg_data = mail.fetch(email_id, "(RFC822)")
         if status != "OK":
@@ -136,19 +137,21 @@ class EmailProcessorService:
         # Mark email as read
         mail.store(email_id, "+FLAGS", "\\Seen")
 
-    async def _find_company_and_user(self, db: Session, recipient_email: str, sender_email: str) -> tuple[Optional[str], Optional[str]]:
+    async def _find_company_and_user(self, db: AsyncSession, recipient_email: str, sender_email: str) -> tuple[Optional[str], Optional[str]]:
         """Find company and user based on email addresses."""
         # For now, use the first available company and user
         # In a real system, this would map email addresses to companies
-        default_company = db.query(Company).first()
-        default_user = db.query(User).filter(User.company_id == default_company.id).first() if default_company else None
+        default_company = await db.scalar(select(Company).limit(1))
+        default_user = await db.scalar(
+            select(User).where(User.company_id == default_company.id).limit(1)
+        ) if default_company else None
 
         if not default_company or not default_user:
             return None, None
 
         return str(default_company.id), str(default_user.id)
 
-    async def start_email_monitoring(self, db: Session):
+    async def start_email_monitoring(self, db: AsyncSession):
         """Start continuous email monitoring."""
         logger.info("Starting email monitoring service...")
         
@@ -19,6 +19,7 @@ from src.models.purchase_order import PurchaseOrder, POLine
 from src.models.receipt import Receipt, ReceiptLine
 from services.erp import ERPIntegrationService
 from core.config import settings
+from core.lazy import LazyService
 
 logger = logging.getLogger(__name__)
 
@@ -648,6 +649,6 @@ class EnhancedThreeWayMatchService:
         })
 
 # Create service instance
-enhanced_three_way_match_service = EnhancedThreeWayMatchService()
+enhanced_three_way_match_service = LazyService(EnhancedThreeWayMatchService)
 
 
@@ -24,6 +24,7 @@ from src.models.user import User, UserStatus, UserRole
 from src.models.company import Company
 from src.models.audit import AuditLog, AuditAction, AuditResourceType
 from core.config import settings
+from core.lazy import LazyService
 
 logger = logging.getLogger(__name__)
 
@@ -746,4 +747,4 @@ class EnterpriseSecurityService:
             return {"error": str(e)}
 
 # Global instance
-enterprise_security_service = EnterpriseSecurityService()
+enterprise_security_service = LazyService(EnterpriseSecurityService)
@@ -0,0 +1,104 @@
+"""
+ERP adapter registry
+
+Adapters are registered by ERP type as ``"module:ClassName"`` specs and
+imported on first lookup, so a worker only loads the adapters (and their
+client code) for the ERP systems its connections actually use. Third-party
+adapters are discovered from the ``ai_erp.erp_adapters`` entry point group
+or named in ``settings.ERP_ADAPTER_PLUGINS``; both override the built-ins.
+"""
+import importlib
+import logging
+from collections.abc import Mapping
+from importlib.metadata import entry_points
+from typing import Dict, Iterator, Type, Union
+
+from core.config import settings
+from services.erp_adapters.base import ERPAdapter, http_limits
+from services.erp_adapters.mock import MockERPAdapter
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "ai_erp.erp_adapters"
+
+BUILTIN_ADAPTERS = {
+    "dynamics_gp": "services.erp_adapters.dynamics_gp:MicrosoftDynamicsGPAdapter",
+    "d365_bc": "services.erp_adapters.d365_bc:Dynamics365BCAdapter",
+    "xero": "services.erp_adapters.xero:XeroAdapter",
+}
+
+
+def _load_spec(spec: str) -> Type[ERPAdapter]:
+    module_name, _, attribute = spec.partition(":")
+    value = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        value = getattr(value, part)
+    return value
+
+
+class ERPAdapterRegistry(Mapping):
+    """ERP type -> adapter class, importing each adapter module on first use
+
+    Membership and iteration only look at registered names, so validating a
+    configuration or listing the supported systems imports nothing.
+    """
+
+    def __init__(self, builtins: Dict[str, str] = None, group: str = ENTRY_POINT_GROUP):
+        self._specs: Dict[str, Union[str, Type[ERPAdapter]]] = dict(BUILTIN_ADAPTERS if builtins is None else builtins)
+        self._loaded: Dict[str, Type[ERPAdapter]] = {}
+        self._group = group
+        self._discovered = False
+
+    def register(self, erp_type: str, adapter: Union[str, Type[ERPAdapter]]) -> None:
+        """Register an adapter class, or a ``"module:ClassName"`` spec to import lazily"""
+        self._specs[erp_type] = adapter
+        self._loaded.pop(erp_type, None)
+
+    def unregister(self, erp_type: str) -> None:
+        self._specs.pop(erp_type, None)
+        self._loaded.pop(erp_type, None)
+
+    def is_loaded(self, erp_type: str) -> bool:
+        return erp_type in self._loaded
+
+    def _discover(self) -> None:
+        if self._discovered:
+            return
+        self._discovered = True
+        try:
+            for entry_point in entry_points(group=self._group):
+                self._specs[entry_point.name] = entry_point.value
+        except Exception as e:
+            logger.warning(f"ERP adapter entry point discovery failed: {e}")
+        for erp_type, spec in (settings.ERP_ADAPTER_PLUGINS or {}).items():
+            self._specs[erp_type] = spec
+
+    def __getitem__(self, erp_type: str) -> Type[ERPAdapter]:
+        adapter = self._loaded.get(erp_type)
+        if adapter is not None:
+            return adapter
+        self._discover()
+        spec = self._specs[erp_type]
+        adapter = _load_spec(spec) if isinstance(spec, str) else spec
+        if not (isinstance(adapter, type) and issubclass(adapter, ERPAdapter)):
+            raise TypeError(f"ERP adapter for {erp_type!r} ({spec}) is not an ERPAdapter subclass")
+        self._loaded[erp_type] = adapter
+        logger.debug(f"Loaded ERP adapter {erp_type}: {adapter.__module__}.{adapter.__name__}")
+        return adapter
+
+    def __contains__(self, erp_type: object) -> bool:
+        self._discover()
+        return erp_type in self._specs
+
+    def __iter__(self) -> Iterator[str]:
+        self._discover()
+        return iter(list(self._specs))
+
+    def __len__(self) -> int:
+        self._discover()
+        return len(self._specs)
+
+
+adapter_registry = ERPAdapterRegistry()
+
+__all__ = ["ERPAdapter", "ERPAdapterRegistry", "MockERPAdapter", "adapter_registry", "http_limits"]
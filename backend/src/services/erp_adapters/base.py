@@ -0,0 +1,139 @@
+"""
+Base class for ERP adapters
+
+An adapter speaks one ERP system's API for ``ERPIntegrationService``. Adapter
+implementations live in their own modules and are imported through the
+registry in ``services.erp_adapters`` only when a connection of their type is
+configured.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from core.config import settings
+from services.vendor_resolution import VendorMatch
+from src.models.invoice import Invoice
+
+
+def http_limits(connection_config: Dict[str, Any]) -> httpx.Limits:
+    """Connection pool bounds for an adapter's HTTP client"""
+    return httpx.Limits(
+        max_connections=connection_config.get("max_connections", settings.ERP_HTTP_MAX_CONNECTIONS),
+        max_keepalive_connections=connection_config.get(
+            "max_keepalive_connections", settings.ERP_HTTP_MAX_KEEPALIVE_CONNECTIONS
+        )
+    )
+
+class ERPAdapter(ABC):
+    """Abstract base class for ERP adapters"""
+    
+    erp_type: str = None
+    # Shared supplier -> vendor mappings (services.vendor_resolution); attached by ``shared_adapter``
+    vendor_resolver = None
+    # Request header the ERP deduplicates POSTs by; ``post_invoice`` sends the outbox
+    # idempotency key in it. ERPs without one are checked with ``find_posted_invoice``
+    idempotency_header: Optional[str] = None
+    
+    @abstractmethod
+    async def health_check(self) -> Dict[str, Any]:
+        """Check ERP system health"""
+        pass
+    
+    @abstractmethod
+    async def post_invoice(self, invoice: Invoice, company_settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Post invoice to ERP system"""
+        pass
+    
+    @abstractmethod
+    async def get_invoice_status(self, erp_document_id: str) -> Dict[str, Any]:
+        """Get invoice status from ERP system"""
+        pass
+    
+    @abstractmethod
+    async def validate_connection(self) -> Dict[str, Any]:
+        """Validate ERP connection and credentials"""
+        pass
+    
+    def idempotency_headers(self, company_settings: Dict[str, Any]) -> Dict[str, str]:
+        """The idempotency header for a post, when the ERP has one and the caller passed a key"""
+        key = company_settings.get("idempotency_key")
+        return {self.idempotency_header: key} if self.idempotency_header and key else {}
+    
+    async def find_posted_invoice(self, invoice: Invoice) -> Optional[str]:
+        """Document ID of an earlier post of ``invoice``; None when there is none or the adapter cannot tell
+        
+        Called before re-posting a job whose previous attempt may have reached
+        the ERP, for ERPs that do not deduplicate requests themselves.
+        """
+        return None
+    
+    async def get_invoice_changes(self, since: Optional[datetime], limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Up to ``limit`` documents changed after ``since``, oldest change first
+        
+        Each change is ``{"erp_doc_id", "status", "modified_at"}``. None when the
+        ERP has no modified-since query; status reconciliation then falls back
+        to ``get_invoice_statuses`` for the documents it tracks.
+        """
+        return None
+    
+    async def get_invoice_statuses(self, erp_document_ids: List[str]) -> List[Dict[str, Any]]:
+        """Current status of several documents, as changes; adapters override this with one batched request"""
+        results = await asyncio.gather(*[self.get_invoice_status(doc_id) for doc_id in erp_document_ids])
+        return [
+            {"erp_doc_id": doc_id, "status": result.get("status"), "modified_at": None}
+            for doc_id, result in zip(erp_document_ids, results)
+            if result.get("status") not in ("error", "not_found", "unknown")
+        ]
+    
+    # Enhanced invoice processing methods
+    async def process_invoice_with_po(self, invoice: Invoice, po_number: str, company_settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Process invoice with Purchase Order matching (default implementation)"""
+        # Default implementation calls standard post_invoice
+        # Subclasses can override for PO-specific processing
+        return await self.post_invoice(invoice, company_settings)
+    
+    async def process_invoice_without_po(self, invoice: Invoice, company_settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Process invoice without Purchase Order (default implementation)"""
+        # Default implementation calls standard post_invoice
+        # Subclasses can override for no-PO specific processing
+        return await self.post_invoice(invoice, company_settings)
+    
+    async def find_vendor(self, supplier_name: str) -> Optional[VendorMatch]:
+        """The ERP vendor for a supplier (found, created or derived); None when the adapter cannot tell"""
+        return None
+    
+    async def resolve_vendor(self, supplier_name: str) -> Optional[VendorMatch]:
+        """``find_vendor`` behind the shared vendor resolver's mapping cache and fuzzy index"""
+        if self.vendor_resolver is None:
+            return await self.find_vendor(supplier_name)
+        return await self.vendor_resolver.resolve(
+            self.erp_type, getattr(self, "company_id", None) or "default", supplier_name, self.find_vendor
+        )
+    
+    async def resolve_vendors(self, supplier_names: List[str]) -> Dict[str, Optional[VendorMatch]]:
+        """``resolve_vendor`` for a batch, with one lookup per distinct supplier"""
+        if self.vendor_resolver is None:
+            return {name: await self.find_vendor(name) for name in dict.fromkeys(supplier_names)}
+        return await self.vendor_resolver.resolve_many(
+            self.erp_type, getattr(self, "company_id", None) or "default", supplier_names, self.find_vendor
+        )
+    
+    def supports_po_matching(self) -> bool:
+        """Check if ERP supports Purchase Order matching"""
+        return True  # Most ERPs support PO matching
+    
+    def supports_no_po_processing(self) -> bool:
+        """Check if ERP supports processing invoices without PO"""
+        return True  # Most ERPs support direct invoice entry
+    
+    def get_supported_invoice_types(self) -> List[str]:
+        """Get list of supported invoice processing types"""
+        types = []
+        if self.supports_no_po_processing():
+            types.append("no_purchase_order")
+        if self.supports_po_matching():
+            types.append("with_purchase_order")
+        return types
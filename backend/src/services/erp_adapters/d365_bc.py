@@ -0,0 +1,219 @@
+"""
+Dynamics 365 Business Central adapter (BC API v2.0)
+"""
+import logging
+from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from services.erp_adapters.base import ERPAdapter, http_limits
+from services.vendor_resolution import VendorMatch
+from src.models.invoice import Invoice
+
+logger = logging.getLogger(__name__)
+
+class Dynamics365BCAdapter(ERPAdapter):
+    """Dynamics 365 Business Central ERP adapter"""
+    
+    erp_type = "d365_bc"
+    
+    def __init__(self, connection_config: Dict[str, Any]):
+        self.erp_name = "D365BC"
+        self.connection_config = connection_config
+        self.base_url = connection_config.get("base_url")
+        self.api_key = connection_config.get("api_key")
+        self.company_id = connection_config.get("company_id")
+        self.timeout = connection_config.get("timeout", 30)
+        
+        if not all([self.base_url, self.api_key, self.company_id]):
+            raise ValueError("Missing required Dynamics 365 BC connection configuration")
+        
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            timeout=self.timeout,
+            limits=http_limits(connection_config)
+        )
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """Check Dynamics 365 BC system health"""
+        try:
+            response = await self.client.get(f"/companies({self.company_id})")
+            response.raise_for_status()
+            return {
+                "status": "healthy",
+                "erp_name": "Dynamics 365 Business Central",
+                "timestamp": datetime.now(UTC).isoformat(),
+                "company_id": self.company_id
+            }
+        except Exception as e:
+            logger.error(f"Dynamics 365 BC health check failed: {str(e)}")
+            return {
+                "status": "unhealthy",
+                "erp_name": "Dynamics 365 Business Central",
+                "error": str(e),
+                "timestamp": datetime.now(UTC).isoformat()
+            }
+    
+    async def post_invoice(self, invoice: Invoice, company_settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Post invoice to Dynamics 365 BC"""
+        try:
+            # Validate company settings
+            if not company_settings.get("bc_environment"):
+                raise ValueError("BC Environment not configured")
+            
+            # Transform to BC format
+            vendor = await self.resolve_vendor(invoice.supplier_name)
+            bc_invoice_data = self._transform_to_bc_format(invoice, company_settings, vendor)
+            
+            response = await self.client.post(
+                f"/companies({self.company_id})/purchaseInvoices",
+                json=bc_invoice_data
+            )
+            response.raise_for_status()
+            
+            bc_response = response.json()
+            
+            return {
+                "status": "success",
+                "erp_doc_id": bc_response.get("id"),
+                "method": "POST",
+                "timestamp": datetime.now(UTC).isoformat(),
+                "message": "Invoice successfully posted to Dynamics 365 BC",
+                "bc_data": bc_response
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to post invoice to Dynamics 365 BC: {str(e)}")
+            return {
+                "status": "error",
+                "error": str(e),
+                "timestamp": datetime.now(UTC).isoformat(),
+                "message": "Failed to post invoice to Dynamics 365 BC"
+            }
+    
+    async def get_invoice_status(self, erp_document_id: str) -> Dict[str, Any]:
+        """Get invoice status from Dynamics 365 BC"""
+        try:
+            response = await self.client.get(f"/companies({self.company_id})/purchaseInvoices({erp_document_id})")
+            response.raise_for_status()
+            
+            bc_data = response.json()
+            
+            return {
+                "status": bc_data.get("status", "unknown"),
+                "erp_doc_id": erp_document_id,
+                "posted_at": bc_data.get("postingDate"),
+                "erp_name": "Dynamics 365 Business Central",
+                "bc_data": bc_data
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to get invoice status from Dynamics 365 BC: {str(e)}")
+            return {
+                "status": "error",
+                "error": str(e),
+                "erp_doc_id": erp_document_id,
+                "message": "Failed to get invoice status from Dynamics 365 BC"
+            }
+    
+    async def find_posted_invoice(self, invoice: Invoice) -> Optional[str]:
+        """Purchase invoice already entered with this invoice's number and vendor name"""
+        supplier = (invoice.supplier_name or "").replace("'", "''")
+        number = (invoice.invoice_number or "").replace("'", "''")
+        response = await self.client.get(
+            f"/companies({self.company_id})/purchaseInvoices",
+            params={
+                "$filter": f"invoiceNumber eq '{number}' and buyFromVendorName eq '{supplier}'",
+                "$select": "id",
+                "$top": 1
+            }
+        )
+        response.raise_for_status()
+        documents = response.json().get("value", [])
+        return documents[0].get("id") if documents else None
+    
+    async def get_invoice_changes(self, since: Optional[datetime], limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Purchase invoices modified after ``since`` (OData filter on lastModifiedDateTime)"""
+        params = {
+            "$orderby": "lastModifiedDateTime",
+            "$top": limit,
+            "$select": "id,status,lastModifiedDateTime"
+        }
+        if since is not None:
+            params["$filter"] = f"lastModifiedDateTime gt {since.astimezone(UTC):%Y-%m-%dT%H:%M:%S.%fZ}"
+        return await self._bc_changes(params)
+    
+    async def get_invoice_statuses(self, erp_document_ids: List[str]) -> List[Dict[str, Any]]:
+        return await self._bc_changes({
+            "$filter": " or ".join(f"id eq {doc_id}" for doc_id in erp_document_ids),
+            "$select": "id,status,lastModifiedDateTime"
+        })
+    
+    async def _bc_changes(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        response = await self.client.get(f"/companies({self.company_id})/purchaseInvoices", params=params)
+        response.raise_for_status()
+        return [
+            {"erp_doc_id": document.get("id"), "status": document.get("status", "unknown"),
+             "modified_at": document.get("lastModifiedDateTime")}
+            for document in response.json().get("value", [])
+        ]
+    
+    async def validate_connection(self) -> Dict[str, Any]:
+        """Validate Dynamics 365 BC connection"""
+        try:
+            response = await self.client.get(f"/companies({self.company_id})")
+            response.raise_for_status()
+            
+            return {
+                "status": "success",
+                "message": "Dynamics 365 BC connection validated successfully",
+                "company_id": self.company_id,
+                "timestamp": datetime.now(UTC).isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"Dynamics 365 BC connection validation failed: {str(e)}")
+            return {
+                "status": "error",
+                "message": f"Connection validation failed: {str(e)}",
+                "timestamp": datetime.now(UTC).isoformat()
+            }
+    
+    def _transform_to_bc_format(
+        self,
+        invoice: Invoice,
+        company_settings: Dict[str, Any],
+        vendor: Optional[VendorMatch] = None
+    ) -> Dict[str, Any]:
+        """Transform invoice to Dynamics 365 BC format"""
+        return {
+            "vendorNumber": vendor.vendor_ref if vendor else self._get_or_create_vendor_number(invoice.supplier_name),
+            "invoiceNumber": invoice.invoice_number,
+            "invoiceDate": invoice.invoice_date.isoformat() if invoice.invoice_date else datetime.now().date().isoformat(),
+            "dueDate": invoice.due_date.isoformat() if invoice.due_date else None,
+            "currencyCode": invoice.currency if invoice.currency else "USD",
+            "purchaseLines": [
+                {
+                    "description": line.description if hasattr(line, 'description') else "",
+                    "quantity": float(line.quantity) if hasattr(line, 'quantity') and line.quantity else 1.0,
+                    "unitPrice": float(line.unit_price) if hasattr(line, 'unit_price') and line.unit_price else 0.0,
+                    "lineAmount": float(line.total) if hasattr(line, 'total') and line.total else 0.0,
+                    "accountNo": line.gl_account if hasattr(line, 'gl_account') else None
+                }
+                for line in (invoice.line_items if hasattr(invoice, 'line_items') and invoice.line_items else [])
+            ],
+            "buyFromVendorName": invoice.supplier_name,
+            "payToVendorName": invoice.supplier_name
+        }
+    
+    def _get_or_create_vendor_number(self, supplier_name: str) -> str:
+        """Get or create vendor number in Dynamics 365 BC"""
+        return f"V{supplier_name.upper().replace(' ', '')[:8]}"
+    
+    async def find_vendor(self, supplier_name: str) -> Optional[VendorMatch]:
+        return VendorMatch(self._get_or_create_vendor_number(supplier_name), supplier_name, "derived")
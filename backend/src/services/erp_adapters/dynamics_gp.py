@@ -0,0 +1,238 @@
+"""
+Microsoft Dynamics GP adapter (GP web services REST API)
+"""
+import logging
+from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from services.erp_adapters.base import ERPAdapter, http_limits
+from services.vendor_resolution import VendorMatch
+from src.models.invoice import Invoice
+
+logger = logging.getLogger(__name__)
+
+class MicrosoftDynamicsGPAdapter(ERPAdapter):
+    """Microsoft Dynamics GP ERP adapter with comprehensive PO and No-PO support"""
+    
+    erp_type = "dynamics_gp"
+    
+    def __init__(self, connection_config: Dict[str, Any]):
+        self.erp_name = "Dynamics GP"
+        self.connection_config = connection_config
+        self.base_url = connection_config.get("base_url")
+        self.api_key = connection_config.get("api_key")
+        self.company_id = connection_config.get("company_id")
+        self.timeout = connection_config.get("timeout", 30)
+        
+        # Validate required configuration
+        if not all([self.base_url, self.api_key, self.company_id]):
+            raise ValueError("Missing required Dynamics GP connection configuration")
+        
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "X-Company-ID": self.company_id
+            },
+            timeout=self.timeout,
+            limits=http_limits(connection_config)
+        )
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """Check Dynamics GP system health"""
+        try:
+            response = await self.client.get("/api/health")
+            response.raise_for_status()
+            return {
+                "status": "healthy",
+                "erp_name": "Microsoft Dynamics GP",
+                "timestamp": datetime.now(UTC).isoformat(),
+                "version": response.json().get("version", "unknown"),
+                "company_id": self.company_id
+            }
+        except Exception as e:
+            logger.error(f"Dynamics GP health check failed: {str(e)}")
+            return {
+                "status": "unhealthy",
+                "erp_name": "Microsoft Dynamics GP",
+                "error": str(e),
+                "timestamp": datetime.now(UTC).isoformat()
+            }
+    
+    async def post_invoice(self, invoice: Invoice, company_settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Post invoice to Dynamics GP"""
+        try:
+            # Validate company settings
+            if not company_settings.get("gp_company_id"):
+                raise ValueError("GP Company ID not configured")
+            if not company_settings.get("gp_vendor_id"):
+                raise ValueError("GP Vendor ID not configured")
+            
+            # Transform invoice to Dynamics GP format
+            vendor = await self.resolve_vendor(invoice.supplier_name)
+            gp_invoice_data = self._transform_to_gp_format(invoice, company_settings, vendor)
+            
+            # Post to Dynamics GP
+            response = await self.client.post(
+                "/api/purchasing/invoices",
+                json=gp_invoice_data
+            )
+            response.raise_for_status()
+            
+            gp_response = response.json()
+            
+            return {
+                "status": "success",
+                "erp_doc_id": gp_response.get("document_id"),
+                "method": "POST",
+                "timestamp": datetime.now(UTC).isoformat(),
+                "message": "Invoice successfully posted to Dynamics GP",
+                "gp_data": gp_response
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to post invoice to Dynamics GP: {str(e)}")
+            return {
+                "status": "error",
+                "error": str(e),
+                "timestamp": datetime.now(UTC).isoformat(),
+                "message": "Failed to post invoice to Dynamics GP"
+            }
+    
+    async def get_invoice_status(self, erp_document_id: str) -> Dict[str, Any]:
+        """Get invoice status from Dynamics GP"""
+        try:
+            response = await self.client.get(f"/api/purchasing/invoices/{erp_document_id}")
+            response.raise_for_status()
+            
+            gp_data = response.json()
+            
+            return {
+                "status": gp_data.get("status", "unknown"),
+                "erp_doc_id": erp_document_id,
+                "posted_at": gp_data.get("posted_date"),
+                "erp_name": "Microsoft Dynamics GP",
+                "gp_data": gp_data
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to get invoice status from Dynamics GP: {str(e)}")
+            return {
+                "status": "error",
+                "error": str(e),
+                "erp_doc_id": erp_document_id,
+                "message": "Failed to get invoice status from Dynamics GP"
+            }
+    
+    async def find_posted_invoice(self, invoice: Invoice) -> Optional[str]:
+        """Purchasing invoice already entered with this invoice's number and vendor"""
+        vendor = await self.resolve_vendor(invoice.supplier_name)
+        response = await self.client.get("/api/purchasing/invoices", params={
+            "invoice_number": invoice.invoice_number,
+            "vendor_id": vendor.vendor_ref if vendor else self._get_or_create_vendor_id(invoice.supplier_name),
+            "limit": 1
+        })
+        response.raise_for_status()
+        documents = response.json().get("invoices", [])
+        return documents[0].get("document_id") if documents else None
+    
+    async def get_invoice_changes(self, since: Optional[datetime], limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Purchasing invoices modified after ``since``"""
+        params = {"order_by": "modified_date", "limit": limit}
+        if since is not None:
+            params["modified_since"] = since.isoformat()
+        response = await self.client.get("/api/purchasing/invoices", params=params)
+        response.raise_for_status()
+        return [self._gp_change(document) for document in response.json().get("invoices", [])]
+    
+    async def get_invoice_statuses(self, erp_document_ids: List[str]) -> List[Dict[str, Any]]:
+        response = await self.client.get(
+            "/api/purchasing/invoices", params={"document_ids": ",".join(erp_document_ids)}
+        )
+        response.raise_for_status()
+        return [self._gp_change(document) for document in response.json().get("invoices", [])]
+    
+    @staticmethod
+    def _gp_change(document: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "erp_doc_id": document.get("document_id"),
+            "status": document.get("status", "unknown"),
+            "modified_at": document.get("modified_date") or document.get("posted_date")
+        }
+    
+    async def validate_connection(self) -> Dict[str, Any]:
+        """Validate Dynamics GP connection and credentials"""
+        try:
+            # Test authentication and basic connectivity
+            response = await self.client.get("/api/companies")
+            response.raise_for_status()
+            
+            companies = response.json()
+            company_exists = any(c.get("id") == self.company_id for c in companies)
+            
+            if not company_exists:
+                return {
+                    "status": "error",
+                    "message": f"Company ID {self.company_id} not found in Dynamics GP",
+                    "timestamp": datetime.now(UTC).isoformat()
+                }
+            
+            return {
+                "status": "success",
+                "message": "Dynamics GP connection validated successfully",
+                "company_id": self.company_id,
+                "timestamp": datetime.now(UTC).isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"Dynamics GP connection validation failed: {str(e)}")
+            return {
+                "status": "error",
+                "message": f"Connection validation failed: {str(e)}",
+                "timestamp": datetime.now(UTC).isoformat()
+            }
+    
+    def _transform_to_gp_format(
+        self,
+        invoice: Invoice,
+        company_settings: Dict[str, Any],
+        vendor: Optional[VendorMatch] = None
+    ) -> Dict[str, Any]:
+        """Transform invoice to Dynamics GP format"""
+        return {
+            "vendor_id": vendor.vendor_ref if vendor else self._get_or_create_vendor_id(invoice.supplier_name),
+            "invoice_number": invoice.invoice_number,
+            "invoice_date": invoice.invoice_date.isoformat() if invoice.invoice_date else datetime.now().date().isoformat(),
+            "due_date": invoice.due_date.isoformat() if invoice.due_date else None,
+            "total_amount": float(invoice.total_amount) if invoice.total_amount else 0.0,
+            "tax_amount": float(invoice.tax_amount) if invoice.tax_amount else 0.0,
+            "currency_id": invoice.currency if invoice.currency else "USD",
+            "line_items": [
+                {
+                    "item_id": line.item_id if hasattr(line, 'item_id') else None,
+                    "description": line.description if hasattr(line, 'description') else "",
+                    "quantity": float(line.quantity) if hasattr(line, 'quantity') and line.quantity else 1.0,
+                    "unit_price": float(line.unit_price) if hasattr(line, 'unit_price') and line.unit_price else 0.0,
+                    "total": float(line.total) if hasattr(line, 'total') and line.total else 0.0,
+                    "gl_account": line.gl_account if hasattr(line, 'gl_account') else None
+                }
+                for line in (invoice.line_items if hasattr(invoice, 'line_items') and invoice.line_items else [])
+            ],
+            "po_number": invoice.po_number if hasattr(invoice, 'po_number') else None,
+            "department": invoice.department if hasattr(invoice, 'department') else None,
+            "cost_center": invoice.cost_center if hasattr(invoice, 'cost_center') else None,
+            "project_code": invoice.project_code if hasattr(invoice, 'project_code') else None,
+            "notes": invoice.notes if hasattr(invoice, 'notes') else None
+        }
+    
+    def _get_or_create_vendor_id(self, supplier_name: str) -> str:
+        """Get or create vendor ID in Dynamics GP"""
+        # In production, this would check if vendor exists or create new one
+        # Dynamics GP vendor IDs are typically alphanumeric and limited length
+        return f"VENDOR-{supplier_name.upper().replace(' ', '-')[:10]}"
+    
+    async def find_vendor(self, supplier_name: str) -> Optional[VendorMatch]:
+        return VendorMatch(self._get_or_create_vendor_id(supplier_name), supplier_name, "derived")
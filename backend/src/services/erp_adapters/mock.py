@@ -0,0 +1,110 @@
+"""
+In-memory ERP adapter for development and tests
+"""
+import asyncio
+from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
+
+from services.erp_adapters.base import ERPAdapter
+from src.models.invoice import Invoice
+
+class MockERPAdapter(ERPAdapter):
+    """Mock ERP adapter for testing and development"""
+    
+    erp_type = "mock"
+    
+    def __init__(self, erp_name: str = "MockERP"):
+        self.erp_name = erp_name
+        self.posted_invoices = {}
+        self.health_status = "healthy"
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """Mock health check"""
+        await asyncio.sleep(0.1)  # Simulate network delay
+        return {
+            "status": self.health_status,
+            "erp_name": self.erp_name,
+            "timestamp": datetime.now(UTC).isoformat(),
+            "version": "1.0.0"
+        }
+    
+    async def post_invoice(self, invoice: Invoice, company_settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Mock invoice posting"""
+        await asyncio.sleep(0.2)  # Simulate processing time
+        
+        # Generate mock ERP document ID
+        erp_doc_id = f"{self.erp_name}-{invoice.invoice_number}-{datetime.now(UTC).strftime('%Y%m%d%H%M%S')}"
+        
+        # Store for status checks
+        self.posted_invoices[erp_doc_id] = {
+            "invoice_id": str(invoice.id),
+            "status": "posted",
+            "posted_at": datetime.now(UTC).isoformat(),
+            "company_settings": company_settings
+        }
+        
+        return {
+            "status": "success",
+            "erp_doc_id": erp_doc_id,
+            "method": "POST",
+            "timestamp": datetime.now(UTC).isoformat(),
+            "message": f"Invoice successfully posted to {self.erp_name}"
+        }
+    
+    async def get_invoice_status(self, erp_document_id: str) -> Dict[str, Any]:
+        """Mock invoice status check"""
+        await asyncio.sleep(0.1)
+        
+        if erp_document_id in self.posted_invoices:
+            return {
+                "status": "posted",
+                "erp_doc_id": erp_document_id,
+                "posted_at": self.posted_invoices[erp_document_id]["posted_at"],
+                "erp_name": self.erp_name
+            }
+        else:
+            return {
+                "status": "not_found",
+                "erp_doc_id": erp_document_id,
+                "message": "Invoice not found in ERP system"
+            }
+    
+    async def validate_connection(self) -> Dict[str, Any]:
+        """Mock connection validation"""
+        await asyncio.sleep(0.1)
+        return {
+            "status": "success",
+            "erp_name": self.erp_name,
+            "connection_type": "mock",
+            "validated_at": datetime.now(UTC).isoformat(),
+            "message": f"Mock connection to {self.erp_name} validated successfully"
+        }
+    
+    async def find_posted_invoice(self, invoice: Invoice) -> Optional[str]:
+        """Mock lookup of an earlier post of the same invoice"""
+        return next(
+            (doc_id for doc_id, posted in self.posted_invoices.items() if posted["invoice_id"] == str(invoice.id)),
+            None
+        )
+    
+    async def get_invoice_changes(self, since: Optional[datetime], limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Mock modified-since query over the posted invoices"""
+        changes = sorted(
+            ({"erp_doc_id": doc_id, "status": posted["status"], "modified_at": posted["posted_at"]}
+             for doc_id, posted in self.posted_invoices.items()),
+            key=lambda change: change["modified_at"]
+        )
+        if since is not None:
+            changes = [change for change in changes if datetime.fromisoformat(change["modified_at"]) > since]
+        return changes[:limit]
+    
+    async def get_invoice_statuses(self, erp_document_ids: List[str]) -> List[Dict[str, Any]]:
+        return [
+            {"erp_doc_id": doc_id, "status": self.posted_invoices[doc_id]["status"],
+             "modified_at": self.posted_invoices[doc_id]["posted_at"]}
+            for doc_id in erp_document_ids if doc_id in self.posted_invoices
+        ]
+    
+    def set_health_status(self, status: str):
+        """Set mock health status for testing"""
+        self.health_status = status
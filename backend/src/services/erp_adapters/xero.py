@@ -0,0 +1,201 @@
+"""
+Xero adapter (Accounting API)
+"""
+import logging
+from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from services.erp_adapters.base import ERPAdapter, http_limits
+from src.models.invoice import Invoice
+
+logger = logging.getLogger(__name__)
+
+class XeroAdapter(ERPAdapter):
+    """Xero ERP adapter"""
+    
+    erp_type = "xero"
+    idempotency_header = "Idempotency-Key"
+    
+    def __init__(self, connection_config: Dict[str, Any]):
+        self.erp_name = "Xero"
+        self.connection_config = connection_config
+        self.base_url = connection_config.get("base_url")
+        self.api_key = connection_config.get("api_key")
+        self.company_id = connection_config.get("company_id")
+        self.tenant_id = connection_config.get("tenant_id")
+        
+        if not all([self.base_url, self.api_key, self.company_id]):
+            raise ValueError("Missing required Xero connection configuration")
+        
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "Xero-tenant-id": self.tenant_id or self.company_id
+            },
+            timeout=30,
+            limits=http_limits(connection_config)
+        )
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """Check Xero system health"""
+        try:
+            response = await self.client.get("/Organisation")
+            response.raise_for_status()
+            return {
+                "status": "healthy",
+                "erp_name": "Xero",
+                "timestamp": datetime.now(UTC).isoformat(),
+                "tenant_id": self.tenant_id or self.company_id
+            }
+        except Exception as e:
+            return {
+                "status": "unhealthy",
+                "erp_name": "Xero",
+                "error": str(e),
+                "timestamp": datetime.now(UTC).isoformat()
+            }
+    
+    async def post_invoice(self, invoice: Invoice, company_settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Post invoice to Xero"""
+        try:
+            # Validate company settings
+            if not company_settings.get("xero_tenant_id"):
+                raise ValueError("Xero Tenant ID not configured")
+            
+            # Transform invoice to Xero format
+            xero_data = self._transform_to_xero_format(invoice, company_settings)
+            
+            # Post to Xero API
+            # Xero answers a repeated Idempotency-Key with the original bill instead of a second one
+            response = await self.client.post("/Bills", json=xero_data, headers=self.idempotency_headers(company_settings))
+            response.raise_for_status()
+            
+            xero_response = response.json()
+            bill_data = xero_response.get("Bills", [{}])[0]
+            
+            return {
+                "status": "success",
+                "erp_doc_id": bill_data.get("BillID"),
+                "method": "WITHOUT_PO",
+                "timestamp": datetime.now(UTC).isoformat(),
+                "erp_name": "Xero",
+                "posted_at": bill_data.get("DateString"),
+                "xero_data": bill_data,
+                "message": "Invoice posted to Xero successfully"
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to post invoice to Xero: {str(e)}")
+            return {
+                "status": "error",
+                "error": str(e),
+                "message": "Failed to post invoice to Xero"
+            }
+    
+    async def get_invoice_status(self, erp_document_id: str) -> Dict[str, Any]:
+        """Get invoice status from Xero"""
+        try:
+            response = await self.client.get(f"/Bills/{erp_document_id}")
+            response.raise_for_status()
+            
+            xero_data = response.json()
+            bill_data = xero_data.get("Bills", [{}])[0]
+            
+            return {
+                "status": bill_data.get("Status", "unknown"),
+                "erp_doc_id": erp_document_id,
+                "erp_name": "Xero",
+                "xero_data": bill_data
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to get invoice status from Xero: {str(e)}")
+            return {
+                "status": "error",
+                "error": str(e),
+                "erp_doc_id": erp_document_id,
+                "message": "Failed to get invoice status from Xero"
+            }
+    
+    async def get_invoice_changes(self, since: Optional[datetime], limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Bills updated after ``since`` (If-Modified-Since)"""
+        headers = {}
+        if since is not None:
+            headers["If-Modified-Since"] = since.astimezone(UTC).strftime("%Y-%m-%dT%H:%M:%S")
+        response = await self.client.get(
+            "/Bills", params={"order": "UpdatedDateUTC ASC", "pageSize": limit}, headers=headers
+        )
+        response.raise_for_status()
+        return [self._xero_change(bill) for bill in response.json().get("Bills", [])]
+    
+    async def get_invoice_statuses(self, erp_document_ids: List[str]) -> List[Dict[str, Any]]:
+        response = await self.client.get("/Bills", params={"IDs": ",".join(erp_document_ids)})
+        response.raise_for_status()
+        return [self._xero_change(bill) for bill in response.json().get("Bills", [])]
+    
+    @staticmethod
+    def _xero_change(bill: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "erp_doc_id": bill.get("BillID"),
+            "status": bill.get("Status", "unknown"),
+            "modified_at": bill.get("UpdatedDateUTC")
+        }
+    
+    async def validate_connection(self) -> Dict[str, Any]:
+        """Validate Xero connection"""
+        try:
+            response = await self.client.get("/Organisation")
+            response.raise_for_status()
+            
+            org_data = response.json()
+            organisations = org_data.get("Organisations", [])
+            
+            if not organisations:
+                return {
+                    "status": "error",
+                    "message": "No organisations found in Xero account",
+                    "timestamp": datetime.now(UTC).isoformat()
+                }
+            
+            return {
+                "status": "connected",
+                "message": "Xero connection validated successfully",
+                "organisation": organisations[0].get("Name"),
+                "timestamp": datetime.now(UTC).isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"Xero connection validation failed: {str(e)}")
+            return {
+                "status": "error",
+                "message": f"Connection validation failed: {str(e)}",
+                "timestamp": datetime.now(UTC).isoformat()
+            }
+    
+    def _transform_to_xero_format(self, invoice: Invoice, company_settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Transform invoice to Xero format"""
+        return {
+            "Type": "ACCPAY",  # Accounts Payable
+            "Contact": {
+                "Name": invoice.supplier_name
+            },
+            "Date": invoice.invoice_date.isoformat() if invoice.invoice_date else datetime.now().date().isoformat(),
+            "DueDate": invoice.due_date.isoformat() if invoice.due_date else None,
+            "InvoiceNumber": invoice.invoice_number,
+            "Reference": invoice.po_number if hasattr(invoice, 'po_number') else None,
+            "CurrencyCode": invoice.currency if invoice.currency else "USD",
+            "LineItems": [
+                {
+                    "Description": line.description if hasattr(line, 'description') else "",
+                    "Quantity": float(line.quantity) if hasattr(line, 'quantity') and line.quantity else 1.0,
+                    "UnitAmount": float(line.unit_price) if hasattr(line, 'unit_price') and line.unit_price else 0.0,
+                    "LineAmount": float(line.total) if hasattr(line, 'total') and line.total else 0.0,
+                    "AccountCode": line.gl_account if hasattr(line, 'gl_account') else company_settings.get('default_expense_account', '400')
+                }
+                for line in (invoice.line_items if hasattr(invoice, 'line_items') and invoice.line_items else [])
+            ]
+        }
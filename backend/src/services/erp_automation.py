@@ -1,27 +1,34 @@
 """
 ERP Automation Service - Fully Automated ERP Integration
-Handles scheduled syncs, real-time monitoring, and automated error recovery
+Handles outbox-driven syncs, real-time monitoring, and automated error recovery
 """
 import logging
 import asyncio
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-import json
+from datetime import datetime, UTC
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, or_, exists, select
 from enum import Enum
 
 from core.config import settings
-from core.database import get_db
+from core.lazy import LazyService, lazy_import
+from core.database import get_async_sessionmaker, get_db
 from src.models.invoice import Invoice, InvoiceStatus
 from src.models.company import Company
 from src.models.user import User
 from src.models.audit import AuditLog, AuditAction, AuditResourceType
-from services.erp import ERPIntegrationService
-from services.dynamics_gp_integration import DynamicsGPIntegration
+from src.models.erp_sync import ERPSyncJob
+from services.erp import ERPAdapter, ERPIntegrationService
+from services.erp_status_sync import DEFAULT_CONNECTION
+from services.erp_sync_queue import ERPSyncQueue, ERPSyncPermanentError
+from services.vendor_resolution import vendor_resolver
 
 logger = logging.getLogger(__name__)
 
+# GP eConnect, its connection pool and the three-way matcher only load for companies syncing to GP
+dynamics_gp_integration = lazy_import("services.dynamics_gp_integration")
+
 class SyncStatus(Enum):
     PENDING = "pending"
     IN_PROGRESS = "in_progress"
@@ -37,13 +44,20 @@ class AutomationRule(Enum):
     DUPLICATE_DETECTION = "duplicate_detection"
     VENDOR_AUTO_MAPPING = "vendor_auto_mapping"
 
+# ERP systems an invoice can be synced to; each has its own worker pool and rate limit
+ERP_TYPES = ("dynamics_gp", "sap", "quickbooks", "xero")
+
 class ERPAutomationService:
     """Fully automated ERP integration service"""
     
-    def __init__(self):
+    def __init__(self, session_factory: Optional[async_sessionmaker] = None, **queue_options):
+        # Sessions default to the shared async engine; ``queue_options`` override the
+        # outbox queue's settings (workers, rate limits, attempts, backoff)
+        self._session_factory = session_factory
         self.erp_service = ERPIntegrationService()
-        self.dynamics_gp = DynamicsGPIntegration()
-        self.sync_queue = []
+        self.vendor_resolver = vendor_resolver.get()
+        # The shared GP service: the one the master-data mirror attaches to and the lifespan closes
+        self.dynamics_gp = LazyService(lambda: dynamics_gp_integration.dynamics_gp_integration.get())
         self.monitoring_active = True
         self.automation_rules = {
             AutomationRule.AUTO_SYNC_ON_APPROVAL: True,
@@ -53,16 +67,30 @@ class ERPAutomationService:
             AutomationRule.DUPLICATE_DETECTION: True,
             AutomationRule.VENDOR_AUTO_MAPPING: True
         }
+        # Retries (with backoff) are the error auto-recovery; with the rule off failures dead-letter at once
+        self.sync_queue = ERPSyncQueue(
+            self._process_sync_job,
+            session_factory,
+            retry_enabled=lambda: self.automation_rules[AutomationRule.ERROR_AUTO_RECOVERY],
+            on_dead_letter=self._on_dead_letter,
+            **queue_options
+        )
+    
+    def _session(self) -> AsyncSession:
+        if self._session_factory is None:
+            self._session_factory = get_async_sessionmaker()
+        return self._session_factory()
         
     async def start_automation_engine(self):
         """Start the automation engine with all automated processes"""
         logger.info("🚀 Starting ERP Automation Engine...")
         
+        await self.sync_queue.start()
+        
         # Start all automation tasks concurrently
         tasks = [
-            self._scheduled_sync_worker(),
+            self._outbox_sweeper(),
             self._real_time_monitor(),
-            self._error_recovery_worker(),
             self._duplicate_detection_worker(),
             self._vendor_mapping_worker(),
             self._health_monitor()
@@ -70,15 +98,23 @@ class ERPAutomationService:
         
         await asyncio.gather(*tasks, return_exceptions=True)
     
+    def enabled_erp_types(self, company: Company) -> List[str]:
+        """ERP systems the company syncs invoices to"""
+        return [erp_type for erp_type in ERP_TYPES if getattr(company, f"erp_{erp_type}_enabled", False)]
+    
+    def enqueue_invoice_sync(self, invoice: Invoice, db: Session) -> List[ERPSyncJob]:
+        """Queue an approved invoice for every enabled ERP in the caller's transaction"""
+        company = db.query(Company).filter(Company.id == invoice.company_id).first()
+        if not company:
+            return []
+        return self.sync_queue.enqueue(db, invoice.id, invoice.company_id, self.enabled_erp_types(company))
+    
     async def auto_sync_on_approval(self, invoice_id: str, company_id: str, db: Session) -> Dict[str, Any]:
-        """Automatically sync invoice to ERP when approved"""
+        """Queue an approved invoice for sync to its company's ERP systems"""
         if not self.automation_rules[AutomationRule.AUTO_SYNC_ON_APPROVAL]:
             return {"status": "disabled", "message": "Auto-sync on approval is disabled"}
         
         try:
-            logger.info(f"🔄 Auto-syncing approved invoice {invoice_id} to ERP...")
-            
-            # Get invoice
             invoice = db.query(Invoice).filter(
                 and_(Invoice.id == invoice_id, Invoice.company_id == company_id)
             ).first()
@@ -89,54 +125,25 @@ class ERPAutomationService:
             if invoice.status != InvoiceStatus.APPROVED:
                 return {"status": "error", "message": "Invoice not approved"}
             
-            # Get company ERP configuration
             company = db.query(Company).filter(Company.id == company_id).first()
-            erp_config = self._get_erp_config(company)
+            erp_types = self.enabled_erp_types(company) if company else []
             
-            if not erp_config:
+            if not erp_types:
                 return {"status": "error", "message": "No ERP configuration found"}
             
-            # Determine ERP system and sync
-            sync_results = {}
-            
-            # Dynamics GP Integration
-            if erp_config.get("dynamics_gp_enabled"):
-                gp_result = await self._sync_to_dynamics_gp(invoice, erp_config["dynamics_gp"])
-                sync_results["dynamics_gp"] = gp_result
-            
-            # SAP Integration
-            if erp_config.get("sap_enabled"):
-                sap_result = await self._sync_to_sap(invoice, erp_config["sap"])
-                sync_results["sap"] = sap_result
-            
-            # QuickBooks Integration
-            if erp_config.get("quickbooks_enabled"):
-                qb_result = await self._sync_to_quickbooks(invoice, erp_config["quickbooks"])
-                sync_results["quickbooks"] = qb_result
-            
-            # Xero Integration
-            if erp_config.get("xero_enabled"):
-                xero_result = await self._sync_to_xero(invoice, erp_config["xero"])
-                sync_results["xero"] = xero_result
-            
-            # Update invoice with ERP sync status
-            await self._update_invoice_erp_status(invoice, sync_results, db)
-            
-            # Create audit log
-            self._create_audit_log(
-                db, invoice.approved_by_id, company_id,
-                AuditAction.CREATE, AuditResourceType.INVOICE,
-                str(invoice.id), f"Invoice auto-synced to ERP systems: {list(sync_results.keys())}"
-            )
+            jobs = self.sync_queue.enqueue(db, invoice.id, invoice.company_id, erp_types)
+            db.commit()
             
             return {
-                "status": "success",
-                "message": f"Invoice automatically synced to {len(sync_results)} ERP systems",
-                "sync_results": sync_results,
-                "synced_at": datetime.now(UTC).isoformat()
+                "status": "queued",
+                "message": f"Invoice queued for sync to {len(erp_types)} ERP systems",
+                "erp_systems": erp_types,
+                "queued_jobs": [job.idempotency_key for job in jobs],
+                "queued_at": datetime.now(UTC).isoformat()
             }
             
         except Exception as e:
+            db.rollback()
             logger.error(f"Auto-sync failed for invoice {invoice_id}: {str(e)}")
             return {
                 "status": "error",
@@ -144,87 +151,158 @@ class ERPAutomationService:
                 "invoice_id": invoice_id
             }
     
-    async def _scheduled_sync_worker(self):
-        """Background worker for scheduled ERP synchronization"""
-        logger.info("📅 Starting scheduled sync worker...")
+    async def sync_invoice(self, invoice: Invoice, erp_type: str, erp_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Push one invoice to one ERP system
+        
+        ERPs without automation of their own (Business Central, registry
+        plugins) post straight through their adapter.
+        """
+        sync_methods = {
+            "dynamics_gp": self._sync_to_dynamics_gp,
+            "sap": self._sync_to_sap,
+            "quickbooks": self._sync_to_quickbooks,
+            "xero": self._sync_to_xero
+        }
+        sync = sync_methods.get(erp_type)
+        if sync is None:
+            return await self.erp_service.post_invoice(erp_type, invoice, erp_config)
+        return await sync(invoice, erp_config)
+    
+    async def _process_sync_job(self, job: ERPSyncJob) -> Dict[str, Any]:
+        """Outbox handler: sync the job's invoice to the job's ERP
+        
+        Runs on the async session, so the queue's workers never block the event
+        loop on the database.
+        """
+        async with self._session() as db:
+            invoice = await db.scalar(
+                select(Invoice).options(selectinload(Invoice.line_items)).where(Invoice.id == job.invoice_id)
+            )
+            if not invoice:
+                raise ERPSyncPermanentError("Invoice no longer exists")
+            if invoice.status != InvoiceStatus.APPROVED:
+                raise ERPSyncPermanentError(f"Invoice is {invoice.status.value}, not approved")
+            
+            company = await db.scalar(select(Company).where(Company.id == job.company_id))
+            erp_config = self._get_erp_config(company) if company else {}
+            if not erp_config.get(f"{job.erp_type}_enabled"):
+                raise ERPSyncPermanentError(f"{job.erp_type} is no longer configured for the company")
+            
+            # An earlier attempt may have reached the ERP before failing; don't post the invoice twice
+            result = None
+            if job.attempts > 1 or job.last_error:
+                result = await self._find_posted_document(invoice, job.erp_type, erp_config[job.erp_type])
+            if result is None:
+                # Adapters send the key in the ERP's idempotency header where it has one
+                result = await self.sync_invoice(
+                    invoice, job.erp_type, {**erp_config[job.erp_type], "idempotency_key": job.idempotency_key}
+                )
+            
+            if result.get("status") == "success":
+                await self._update_invoice_erp_status(invoice, job.erp_type, result, db)
+                await self._create_audit_log(
+                    db, invoice.approved_by_id, invoice.company_id,
+                    AuditAction.ERP_SYNC, AuditResourceType.INVOICE,
+                    invoice.id, f"Invoice auto-synced to {job.erp_type}"
+                )
+            return result
+    
+    async def _find_posted_document(self, invoice: Invoice, erp_type: str,
+                                    erp_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """A success result for a document an earlier attempt already created, else None
+        
+        ERPs that deduplicate by idempotency header need no lookup; the retried
+        post returns the original document.
+        """
+        if erp_type == "dynamics_gp":
+            erp_doc_id = await self.dynamics_gp.find_payables_transaction(
+                invoice.invoice_number, float(invoice.total_amount or 0), erp_config["company_db"]
+            )
+        else:
+            adapter = self.erp_service.get_adapter(erp_type)
+            if adapter is None or adapter.idempotency_header:
+                return None
+            erp_doc_id = await adapter.find_posted_invoice(invoice)
+        if not erp_doc_id:
+            return None
+        logger.info(f"Invoice {invoice.invoice_number} is already in {erp_type} as {erp_doc_id}; not re-posting")
+        return {
+            "status": "success",
+            "method": "already_posted",
+            "erp_doc_id": erp_doc_id,
+            "message": f"Invoice was already posted to {erp_type}"
+        }
+    
+    async def _on_dead_letter(self, job: ERPSyncJob, error: str):
+        db = next(get_db())
+        
+        try:
+            invoice = db.query(Invoice).filter(Invoice.id == job.invoice_id).first()
+            if not invoice:
+                return
+            invoice.erp_error_message = f"{job.erp_type}: {error}"
+            db.commit()
+            await self._notify_admin_of_failure(invoice, {
+                "erp_type": job.erp_type, "attempts": job.attempts, "message": error
+            })
+        finally:
+            db.close()
+    
+    async def _outbox_sweeper(self):
+        """Queue approved invoices that reached APPROVED without passing through the approval hook"""
+        logger.info("📅 Starting ERP outbox sweeper...")
         
         while self.monitoring_active:
             try:
                 if self.automation_rules[AutomationRule.SCHEDULED_SYNC]:
-                    await self._run_scheduled_sync()
+                    await self._sweep_unqueued_invoices()
                 
                 # Run every 5 minutes
                 await asyncio.sleep(300)
                 
             except Exception as e:
-                logger.error(f"Scheduled sync worker error: {str(e)}")
+                logger.error(f"Outbox sweeper error: {str(e)}")
                 await asyncio.sleep(60)  # Wait 1 minute before retrying
     
-    async def _run_scheduled_sync(self):
-        """Run scheduled synchronization for all companies"""
-        logger.info("🔄 Running scheduled ERP sync...")
-        
-        # Get database session
+    async def _sweep_unqueued_invoices(self) -> int:
+        """Enqueue approved, unposted invoices that have no outbox entries"""
         db = next(get_db())
         
         try:
-            # Get all companies with ERP integrations
-            companies = db.query(Company).filter(
-                or_(
-                    Company.erp_dynamics_gp_enabled == True,
-                    Company.erp_sap_enabled == True,
-                    Company.erp_quickbooks_enabled == True,
-                    Company.erp_xero_enabled == True
-                )
+            unqueued = db.query(Invoice).filter(
+                Invoice.status == InvoiceStatus.APPROVED,
+                Invoice.posted_to_erp == False,
+                ~exists().where(ERPSyncJob.invoice_id == Invoice.id)
             ).all()
             
-            for company in companies:
-                await self._sync_company_data(company, db)
-                
-        except Exception as e:
-            logger.error(f"Scheduled sync failed: {str(e)}")
-        finally:
-            db.close()
-    
-    async def _sync_company_data(self, company: Company, db: Session):
-        """Sync all pending data for a company"""
-        try:
-            # Get approved invoices not yet synced to ERP
-            pending_invoices = db.query(Invoice).filter(
-                and_(
-                    Invoice.company_id == company.id,
-                    Invoice.status == InvoiceStatus.APPROVED,
-                    Invoice.erp_sync_status.in_(["pending", "failed"])
-                )
-            ).all()
+            queued = 0
+            for invoice in unqueued:
+                queued += len(self.enqueue_invoice_sync(invoice, db))
+            db.commit()
             
-            logger.info(f"📋 Syncing {len(pending_invoices)} invoices for company {company.name}")
+            if queued:
+                logger.info(f"📋 Queued {queued} ERP syncs for {len(unqueued)} approved invoices")
+            return queued
             
-            for invoice in pending_invoices:
-                sync_result = await self.auto_sync_on_approval(
-                    str(invoice.id), str(company.id), db
-                )
-                
-                if sync_result["status"] == "success":
-                    logger.info(f"✅ Invoice {invoice.invoice_number} synced successfully")
-                else:
-                    logger.warning(f"⚠️ Invoice {invoice.invoice_number} sync failed: {sync_result.get('message')}")
-                
-                # Small delay between syncs to avoid overwhelming ERP systems
-                await asyncio.sleep(1)
-                
         except Exception as e:
-            logger.error(f"Company sync failed for {company.name}: {str(e)}")
+            db.rollback()
+            logger.error(f"Outbox sweep failed: {str(e)}")
+            return 0
+        finally:
+            db.close()
     
     async def _real_time_monitor(self):
-        """Real-time monitoring of ERP system health and sync status"""
+        """Real-time monitoring of ERP system health
+        
+        Document statuses are not polled here; ``services.erp_status_sync``
+        reconciles them in bulk from each ERP's change feed and webhooks.
+        """
         logger.info("📡 Starting real-time ERP monitor...")
         
         while self.monitoring_active:
             try:
                 if self.automation_rules[AutomationRule.REAL_TIME_MONITORING]:
                     await self._check_erp_health()
-                    await self._monitor_sync_queues()
                 
                 # Monitor every 30 seconds
                 await asyncio.sleep(30)
@@ -247,91 +325,36 @@ class ERPAutomationService:
                 )
             ).all()
             
+            checks = []
             for company in companies:
                 erp_config = self._get_erp_config(company)
                 
                 # Check each enabled ERP system
                 if erp_config.get("dynamics_gp_enabled"):
-                    health = await self.dynamics_gp.health_check(erp_config["dynamics_gp"]["company_db"])
-                    await self._log_health_status("Dynamics GP", company.id, health)
+                    checks.append(("Dynamics GP", company.id,
+                                   self.dynamics_gp.health_check(erp_config["dynamics_gp"]["company_db"])))
                 
                 if erp_config.get("sap_enabled"):
-                    health = await self.erp_service.health_check("sap")
-                    await self._log_health_status("SAP", company.id, health)
+                    checks.append(("SAP", company.id, self.erp_service.health_check("sap")))
                 
                 if erp_config.get("quickbooks_enabled"):
-                    health = await self.erp_service.health_check("quickbooks")
-                    await self._log_health_status("QuickBooks", company.id, health)
+                    checks.append(("QuickBooks", company.id, self.erp_service.health_check("quickbooks")))
                 
                 if erp_config.get("xero_enabled"):
-                    health = await self.erp_service.health_check("xero")
-                    await self._log_health_status("Xero", company.id, health)
+                    checks.append(("Xero", company.id, self.erp_service.health_check("xero")))
+            
+            # All systems are checked at once; the adapters' bulkheads bound each ERP
+            results = await asyncio.gather(*[check for _, _, check in checks], return_exceptions=True)
+            for (erp_name, company_id, _), health in zip(checks, results):
+                if isinstance(health, Exception):
+                    health = {"status": "error", "error": str(health)}
+                await self._log_health_status(erp_name, company_id, health)
                     
         except Exception as e:
             logger.error(f"Health check failed: {str(e)}")
         finally:
             db.close()
     
-    async def _error_recovery_worker(self):
-        """Automated error recovery for failed ERP operations"""
-        logger.info("🔧 Starting error recovery worker...")
-        
-        while self.monitoring_active:
-            try:
-                if self.automation_rules[AutomationRule.ERROR_AUTO_RECOVERY]:
-                    await self._retry_failed_syncs()
-                
-                # Run every 10 minutes
-                await asyncio.sleep(600)
-                
-            except Exception as e:
-                logger.error(f"Error recovery worker failed: {str(e)}")
-                await asyncio.sleep(300)
-    
-    async def _retry_failed_syncs(self):
-        """Automatically retry failed ERP synchronizations"""
-        db = next(get_db())
-        
-        try:
-            # Get invoices with failed ERP sync that are eligible for retry
-            failed_invoices = db.query(Invoice).filter(
-                and_(
-                    Invoice.erp_sync_status == "failed",
-                    Invoice.erp_retry_count < 3,
-                    Invoice.approved_at > datetime.now(UTC) - timedelta(hours=24)
-                )
-            ).all()
-            
-            logger.info(f"🔄 Retrying {len(failed_invoices)} failed ERP syncs...")
-            
-            for invoice in failed_invoices:
-                # Increment retry count
-                invoice.erp_retry_count = (invoice.erp_retry_count or 0) + 1
-                db.commit()
-                
-                # Retry sync
-                retry_result = await self.auto_sync_on_approval(
-                    str(invoice.id), str(invoice.company_id), db
-                )
-                
-                if retry_result["status"] == "success":
-                    logger.info(f"✅ Retry successful for invoice {invoice.invoice_number}")
-                    invoice.erp_sync_status = "completed"
-                else:
-                    logger.warning(f"⚠️ Retry failed for invoice {invoice.invoice_number}")
-                    if invoice.erp_retry_count >= 3:
-                        invoice.erp_sync_status = "failed_final"
-                        # Send notification to admin
-                        await self._notify_admin_of_failure(invoice, retry_result)
-                
-                db.commit()
-                await asyncio.sleep(2)  # Delay between retries
-                
-        except Exception as e:
-            logger.error(f"Error recovery failed: {str(e)}")
-        finally:
-            db.close()
-    
     async def _duplicate_detection_worker(self):
         """Automated duplicate invoice detection across ERP systems"""
         logger.info("🔍 Starting duplicate detection worker...")
@@ -585,33 +608,27 @@ class ERPAutomationService:
         
         return config
     
-    async def _update_invoice_erp_status(self, invoice: Invoice, sync_results: Dict[str, Any], db: Session):
-        """Update invoice with ERP sync status"""
+    async def _update_invoice_erp_status(self, invoice: Invoice, erp_type: str, sync_result: Dict[str, Any],
+                                         db: AsyncSession):
+        """Record a successful ERP posting on the invoice"""
         try:
-            # Determine overall sync status
-            all_success = all(result.get("status") == "success" for result in sync_results.values())
-            any_success = any(result.get("status") == "success" for result in sync_results.values())
-            
-            if all_success:
-                invoice.erp_sync_status = "completed"
-            elif any_success:
-                invoice.erp_sync_status = "partial"
-            else:
-                invoice.erp_sync_status = "failed"
+            invoice.posted_to_erp = True
+            invoice.erp_document_id = sync_result.get("erp_doc_id") or invoice.erp_document_id
+            # Outbox jobs post through the settings-configured adapters
+            invoice.erp_type = erp_type
+            invoice.erp_connection_key = DEFAULT_CONNECTION
+            invoice.erp_posting_date = datetime.now(UTC)
+            invoice.erp_error_message = None
             
-            # Store sync results
-            invoice.erp_sync_results = json.dumps(sync_results)
-            invoice.erp_synced_at = datetime.now(UTC)
-            
-            db.commit()
+            await db.commit()
             
         except Exception as e:
             logger.error(f"Failed to update invoice ERP status: {str(e)}")
-            db.rollback()
+            await db.rollback()
     
-    def _create_audit_log(self, db: Session, user_id: str, company_id: str, 
-                         action: AuditAction, resource_type: AuditResourceType, 
-                         resource_id: str, details: str):
+    async def _create_audit_log(self, db: AsyncSession, user_id: str, company_id: str,
+                                action: AuditAction, resource_type: AuditResourceType,
+                                resource_id: Any, details: str):
         """Create audit log entry"""
         try:
             audit_log = AuditLog(
@@ -624,14 +641,16 @@ class ERPAutomationService:
                 timestamp=datetime.now(UTC)
             )
             db.add(audit_log)
-            db.commit()
+            await db.commit()
         except Exception as e:
             logger.error(f"Failed to create audit log: {str(e)}")
+            await db.rollback()
     
     async def _notify_admin_of_failure(self, invoice: Invoice, error_result: Dict[str, Any]):
         """Notify admin of persistent ERP sync failures"""
         # In production, this would send email/Slack notification
-        logger.error(f"🚨 ADMIN ALERT: Invoice {invoice.invoice_number} failed ERP sync after 3 retries")
+        logger.error(f"🚨 ADMIN ALERT: Invoice {invoice.invoice_number} failed ERP sync after "
+                     f"{error_result.get('attempts')} attempts")
         logger.error(f"Error details: {error_result}")
     
     def _transform_invoice_to_gp_format(self, invoice: Invoice) -> Dict[str, Any]:
@@ -642,7 +661,7 @@ class ERPAutomationService:
             "invoice_date": invoice.invoice_date.isoformat() if invoice.invoice_date else None,
             "due_date": invoice.due_date.isoformat() if invoice.due_date else None,
             "total_amount": float(invoice.total_amount),
-            "description": invoice.description,
+            "description": invoice.notes,
             "purchase_order": invoice.po_number
         }
     
@@ -653,7 +672,7 @@ class ERPAutomationService:
             "CompanyCode": sap_config.get("company_code", "1000"),
             "DocumentDate": invoice.invoice_date.isoformat() if invoice.invoice_date else None,
             "PostingDate": datetime.now(UTC).isoformat(),
-            "DocumentHeaderText": invoice.description,
+            "DocumentHeaderText": invoice.notes,
             "Reference": invoice.invoice_number,
             "BusinessPartner": invoice.supplier_name,
             "DocumentCurrency": invoice.currency or "USD",
@@ -661,15 +680,25 @@ class ERPAutomationService:
         }
     
     async def _auto_map_vendor_quickbooks(self, vendor_name: str, qb_config: Dict[str, Any]) -> str:
-        """Automatically map vendor to QuickBooks vendor ID"""
-        # In production, this would query QB API for existing vendors
-        # and create new ones if needed
-        return "1"  # Default vendor ref
+        """Automatically map vendor to QuickBooks vendor ID
+        
+        Goes through the shared vendor resolver, so a supplier mapped once (by
+        the adapter's lookup or by hand) is not looked up again; unresolved
+        suppliers post against the default vendor.
+        """
+        adapter = self.erp_service.get_adapter("quickbooks")
+        match = await self.vendor_resolver.resolve(
+            "quickbooks",
+            qb_config.get("realm_id") or qb_config.get("company_id") or "default",
+            vendor_name,
+            adapter.find_vendor if isinstance(adapter, ERPAdapter) else None
+        )
+        return match.vendor_ref if match is not None else qb_config.get("default_vendor_ref", "1")
     
     async def _auto_categorize_invoice(self, invoice: Invoice) -> str:
         """Automatically categorize invoice for proper GL coding"""
         # Simple categorization based on description
-        description = (invoice.description or "").lower()
+        description = (invoice.notes or "").lower()
         
         if any(word in description for word in ["software", "license", "subscription"]):
             return "Software & Technology"
@@ -685,7 +714,7 @@ class ERPAutomationService:
             return "General Expenses"
 
 # Global automation service instance
-erp_automation = ERPAutomationService()
+erp_automation = LazyService(ERPAutomationService)
 
 async def start_erp_automation():
     """Start the ERP automation engine"""
@@ -0,0 +1,169 @@
+"""
+Bulkheads for ERP adapter calls
+
+Every adapter call made by ``ERPIntegrationService`` goes through the
+``Bulkhead`` of its ERP connection. A bulkhead:
+
+- bounds concurrent calls to one ERP, and bounds how many more may wait, so
+  a slow ERP ties up only its own slots instead of every request worker;
+- puts a timeout on each call;
+- trips a circuit breaker after consecutive failures, failing calls fast for
+  ``reset_timeout`` seconds. After that a single probe call is let through
+  and its outcome closes or re-opens the circuit.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BulkheadRejectedError(Exception):
+    """The call was refused without reaching the ERP (circuit open or bulkhead full)"""
+
+
+class CircuitOpenError(BulkheadRejectedError):
+    pass
+
+
+class BulkheadFullError(BulkheadRejectedError):
+    pass
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one probe) -> closed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self._opened_at = self._clock()
+        self._probing = False
+
+    def abandon_probe(self):
+        """The half-open probe never reached the ERP; let the next call probe instead"""
+        self._probing = False
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+
+def _failed_result(result: Any) -> bool:
+    # Adapters report ERP-side failures as result dicts rather than exceptions
+    return isinstance(result, dict) and result.get("status") in ("error", "unhealthy")
+
+
+class Bulkhead:
+    """Concurrency limit, timeout and circuit breaker for one ERP connection"""
+
+    def __init__(self, name: str, max_concurrent: int = 8, max_waiting: int = 32, timeout: float = 30.0,
+                 breaker: CircuitBreaker = None, is_failure: Callable[[Any], bool] = _failed_result):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.is_failure = is_failure
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.stats = {"calls": 0, "failures": 0, "timeouts": 0, "rejected": 0, "short_circuited": 0}
+
+    async def call(self, fn: Callable[..., Awaitable[Any]], *args, timeout: float = None, **kwargs) -> Any:
+        if not self.breaker.allow():
+            self.stats["short_circuited"] += 1
+            raise CircuitOpenError(
+                f"{self.name} circuit open after {self.breaker.failures} failures; "
+                f"retry in {self.breaker.retry_after():.0f}s"
+            )
+        if self.active >= self.max_concurrent and self.waiting >= self.max_waiting:
+            self.stats["rejected"] += 1
+            self.breaker.abandon_probe()
+            raise BulkheadFullError(f"{self.name} has {self.active} calls in flight and {self.waiting} waiting")
+
+        timeout = self.timeout if timeout is None else timeout
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            self.breaker.abandon_probe()
+            raise
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.stats["calls"] += 1
+        try:
+            result = await asyncio.wait_for(fn(*args, **kwargs), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            self._failure()
+            raise asyncio.TimeoutError(f"{self.name} did not answer within {timeout:g}s") from None
+        except asyncio.CancelledError:
+            self.breaker.abandon_probe()
+            raise
+        except Exception:
+            self._failure()
+            raise
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+        if self.is_failure(result):
+            self._failure()
+        else:
+            self.breaker.record_success()
+        return result
+
+    def _failure(self):
+        self.stats["failures"] += 1
+        was_open = self.breaker.state != CircuitBreaker.CLOSED
+        self.breaker.record_failure()
+        if not was_open and self.breaker.state == CircuitBreaker.OPEN:
+            logger.warning(f"ERP circuit for {self.name} opened after {self.breaker.failures} consecutive failures")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            **self.stats
+        }
@@ -0,0 +1,627 @@
+"""
+Simulated ERP backends and a load driver for the ERP integration paths
+
+``SimulatedERP`` stands in for the Dynamics GP, Business Central or Xero HTTP
+API the adapters in ``services.erp`` call, with configurable behaviour:
+log-normal response latency, a request rate limit answered with 429 and
+``Retry-After``, server errors, hung requests and "lost responses" (the
+document is created but the caller sees a 502, so a retry creates a
+duplicate). It runs in process as an httpx transport, or as a local HTTP
+server for pointing a running application at it:
+
+    server = SimulatedERP("xero", SimulationProfile(latency_ms=80, rate_limit=20, error_rate=0.02))
+    report = await run_integration_load(server, synthetic_invoices(500), rate=50)
+    print(report.summary())
+
+    PYTHONPATH=src python -m services.erp_simulation run --erp xero --invoices 500 --rate 50 --rate-limit 20
+    PYTHONPATH=src python -m services.erp_simulation serve --erp d365_bc --port 8801
+
+``run_integration_load`` replays invoices through ``ERPIntegrationService``
+(bulkheads and circuit breakers, no retries). ``run_sync_queue_load`` replays
+them through the outbox queue of ``ERPAutomationService`` and its real job
+handler (per-ERP workers, rate limiting, retries with backoff, idempotency
+keys and lookups before re-posting) against invoices seeded with
+``seed_invoices``. Both return a ``LoadReport`` with throughput, end-to-end
+latency percentiles and retry amplification (requests the ERP received per
+invoice).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, UTC
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from services.erp import ADAPTER_CLASSES, ERPAdapter, ERPIntegrationService
+from src.models.invoice import Invoice, InvoiceStatus
+
+SIMULATED_ERPS = tuple(ADAPTER_CLASSES)
+# ERPs the automation engine posts to over their HTTP adapters (it posts GP through eConnect)
+SYNC_QUEUE_ERPS = ("d365_bc", "xero")
+
+# Settings each adapter's post_invoice requires
+COMPANY_SETTINGS = {
+    "dynamics_gp": {"gp_company_id": "SIM", "gp_vendor_id": "SIMVENDOR"},
+    "d365_bc": {"bc_environment": "simulation"},
+    "xero": {"xero_tenant_id": "simulation"}
+}
+
+# Field carrying the supplier's invoice number in each ERP's posting payload
+_INVOICE_NUMBER_FIELDS = {"dynamics_gp": "invoice_number", "d365_bc": "invoiceNumber", "xero": "InvoiceNumber"}
+
+
+@dataclass
+class SimulationProfile:
+    """How a simulated ERP behaves under load; rates are probabilities per request"""
+    latency_ms: float = 50.0
+    latency_p95_ms: float = 150.0
+    # Requests per second before answering 429 (0 disables), with bursts of ``burst``
+    rate_limit: float = 0.0
+    burst: Optional[int] = None
+    retry_after_seconds: float = 1.0
+    error_rate: float = 0.0
+    # The request never answers (the caller's timeout decides what happens)
+    hang_rate: float = 0.0
+    hang_seconds: float = 300.0
+    # Postings that are committed but answered with 502, as when a gateway drops the response
+    lost_response_rate: float = 0.0
+    seed: Optional[int] = None
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Seconds, log-normal with the configured median and 95th percentile"""
+        median = max(self.latency_ms, 0.0) / 1000
+        if median == 0:
+            return 0.0
+        sigma = max(math.log(max(self.latency_p95_ms, self.latency_ms) / self.latency_ms), 0.0) / 1.645
+        return rng.lognormvariate(math.log(median), sigma)
+
+
+class SimulatedERP:
+    """In-memory Dynamics GP, Business Central or Xero API with injected latency and failures"""
+
+    def __init__(self, kind: str, profile: SimulationProfile = None, company_id: str = "SIM"):
+        if kind not in SIMULATED_ERPS:
+            raise ValueError(f"Unsupported ERP type: {kind}")
+        self.kind = kind
+        self.profile = profile or SimulationProfile()
+        self.company_id = company_id
+        self.base_url = f"http://{kind.replace('_', '-')}.simulated"
+        self._rng = random.Random(self.profile.seed)
+        self._tokens = float(self.profile.burst or max(1.0, self.profile.rate_limit))
+        self._refilled = time.monotonic()
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.stats = Counter()
+        self.responses = Counter()
+        self.posted_numbers = Counter()
+        # Xero answers a repeated Idempotency-Key with the document it created the first time
+        self.idempotent_documents: Dict[str, str] = {}
+
+    # Transport
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def adapter(self, **connection_config) -> ERPAdapter:
+        """An adapter of the simulated ERP's type whose HTTP client talks to this simulation"""
+        config = {"base_url": self.base_url, "api_key": "simulation", "company_id": self.company_id,
+                  **connection_config}
+        adapter = ADAPTER_CLASSES[self.kind](config)
+        adapter.client = httpx.AsyncClient(
+            base_url=self.base_url, headers=adapter.client.headers, timeout=adapter.client.timeout,
+            transport=self.transport()
+        )
+        return adapter
+
+    def _rate_limited(self) -> bool:
+        if self.profile.rate_limit <= 0:
+            return False
+        now = time.monotonic()
+        capacity = float(self.profile.burst or max(1.0, self.profile.rate_limit))
+        self._tokens = min(capacity, self._tokens + (now - self._refilled) * self.profile.rate_limit)
+        self._refilled = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.stats["requests"] += 1
+        posting = request.method == "POST"
+        if posting:
+            self.stats["post_requests"] += 1
+        response = await self._respond(request, posting)
+        self.responses[response.status_code] += 1
+        return response
+
+    async def _respond(self, request: httpx.Request, posting: bool) -> httpx.Response:
+        if self._rate_limited():
+            return httpx.Response(429, headers={"Retry-After": f"{self.profile.retry_after_seconds:g}"},
+                                  json={"message": "Rate limit exceeded"})
+        await asyncio.sleep(self.profile.sample_latency(self._rng))
+        roll = self._rng.random()
+        if roll < self.profile.hang_rate:
+            await asyncio.sleep(self.profile.hang_seconds)
+        roll -= self.profile.hang_rate
+        if roll < self.profile.error_rate:
+            return httpx.Response(503, json={"message": "Simulated ERP error"})
+        roll -= self.profile.error_rate
+
+        try:
+            body = json.loads(request.content) if request.content else {}
+        except ValueError:
+            return httpx.Response(400, json={"message": "Malformed JSON"})
+        response = self._route(request, body)
+        if posting and response.status_code < 300 and roll < self.profile.lost_response_rate:
+            self.stats["lost_responses"] += 1
+            return httpx.Response(502, json={"message": "Bad gateway"})
+        return response
+
+    # ERP APIs
+
+    def _route(self, request: httpx.Request, body: Dict[str, Any]) -> httpx.Response:
+        path, method = request.url.path, request.method
+        if self.kind == "dynamics_gp":
+            collection, detail = "/api/purchasing/invoices", r"/api/purchasing/invoices/([^/]+)"
+            if path == "/api/health":
+                return httpx.Response(200, json={"version": "simulated"})
+        elif self.kind == "d365_bc":
+            collection = f"/companies({self.company_id})/purchaseInvoices"
+            detail = re.escape(collection) + r"\(([^)]+)\)"
+            if path == f"/companies({self.company_id})":
+                return httpx.Response(200, json={"id": self.company_id, "name": "Simulated company"})
+        else:
+            collection, detail = "/Bills", r"/Bills/([^/]+)"
+            if path == "/Organisation":
+                return httpx.Response(200, json={"Organisations": [{"Name": "Simulated organisation"}]})
+
+        if path == collection and method == "POST":
+            key = request.headers.get("Idempotency-Key") if self.kind == "xero" else None
+            if key in self.idempotent_documents:
+                self.stats["idempotent_replays"] += 1
+                return self._document_response(self.documents[self.idempotent_documents[key]])
+            document = self._create(body)
+            if key:
+                self.idempotent_documents[key] = document["id"]
+            return self._document_response(document)
+        if path == collection and method == "GET":
+            documents = self._query(request.url.params)
+            key = {"dynamics_gp": "invoices", "d365_bc": "value", "xero": "Bills"}[self.kind]
+            return httpx.Response(200, json={key: [self._document_body(document) for document in documents]})
+        match = re.fullmatch(detail, path)
+        if match and method == "GET":
+            document = self.documents.get(match.group(1))
+            if document is None:
+                return httpx.Response(404, json={"message": "Document not found"})
+            return self._document_response(document)
+        return httpx.Response(404, json={"message": f"No simulated route for {method} {path}"})
+
+    def _create(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        number = body.get(_INVOICE_NUMBER_FIELDS[self.kind])
+        if number:
+            self.posted_numbers[number] += 1
+        document = {"id": f"SIM-{uuid.uuid4().hex[:12].upper()}", "invoice_number": number,
+                    "status": "posted", "modified_at": datetime.now(UTC)}
+        self.documents[document["id"]] = document
+        return document
+
+    def _query(self, params: httpx.QueryParams) -> List[Dict[str, Any]]:
+        ids = params.get("document_ids") or params.get("IDs")
+        documents = sorted(self.documents.values(), key=lambda document: document["modified_at"])
+        if ids:
+            wanted = set(ids.split(","))
+            documents = [document for document in documents if document["id"] in wanted]
+        # Lookups by supplier invoice number (GP's parameter, BC's OData filter)
+        number = params.get("invoice_number")
+        match = re.search(r"invoiceNumber eq '((?:[^']|'')*)'", params.get("$filter", ""))
+        if match:
+            number = match.group(1).replace("''", "'")
+        if number is not None:
+            documents = [document for document in documents if document["invoice_number"] == number]
+        limit = params.get("limit") or params.get("$top") or params.get("pageSize")
+        return documents[:int(limit)] if limit else documents
+
+    def _document_body(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        modified = document["modified_at"].isoformat()
+        if self.kind == "dynamics_gp":
+            return {"document_id": document["id"], "status": document["status"], "modified_date": modified,
+                    "posted_date": modified}
+        if self.kind == "d365_bc":
+            return {"id": document["id"], "status": document["status"].capitalize(),
+                    "lastModifiedDateTime": modified, "postingDate": modified[:10]}
+        return {"BillID": document["id"], "Status": "AUTHORISED", "UpdatedDateUTC": modified,
+                "DateString": modified}
+
+    def _document_response(self, document: Dict[str, Any]) -> httpx.Response:
+        body = self._document_body(document)
+        return httpx.Response(200, json={"Bills": [body]} if self.kind == "xero" else body)
+
+    # Reporting
+
+    @property
+    def duplicate_documents(self) -> int:
+        """Documents created more than once for the same supplier invoice number"""
+        return sum(count - 1 for count in self.posted_numbers.values() if count > 1)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "erp_type": self.kind,
+            "requests": self.stats["requests"],
+            "post_requests": self.stats["post_requests"],
+            "documents": len(self.documents),
+            "duplicate_documents": self.duplicate_documents,
+            "lost_responses": self.stats["lost_responses"],
+            "idempotent_replays": self.stats["idempotent_replays"],
+            "responses": dict(sorted(self.responses.items()))
+        }
+
+    def asgi_app(self):
+        """A FastAPI app serving this simulation over HTTP"""
+        from fastapi import FastAPI, Request, Response
+
+        app = FastAPI(title=f"Simulated {self.kind}")
+
+        @app.get("/_simulation/status")
+        async def simulation_status():
+            return self.status()
+
+        @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+        async def simulate(path: str, request: Request):
+            response = await self.handle(httpx.Request(
+                request.method, f"{self.base_url}{request.url.path}?{request.url.query}",
+                headers=request.headers.raw, content=await request.body()
+            ))
+            return Response(response.content, status_code=response.status_code,
+                            headers={k: v for k, v in response.headers.items() if k.lower() != "content-length"})
+
+        return app
+
+
+def synthetic_invoices(count: int, suppliers: int = 25, seed: int = None) -> List[Invoice]:
+    """Approved, unsaved invoices with realistic amounts spread over ``suppliers`` suppliers"""
+    rng = random.Random(seed)
+    company_id = uuid.uuid4()
+    created_by_id = uuid.uuid4()
+    start = date.today() - timedelta(days=30)
+    invoices = []
+    for index in range(count):
+        subtotal = Decimal(str(round(rng.lognormvariate(6, 1.2), 2)))
+        tax = (subtotal * Decimal("0.15")).quantize(Decimal("0.01"))
+        invoice_date = start + timedelta(days=rng.randrange(30))
+        invoices.append(Invoice(
+            id=uuid.uuid4(), company_id=company_id, invoice_number=f"SIM-{index:06d}",
+            supplier_name=f"Simulated Supplier {rng.randrange(suppliers):03d}",
+            invoice_date=invoice_date, due_date=invoice_date + timedelta(days=30),
+            subtotal=subtotal, tax_amount=tax, total_amount=subtotal + tax, total_with_tax=subtotal + tax,
+            currency="USD", status=InvoiceStatus.APPROVED, po_number=None, created_by_id=created_by_id
+        ))
+    return invoices
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+@dataclass
+class LoadReport:
+    """Outcome of one replay against a simulated ERP"""
+    path: str
+    erp_type: str
+    invoices: int
+    succeeded: int
+    failed: int
+    duration_seconds: float
+    latencies: List[float] = field(default_factory=list, repr=False)
+    erp: Dict[str, Any] = field(default_factory=dict)
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        """Invoices posted per second"""
+        return self.succeeded / self.duration_seconds if self.duration_seconds else 0.0
+
+    @property
+    def retry_amplification(self) -> float:
+        """Posting requests the ERP received per invoice (1.0 = no retries)"""
+        return self.erp.get("post_requests", 0) / self.invoices if self.invoices else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "erp_type": self.erp_type,
+            "invoices": self.invoices,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "duration_seconds": round(self.duration_seconds, 3),
+            "throughput_per_second": round(self.throughput, 2),
+            "latency_ms": {
+                name: round(value * 1000, 1) if value is not None else None
+                for name, value in (("p50", percentile(self.latencies, 50)), ("p95", percentile(self.latencies, 95)),
+                                    ("p99", percentile(self.latencies, 99)),
+                                    ("max", max(self.latencies, default=None)))
+            },
+            "retry_amplification": round(self.retry_amplification, 3),
+            "erp": self.erp,
+            **self.details
+        }
+
+    def summary(self) -> str:
+        data = self.as_dict()
+        latency = data["latency_ms"]
+        return (f"{self.path} -> {self.erp_type}: {self.succeeded}/{self.invoices} posted in "
+                f"{data['duration_seconds']}s ({data['throughput_per_second']}/s); latency p50 {latency['p50']}ms "
+                f"p95 {latency['p95']}ms p99 {latency['p99']}ms; {data['retry_amplification']} requests/invoice; "
+                f"{self.erp.get('duplicate_documents', 0)} duplicate(s); responses {self.erp.get('responses')}")
+
+
+async def _paced(invoices: List[Invoice], rate: Optional[float], work: Callable[[int, Invoice], Any]):
+    """Start ``work`` for each invoice at ``rate`` per second (all at once when None) and wait for all"""
+    started = time.perf_counter()
+
+    async def run(index: int, invoice: Invoice):
+        if rate:
+            await asyncio.sleep(max(0.0, started + index / rate - time.perf_counter()))
+        return await work(index, invoice)
+
+    return await asyncio.gather(*[run(index, invoice) for index, invoice in enumerate(invoices)])
+
+
+async def run_integration_load(
+    server: SimulatedERP,
+    invoices: List[Invoice],
+    rate: float = None,
+    service: ERPIntegrationService = None
+) -> LoadReport:
+    """Post ``invoices`` through ``ERPIntegrationService.post_invoice``, arriving at ``rate`` per second"""
+    service = service or ERPIntegrationService()
+    adapter = server.adapter()
+    service.adapters[server.kind] = adapter
+    company_settings = COMPANY_SETTINGS[server.kind]
+    latencies, outcomes, errors = [], Counter(), Counter()
+
+    async def post(index: int, invoice: Invoice):
+        started = time.perf_counter()
+        result = await service.post_invoice(server.kind, invoice, company_settings)
+        latencies.append(time.perf_counter() - started)
+        outcomes[result.get("status")] += 1
+        if result.get("status") != "success":
+            errors[str(result.get("error") or result.get("message"))[:120]] += 1
+
+    started = time.perf_counter()
+    try:
+        await _paced(invoices, rate, post)
+    finally:
+        await adapter.client.aclose()
+    return LoadReport(
+        path="integration", erp_type=server.kind, invoices=len(invoices), succeeded=outcomes["success"],
+        failed=len(invoices) - outcomes["success"], duration_seconds=time.perf_counter() - started,
+        latencies=latencies, erp=server.status(),
+        details={"bulkhead": service.bulkhead_status().get(server.kind, {}), "errors": dict(errors.most_common(5))}
+    )
+
+
+def seed_invoices(engine, invoices: List[Invoice]):
+    """Create the tables the outbox handler uses in ``engine``'s database and insert ``invoices``
+
+    Each invoice's company is created too. The invoices stay usable (detached)
+    after the commit.
+    """
+    from sqlalchemy.orm import Session
+    import core.sqlite_types  # noqa: F401 - UUID columns on SQLite
+    from src.core.database import Base
+    from src.models.audit import AuditLog
+    from src.models.company import Company
+    from src.models.erp_sync import ERPSyncJob
+    from src.models.invoice_line import InvoiceLine
+    from src.models.user import User
+
+    Base.metadata.create_all(engine, tables=[
+        Company.__table__, User.__table__, Invoice.__table__, InvoiceLine.__table__,
+        AuditLog.__table__, ERPSyncJob.__table__
+    ])
+    with Session(engine, expire_on_commit=False) as db:
+        for company_id in {invoice.company_id for invoice in invoices}:
+            db.add(Company(id=company_id, name="Simulated company", email="ap@simulated.test"))
+        db.add_all(invoices)
+        db.commit()
+        db.expunge_all()
+
+
+def _simulated_automation(server: SimulatedERP, session_factory, **queue_options):
+    """``ERPAutomationService`` whose companies sync to ``server``, timing each posted job"""
+    from services.erp_automation import ERPAutomationService
+
+    class SimulatedAutomation(ERPAutomationService):
+        def __init__(self):
+            self.enqueued_at: Dict[Any, float] = {}
+            self.latencies: List[float] = []
+            super().__init__(session_factory, **queue_options)
+
+        def _get_erp_config(self, company) -> Dict[str, Any]:
+            # Company rows carry no ERP credentials; every company posts to the simulation
+            return {f"{server.kind}_enabled": True, server.kind: COMPANY_SETTINGS[server.kind]}
+
+        async def _process_sync_job(self, job) -> Dict[str, Any]:
+            result = await super()._process_sync_job(job)
+            if result.get("status") == "success":
+                self.latencies.append(time.perf_counter() - self.enqueued_at[job.invoice_id])
+            return result
+
+        async def _on_dead_letter(self, job, error: str):
+            # Dead letters stay in the simulation's outbox; nobody is notified
+            pass
+
+    return SimulatedAutomation()
+
+
+async def run_sync_queue_load(
+    server: SimulatedERP,
+    invoices: List[Invoice],
+    engine,
+    session_factory,
+    rate: float = None,
+    workers: int = 4,
+    rate_limit: float = 0.0,
+    max_attempts: int = 5,
+    backoff_base: float = 0.1,
+    backoff_max: float = 2.0,
+    drain_timeout: float = 300.0
+) -> LoadReport:
+    """Enqueue ``invoices`` in the outbox and let ``ERPAutomationService``'s queue workers post them
+
+    ``engine`` (sync) and ``session_factory`` (async) must reach a database
+    the invoices were seeded into with ``seed_invoices``. Jobs run through the
+    automation engine's own handler: it loads each invoice, posts it (with the
+    job's idempotency key, or after looking for an earlier post on retries)
+    and records the ERP document on the invoice.
+    """
+    from sqlalchemy.orm import Session
+
+    if server.kind not in SYNC_QUEUE_ERPS:
+        raise ValueError(f"The automation engine does not post {server.kind} over HTTP; "
+                         f"sync queue load runs against {', '.join(SYNC_QUEUE_ERPS)}")
+    automation = _simulated_automation(
+        server, session_factory, workers={server.kind: workers}, rate_limits={server.kind: rate_limit},
+        max_attempts=max_attempts, backoff_base=backoff_base, backoff_max=backoff_max, poll_interval=0.5
+    )
+    adapter = server.adapter()
+    automation.erp_service.adapters[server.kind] = adapter
+    queue = automation.sync_queue
+
+    def enqueue_sync(invoice: Invoice):
+        with Session(engine) as db:
+            queue.enqueue(db, invoice.id, invoice.company_id, [server.kind])
+            automation.enqueued_at[invoice.id] = time.perf_counter()
+            db.commit()
+
+    async def enqueue(index: int, invoice: Invoice):
+        # Approval commits are blocking database calls; keep them off the workers' event loop
+        await asyncio.to_thread(enqueue_sync, invoice)
+
+    started = time.perf_counter()
+    await queue.start()
+    try:
+        await _paced(invoices, rate, enqueue)
+        deadline = time.perf_counter() + drain_timeout
+        while time.perf_counter() < deadline:
+            settled = queue.stats["completed"] + queue.stats["needs_review"] + queue.stats["dead_lettered"]
+            if settled >= len(invoices):
+                break
+            await asyncio.sleep(0.05)
+        duration = time.perf_counter() - started
+    finally:
+        await queue.stop()
+        await adapter.client.aclose()
+    return LoadReport(
+        path="sync_queue", erp_type=server.kind, invoices=len(invoices), succeeded=queue.stats["completed"],
+        failed=len(invoices) - queue.stats["completed"], duration_seconds=duration, latencies=automation.latencies,
+        erp=server.status(),
+        details={"queue": dict(queue.stats), "bulkhead": automation.erp_service.bulkhead_status().get(server.kind, {})}
+    )
+
+
+# Command line
+
+def _sqlite_database(path: str, invoices: List[Invoice]) -> Tuple[Any, Any, Any]:
+    """A throwaway SQLite database seeded with ``invoices``: (sync engine, async engine, async session factory)"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    # SQLite allows one writer at a time; producers and workers wait for the lock instead of failing
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 30})
+    seed_invoices(engine, invoices)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 30})
+    return engine, async_engine, async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+def _profile(args) -> SimulationProfile:
+    return SimulationProfile(
+        latency_ms=args.latency_ms, latency_p95_ms=args.latency_p95_ms, rate_limit=args.rate_limit,
+        retry_after_seconds=args.retry_after, error_rate=args.error_rate, hang_rate=args.hang_rate,
+        lost_response_rate=args.lost_response_rate, seed=args.seed
+    )
+
+
+async def _run(args) -> List[LoadReport]:
+    import tempfile
+
+    reports = []
+    paths = ["integration", "sync_queue"] if args.path == "both" else [args.path]
+    if args.erp not in SYNC_QUEUE_ERPS and "sync_queue" in paths:
+        if args.path == "sync_queue":
+            raise SystemExit(f"sync_queue load runs against {', '.join(SYNC_QUEUE_ERPS)}, not {args.erp}")
+        paths.remove("sync_queue")
+    for path in paths:
+        server = SimulatedERP(args.erp, _profile(args))
+        invoices = synthetic_invoices(args.invoices, seed=args.seed)
+        if path == "integration":
+            reports.append(await run_integration_load(server, invoices, rate=args.rate))
+            continue
+        with tempfile.TemporaryDirectory() as directory:
+            engine, async_engine, sessions = _sqlite_database(f"{directory}/simulation.db", invoices)
+            try:
+                reports.append(await run_sync_queue_load(
+                    server, invoices, engine, sessions, rate=args.rate, workers=args.workers,
+                    rate_limit=args.client_rate_limit, max_attempts=args.max_attempts
+                ))
+            finally:
+                await async_engine.dispose()
+                engine.dispose()
+    return reports
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Load-test the ERP integration paths against a simulated ERP")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("run", "serve"):
+        command = commands.add_parser(name)
+        command.add_argument("--erp", choices=SIMULATED_ERPS, default="xero")
+        command.add_argument("--latency-ms", type=float, default=50.0)
+        command.add_argument("--latency-p95-ms", type=float, default=150.0)
+        command.add_argument("--rate-limit", type=float, default=0.0, help="ERP requests/second before 429")
+        command.add_argument("--retry-after", type=float, default=1.0)
+        command.add_argument("--error-rate", type=float, default=0.0)
+        command.add_argument("--hang-rate", type=float, default=0.0)
+        command.add_argument("--lost-response-rate", type=float, default=0.0)
+        command.add_argument("--seed", type=int, default=None)
+    run, serve = commands.choices["run"], commands.choices["serve"]
+    run.add_argument("--path", choices=("integration", "sync_queue", "both"), default="both")
+    run.add_argument("--invoices", type=int, default=200)
+    run.add_argument("--rate", type=float, default=None, help="invoice arrivals/second (default: all at once)")
+    run.add_argument("--workers", type=int, default=4)
+    run.add_argument("--client-rate-limit", type=float, default=0.0, help="sync queue pacing, requests/second")
+    run.add_argument("--max-attempts", type=int, default=5)
+    run.add_argument("--json", action="store_true")
+    run.add_argument("--verbose", action="store_true", help="show the adapters' per-request error logs")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8801)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        import uvicorn
+        server = SimulatedERP(args.erp, _profile(args))
+        print(f"Simulated {args.erp} on http://{args.host}:{args.port} (company {server.company_id})")
+        uvicorn.run(server.asgi_app(), host=args.host, port=args.port, log_level="warning")
+        return
+
+    # Injected failures make the adapters log every failed request
+    logging.basicConfig(level=logging.WARNING if args.verbose else logging.CRITICAL)
+    for report in asyncio.run(_run(args)):
+        print(json.dumps(report.as_dict(), indent=2) if args.json else report.summary())
+
+
+if __name__ == "__main__":
+    main()
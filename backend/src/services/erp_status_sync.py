@@ -0,0 +1,435 @@
+"""
+ERP document-status reconciliation
+
+Local invoices used to learn what the ERP did with them (posted, paid,
+voided) one document at a time: ``check_invoice_status`` per invoice, and the
+automation engine's monitor loop every 30 seconds. ``ERPStatusReconciler``
+instead reads changes in bulk. For each ERP connection it keeps a watermark
+(``ERPStatusWatermark``) and asks the adapter for documents modified since
+then (``get_invoice_changes``), page by page, and applies the whole page to
+the invoices table with one UPDATE per status. Adapters without a
+modified-since query fall back to batched lookups of the documents still
+being tracked (``get_invoice_statuses``). ERPs that can push changes call the
+webhook endpoint instead, which goes through ``push``.
+
+Document IDs are only unique within one ERP tenant, so every update is scoped
+to the invoices posted to that ERP (``Invoice.erp_type``) through that
+connection (``Invoice.erp_connection_key``) or, for webhooks, by that company.
+
+Like the GP master-data mirror, each pass starts a short overlap before the
+watermark because a change committed late on the ERP side can carry an
+older modification time. Each invoice keeps the ``modified_at`` of the change
+it last applied (``erp_status_updated_at``) and only takes strictly newer
+ones, so re-read, reordered or replayed changes never roll a status back.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import re
+import uuid
+from datetime import datetime, timedelta, UTC
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.config import settings
+from core.lazy import LazyService
+from services.erp import ERPAdapter, erp_integration
+from src.models.erp_sync import ERPStatusWatermark
+from src.models.invoice import Invoice, InvoiceStatus
+
+logger = logging.getLogger(__name__)
+
+# ERP document statuses (lowercased) and what they mean locally
+POSTED_STATUSES = frozenset({"posted", "open", "authorised", "authorized", "paid"})
+VOIDED_STATUSES = frozenset({"voided", "void", "deleted", "canceled", "cancelled", "reversed"})
+# Documents in a final status are no longer polled
+FINAL_STATUSES = frozenset({"paid"}) | VOIDED_STATUSES
+
+# Connection key of the settings-configured adapter of an ERP type
+DEFAULT_CONNECTION = "default"
+
+_XERO_DATE = re.compile(r"/Date\((-?\d+)([+-]\d{4})?\)/")
+
+
+def parse_erp_timestamp(value: Any) -> Optional[datetime]:
+    """A change's ``modified_at`` as an aware datetime: datetimes, ISO 8601, or Xero's ``/Date(ms+0000)/``"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=UTC)
+    text = str(value)
+    match = _XERO_DATE.fullmatch(text)
+    if match:
+        return datetime.fromtimestamp(int(match.group(1)) / 1000, UTC)
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        logger.debug(f"Unparseable ERP timestamp: {text!r}")
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+def verify_webhook_signature(secret: str, body: bytes, signature: Optional[str],
+                             timestamp: Optional[str] = None) -> bool:
+    """Whether ``signature`` is the HMAC-SHA256 of ``body``, as hex, base64 or ``sha256=<hex>``
+
+    With a ``timestamp`` the signed message is ``<timestamp>.<body>``.
+    """
+    if not secret or not signature:
+        return False
+    message = f"{timestamp}.".encode() + body if timestamp is not None else body
+    digest = hmac.new(secret.encode(), message, hashlib.sha256).digest()
+    signature = signature.strip()
+    if signature.startswith("sha256="):
+        signature = signature[len("sha256="):]
+    candidates = [digest.hex(), base64.b64encode(digest).decode()]
+    return any(hmac.compare_digest(signature, candidate) for candidate in candidates)
+
+
+def webhook_timestamp_fresh(timestamp: Optional[str], tolerance: float = None, now: float = None) -> bool:
+    """Whether a delivery's signed ``timestamp`` (Unix seconds) is within ``tolerance`` seconds of now
+
+    Bounds how long a captured delivery can be replayed.
+    """
+    tolerance = settings.ERP_WEBHOOK_TOLERANCE if tolerance is None else tolerance
+    try:
+        sent_at = float(timestamp)
+    except (TypeError, ValueError):
+        return False
+    now = datetime.now(UTC).timestamp() if now is None else now
+    return abs(now - sent_at) <= tolerance
+
+
+def company_webhook_secret(company_id: Any) -> Optional[str]:
+    """The key a company's ERP signs status webhooks with, derived from ``ERP_WEBHOOK_SECRET``
+
+    One company's key cannot sign deliveries for another, and none is stored.
+    """
+    if not settings.ERP_WEBHOOK_SECRET:
+        return None
+    message = f"erp-webhook:{company_id}".encode()
+    return hmac.new(settings.ERP_WEBHOOK_SECRET.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ERPStatusReconciler:
+    """Watermarked bulk reconciliation of local invoices with ERP document statuses
+
+    ``erp_service`` is the ``ERPIntegrationService`` whose adapters (settings
+    configured and company registered) are read, through their bulkheads.
+    """
+
+    def __init__(
+        self,
+        erp_service,
+        session_factory: Optional[async_sessionmaker] = None,
+        overlap_seconds: float = None,
+        page_size: int = None,
+        batch_size: int = None
+    ):
+        self.erp_service = erp_service
+        self._session_factory = session_factory
+        self.overlap = timedelta(seconds=settings.ERP_STATUS_SYNC_OVERLAP_SECONDS if overlap_seconds is None
+                                 else overlap_seconds)
+        self.page_size = page_size or settings.ERP_STATUS_SYNC_PAGE_SIZE
+        self.batch_size = batch_size or settings.ERP_STATUS_BATCH_SIZE
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"passes": 0, "changes_read": 0, "documents_updated": 0, "webhook_events": 0,
+                      "erp_requests": 0, "failures": 0}
+
+    def _session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from core.database import get_async_sessionmaker
+            self._session_factory = get_async_sessionmaker()
+        return self._session_factory()
+
+    def connections(self) -> List[Tuple[str, str, str, ERPAdapter, Optional[str]]]:
+        """``(erp_type, connection_key, bulkhead name, adapter, company_id)`` for every ERP connection"""
+        connections = [
+            (erp_type, DEFAULT_CONNECTION, erp_type, adapter, None)
+            for erp_type, adapter in self.erp_service.adapters.items()
+        ]
+        for company_id, info in self.erp_service.connection_cache.items():
+            connections.append(
+                (info.get("erp_type"), str(company_id), f"company:{company_id}", info.get("adapter"), str(company_id))
+            )
+        return [connection for connection in connections if isinstance(connection[3], ERPAdapter)]
+
+    # Pull
+
+    async def reconcile_all(self) -> Dict[str, int]:
+        """One pass over every ERP connection, concurrently; documents updated per connection"""
+        connections = self.connections()
+
+        async def run(connection) -> int:
+            try:
+                return await self.reconcile(*connection)
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.error(f"ERP status reconciliation failed for {connection[2]}: {e}")
+                return 0
+
+        results = await asyncio.gather(*[run(connection) for connection in connections])
+        self.stats["passes"] += 1
+        return {connection[2]: updated for connection, updated in zip(connections, results)}
+
+    async def reconcile(
+        self,
+        erp_type: str,
+        connection_key: str,
+        name: str,
+        adapter: ERPAdapter,
+        company_id: Optional[str] = None
+    ) -> int:
+        """Apply every change since the connection's watermark, then advance it"""
+        lock = self._locks.setdefault((erp_type, connection_key), asyncio.Lock())
+        async with lock:
+            async with self._session() as session:
+                state = await session.get(ERPStatusWatermark, (erp_type, connection_key))
+            watermark = parse_erp_timestamp(state.watermark) if state is not None else None
+            since = watermark - self.overlap if watermark is not None else None
+
+            updated = 0
+            while True:
+                changes = await self.erp_service._call(name, adapter, "get_invoice_changes", since, self.page_size)
+                self.stats["erp_requests"] += 1
+                if changes is None:
+                    updated += await self._poll_tracked(erp_type, connection_key, name, adapter, company_id)
+                    break
+                self.stats["changes_read"] += len(changes)
+                updated += await self.apply_changes(erp_type, changes, company_id, connection_key)
+                modified = [stamp for stamp in (parse_erp_timestamp(c.get("modified_at")) for c in changes) if stamp]
+                latest = max(modified, default=None)
+                if latest is not None and (watermark is None or latest > watermark):
+                    watermark = latest
+                # A full page means more may follow; stop if the ERP's clock did not move past it
+                if len(changes) < self.page_size or latest is None or (since is not None and latest <= since):
+                    break
+                since = latest
+
+            await self._save_watermark(erp_type, connection_key, watermark, updated)
+            return updated
+
+    async def _poll_tracked(self, erp_type: str, connection_key: str, name: str, adapter: ERPAdapter,
+                            company_id: Optional[str]) -> int:
+        """Batched status lookups for the connection's posted documents not yet in a final status"""
+        query = (
+            select(Invoice.erp_document_id)
+            .where(
+                Invoice.erp_type == erp_type,
+                Invoice.erp_connection_key == connection_key,
+                Invoice.erp_document_id.is_not(None),
+                or_(Invoice.erp_status.is_(None), Invoice.erp_status.not_in(FINAL_STATUSES))
+            )
+            .distinct()
+        )
+        if company_id is not None:
+            query = query.where(Invoice.company_id == _uuid_or_str(company_id))
+        async with self._session() as session:
+            document_ids = list((await session.execute(query)).scalars())
+
+        updated = 0
+        for chunk in _chunks(document_ids, self.batch_size):
+            changes = await self.erp_service._call(name, adapter, "get_invoice_statuses", chunk)
+            self.stats["erp_requests"] += 1
+            self.stats["changes_read"] += len(changes)
+            updated += await self.apply_changes(erp_type, changes, company_id, connection_key)
+        return updated
+
+    async def _save_watermark(self, erp_type: str, connection_key: str, watermark: Optional[datetime], updated: int):
+        async with self._session() as session:
+            state = await session.get(ERPStatusWatermark, (erp_type, connection_key))
+            if state is None:
+                state = ERPStatusWatermark(erp_type=erp_type, connection_key=connection_key, documents_updated=0)
+                session.add(state)
+            state.watermark = watermark
+            state.last_polled_at = datetime.now(UTC)
+            state.documents_updated = (state.documents_updated or 0) + updated
+            await session.commit()
+
+    # Apply
+
+    async def apply_changes(
+        self,
+        erp_type: str,
+        changes: List[Dict[str, Any]],
+        company_id: Optional[str] = None,
+        connection_key: Optional[str] = None
+    ) -> int:
+        """Record ERP statuses on the matching invoices, one UPDATE per status and chunk; rows changed
+
+        Only invoices posted to ``erp_type`` are touched, and only those of
+        ``company_id`` and/or posted through ``connection_key``; changes that
+        name neither cannot be told apart from another tenant's documents.
+        """
+        if company_id is None and connection_key is None:
+            raise ValueError(f"{erp_type} status changes need a company or connection to apply to")
+        # The latest change per document; a change without ``modified_at`` is a current lookup
+        latest: Dict[str, Tuple[Optional[datetime], str]] = {}
+        for change in changes:
+            doc_id, status = change.get("erp_doc_id"), change.get("status")
+            if not (doc_id and status):
+                continue
+            stamp = parse_erp_timestamp(change.get("modified_at"))
+            stamp = stamp.astimezone(UTC) if stamp is not None else None
+            previous = latest.get(str(doc_id))
+            if previous is None or stamp is None or previous[0] is None or stamp >= previous[0]:
+                latest[str(doc_id)] = (stamp, str(status).lower())
+        by_status: Dict[str, Dict[str, Optional[datetime]]] = {}
+        for doc_id, (stamp, status) in latest.items():
+            by_status.setdefault(status, {})[doc_id] = stamp
+        if not by_status:
+            return 0
+
+        now = datetime.now(UTC)
+        status_type = Invoice.__table__.c.status.type
+        stamp_type = Invoice.__table__.c.erp_status_updated_at.type
+        updated = 0
+        async with self._session() as session:
+            for status, stamps in by_status.items():
+                values = {"erp_status": status}
+                if status in POSTED_STATUSES:
+                    values.update(
+                        posted_to_erp=True,
+                        erp_posting_date=func.coalesce(Invoice.erp_posting_date, now),
+                        status=case(
+                            (Invoice.status == literal(InvoiceStatus.APPROVED, type_=status_type),
+                             literal(InvoiceStatus.POSTED_TO_ERP, type_=status_type)),
+                            else_=Invoice.status
+                        )
+                    )
+                elif status in VOIDED_STATUSES:
+                    values.update(posted_to_erp=False, erp_error_message=f"Document {status} in {erp_type}")
+                for chunk in _chunks(sorted(stamps), self.batch_size * 10):
+                    stamped = {doc_id: stamps[doc_id] for doc_id in chunk if stamps[doc_id] is not None}
+                    unstamped = [doc_id for doc_id in chunk if stamps[doc_id] is None]
+                    if stamped:
+                        # Only changes newer than the one each invoice last applied
+                        modified_at = case(
+                            {doc_id: literal(stamp, type_=stamp_type) for doc_id, stamp in stamped.items()},
+                            value=Invoice.erp_document_id
+                        )
+                        newer = or_(Invoice.erp_status_updated_at.is_(None),
+                                    Invoice.erp_status_updated_at < modified_at)
+                        updated += await self._update_documents(
+                            session, erp_type, list(stamped), newer, {**values, "erp_status_updated_at": modified_at},
+                            company_id, connection_key
+                        )
+                    if unstamped:
+                        changed = or_(Invoice.erp_status.is_(None), Invoice.erp_status != status)
+                        updated += await self._update_documents(
+                            session, erp_type, unstamped, changed, {**values, "erp_status_updated_at": now},
+                            company_id, connection_key
+                        )
+            await session.commit()
+        self.stats["documents_updated"] += updated
+        if updated:
+            logger.info(f"Reconciled {updated} invoice(s) with {erp_type} document statuses")
+        return updated
+
+    async def _update_documents(self, session: AsyncSession, erp_type: str, document_ids: List[str], condition,
+                                values: Dict[str, Any], company_id: Optional[str],
+                                connection_key: Optional[str]) -> int:
+        statement = (
+            update(Invoice)
+            .where(Invoice.erp_type == erp_type, Invoice.erp_document_id.in_(document_ids), condition)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if company_id is not None:
+            statement = statement.where(Invoice.company_id == _uuid_or_str(company_id))
+        if connection_key is not None:
+            statement = statement.where(Invoice.erp_connection_key == connection_key)
+        return (await session.execute(statement)).rowcount or 0
+
+    # Push
+
+    async def push(self, erp_type: str, company_id: str, payload: Any) -> int:
+        """Apply a webhook delivery for one company: ``{"events": [...]}`` or a list of events
+
+        An event carries ``erp_doc_id`` (or ``document_id``/``id``) and, when the
+        ERP includes it, ``status``; events without a status are looked up in
+        one batched request, through the company's connection when it has one.
+        """
+        events = payload.get("events", []) if isinstance(payload, dict) else payload
+        if not isinstance(events, list):
+            raise ValueError("Webhook payload must be a list of events or an object with 'events'")
+        self.stats["webhook_events"] += len(events)
+
+        changes, unresolved = [], []
+        for event in events:
+            if not isinstance(event, dict):
+                continue
+            doc_id = event.get("erp_doc_id") or event.get("document_id") or event.get("id")
+            if not doc_id:
+                continue
+            if event.get("status"):
+                changes.append({"erp_doc_id": doc_id, "status": event["status"],
+                                "modified_at": event.get("modified_at")})
+            else:
+                unresolved.append(str(doc_id))
+
+        if unresolved:
+            name, adapter = erp_type, self.erp_service.get_adapter(erp_type)
+            connection = self.erp_service.connection_cache.get(str(company_id)) or {}
+            if connection.get("erp_type") == erp_type:
+                name, adapter = f"company:{company_id}", connection.get("adapter")
+            if isinstance(adapter, ERPAdapter):
+                for chunk in _chunks(list(dict.fromkeys(unresolved)), self.batch_size):
+                    changes.extend(await self.erp_service._call(name, adapter, "get_invoice_statuses", chunk))
+                    self.stats["erp_requests"] += 1
+            else:
+                logger.warning(f"Webhook events for {erp_type} without status and no adapter to look them up")
+        return await self.apply_changes(erp_type, changes, company_id)
+
+    # Background reconciliation
+
+    async def _sync_loop(self, interval: float):
+        while True:
+            try:
+                await self.reconcile_all()
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.error(f"ERP status reconciliation pass failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def start(self, interval: float = None):
+        """Reconcile every ``interval`` seconds in the background"""
+        if self._task is not None:
+            return
+        interval = interval or settings.ERP_STATUS_SYNC_INTERVAL_SECONDS
+        self._task = asyncio.get_running_loop().create_task(self._sync_loop(interval))
+        logger.info(f"Reconciling ERP document statuses every {interval:.0f}s")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {"running": self._task is not None, "stats": dict(self.stats)}
+
+
+def _uuid_or_str(value: str):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return value
+
+
+# Global reconciler instance over the shared ERP integration service
+erp_status_reconciler = LazyService(lambda: ERPStatusReconciler(erp_integration.get()))
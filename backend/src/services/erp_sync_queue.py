@@ -0,0 +1,398 @@
+"""
+Outbox-driven ERP synchronization
+
+Approving an invoice writes one ``erp_sync_outbox`` row per enabled ERP in the
+approval's own transaction, so an approved invoice can never be missed by a
+crash between commit and sync. ``ERPSyncQueue`` consumes the outbox:
+
+- Each ERP has its own pool of workers, paced by a token bucket set to that
+  system's rate limit; a slow or failing ERP never holds up the others.
+- Committing an enqueue wakes the workers, so a job normally starts within
+  milliseconds. A short poll picks up rows written by other replicas.
+- Jobs are claimed with a lease (compare-and-set on the row), so replicas
+  never process the same job at once and a crashed worker's job is retried
+  after its lease expires.
+- Failures are retried with exponential backoff and full jitter, and moved to
+  the dead letter state after ``max_attempts``; ``requeue`` revives them.
+- The idempotency key (``<erp_type>:<invoice_id>``) is unique in the outbox,
+  so re-approving or re-sweeping an invoice never queues it twice. The
+  handler sends it in the ERP's idempotency header (Xero's
+  ``Idempotency-Key``); for ERPs without one, a retried job first looks the
+  invoice up in the ERP, since the failed attempt may have posted it.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, UTC
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, event, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from src.models.erp_sync import ERPSyncJob, ERPSyncJobStatus
+
+logger = logging.getLogger(__name__)
+
+_CLAIM_WINDOW = 8
+
+
+class ERPSyncPermanentError(Exception):
+    """The job can never succeed (e.g. the invoice is gone); dead-letter it without retrying"""
+
+
+def idempotency_key(erp_type: str, invoice_id: Any) -> str:
+    return f"{erp_type}:{invoice_id}"
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: Callable[[], float] = random.random) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^(attempt-1))]"""
+    return rng() * min(cap, base * 2 ** max(0, attempt - 1))
+
+
+class TokenBucket:
+    """Paces calls to ``rate`` per second, allowing bursts of ``capacity``
+
+    Waiters are served in arrival order; a rate of 0 or less disables pacing.
+    """
+
+    def __init__(self, rate: float, capacity: float = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC)
+
+
+def _json_safe(result: Any) -> Any:
+    return json.loads(json.dumps(result, default=str))
+
+
+class ERPSyncQueue:
+    """Consumes the ERP sync outbox with per-ERP worker pools
+
+    ``handler(job)`` performs one sync and returns the ERP result dict:
+    status ``"success"`` completes the job, ``"error"`` (or an exception)
+    schedules a retry, and anything else (a match that needs review) is
+    terminal. ``ERPSyncPermanentError`` dead-letters the job at once.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[ERPSyncJob], Awaitable[Dict[str, Any]]],
+        session_factory: Optional[async_sessionmaker] = None,
+        workers: Dict[str, int] = None,
+        rate_limits: Dict[str, float] = None,
+        max_attempts: int = None,
+        backoff_base: float = None,
+        backoff_max: float = None,
+        lease_seconds: float = None,
+        poll_interval: float = None,
+        retry_enabled: Callable[[], bool] = None,
+        on_dead_letter: Callable[[ERPSyncJob, str], Awaitable[None]] = None
+    ):
+        self.handler = handler
+        self._session_factory = session_factory
+        self.workers = dict(workers if workers is not None else settings.ERP_SYNC_WORKERS)
+        rate_limits = rate_limits if rate_limits is not None else settings.ERP_SYNC_RATE_LIMITS
+        self.buckets = {erp_type: TokenBucket(rate_limits.get(erp_type, 0)) for erp_type in self.workers}
+        self.max_attempts = max_attempts or settings.ERP_SYNC_MAX_ATTEMPTS
+        self.backoff_base = settings.ERP_SYNC_BACKOFF_BASE_SECONDS if backoff_base is None else backoff_base
+        self.backoff_max = settings.ERP_SYNC_BACKOFF_MAX_SECONDS if backoff_max is None else backoff_max
+        self.lease = timedelta(seconds=lease_seconds or settings.ERP_SYNC_LEASE_SECONDS)
+        self.poll_interval = poll_interval or settings.ERP_SYNC_POLL_INTERVAL_SECONDS
+        self.retry_enabled = retry_enabled or (lambda: True)
+        self.on_dead_letter = on_dead_letter
+
+        self._worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {
+            "enqueued": 0, "claimed": 0, "completed": 0, "needs_review": 0,
+            "retried": 0, "dead_lettered": 0, "lease_expired": 0
+        }
+
+    def _session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from core.database import get_async_sessionmaker
+            self._session_factory = get_async_sessionmaker()
+        return self._session_factory()
+
+    # Producer side
+
+    def enqueue(self, db: Session, invoice_id: Any, company_id: Any, erp_types: Iterable[str]) -> List[ERPSyncJob]:
+        """Add outbox rows for an invoice to the caller's transaction
+
+        Nothing is written until the caller commits, and workers are woken
+        only after that commit. Invoices already queued for an ERP are skipped.
+        """
+        invoice_id = invoice_id if isinstance(invoice_id, uuid.UUID) else uuid.UUID(str(invoice_id))
+        company_id = company_id if isinstance(company_id, uuid.UUID) else uuid.UUID(str(company_id))
+        keys = {idempotency_key(erp_type, invoice_id): erp_type for erp_type in erp_types}
+        if not keys:
+            return []
+
+        existing = set(db.scalars(
+            select(ERPSyncJob.idempotency_key).where(ERPSyncJob.idempotency_key.in_(list(keys)))
+        ))
+        jobs = [
+            ERPSyncJob(
+                idempotency_key=key, invoice_id=invoice_id, company_id=company_id, erp_type=erp_type,
+                status=ERPSyncJobStatus.PENDING.value, attempts=0, next_attempt_at=_utcnow()
+            )
+            for key, erp_type in keys.items() if key not in existing
+        ]
+        if jobs:
+            db.add_all(jobs)
+            self.stats["enqueued"] += len(jobs)
+            erp_types_added = {job.erp_type for job in jobs}
+            event.listen(db, "after_commit", lambda session: self.notify(erp_types_added), once=True)
+        return jobs
+
+    def notify(self, erp_types: Iterable[str] = None):
+        """Wake the workers of ``erp_types`` (all ERPs by default); safe from any thread"""
+        if self._loop is None:
+            return
+        for erp_type in (erp_types or self._wakeups):
+            wakeup = self._wakeups.get(erp_type)
+            if wakeup is None:
+                continue
+            try:
+                running_loop = asyncio.get_running_loop()
+            except RuntimeError:
+                running_loop = None
+            if running_loop is self._loop:
+                wakeup.set()
+            else:
+                self._loop.call_soon_threadsafe(wakeup.set)
+
+    # Consumer side
+
+    def _claimable(self, erp_type: str, now: datetime):
+        return and_(
+            ERPSyncJob.erp_type == erp_type,
+            or_(
+                and_(ERPSyncJob.status == ERPSyncJobStatus.PENDING.value, ERPSyncJob.next_attempt_at <= now),
+                and_(ERPSyncJob.status == ERPSyncJobStatus.IN_PROGRESS.value, ERPSyncJob.locked_until < now)
+            )
+        )
+
+    async def claim(self, erp_type: str, worker: str = None) -> Optional[ERPSyncJob]:
+        """Lease the oldest due job for ``erp_type``, or None when nothing is due"""
+        worker = worker or self._worker_id
+        now = _utcnow()
+        async with self._session() as session:
+            candidates = (await session.execute(
+                select(ERPSyncJob.id, ERPSyncJob.status)
+                .where(self._claimable(erp_type, now))
+                .order_by(ERPSyncJob.next_attempt_at)
+                .limit(_CLAIM_WINDOW)
+                .with_for_update(skip_locked=True)
+            )).all()
+            for job_id, status in candidates:
+                # Compare-and-set: another replica may have taken it since the select
+                claimed = await session.execute(
+                    update(ERPSyncJob)
+                    .where(ERPSyncJob.id == job_id, self._claimable(erp_type, now))
+                    .values(
+                        status=ERPSyncJobStatus.IN_PROGRESS.value,
+                        attempts=ERPSyncJob.attempts + 1,
+                        locked_by=worker,
+                        locked_until=now + self.lease
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                if claimed.rowcount != 1:
+                    continue
+                await session.commit()
+                self.stats["claimed"] += 1
+                if status == ERPSyncJobStatus.IN_PROGRESS.value:
+                    self.stats["lease_expired"] += 1
+                job = (await session.execute(select(ERPSyncJob).where(ERPSyncJob.id == job_id))).scalar_one()
+                session.expunge(job)
+                return job
+            await session.rollback()
+        return None
+
+    async def process(self, job: ERPSyncJob):
+        """Run the handler for a claimed job and record the outcome"""
+        try:
+            result = await asyncio.wait_for(self.handler(job), timeout=self.lease.total_seconds())
+        except asyncio.CancelledError:
+            # Shutting down: hand the job straight back instead of waiting out the lease
+            await self._settle(job, status=ERPSyncJobStatus.PENDING, next_attempt_at=_utcnow())
+            raise
+        except ERPSyncPermanentError as e:
+            await self._dead_letter(job, str(e))
+        except Exception as e:
+            await self._failed(job, f"{type(e).__name__}: {e}")
+        else:
+            status = (result or {}).get("status")
+            if status == "error":
+                await self._failed(job, result.get("message") or "ERP sync failed", result)
+            elif status == "success":
+                await self._settle(job, status=ERPSyncJobStatus.COMPLETED, result=result, completed_at=_utcnow())
+                self.stats["completed"] += 1
+            else:
+                await self._settle(job, status=ERPSyncJobStatus.NEEDS_REVIEW, result=result, completed_at=_utcnow())
+                self.stats["needs_review"] += 1
+
+    async def _failed(self, job: ERPSyncJob, error: str, result: Dict[str, Any] = None):
+        if job.attempts >= self.max_attempts or not self.retry_enabled():
+            await self._dead_letter(job, error, result)
+            return
+        delay = backoff_delay(job.attempts, self.backoff_base, self.backoff_max)
+        await self._settle(job, status=ERPSyncJobStatus.PENDING, error=error, result=result,
+                           next_attempt_at=_utcnow() + timedelta(seconds=delay))
+        self.stats["retried"] += 1
+        logger.warning(f"ERP sync {job.idempotency_key} failed (attempt {job.attempts}/{self.max_attempts}), "
+                       f"retrying in {delay:.1f}s: {error}")
+        if self._loop is not None:
+            self._loop.call_later(delay, self.notify, [job.erp_type])
+
+    async def _dead_letter(self, job: ERPSyncJob, error: str, result: Dict[str, Any] = None):
+        await self._settle(job, status=ERPSyncJobStatus.DEAD_LETTER, error=error, result=result)
+        self.stats["dead_lettered"] += 1
+        logger.error(f"ERP sync {job.idempotency_key} dead-lettered after {job.attempts} attempt(s): {error}")
+        if self.on_dead_letter is not None:
+            try:
+                await self.on_dead_letter(job, error)
+            except Exception as e:
+                logger.error(f"Dead letter notification for {job.idempotency_key} failed: {e}")
+
+    async def _settle(self, job: ERPSyncJob, status: ERPSyncJobStatus, error: str = None,
+                      result: Dict[str, Any] = None, next_attempt_at: datetime = None,
+                      completed_at: datetime = None):
+        values = {"status": status.value, "locked_by": None, "locked_until": None, "last_error": error}
+        if result is not None:
+            values["result"] = _json_safe(result)
+        if next_attempt_at is not None:
+            values["next_attempt_at"] = next_attempt_at
+        if completed_at is not None:
+            values["completed_at"] = completed_at
+        async with self._session() as session:
+            # Only while we still hold the lease; otherwise another worker owns the job now
+            settled = await session.execute(
+                update(ERPSyncJob)
+                .where(ERPSyncJob.id == job.id, ERPSyncJob.locked_by == job.locked_by)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        if settled.rowcount != 1:
+            logger.warning(f"Lost the lease on ERP sync {job.idempotency_key}; outcome {status.value} not recorded")
+
+    async def requeue(self, job_ids: Iterable[Any] = None, erp_type: str = None) -> int:
+        """Move dead-lettered jobs back to pending with a fresh attempt budget"""
+        conditions = [ERPSyncJob.status == ERPSyncJobStatus.DEAD_LETTER.value]
+        if job_ids is not None:
+            conditions.append(ERPSyncJob.id.in_([
+                job_id if isinstance(job_id, uuid.UUID) else uuid.UUID(str(job_id)) for job_id in job_ids
+            ]))
+        if erp_type is not None:
+            conditions.append(ERPSyncJob.erp_type == erp_type)
+        async with self._session() as session:
+            requeued = await session.execute(
+                update(ERPSyncJob)
+                .where(*conditions)
+                .values(status=ERPSyncJobStatus.PENDING.value, attempts=0, next_attempt_at=_utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        self.notify([erp_type] if erp_type else None)
+        return requeued.rowcount
+
+    async def backlog(self) -> Dict[str, Dict[str, int]]:
+        """Job counts per ERP and status"""
+        async with self._session() as session:
+            rows = (await session.execute(
+                select(ERPSyncJob.erp_type, ERPSyncJob.status, func.count())
+                .group_by(ERPSyncJob.erp_type, ERPSyncJob.status)
+            )).all()
+        counts: Dict[str, Dict[str, int]] = {}
+        for erp_type, status, count in rows:
+            counts.setdefault(erp_type, {})[status] = count
+        return counts
+
+    # Lifecycle
+
+    async def _worker(self, erp_type: str, name: str):
+        wakeup = self._wakeups[erp_type]
+        while True:
+            try:
+                job = await self.claim(erp_type, name)
+            except Exception as e:
+                logger.error(f"ERP sync worker {name} could not claim a job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+                continue
+            await self.buckets[erp_type].acquire()
+            try:
+                await self.process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"ERP sync worker {name} failed recording {job.idempotency_key}: {e}")
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        for erp_type, count in self.workers.items():
+            self._wakeups[erp_type] = asyncio.Event()
+            for index in range(count):
+                name = f"{self._worker_id}-{erp_type}-{index}"
+                self._tasks.append(self._loop.create_task(self._worker(erp_type, name)))
+        logger.info("ERP sync queue started: " + ", ".join(
+            f"{erp_type} x{count} @ {self.buckets[erp_type].rate:g}/s" for erp_type, count in self.workers.items()
+        ))
+
+    async def stop(self):
+        if not self._tasks:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+        self._wakeups.clear()
+        logger.info("ERP sync queue stopped")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": bool(self._tasks),
+            "workers": dict(self.workers),
+            "rate_limits": {erp_type: bucket.rate for erp_type, bucket in self.buckets.items()},
+            "stats": dict(self.stats)
+        }
@@ -4,22 +4,23 @@ World-class fraud detection using multiple ML models and business rules
 """
 import logging
 import asyncio
-import numpy as np
-import pandas as pd
 from typing import Dict, Any, List, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, UTC
 from decimal import Decimal
 from dataclasses import dataclass
 from enum import Enum
 import uuid
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, func, select
 
 from src.models.invoice import Invoice, InvoiceStatus
 from src.models.user import User
 from src.models.audit import AuditLog, AuditAction, AuditResourceType
 from core.config import settings
+from core.lazy import lazy_import
+
+np = lazy_import("numpy")
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +55,7 @@ class FraudAnalysisResult:
     investigation_priority: int  # 1-10, 10 being highest
 
 @dataclass
-class FraudIndicator:
+class FraudIndicatorDetail:
     """Individual fraud indicator"""
     type: FraudIndicator
     severity: float  # 0-1
@@ -88,7 +89,7 @@ class FraudDetectionService:
     async def analyze_fraud_risk(
         self, 
         invoice: Invoice, 
-        db: Session,
+        db: AsyncSession,
         historical_data: Optional[List[Invoice]] = None
     ) -> FraudAnalysisResult:
         """
@@ -180,25 +181,26 @@ class FraudDetectionService:
             logger.error(f"Error in fraud analysis: {str(e)}")
             raise
     
-    async def _get_historical_data(self, invoice: Invoice, db: Session) -> List[Invoice]:
+    async def _get_historical_data(self, invoice: Invoice, db: AsyncSession) -> List[Invoice]:
         """Get historical invoice data for analysis"""
         # Get invoices from the same supplier in the last 90 days
         cutoff_date = datetime.now(UTC) - timedelta(days=90)
         
-        return db.query(Invoice).filter(
+        result = await db.scalars(select(Invoice).where(
             and_(
                 Invoice.company_id == invoice.company_id,
                 Invoice.supplier_name == invoice.supplier_name,
                 Invoice.created_at >= cutoff_date,
                 Invoice.id != invoice.id
             )
-        ).all()
+        ))
+        return list(result)
     
     async def _check_amount_anomalies(
         self, 
         invoice: Invoice, 
         historical_data: List[Invoice], 
-        db: Session
+        db: AsyncSession
     ) -> List[Dict[str, Any]]:
         """Check for amount-based fraud indicators"""
         indicators = []
@@ -250,7 +252,7 @@ class FraudDetectionService:
         self, 
         invoice: Invoice, 
         historical_data: List[Invoice], 
-        db: Session
+        db: AsyncSession
     ) -> List[Dict[str, Any]]:
         """Check for supplier-based fraud indicators"""
         indicators = []
@@ -268,13 +270,13 @@ class FraudDetectionService:
         # Check daily amount limits per supplier
         if invoice.total_amount:
             today = invoice.invoice_date.date() if invoice.invoice_date else datetime.now(UTC).date()
-            daily_amount = db.query(func.sum(Invoice.total_amount)).filter(
+            daily_amount = await db.scalar(select(func.sum(Invoice.total_amount)).where(
                 and_(
                     Invoice.company_id == invoice.company_id,
                     Invoice.supplier_name == invoice.supplier_name,
                     func.date(Invoice.invoice_date) == today
                 )
-            ).scalar() or 0
+            )) or 0
             
             if daily_amount + invoice.total_amount > self.business_rules["max_daily_amount_per_supplier"]:
                 indicators.append({
@@ -295,7 +297,7 @@ class FraudDetectionService:
         self, 
         invoice: Invoice, 
         historical_data: List[Invoice], 
-        db: Session
+        db: AsyncSession
     ) -> List[Dict[str, Any]]:
         """Check for timing-based fraud indicators"""
         indicators = []
@@ -330,7 +332,7 @@ class FraudDetectionService:
         self, 
         invoice: Invoice, 
         historical_data: List[Invoice], 
-        db: Session
+        db: AsyncSession
     ) -> List[Dict[str, Any]]:
         """Check for pattern-based fraud indicators"""
         indicators = []
@@ -355,7 +357,7 @@ class FraudDetectionService:
         self, 
         invoice: Invoice, 
         historical_data: List[Invoice], 
-        db: Session
+        db: AsyncSession
     ) -> List[Dict[str, Any]]:
         """Check for potential duplicate invoices"""
         indicators = []
@@ -388,7 +390,7 @@ class FraudDetectionService:
         
         return indicators
     
-    async def _check_vendor_risk(self, invoice: Invoice, db: Session) -> List[Dict[str, Any]]:
+    async def _check_vendor_risk(self, invoice: Invoice, db: AsyncSession) -> List[Dict[str, Any]]:
         """Check vendor risk factors"""
         indicators = []
         
@@ -412,27 +414,27 @@ class FraudDetectionService:
         self, 
         invoice: Invoice, 
         historical_data: List[Invoice], 
-        db: Session
+        db: AsyncSession
     ) -> List[Dict[str, Any]]:
         """Check for behavioral anomalies"""
         indicators = []
         
         # Check for unusual approval patterns
         if invoice.created_by_id:
-            user_invoices = db.query(Invoice).filter(
+            invoice_count = await db.scalar(select(func.count(Invoice.id)).where(
                 and_(
                     Invoice.created_by_id == invoice.created_by_id,
                     Invoice.company_id == invoice.company_id,
                     Invoice.created_at >= datetime.now(UTC) - timedelta(days=30)
                 )
-            ).all()
+            ))
             
-            if len(user_invoices) > 50:  # More than 50 invoices in 30 days
+            if invoice_count > 50:  # More than 50 invoices in 30 days
                 indicators.append({
                     "type": FraudIndicator.BEHAVIORAL_ANOMALY.value,
                     "severity": 0.6,
-                    "description": f"High volume of invoices from user: {len(user_invoices)} in 30 days",
-                    "evidence": {"invoice_count": len(user_invoices)},
+                    "description": f"High volume of invoices from user: {invoice_count} in 30 days",
+                    "evidence": {"invoice_count": invoice_count},
                     "confidence": 0.8
                 })
         
@@ -535,7 +537,7 @@ class FraudDetectionService:
         self, 
         invoice: Invoice, 
         result: FraudAnalysisResult, 
-        db: Session
+        db: AsyncSession
     ):
         """Log fraud analysis results"""
         try:
@@ -558,22 +560,22 @@ class FraudDetectionService:
             )
             
             db.add(audit_log)
-            db.commit()
+            await db.commit()
             
         except Exception as e:
             logger.error(f"Failed to log fraud analysis: {str(e)}")
     
-    async def get_fraud_analytics(self, company_id: str, db: Session) -> Dict[str, Any]:
+    async def get_fraud_analytics(self, company_id: str, db: AsyncSession) -> Dict[str, Any]:
         """Get fraud analytics for a company"""
         try:
             # Get fraud analysis data from audit logs
-            fraud_logs = db.query(AuditLog).filter(
+            fraud_logs = (await db.scalars(select(AuditLog).where(
                 and_(
                     AuditLog.company_id == company_id,
                     AuditLog.action == AuditAction.FRAUD_ANALYSIS,
                     AuditLog.created_at >= datetime.now(UTC) - timedelta(days=30)
                 )
-            ).all()
+            ))).all()
             
             if not fraud_logs:
                 return {
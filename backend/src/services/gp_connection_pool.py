@@ -0,0 +1,260 @@
+"""
+Pooled, non-blocking access to Dynamics GP company databases
+
+Opening an ODBC connection to SQL Server costs a full login round trip, and
+every pyodbc call blocks the calling thread. ``GPConnectionPool`` keeps a
+bounded set of open connections per company database, pinging ones that sat
+idle and recycling old ones; ``GPDatabaseExecutor`` runs each unit of GP work
+(checkout, queries, commit or rollback, return) on a dedicated thread pool so
+the event loop never waits on the driver.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class GPPoolTimeoutError(Exception):
+    """No GP connection became available within the pool timeout"""
+
+
+@dataclass
+class _PooledConnection:
+    connection: Any
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class GPConnectionPool:
+    """Bounded pool of DB-API connections to one GP company database
+
+    Connections are opened on demand up to ``max_size``; further checkouts
+    wait up to ``timeout`` seconds. On checkout a connection older than
+    ``recycle_seconds`` is replaced, and one idle for longer than
+    ``ping_after_seconds`` is checked with ``SELECT 1`` first. On return the
+    open transaction is rolled back, so work that did not commit leaves no
+    locks behind in GP.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], Any],
+        max_size: int = 5,
+        timeout: float = 30.0,
+        recycle_seconds: float = 1800.0,
+        ping_after_seconds: float = 30.0
+    ):
+        self.name = name
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle_seconds = recycle_seconds
+        self.ping_after_seconds = ping_after_seconds
+        self._idle: List[_PooledConnection] = []
+        self._open = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self.stats = {"created": 0, "recycled": 0, "failed_pings": 0, "invalidated": 0, "waits": 0, "timeouts": 0}
+
+    def acquire(self) -> _PooledConnection:
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError(f"GP connection pool {self.name} is closed")
+                if self._idle:
+                    # Most recently used first, so surplus connections age out
+                    entry = self._idle.pop()
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    entry = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    raise GPPoolTimeoutError(
+                        f"No connection to GP database {self.name} within {self.timeout:.0f}s "
+                        f"({self.max_size} in use)"
+                    )
+                self.stats["waits"] += 1
+                self._condition.wait(remaining)
+
+        try:
+            if entry is not None:
+                entry = self._validate(entry)
+            if entry is None:
+                entry = _PooledConnection(self._connect())
+                self.stats["created"] += 1
+        except Exception:
+            self._discard_slot()
+            raise
+        return entry
+
+    def release(self, entry: _PooledConnection, invalidate: bool = False):
+        if not invalidate:
+            try:
+                entry.connection.rollback()
+            except Exception as e:
+                logger.warning(f"Discarding GP connection to {self.name} that failed to reset: {e}")
+                invalidate = True
+
+        if invalidate or self._closed:
+            self.stats["invalidated"] += invalidate
+            self._close_quietly(entry)
+            self._discard_slot()
+            return
+
+        entry.last_used = time.monotonic()
+        with self._condition:
+            self._idle.append(entry)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; errors roll back and drop connections the driver reports as broken"""
+        entry = self.acquire()
+        invalidate = False
+        try:
+            yield entry.connection
+        except Exception as e:
+            invalidate = is_disconnect_error(e)
+            raise
+        finally:
+            self.release(entry, invalidate=invalidate)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._condition.notify_all()
+        for entry in idle:
+            self._close_quietly(entry)
+
+    def status(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                **self.stats
+            }
+
+    def _validate(self, entry: _PooledConnection) -> Optional[_PooledConnection]:
+        """The entry if still usable, otherwise None after closing it (its slot stays reserved)"""
+        now = time.monotonic()
+        if now - entry.created_at > self.recycle_seconds:
+            self.stats["recycled"] += 1
+            self._close_quietly(entry)
+            return None
+        if now - entry.last_used > self.ping_after_seconds:
+            try:
+                cursor = entry.connection.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+                cursor.close()
+            except Exception as e:
+                logger.info(f"Replacing stale GP connection to {self.name}: {e}")
+                self.stats["failed_pings"] += 1
+                self._close_quietly(entry)
+                return None
+        return entry
+
+    def _discard_slot(self):
+        with self._condition:
+            self._open -= 1
+            self._condition.notify()
+
+    @staticmethod
+    def _close_quietly(entry: _PooledConnection):
+        try:
+            entry.connection.close()
+        except Exception:
+            pass
+
+
+def is_disconnect_error(error: Exception) -> bool:
+    """Whether a driver error means the connection itself is unusable
+
+    pyodbc reports lost links and dead sessions as OperationalError or
+    InterfaceError with SQLSTATE class 08 (connection exception).
+    """
+    if type(error).__name__ in ("OperationalError", "InterfaceError"):
+        return True
+    state = str(error.args[0]) if error.args else ""
+    return state.startswith("08")
+
+
+class GPDatabaseExecutor:
+    """Runs blocking GP work off the event loop, one pool per company database
+
+    ``await executor.run(company_db, work, *args)`` checks out a connection for
+    ``company_db`` on a worker thread, calls ``work(connection, *args)`` there
+    and returns its result. Worker count bounds the number of in-flight ODBC
+    calls across all company databases.
+    """
+
+    def __init__(self, max_workers: int = 16, thread_name_prefix: str = "gp-odbc"):
+        self.pools: Dict[str, GPConnectionPool] = {}
+        self._max_workers = max_workers
+        self._thread_name_prefix = thread_name_prefix
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def register(self, pool: GPConnectionPool):
+        previous = self.pools.get(pool.name)
+        self.pools[pool.name] = pool
+        if previous is not None and previous is not pool:
+            previous.close()
+
+    def __contains__(self, company_db: str) -> bool:
+        return company_db in self.pools
+
+    async def run(self, company_db: str, work: Callable[..., Any], *args: Any) -> Any:
+        pool = self.pools.get(company_db)
+        if pool is None:
+            raise ValueError(f"No connection pool for company database: {company_db}")
+        return await self.run_on(pool, work, *args)
+
+    async def run_on(self, pool: GPConnectionPool, work: Callable[..., Any], *args: Any) -> Any:
+        """Like ``run``, for a pool not registered by company database (e.g. the DYNAMICS system database)"""
+        return await self.run_blocking(self._run_with_connection, pool, work, *args)
+
+    async def run_blocking(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run any blocking driver call on the GP worker threads"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), lambda: func(*args))
+
+    @staticmethod
+    def _run_with_connection(pool: GPConnectionPool, work: Callable[..., Any], *args: Any) -> Any:
+        with pool.connection() as connection:
+            return work(connection, *args)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers, thread_name_prefix=self._thread_name_prefix
+                    )
+        return self._executor
+
+    def status(self) -> Dict[str, Any]:
+        return {name: pool.status() for name, pool in self.pools.items()}
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+        self.pools.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
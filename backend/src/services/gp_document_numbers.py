@@ -0,0 +1,167 @@
+"""
+Block allocation of Dynamics GP document numbers
+
+GP keeps the next document number per series in SY00500. Taking numbers one
+at a time (read, increment, commit per document) makes every posting queue on
+that single row lock. ``GPDocumentNumberAllocator`` instead reserves a block
+of numbers with one atomic ``UPDATE ... OUTPUT`` and hands them out in
+process:
+
+- Numbers from a posting that failed (and was rolled back) are released back
+  and reused before the block continues.
+- On shutdown the unused tail of each block is returned to SY00500 with a
+  compare-and-set, which only succeeds if nobody reserved after us; otherwise
+  the tail is left as a gap. GP requires document numbers to be unique, not
+  contiguous, so a gap (also the outcome of a crash) is safe, while handing
+  out a number twice never happens.
+"""
+import asyncio
+import heapq
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Document type -> (SY00500 series, numbering record, printed prefix)
+DOCUMENT_NUMBER_SERIES: Dict[str, Tuple[int, str, str]] = {
+    "PM": (4, "PM_Transaction_Entry", "PM"),
+}
+
+
+class DocumentNumberError(Exception):
+    """GP has no numbering record for the document type"""
+
+
+@dataclass
+class NumberBlock:
+    """Numbers ``next`` up to (excluding) ``end`` reserved from SY00500"""
+    next: int
+    end: int
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.next
+
+
+class GPDocumentNumberAllocator:
+    """Hands out GP document numbers from blocks reserved in one statement
+
+    ``executor`` is the ``GPDatabaseExecutor`` holding the company pools.
+    Blocks are ``block_size`` numbers, or larger when a caller asks for more
+    at once (bulk posting).
+    """
+
+    def __init__(self, executor, block_size: int = 100):
+        self.executor = executor
+        self.block_size = block_size
+        self._blocks: Dict[Tuple[str, str], NumberBlock] = {}
+        self._released: Dict[Tuple[str, str], List[int]] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.stats = {"reservations": 0, "issued": 0, "reused": 0, "returned": 0}
+
+    async def next_number(self, company_db: str, doc_type: str) -> str:
+        return (await self.take(company_db, doc_type, 1))[0]
+
+    async def take(self, company_db: str, doc_type: str, count: int) -> List[str]:
+        """``count`` unique document numbers, formatted as GP stores them"""
+        series, record, prefix = self._series(doc_type)
+        key = (company_db, doc_type)
+        numbers: List[int] = []
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            released = self._released.get(key, [])
+            while released and len(numbers) < count:
+                numbers.append(heapq.heappop(released))
+            self.stats["reused"] += len(numbers)
+
+            block = self._blocks.get(key)
+            while len(numbers) < count:
+                if block is None or block.remaining == 0:
+                    size = max(self.block_size, count - len(numbers))
+                    block = await self.executor.run(company_db, self._reserve, series, record, size)
+                    self._blocks[key] = block
+                    self.stats["reservations"] += 1
+                taken = min(block.remaining, count - len(numbers))
+                numbers.extend(range(block.next, block.next + taken))
+                block.next += taken
+
+        self.stats["issued"] += count
+        return [self.format(prefix, number) for number in numbers]
+
+    def release(self, company_db: str, doc_type: str, document_numbers: List[str]):
+        """Give back numbers whose documents were never written to GP"""
+        _, _, prefix = self._series(doc_type)
+        released = self._released.setdefault((company_db, doc_type), [])
+        for document_number in document_numbers:
+            try:
+                heapq.heappush(released, int(document_number[len(prefix):]))
+            except ValueError:
+                logger.warning(f"Not reusing unrecognized GP document number {document_number}")
+
+    @staticmethod
+    def format(prefix: str, number: int) -> str:
+        return f"{prefix}{number:06d}"
+
+    @staticmethod
+    def _series(doc_type: str) -> Tuple[int, str, str]:
+        try:
+            return DOCUMENT_NUMBER_SERIES[doc_type]
+        except KeyError:
+            raise DocumentNumberError(f"No GP numbering series for document type {doc_type}") from None
+
+    @staticmethod
+    def _reserve(conn, series: int, record: str, size: int) -> NumberBlock:
+        """Advance SY00500 by ``size`` in one statement; the row lock is held only for this update"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE SY00500 WITH (ROWLOCK)
+            SET NXTNUMBR = NXTNUMBR + ?
+            OUTPUT inserted.NXTNUMBR
+            WHERE SERIES = ? AND DTAFILNM = ?
+        """, size, series, record)
+        row = cursor.fetchone()
+        if row is None:
+            conn.rollback()
+            raise DocumentNumberError(f"SY00500 has no numbering record {record} (series {series})")
+        conn.commit()
+        end = row[0]
+        return NumberBlock(next=end - size, end=end)
+
+    @staticmethod
+    def _return_tail(conn, series: int, record: str, block: NumberBlock) -> bool:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE SY00500
+            SET NXTNUMBR = ?
+            WHERE SERIES = ? AND DTAFILNM = ? AND NXTNUMBR = ?
+        """, block.next, series, record, block.end)
+        returned = cursor.rowcount == 1
+        conn.commit()
+        return returned
+
+    def return_unused(self):
+        """Hand unused block tails back to GP (blocking; call at shutdown, before the pools close)"""
+        for (company_db, doc_type), block in list(self._blocks.items()):
+            pool = self.executor.pools.get(company_db)
+            if pool is None or block.remaining == 0:
+                continue
+            series, record, _ = DOCUMENT_NUMBER_SERIES[doc_type]
+            try:
+                with pool.connection() as conn:
+                    if self._return_tail(conn, series, record, block):
+                        self.stats["returned"] += block.remaining
+                        block.end = block.next
+                    else:
+                        logger.info(f"GP {record} advanced past our block in {company_db}; "
+                                    f"leaving {block.remaining} number(s) unused")
+            except Exception as e:
+                logger.warning(f"Could not return unused GP document numbers for {company_db}: {e}")
+        self._blocks.clear()
+        self._released.clear()
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "blocks": {f"{company_db}:{doc_type}": block.remaining
+                       for (company_db, doc_type), block in self._blocks.items()},
+            **self.stats
+        }
@@ -0,0 +1,325 @@
+"""
+Batched eConnect posting of payables transactions to Dynamics GP
+
+Posting one eConnect document per invoice costs a service round trip (and a
+GP transaction) per invoice, which dominates month-end runs. eConnect accepts
+many ``<PMTransactionType>`` nodes in one document, so ``EConnectBatchPoster``
+sends invoices in bounded batches, each a single envelope streamed out with
+an XML writer rather than built by string formatting.
+
+eConnect processes a document in one SQL transaction: if any transaction in
+it fails, none are created. A rejected batch is therefore resubmitted without
+the document the error names (eConnect errors carry the node's key fields),
+or split in halves when the error names none, so a bad invoice costs a few
+extra round trips instead of failing its whole batch. Documents already
+posted are never sent again. Connection failures before a request reaches
+eConnect are retried with backoff.
+"""
+import asyncio
+import io
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, UTC
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from xml.sax.saxutils import XMLGenerator
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# PM distribution types (DISTTYPE)
+DISTRIBUTION_PAYABLES = 2
+DISTRIBUTION_PURCHASES = 6
+DISTRIBUTION_TAX = 10
+
+_VOUCHER_IN_ERROR = re.compile(r"VCHNUMWK\s*=\s*(\S+)", re.IGNORECASE)
+_CHUNK_SIZE = 64 * 1024
+
+
+class EConnectError(Exception):
+    """eConnect rejected a document; the message is eConnect's error text"""
+
+
+@dataclass
+class EConnectDistribution:
+    account: str
+    distribution_type: int
+    debit: Decimal = Decimal("0")
+    credit: Decimal = Decimal("0")
+    reference: str = ""
+
+
+@dataclass
+class EConnectDocument:
+    """One payables transaction (taPMTransactionInsert plus its distributions)
+
+    ``key`` identifies the caller's record (e.g. the invoice id) in results.
+    """
+    key: str
+    batch_number: str
+    voucher_number: str
+    vendor_id: str
+    document_number: str
+    document_date: Any
+    amount: Decimal
+    tax_amount: Decimal = Decimal("0")
+    currency: str = "USD"
+    description: str = ""
+    distributions: List[EConnectDistribution] = field(default_factory=list)
+
+
+@dataclass
+class EConnectResult:
+    key: str
+    voucher_number: str
+    posted: bool
+    error: Optional[str] = None
+    # eConnect refused it (nothing was written), as opposed to an unreachable service
+    rejected: bool = False
+    submissions: int = 0
+
+
+def _format_date(value: Any) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value or datetime.now(UTC).strftime("%Y-%m-%d"))[:10]
+
+
+def _money(value: Any) -> str:
+    return str(Decimal(str(value or 0)).quantize(Decimal("0.01")))
+
+
+def _element(writer: XMLGenerator, name: str, value: Any):
+    writer.startElement(name, {})
+    writer.characters(str(value))
+    writer.endElement(name)
+
+
+def _write_document(writer: XMLGenerator, document: EConnectDocument):
+    writer.startElement("PMTransactionType", {})
+
+    if document.distributions:
+        _write_distributions(writer, document)
+
+    writer.startElement("taPMTransactionInsert", {})
+    _element(writer, "BACHNUMB", document.batch_number)
+    _element(writer, "VCHNUMWK", document.voucher_number)
+    _element(writer, "VENDORID", document.vendor_id)
+    _element(writer, "DOCNUMBR", document.document_number)
+    _element(writer, "DOCTYPE", 1)
+    _element(writer, "DOCAMNT", _money(document.amount))
+    _element(writer, "DOCDATE", _format_date(document.document_date))
+    _element(writer, "PRCHAMNT", _money(Decimal(str(document.amount)) - Decimal(str(document.tax_amount))))
+    _element(writer, "TAXAMNT", _money(document.tax_amount))
+    _element(writer, "CHRGAMNT", _money(document.amount))
+    _element(writer, "CURNCYID", document.currency)
+    if document.description:
+        _element(writer, "TRXDSCRN", document.description[:30])
+    # Without explicit distributions GP creates the vendor's default ones
+    _element(writer, "CREATEDIST", 0 if document.distributions else 1)
+    writer.endElement("taPMTransactionInsert")
+
+    writer.endElement("PMTransactionType")
+
+
+def _write_distributions(writer: XMLGenerator, document: EConnectDocument):
+    writer.startElement("taPMDistribution_Items", {})
+    for sequence, distribution in enumerate(document.distributions, start=1):
+        writer.startElement("taPMDistribution_Items", {})
+        _element(writer, "DOCTYPE", 1)
+        _element(writer, "VCHRNMBR", document.voucher_number)
+        _element(writer, "VENDORID", document.vendor_id)
+        _element(writer, "DSTSQNUM", sequence * 16384)
+        _element(writer, "DISTTYPE", distribution.distribution_type)
+        _element(writer, "ACTNUMST", distribution.account)
+        _element(writer, "DEBITAMT", _money(distribution.debit))
+        _element(writer, "CRDTAMNT", _money(distribution.credit))
+        if distribution.reference:
+            _element(writer, "DistRef", distribution.reference[:30])
+        writer.endElement("taPMDistribution_Items")
+    writer.endElement("taPMDistribution_Items")
+
+
+def iter_econnect_envelope(documents: Iterable[EConnectDocument], chunk_size: int = _CHUNK_SIZE) -> Iterator[bytes]:
+    """One eConnect document holding every transaction, yielded in chunks as it is written"""
+    buffer = io.BytesIO()
+    writer = XMLGenerator(buffer, encoding="utf-8", short_empty_elements=True)
+
+    def drain(force: bool = False) -> Optional[bytes]:
+        if buffer.tell() >= chunk_size or (force and buffer.tell()):
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+        return None
+
+    writer.startDocument()
+    writer.startElement("eConnect", {"xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance"})
+    for document in documents:
+        _write_document(writer, document)
+        chunk = drain()
+        if chunk:
+            yield chunk
+    writer.endElement("eConnect")
+    writer.endDocument()
+    chunk = drain(force=True)
+    if chunk:
+        yield chunk
+
+
+def build_econnect_xml(documents: Iterable[EConnectDocument]) -> str:
+    return b"".join(iter_econnect_envelope(documents)).decode("utf-8")
+
+
+class EConnectServiceTransport:
+    """Submits eConnect documents to the GP eConnect Integration Service
+
+    The service's ``CreateTransactionEntity`` operation takes the target
+    company's connection string and the eConnect XML, and answers with a SOAP
+    fault carrying eConnect's error text when it rejects the document.
+    """
+
+    ACTION = "http://tempuri.org/eConnect/CreateTransactionEntity"
+
+    def __init__(self, url: str, timeout: float = 120.0, auth: Optional[httpx.Auth] = None):
+        self.url = url
+        self.timeout = timeout
+        self.auth = auth
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _soap_chunks(self, connection_string: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        # The eConnect document travels as an escaped string parameter of the SOAP call
+        buffer = io.BytesIO()
+        writer = XMLGenerator(buffer, encoding="utf-8")
+        soap = "http://schemas.xmlsoap.org/soap/envelope/"
+        writer.startDocument()
+        writer.startElement("s:Envelope", {"xmlns:s": soap})
+        writer.startElement("s:Body", {})
+        writer.startElement("CreateTransactionEntity", {"xmlns": "http://tempuri.org/"})
+        _element(writer, "connectionString", connection_string)
+        writer.startElement("xml", {})
+        for chunk in chunks:
+            writer.characters(chunk.decode("utf-8"))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        writer.endElement("xml")
+        writer.endElement("CreateTransactionEntity")
+        writer.endElement("s:Body")
+        writer.endElement("s:Envelope")
+        writer.endDocument()
+        yield buffer.getvalue()
+
+    async def submit(self, connection_string: str, chunks: Iterable[bytes]):
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, auth=self.auth)
+
+        async def body():
+            for chunk in self._soap_chunks(connection_string, chunks):
+                if chunk:
+                    yield chunk
+
+        response = await self._client.post(
+            self.url,
+            content=body(),
+            headers={"Content-Type": "text/xml; charset=utf-8", "SOAPAction": self.ACTION}
+        )
+        if response.status_code == 500 and b"Fault" in response.content:
+            fault = re.search(rb"<faultstring[^>]*>(.*?)</faultstring>", response.content, re.DOTALL)
+            raise EConnectError(fault.group(1).decode("utf-8", "replace") if fault else response.text)
+        response.raise_for_status()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _is_retryable(error: Exception) -> bool:
+    # Only failures where the request cannot have reached eConnect; anything
+    # later may have committed, and resending would duplicate the documents
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, ConnectionRefusedError))
+
+
+class EConnectBatchPoster:
+    """Posts documents in batches of at most ``batch_size`` per eConnect call
+
+    ``transport.submit(connection_string, chunks)`` sends one eConnect
+    document, raising ``EConnectError`` when eConnect rejects it.
+    """
+
+    def __init__(self, transport, batch_size: int = 50, max_attempts: int = 3, retry_delay: float = 1.0):
+        self.transport = transport
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.stats = {"submissions": 0, "posted": 0, "failed": 0, "retries": 0}
+
+    async def post(self, connection_string: str, documents: List[EConnectDocument]) -> List[EConnectResult]:
+        """Results in the order of ``documents``"""
+        results: Dict[int, EConnectResult] = {
+            id(document): EConnectResult(key=document.key, voucher_number=document.voucher_number, posted=False)
+            for document in documents
+        }
+        for start in range(0, len(documents), self.batch_size):
+            await self._post_batch(connection_string, documents[start:start + self.batch_size], results)
+        return [results[id(document)] for document in documents]
+
+    async def _post_batch(self, connection_string: str, batch: List[EConnectDocument],
+                          results: Dict[int, EConnectResult]):
+        pending = list(batch)
+        while pending:
+            for document in pending:
+                results[id(document)].submissions += 1
+            try:
+                await self._submit(connection_string, pending)
+            except EConnectError as e:
+                culprit = self._blame(e, pending)
+                if culprit is not None:
+                    self._fail(results[id(culprit)], str(e), rejected=True)
+                    pending.remove(culprit)
+                    continue
+                if len(pending) == 1:
+                    self._fail(results[id(pending[0])], str(e), rejected=True)
+                    return
+                # The error names no document: find the bad one(s) by halves
+                middle = len(pending) // 2
+                await self._post_batch(connection_string, pending[:middle], results)
+                await self._post_batch(connection_string, pending[middle:], results)
+                return
+            except Exception as e:
+                for document in pending:
+                    self._fail(results[id(document)], f"eConnect unavailable: {e}")
+                return
+
+            for document in pending:
+                results[id(document)].posted = True
+            self.stats["posted"] += len(pending)
+            return
+
+    async def _submit(self, connection_string: str, documents: List[EConnectDocument]):
+        for attempt in range(1, self.max_attempts + 1):
+            self.stats["submissions"] += 1
+            try:
+                return await self.transport.submit(connection_string, iter_econnect_envelope(documents))
+            except Exception as e:
+                if not _is_retryable(e) or attempt == self.max_attempts:
+                    raise
+                self.stats["retries"] += 1
+                logger.warning(f"eConnect connection failed (attempt {attempt}/{self.max_attempts}): {e}")
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+    def _fail(self, result: EConnectResult, error: str, rejected: bool = False):
+        result.error = error
+        result.rejected = rejected
+        self.stats["failed"] += 1
+
+    @staticmethod
+    def _blame(error: EConnectError, documents: List[EConnectDocument]) -> Optional[EConnectDocument]:
+        match = _VOUCHER_IN_ERROR.search(str(error))
+        if not match:
+            return None
+        voucher = match.group(1).strip()
+        return next((document for document in documents if document.voucher_number == voucher), None)
@@ -0,0 +1,537 @@
+"""
+Local mirror of Dynamics GP master data for invoice matching
+
+Matching an invoice used to search GP itself: ``VENDNAME LIKE '%name%'`` over
+PM00200 and an amount-range scan of POP10100, per invoice, on the customer's
+production ERP. ``GPMasterDataMirror`` keeps copies of vendors, open purchase
+orders, PO lines, receipts and receipt lines in the application database and
+answers those lookups from local indexes; only vendor creation and posting
+still go to GP.
+
+Sync is incremental. Every mirrored GP table carries ``DEX_ROW_TS``, which GP
+stamps on insert and update, so each pass reads only rows changed since the
+stored watermark, in ``(DEX_ROW_TS, key)`` keyset pages. Each pass starts a
+short lookback before the watermark because a row written by a transaction
+that commits late can carry a timestamp older than rows already copied; the
+re-read rows are upserted idempotently. Deleted rows (POs and receipts moved
+to history, removed lines) leave no trace in ``DEX_ROW_TS``, so the key sets
+are reconciled against GP on a slower schedule.
+
+Vendor names are matched on a normalized key (case, punctuation and legal
+suffixes removed): exact, then substring, then fuzzy — ``pg_trgm`` similarity
+on PostgreSQL, ``difflib`` over the company's vendor keys elsewhere.
+"""
+import asyncio
+import difflib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, UTC
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Numeric, delete, func, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.models.gp_mirror import (
+    GPMirrorPurchaseOrder, GPMirrorPurchaseOrderLine, GPMirrorReceipt, GPMirrorReceiptLine, GPMirrorSyncState,
+    GPMirrorVendor
+)
+from core.config import settings
+from core.lazy import LazyService
+from services.dynamics_gp_integration import (
+    GPPurchaseOrder, GPShipment, PO_STATUS_DESCRIPTIONS, RECEIPT_TYPE_DESCRIPTIONS, dynamics_gp_integration
+)
+from services.vendor_resolution import vendor_name_key
+
+logger = logging.getLogger(__name__)
+
+# Minimum pg_trgm similarity for a vendor name to count as a fuzzy match
+TRIGRAM_THRESHOLD = 0.4
+# difflib ratio for the fuzzy vendor fallback on other databases
+FUZZY_CUTOFF = 0.75
+
+OPEN_PO_STATUSES = (1, 2, 3, 4)
+RECEIPT_TYPES = (1, 2, 3)
+# PO search window around the invoice total, as in the direct GP query
+PO_AMOUNT_TOLERANCE = 0.2
+
+
+@dataclass(frozen=True)
+class MirrorTable:
+    """How one GP table maps onto its mirror model
+
+    ``columns`` maps GP columns to model attributes; ``keys`` are the GP
+    primary key columns, in keyset order.
+    """
+    source: str
+    model: type
+    keys: Tuple[str, ...]
+    columns: Dict[str, str]
+
+    def key_attributes(self) -> List[str]:
+        return [self.columns[key] for key in self.keys]
+
+
+MIRROR_TABLES: Tuple[MirrorTable, ...] = (
+    MirrorTable("PM00200", GPMirrorVendor, ("VENDORID",), {
+        "VENDORID": "vendor_id", "VENDNAME": "vendor_name", "VENDSTTS": "status", "PYMTRMID": "payment_terms",
+        "TXSCHDUL": "tax_schedule", "CURNCYID": "currency_code"
+    }),
+    MirrorTable("POP10100", GPMirrorPurchaseOrder, ("PONUMBER",), {
+        "PONUMBER": "po_number", "VENDORID": "vendor_id", "DOCDATE": "po_date", "REQDATE": "required_date",
+        "SUBTOTAL": "subtotal", "CURNCYID": "currency_code", "POSTATUS": "status", "POTYPE": "po_type"
+    }),
+    MirrorTable("POP10110", GPMirrorPurchaseOrderLine, ("PONUMBER", "ORD"), {
+        "PONUMBER": "po_number", "ORD": "line_number", "ITEMNMBR": "item_number", "ITEMDESC": "description",
+        "QTYORDER": "quantity", "UNITCOST": "unit_cost", "EXTDCOST": "extended_cost", "UOFM": "unit_of_measure"
+    }),
+    MirrorTable("POP10300", GPMirrorReceipt, ("POPRCTNM",), {
+        "POPRCTNM": "receipt_number", "PONUMBER": "po_number", "RECEIPTDATE": "receipt_date",
+        "VENDORID": "vendor_id", "SUBTOTAL": "subtotal", "CURNCYID": "currency_code", "POPTYPE": "receipt_type"
+    }),
+    MirrorTable("POP10310", GPMirrorReceiptLine, ("POPRCTNM", "RCPTLNNM"), {
+        "POPRCTNM": "receipt_number", "RCPTLNNM": "line_number", "PONUMBER": "po_number",
+        "ITEMNMBR": "item_number", "ITEMDESC": "description", "QTYSHPPD": "quantity", "UNITCOST": "unit_cost",
+        "EXTDCOST": "extended_cost"
+    }),
+)
+
+
+def _keyset_condition(keys: Sequence[str], values: Sequence[Any]) -> Tuple[str, List[Any]]:
+    """``(k1, k2, ...) > (v1, v2, ...)`` spelled out, since T-SQL has no row-value comparison"""
+    if len(keys) == 1:
+        return f"{keys[0]} > ?", [values[0]]
+    rest, params = _keyset_condition(keys[1:], values[1:])
+    return f"({keys[0]} > ? OR ({keys[0]} = ? AND {rest}))", [values[0], values[0], *params]
+
+
+def _clean(value: Any) -> Any:
+    # GP CHAR columns come back space-padded
+    return value.strip() if isinstance(value, str) else value
+
+
+def _aware(moment: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands timezone-aware columns back naive
+    if moment is not None and moment.tzinfo is None:
+        return moment.replace(tzinfo=UTC)
+    return moment
+
+
+class GPMasterDataMirror:
+    """Incrementally synchronized local copy of GP vendors, POs and receipts
+
+    ``gp`` is the ``DynamicsGPIntegration`` whose pooled connections the sync
+    reads through; attach the mirror with ``gp.master_data = mirror`` so its
+    lookups are served locally once a company has completed a first sync.
+    """
+
+    def __init__(
+        self,
+        gp,
+        session_factory: Optional[async_sessionmaker] = None,
+        batch_size: int = None,
+        lookback_seconds: float = None,
+        reconcile_interval_seconds: float = None
+    ):
+        self.gp = gp
+        self._session_factory = session_factory
+        self.batch_size = batch_size or settings.GP_MIRROR_BATCH_SIZE
+        self.lookback = timedelta(seconds=settings.GP_MIRROR_LOOKBACK_SECONDS if lookback_seconds is None
+                                  else lookback_seconds)
+        self.reconcile_interval = timedelta(
+            seconds=settings.GP_MIRROR_RECONCILE_INTERVAL_SECONDS if reconcile_interval_seconds is None
+            else reconcile_interval_seconds
+        )
+        self._ready: set = set()
+        self._vendor_keys: Dict[str, List[Tuple[str, str]]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"passes": 0, "rows_upserted": 0, "rows_deleted": 0, "failures": 0}
+
+    def _session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from core.database import get_async_sessionmaker
+            self._session_factory = get_async_sessionmaker()
+        return self._session_factory()
+
+    # Sync
+
+    async def sync_all(self) -> Dict[str, Dict[str, int]]:
+        """One pass over every company database the GP service has a pool for"""
+        if not self.gp.connection_pools:
+            await self.gp.initialize_connections()
+        results = {}
+        for company_db in list(self.gp.connection_pools):
+            try:
+                results[company_db] = await self.sync_company(company_db)
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.error(f"GP mirror sync failed for {company_db}: {e}")
+        return results
+
+    async def sync_company(self, company_db: str, reconcile: Optional[bool] = None) -> Dict[str, int]:
+        """Copy rows changed since the last pass; reconcile deletions when due (or when ``reconcile``)"""
+        lock = self._locks.setdefault(company_db, asyncio.Lock())
+        async with lock:
+            changed = {}
+            for table in MIRROR_TABLES:
+                changed[table.source] = await self._sync_table(company_db, table, reconcile)
+            self.stats["passes"] += 1
+            self._ready.add(company_db)
+            return changed
+
+    async def _sync_table(self, company_db: str, table: MirrorTable, reconcile: Optional[bool]) -> int:
+        async with self._session() as session:
+            state = await session.get(GPMirrorSyncState, (company_db, table.source))
+            if state is None:
+                state = GPMirrorSyncState(company_db=company_db, source_table=table.source, rows_synced=0)
+                session.add(state)
+            initial_load = state.last_row_ts is None
+
+            since = after = None
+            if not initial_load and self.lookback:
+                since = state.last_row_ts - self.lookback
+            elif not initial_load:
+                after = (state.last_row_ts, json.loads(state.last_key))
+            copied = 0
+            while True:
+                rows = await self.gp._run_gp(company_db, self._fetch_changes, table, since, after)
+                if not rows:
+                    break
+                await self._upsert(session, company_db, table, rows)
+                last = rows[-1]
+                after = (last["dex_row_ts"], [last[attribute] for attribute in table.key_attributes()])
+                since = None
+                if state.last_row_ts is None or after[0] >= state.last_row_ts:
+                    state.last_row_ts, state.last_key = after[0], json.dumps(after[1])
+                state.rows_synced += len(rows)
+                # Commit per page, so an interrupted initial load resumes where it stopped
+                await session.commit()
+                copied += len(rows)
+                if len(rows) < self.batch_size:
+                    break
+
+            now = datetime.now(UTC)
+            state.last_synced_at = now
+            due = (state.last_reconciled_at is None
+                   or now - _aware(state.last_reconciled_at) >= self.reconcile_interval)
+            if initial_load:
+                # A full load has nothing stale to remove
+                state.last_reconciled_at = now
+            elif reconcile or (reconcile is None and due):
+                await self._reconcile(session, company_db, table)
+                state.last_reconciled_at = now
+            await session.commit()
+
+        if copied and table.model is GPMirrorVendor:
+            self._vendor_keys.pop(company_db, None)
+        self.stats["rows_upserted"] += copied
+        return copied
+
+    def _fetch_changes(self, conn, table: MirrorTable, since: Optional[datetime],
+                       after: Optional[Tuple[datetime, List[Any]]]) -> List[Dict[str, Any]]:
+        """Next keyset page of changed rows, as mirror attribute dicts (runs on a GP worker thread)"""
+        columns = ", ".join([*table.columns, "DEX_ROW_TS"])
+        order = ", ".join(["DEX_ROW_TS", *table.keys])
+        params: List[Any] = []
+        where = ""
+        if after is not None:
+            keyset, key_params = _keyset_condition(table.keys, after[1])
+            where = f"WHERE DEX_ROW_TS > ? OR (DEX_ROW_TS = ? AND {keyset})"
+            params = [after[0], after[0], *key_params]
+        elif since is not None:
+            where = "WHERE DEX_ROW_TS >= ?"
+            params = [since]
+
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT TOP {int(self.batch_size)} {columns} FROM {table.source} {where} ORDER BY {order}",
+                       *params)
+        numeric = {attribute for attribute in table.columns.values()
+                   if isinstance(table.model.__table__.c[attribute].type, Numeric)}
+        rows = []
+        for row in cursor.fetchall():
+            values = {}
+            for index, attribute in enumerate(table.columns.values()):
+                value = _clean(row[index])
+                values[attribute] = Decimal(str(value)) if attribute in numeric and value is not None else value
+            values["dex_row_ts"] = row[len(table.columns)]
+            rows.append(values)
+        return rows
+
+    async def _upsert(self, session: AsyncSession, company_db: str, table: MirrorTable, rows: List[Dict[str, Any]]):
+        now = datetime.now(UTC)
+        values = []
+        for row in rows:
+            value = {"company_db": company_db, **row}
+            if table.model is GPMirrorVendor:
+                value["name_key"] = vendor_name_key(row["vendor_name"])
+            if "synced_at" in table.model.__table__.c:
+                value["synced_at"] = now
+            values.append(value)
+
+        from core.database import upsert_rows
+        await upsert_rows(session, table.model, values)
+
+    async def _reconcile(self, session: AsyncSession, company_db: str, table: MirrorTable) -> int:
+        """Delete mirror rows whose keys GP no longer has"""
+        gp_keys = await self.gp._run_gp(company_db, self._fetch_keys, table)
+        key_columns = [getattr(table.model, attribute) for attribute in table.key_attributes()]
+        mirror_keys = set((await session.execute(
+            select(*key_columns).where(table.model.company_db == company_db)
+        )).all())
+        missing = [tuple(key) for key in mirror_keys if tuple(key) not in gp_keys]
+        for start in range(0, len(missing), 500):
+            await session.execute(delete(table.model).where(
+                table.model.company_db == company_db,
+                tuple_(*key_columns).in_(missing[start:start + 500])
+            ))
+        if missing:
+            logger.info(f"GP mirror removed {len(missing)} {table.source} row(s) no longer in {company_db}")
+            if table.model is GPMirrorVendor:
+                self._vendor_keys.pop(company_db, None)
+        self.stats["rows_deleted"] += len(missing)
+        return len(missing)
+
+    @staticmethod
+    def _fetch_keys(conn, table: MirrorTable) -> set:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(table.keys)} FROM {table.source}")
+        return {tuple(_clean(value) for value in row) for row in cursor.fetchall()}
+
+    async def is_ready(self, company_db: str) -> bool:
+        """Whether every mirrored table of ``company_db`` has completed a first sync"""
+        if company_db in self._ready:
+            return True
+        async with self._session() as session:
+            synced = (await session.execute(
+                select(func.count()).select_from(GPMirrorSyncState).where(
+                    GPMirrorSyncState.company_db == company_db,
+                    GPMirrorSyncState.last_synced_at.is_not(None)
+                )
+            )).scalar()
+        if synced >= len(MIRROR_TABLES):
+            self._ready.add(company_db)
+            return True
+        return False
+
+    # Lookups
+
+    async def find_vendor(self, company_db: str, name: str) -> Optional[Dict[str, Any]]:
+        """Best mirrored vendor for a name or vendor ID, in the shape ``_ensure_vendor_exists`` returns"""
+        key = vendor_name_key(name)
+        if not key:
+            return None
+        async with self._session() as session:
+            vendor = await self._match_vendor(session, company_db, name.strip().upper(), key)
+        if vendor is None:
+            return None
+        return {
+            "vendor_id": vendor.vendor_id,
+            "vendor_name": vendor.vendor_name,
+            "status": "existing",
+            "is_active": vendor.status == 1,
+            "payment_terms": vendor.payment_terms or "Net 30",
+            "currency": vendor.currency_code or "USD"
+        }
+
+    async def _match_vendor(self, session: AsyncSession, company_db: str, vendor_id: str,
+                            key: str) -> Optional[GPMirrorVendor]:
+        vendors = select(GPMirrorVendor).where(GPMirrorVendor.company_db == company_db)
+        # Active vendors first, then the closest name
+        active_first = GPMirrorVendor.status != 1
+
+        exact = (await session.execute(
+            vendors.where(or_(GPMirrorVendor.vendor_id == vendor_id, GPMirrorVendor.name_key == key))
+            .order_by(active_first, GPMirrorVendor.vendor_id).limit(1)
+        )).scalar_one_or_none()
+        if exact is not None:
+            return exact
+
+        contains = GPMirrorVendor.name_key.contains(key, autoescape=True)
+        if session.get_bind().dialect.name == "postgresql":
+            similarity = func.similarity(GPMirrorVendor.name_key, key)
+            return (await session.execute(
+                vendors.where(or_(contains, similarity >= TRIGRAM_THRESHOLD))
+                .order_by(active_first, similarity.desc()).limit(1)
+            )).scalar_one_or_none()
+
+        containing = (await session.execute(
+            vendors.where(contains).order_by(active_first, func.length(GPMirrorVendor.name_key)).limit(1)
+        )).scalar_one_or_none()
+        if containing is not None:
+            return containing
+
+        candidates = self._vendor_keys.get(company_db)
+        if candidates is None:
+            candidates = (await session.execute(
+                select(GPMirrorVendor.name_key, GPMirrorVendor.vendor_id)
+                .where(GPMirrorVendor.company_db == company_db)
+            )).all()
+            self._vendor_keys[company_db] = candidates = [tuple(row) for row in candidates]
+        by_key = dict(candidates)
+        close = difflib.get_close_matches(key, list(by_key), n=1, cutoff=FUZZY_CUTOFF)
+        if not close:
+            return None
+        return await session.get(GPMirrorVendor, (company_db, by_key[close[0]]))
+
+    async def find_purchase_order(
+        self,
+        invoice_data: Dict[str, Any],
+        company_db: str,
+        po_number: Optional[str] = None
+    ) -> Optional[GPPurchaseOrder]:
+        """Open PO by number, or the vendor's open PO closest to the invoice total"""
+        query = select(GPMirrorPurchaseOrder).where(
+            GPMirrorPurchaseOrder.company_db == company_db,
+            GPMirrorPurchaseOrder.status.in_(OPEN_PO_STATUSES)
+        )
+        async with self._session() as session:
+            if po_number:
+                query = query.where(GPMirrorPurchaseOrder.po_number == po_number.strip())
+            else:
+                vendor_name = invoice_data.get("vendor_name", "")
+                key = vendor_name_key(vendor_name)
+                vendor = await self._match_vendor(session, company_db, vendor_name.strip().upper(), key) if key else None
+                if vendor is None:
+                    return None
+                amount = Decimal(str(invoice_data.get("total_amount", 0)))
+                tolerance = amount * Decimal(str(PO_AMOUNT_TOLERANCE))
+                query = query.where(
+                    GPMirrorPurchaseOrder.vendor_id == vendor.vendor_id,
+                    GPMirrorPurchaseOrder.subtotal.between(amount - tolerance, amount + tolerance)
+                ).order_by(func.abs(GPMirrorPurchaseOrder.subtotal - amount))
+
+            po = (await session.execute(query.limit(1))).scalar_one_or_none()
+            if po is None:
+                return None
+
+            lines = (await session.execute(
+                select(GPMirrorPurchaseOrderLine).where(
+                    GPMirrorPurchaseOrderLine.company_db == company_db,
+                    GPMirrorPurchaseOrderLine.po_number == po.po_number
+                ).order_by(GPMirrorPurchaseOrderLine.line_number)
+            )).scalars().all()
+            receipts = (await session.execute(
+                select(GPMirrorReceipt).where(
+                    GPMirrorReceipt.company_db == company_db, GPMirrorReceipt.po_number == po.po_number
+                ).order_by(GPMirrorReceipt.receipt_date)
+            )).scalars().all()
+
+        return GPPurchaseOrder(
+            po_number=po.po_number,
+            vendor_id=po.vendor_id,
+            po_date=po.po_date,
+            required_date=po.required_date,
+            total_amount=po.subtotal,
+            currency_code=po.currency_code or "",
+            status=PO_STATUS_DESCRIPTIONS.get(po.status, f"Unknown({po.status})"),
+            type_id=po.po_type,
+            company_db=company_db,
+            line_items=[
+                {
+                    "line_number": line.line_number,
+                    "item_number": line.item_number or "",
+                    "description": line.description or "",
+                    "quantity": line.quantity,
+                    "unit_price": line.unit_cost,
+                    "total": line.extended_cost,
+                    "unit_of_measure": line.unit_of_measure or ""
+                }
+                for line in lines
+            ],
+            shipments=[
+                {
+                    "receipt_number": receipt.receipt_number,
+                    "receipt_date": receipt.receipt_date,
+                    "total_amount": receipt.subtotal,
+                    "status": RECEIPT_TYPE_DESCRIPTIONS.get(receipt.receipt_type, f"Unknown({receipt.receipt_type})")
+                }
+                for receipt in receipts
+            ]
+        )
+
+    async def find_shipments(self, po_number: str, company_db: str, include_all: bool = True) -> List[GPShipment]:
+        """Receipts against a PO, most recent first"""
+        async with self._session() as session:
+            query = select(GPMirrorReceipt).where(
+                GPMirrorReceipt.company_db == company_db,
+                GPMirrorReceipt.po_number == po_number.strip(),
+                GPMirrorReceipt.receipt_type.in_(RECEIPT_TYPES)
+            ).order_by(GPMirrorReceipt.receipt_date.desc())
+            if not include_all:
+                query = query.limit(1)
+            receipts = (await session.execute(query)).scalars().all()
+
+            shipments = []
+            for receipt in receipts:
+                lines = (await session.execute(
+                    select(GPMirrorReceiptLine).where(
+                        GPMirrorReceiptLine.company_db == company_db,
+                        GPMirrorReceiptLine.receipt_number == receipt.receipt_number
+                    ).order_by(GPMirrorReceiptLine.line_number)
+                )).scalars().all()
+                shipments.append(GPShipment(
+                    shipment_number=receipt.receipt_number,
+                    po_number=receipt.po_number,
+                    receipt_date=receipt.receipt_date,
+                    vendor_id=receipt.vendor_id,
+                    total_amount=receipt.subtotal,
+                    currency_code=receipt.currency_code or "",
+                    status=RECEIPT_TYPE_DESCRIPTIONS.get(receipt.receipt_type, f"Unknown({receipt.receipt_type})"),
+                    line_items=[
+                        {
+                            "line_number": line.line_number,
+                            "item_number": line.item_number or "",
+                            "description": line.description or "",
+                            "quantity": line.quantity,
+                            "unit_price": line.unit_cost,
+                            "total": line.extended_cost
+                        }
+                        for line in lines
+                    ]
+                ))
+        return shipments
+
+    # Background sync
+
+    async def _sync_loop(self, interval: float):
+        while True:
+            try:
+                await self.sync_all()
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.error(f"GP mirror sync pass failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def start(self, interval: float = None):
+        """Sync every ``interval`` seconds in the background"""
+        if self._task is not None:
+            return
+        interval = interval or settings.GP_MIRROR_SYNC_INTERVAL_SECONDS
+        self._task = asyncio.get_running_loop().create_task(self._sync_loop(interval))
+        logger.info(f"Syncing the GP master-data mirror every {interval:.0f}s")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {"ready_companies": sorted(self._ready), "running": self._task is not None, "stats": dict(self.stats)}
+
+
+def _create_master_data_mirror() -> GPMasterDataMirror:
+    gp = dynamics_gp_integration.get()
+    mirror = GPMasterDataMirror(gp)
+    gp.master_data = mirror
+    return mirror
+
+
+# Global mirror instance; constructing it attaches it to the GP service
+gp_master_data = LazyService(_create_master_data_mirror)
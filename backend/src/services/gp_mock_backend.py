@@ -0,0 +1,506 @@
+"""
+SQLite stand-in for Dynamics GP databases
+
+Provides the GP tables ``DynamicsGPIntegration`` reads and writes (SY01500,
+PM00200, PM00300, PM10000, PM10100, PM40100, POP10100, POP10110, POP10300,
+POP10310, SY00500) with GP column names and ``DEX_ROW_TS`` change stamps,
+behind a pyodbc-like connection: ``cursor.execute(sql, *params)``, rows with
+attribute access, and the T-SQL used by the service (``SELECT TOP n``,
+``GETDATE()``, ``OUTPUT inserted.*``, table lock hints). Each GP database
+(the DYNAMICS system database and every company) is a separate SQLite file,
+so tests and local development can exercise the real query paths without SQL
+Server or an ODBC driver:
+
+    backend = MockGPBackend(tmp_path)
+    backend.create_company("TWO", "Fabrikam, Inc.")
+    gp = DynamicsGPIntegration(connector=backend.connector, econnect_transport=backend.econnect())
+"""
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from services.gp_econnect import EConnectError
+
+SYSTEM_DATABASE = "DYNAMICS"
+
+SYSTEM_SCHEMA = """
+CREATE TABLE IF NOT EXISTS SY01500 (
+    CMPANYID CHAR(5) PRIMARY KEY,
+    CMPNYNAM CHAR(64) NOT NULL,
+    DB_Name CHAR(5) NOT NULL,
+    SERVER CHAR(64) NOT NULL DEFAULT 'localhost',
+    ACTIVE INTEGER NOT NULL DEFAULT 1,
+    CURNCYID CHAR(15) NOT NULL DEFAULT 'USD',
+    MCACTIVE INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+COMPANY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS PM00200 (
+    VENDORID CHAR(15) PRIMARY KEY,
+    VENDNAME CHAR(64) NOT NULL,
+    VNDCHKNM CHAR(64) NOT NULL DEFAULT '',
+    VENDSTTS INTEGER NOT NULL DEFAULT 1,
+    VNDCNTCT CHAR(60) NOT NULL DEFAULT '',
+    PYMTRMID CHAR(20) NOT NULL DEFAULT '',
+    TXSCHDUL CHAR(15) NOT NULL DEFAULT '',
+    CURNCYID CHAR(15) NOT NULL DEFAULT '',
+    PMAPRVND INTEGER NOT NULL DEFAULT 0,
+    ACPURACCT CHAR(15) NOT NULL DEFAULT '',
+    PMCSHACCT CHAR(15) NOT NULL DEFAULT '',
+    PMDISCCT CHAR(15) NOT NULL DEFAULT '',
+    PMTAXACCT CHAR(15) NOT NULL DEFAULT '',
+    VADDCDPR CHAR(15) NOT NULL DEFAULT '',
+    VADCDPAD CHAR(15) NOT NULL DEFAULT '',
+    VADCDTRO CHAR(15) NOT NULL DEFAULT '',
+    CREATDDT TIMESTAMP,
+    MODIFDT TIMESTAMP,
+    DEX_ROW_TS TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+CREATE TABLE IF NOT EXISTS PM00300 (
+    VENDORID CHAR(15) NOT NULL,
+    ADRSCODE CHAR(15) NOT NULL,
+    VNDCNTCT CHAR(60) NOT NULL DEFAULT '',
+    ADDRESS1 CHAR(60) NOT NULL DEFAULT '',
+    CITY CHAR(35) NOT NULL DEFAULT '',
+    STATE CHAR(29) NOT NULL DEFAULT '',
+    ZIPCODE CHAR(10) NOT NULL DEFAULT '',
+    COUNTRY CHAR(60) NOT NULL DEFAULT '',
+    PRIMARY KEY (VENDORID, ADRSCODE)
+);
+CREATE TABLE IF NOT EXISTS PM40100 (
+    APPAYABL CHAR(15) NOT NULL DEFAULT '',
+    CSHACCNT CHAR(15) NOT NULL DEFAULT '',
+    PMDISCCT CHAR(15) NOT NULL DEFAULT '',
+    PMTAXACCT CHAR(15) NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS PM10000 (
+    VENDORID CHAR(15) NOT NULL,
+    DOCNUMBR CHAR(21) NOT NULL,
+    DOCTYPE INTEGER NOT NULL,
+    DOCDATE TIMESTAMP,
+    DUEDATE TIMESTAMP,
+    DOCAMNT NUMERIC(19, 5) NOT NULL DEFAULT 0,
+    CURNCYID CHAR(15) NOT NULL DEFAULT '',
+    PYMTRMID CHAR(20) NOT NULL DEFAULT '',
+    PSTGDATE TIMESTAMP,
+    PTDUSRID CHAR(15) NOT NULL DEFAULT '',
+    CREATDDT TIMESTAMP,
+    MODIFDT TIMESTAMP,
+    VCHRNMBR CHAR(21) NOT NULL DEFAULT '',
+    TRXDSCRN CHAR(31) NOT NULL DEFAULT '',
+    PRIMARY KEY (VENDORID, DOCNUMBR, DOCTYPE)
+);
+CREATE TABLE IF NOT EXISTS PM10100 (
+    VENDORID CHAR(15) NOT NULL,
+    DOCNUMBR CHAR(21) NOT NULL,
+    DOCTYPE INTEGER NOT NULL,
+    SEQNUMBR INTEGER NOT NULL,
+    DSTINDX INTEGER NOT NULL,
+    ACTINDX INTEGER NOT NULL,
+    DEBITAMT NUMERIC(19, 5) NOT NULL DEFAULT 0,
+    CRDTAMNT NUMERIC(19, 5) NOT NULL DEFAULT 0,
+    DISTTYPE INTEGER NOT NULL,
+    DSTSQNUM INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS POP10100 (
+    PONUMBER CHAR(17) PRIMARY KEY,
+    VENDORID CHAR(15) NOT NULL,
+    DOCDATE TIMESTAMP,
+    REQDATE TIMESTAMP,
+    SUBTOTAL NUMERIC(19, 5) NOT NULL DEFAULT 0,
+    CURNCYID CHAR(15) NOT NULL DEFAULT 'USD',
+    POSTATUS INTEGER NOT NULL DEFAULT 1,
+    POTYPE INTEGER NOT NULL DEFAULT 1,
+    DEX_ROW_TS TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+CREATE INDEX IF NOT EXISTS POP10100_VENDOR ON POP10100 (VENDORID, POSTATUS);
+CREATE TABLE IF NOT EXISTS POP10110 (
+    PONUMBER CHAR(17) NOT NULL,
+    ORD INTEGER NOT NULL,
+    ITEMNMBR CHAR(31) NOT NULL DEFAULT '',
+    ITEMDESC CHAR(101) NOT NULL DEFAULT '',
+    QTYORDER NUMERIC(19, 5) NOT NULL DEFAULT 0,
+    UNITCOST NUMERIC(19, 5) NOT NULL DEFAULT 0,
+    EXTDCOST NUMERIC(19, 5) NOT NULL DEFAULT 0,
+    UOFM CHAR(9) NOT NULL DEFAULT 'EACH',
+    DEX_ROW_TS TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    PRIMARY KEY (PONUMBER, ORD)
+);
+CREATE TABLE IF NOT EXISTS POP10300 (
+    POPRCTNM CHAR(17) PRIMARY KEY,
+    PONUMBER CHAR(17) NOT NULL,
+    RECEIPTDATE TIMESTAMP,
+    VENDORID CHAR(15) NOT NULL,
+    SUBTOTAL NUMERIC(19, 5) NOT NULL DEFAULT 0,
+    CURNCYID CHAR(15) NOT NULL DEFAULT 'USD',
+    POPTYPE INTEGER NOT NULL DEFAULT 1,
+    DEX_ROW_TS TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+CREATE INDEX IF NOT EXISTS POP10300_PO ON POP10300 (PONUMBER);
+CREATE TABLE IF NOT EXISTS POP10310 (
+    POPRCTNM CHAR(17) NOT NULL,
+    RCPTLNNM INTEGER NOT NULL,
+    PONUMBER CHAR(17) NOT NULL,
+    ITEMNMBR CHAR(31) NOT NULL DEFAULT '',
+    ITEMDESC CHAR(101) NOT NULL DEFAULT '',
+    QTYSHPPD NUMERIC(19, 5) NOT NULL DEFAULT 0,
+    UNITCOST NUMERIC(19, 5) NOT NULL DEFAULT 0,
+    EXTDCOST NUMERIC(19, 5) NOT NULL DEFAULT 0,
+    DEX_ROW_TS TIMESTAMP NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    PRIMARY KEY (POPRCTNM, RCPTLNNM)
+);
+CREATE TRIGGER IF NOT EXISTS PM00200_DEX_ROW_TS AFTER UPDATE ON PM00200 BEGIN
+    UPDATE PM00200 SET DEX_ROW_TS = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE VENDORID = NEW.VENDORID;
+END;
+CREATE TRIGGER IF NOT EXISTS POP10100_DEX_ROW_TS AFTER UPDATE ON POP10100 BEGIN
+    UPDATE POP10100 SET DEX_ROW_TS = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE PONUMBER = NEW.PONUMBER;
+END;
+CREATE TRIGGER IF NOT EXISTS POP10110_DEX_ROW_TS AFTER UPDATE ON POP10110 BEGIN
+    UPDATE POP10110 SET DEX_ROW_TS = strftime('%Y-%m-%d %H:%M:%f', 'now')
+    WHERE PONUMBER = NEW.PONUMBER AND ORD = NEW.ORD;
+END;
+CREATE TRIGGER IF NOT EXISTS POP10300_DEX_ROW_TS AFTER UPDATE ON POP10300 BEGIN
+    UPDATE POP10300 SET DEX_ROW_TS = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE POPRCTNM = NEW.POPRCTNM;
+END;
+CREATE TRIGGER IF NOT EXISTS POP10310_DEX_ROW_TS AFTER UPDATE ON POP10310 BEGIN
+    UPDATE POP10310 SET DEX_ROW_TS = strftime('%Y-%m-%d %H:%M:%f', 'now')
+    WHERE POPRCTNM = NEW.POPRCTNM AND RCPTLNNM = NEW.RCPTLNNM;
+END;
+CREATE TABLE IF NOT EXISTS SY00500 (
+    SERIES INTEGER NOT NULL,
+    DTAFILNM CHAR(31) NOT NULL,
+    NXTNUMBR INTEGER NOT NULL,
+    PRIMARY KEY (SERIES, DTAFILNM)
+);
+"""
+
+_TOP = re.compile(r"\bSELECT\s+TOP\s+(\d+)\b", re.IGNORECASE)
+_DATABASE = re.compile(r"DATABASE=([^;]+)", re.IGNORECASE)
+_TABLE_HINT = re.compile(r"\s+WITH\s*\((?:ROWLOCK|UPDLOCK|HOLDLOCK|NOLOCK|READPAST)(?:\s*,\s*\w+)*\)", re.IGNORECASE)
+_OUTPUT = re.compile(r"\s+OUTPUT\s+((?:inserted\.\w+)(?:\s*,\s*inserted\.\w+)*)", re.IGNORECASE)
+
+
+def _timestamp(moment: datetime) -> str:
+    # Same format as the DEX_ROW_TS defaults, so timestamps compare as strings
+    return moment.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def _getdate() -> str:
+    return _timestamp(datetime.now(UTC))
+
+
+def _param(value: Any) -> Any:
+    return _timestamp(value) if isinstance(value, datetime) else value
+
+
+def _translate(sql: str) -> str:
+    """The T-SQL subset the GP service uses, as SQLite"""
+    sql = _TABLE_HINT.sub("", sql)
+    match = _TOP.search(sql)
+    if match:
+        sql = _TOP.sub("SELECT", sql, count=1).rstrip().rstrip(";") + f" LIMIT {match.group(1)}"
+    match = _OUTPUT.search(sql)
+    if match:
+        # UPDATE ... OUTPUT inserted.X ... -> UPDATE ... RETURNING X
+        returning = re.sub(r"inserted\.", "", match.group(1), flags=re.IGNORECASE)
+        sql = _OUTPUT.sub("", sql, count=1).rstrip().rstrip(";") + f" RETURNING {returning}"
+    return sql
+
+
+class MockGPRow(tuple):
+    """Row with pyodbc-style attribute access by column name"""
+
+    def __new__(cls, columns: Dict[str, int], values: Sequence[Any]):
+        row = super().__new__(cls, values)
+        row._columns = columns
+        return row
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[self._columns[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class MockGPCursor:
+    """pyodbc-like cursor: positional parameters as varargs or one sequence"""
+
+    def __init__(self, cursor: sqlite3.Cursor, latency: float):
+        self._cursor = cursor
+        self._latency = latency
+
+    def execute(self, sql: str, *params: Any) -> "MockGPCursor":
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = tuple(params[0])
+        if self._latency:
+            # Stands in for the network round trip of a real ODBC call
+            time.sleep(self._latency)
+        self._cursor.execute(_translate(sql), tuple(_param(value) for value in params))
+        return self
+
+    def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> "MockGPCursor":
+        self._cursor.executemany(_translate(sql), rows)
+        return self
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def _row(self, values):
+        if values is None:
+            return None
+        columns = {column[0]: index for index, column in enumerate(self._cursor.description)}
+        return MockGPRow(columns, values)
+
+    def fetchone(self) -> Optional[MockGPRow]:
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self) -> List[MockGPRow]:
+        return [self._row(values) for values in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class MockGPConnection:
+    """pyodbc-like connection to one mock GP database"""
+
+    def __init__(self, connection: sqlite3.Connection, latency: float = 0.0):
+        self._connection = connection
+        self._latency = latency
+        self.closed = False
+
+    def cursor(self) -> MockGPCursor:
+        if self.closed:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed connection")
+        return MockGPCursor(self._connection.cursor(), self._latency)
+
+    def execute(self, sql: str, *params: Any) -> MockGPCursor:
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self.closed = True
+        self._connection.close()
+
+
+class MockGPBackend:
+    """A set of mock GP databases in ``directory``
+
+    ``connector(connection_string)`` opens the database named by its
+    ``DATABASE=`` part, matching how ``DynamicsGPIntegration`` opens ODBC
+    connections. ``latency`` adds a blocking delay to every statement.
+    """
+
+    def __init__(self, directory, latency: float = 0.0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.latency = latency
+        self.connections_opened = 0
+        self._lock = threading.Lock()
+        with self._session(SYSTEM_DATABASE) as connection:
+            connection.executescript(SYSTEM_SCHEMA)
+
+    def path(self, database: str) -> Path:
+        return self.directory / f"{database}.db"
+
+    def _raw(self, database: str) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path(database), check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES, timeout=30
+        )
+        connection.create_function("GETDATE", 0, _getdate)
+        return connection
+
+    @contextmanager
+    def _session(self, database: str):
+        connection = self._raw(database)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def connect(self, database: str) -> MockGPConnection:
+        if database != SYSTEM_DATABASE and not self.path(database).exists():
+            raise sqlite3.OperationalError(f"Cannot open database \"{database}\" requested by the login")
+        with self._lock:
+            self.connections_opened += 1
+        return MockGPConnection(self._raw(database), self.latency)
+
+    def connector(self, connection_string: str, **kwargs) -> MockGPConnection:
+        return self.connect(self.database_for(connection_string))
+
+    @staticmethod
+    def database_for(connection_string: str) -> str:
+        match = _DATABASE.search(connection_string)
+        return match.group(1).strip() if match else SYSTEM_DATABASE
+
+    def econnect(self, latency: float = 0.0) -> "MockEConnect":
+        """An eConnect transport that creates payables transactions in these databases"""
+        return MockEConnect(self, latency)
+
+    # Seeding helpers
+
+    def create_company(self, database: str, name: Optional[str] = None, currency: str = "USD",
+                       next_pm_number: int = 1):
+        """Register a company in SY01500 and create its database"""
+        with self._session(SYSTEM_DATABASE) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO SY01500 (CMPANYID, CMPNYNAM, DB_Name, CURNCYID) VALUES (?, ?, ?, ?)",
+                (database, name or database, database, currency)
+            )
+        with self._session(database) as connection:
+            connection.executescript(COMPANY_SCHEMA)
+            connection.execute(
+                "INSERT OR IGNORE INTO SY00500 (SERIES, DTAFILNM, NXTNUMBR) VALUES (4, 'PM_Transaction_Entry', ?)",
+                (next_pm_number,)
+            )
+
+    def add_vendor(self, database: str, vendor_id: str, name: str, **columns):
+        self._insert(database, "PM00200", {"VENDORID": vendor_id, "VENDNAME": name, "VNDCHKNM": name, **columns})
+
+    def add_purchase_order(self, database: str, po_number: str, vendor_id: str,
+                           lines: List[Dict[str, Any]], status: int = 1, **columns):
+        """PO header plus lines; each line needs ``quantity`` and ``unit_cost``"""
+        subtotal = sum(line["quantity"] * line["unit_cost"] for line in lines)
+        self._insert(database, "POP10100", {
+            "PONUMBER": po_number, "VENDORID": vendor_id, "SUBTOTAL": subtotal, "POSTATUS": status,
+            "DOCDATE": _getdate(), "REQDATE": _getdate(), **columns
+        })
+        for number, line in enumerate(lines, start=1):
+            self._insert(database, "POP10110", {
+                "PONUMBER": po_number, "ORD": number * 16384, "ITEMNMBR": line.get("item_number", f"ITEM-{number}"),
+                "ITEMDESC": line.get("description", ""), "QTYORDER": line["quantity"],
+                "UNITCOST": line["unit_cost"], "EXTDCOST": line["quantity"] * line["unit_cost"]
+            })
+
+    def add_receipt(self, database: str, receipt_number: str, po_number: str, vendor_id: str,
+                    lines: List[Dict[str, Any]], receipt_type: int = 1, **columns):
+        """Receipt (shipment) header plus lines; each line needs ``quantity`` and ``unit_cost``"""
+        subtotal = sum(line["quantity"] * line["unit_cost"] for line in lines)
+        self._insert(database, "POP10300", {
+            "POPRCTNM": receipt_number, "PONUMBER": po_number, "VENDORID": vendor_id, "SUBTOTAL": subtotal,
+            "POPTYPE": receipt_type, "RECEIPTDATE": _getdate(), **columns
+        })
+        for number, line in enumerate(lines, start=1):
+            self._insert(database, "POP10310", {
+                "POPRCTNM": receipt_number, "RCPTLNNM": number * 16384, "PONUMBER": po_number,
+                "ITEMNMBR": line.get("item_number", f"ITEM-{number}"), "ITEMDESC": line.get("description", ""),
+                "QTYSHPPD": line["quantity"], "UNITCOST": line["unit_cost"],
+                "EXTDCOST": line["quantity"] * line["unit_cost"]
+            })
+
+    def query(self, database: str, sql: str, *params: Any) -> List[MockGPRow]:
+        """Read rows directly, bypassing the service (for assertions)"""
+        connection = MockGPConnection(self._raw(database))
+        try:
+            return connection.execute(sql, *params).fetchall()
+        finally:
+            connection.close()
+
+    def execute(self, database: str, sql: str, *params: Any) -> int:
+        """Change rows directly, as another GP user would (triggers restamp DEX_ROW_TS); returns the row count"""
+        with self._session(database) as connection:
+            return connection.execute(_translate(sql), tuple(_param(value) for value in params)).rowcount
+
+    def _insert(self, database: str, table: str, values: Dict[str, Any]):
+        columns = ", ".join(values)
+        placeholders = ", ".join("?" for _ in values)
+        with self._session(database) as connection:
+            connection.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", tuple(values.values()))
+
+
+class MockEConnect:
+    """Stand-in for the eConnect Integration Service (``EConnectServiceTransport``)
+
+    Each submitted document is applied in one SQLite transaction: every
+    ``PMTransactionType`` becomes a PM10000 row plus PM10100 distributions,
+    or, if any of them is invalid (unknown vendor, duplicate vendor document
+    number), nothing is written and ``EConnectError`` is raised with
+    eConnect's error layout. ``name_documents=False`` drops the node
+    identifiers from errors; ``refuse_connections`` makes the next calls fail
+    before reaching the service.
+    """
+
+    def __init__(self, backend: MockGPBackend, latency: float = 0.0):
+        self.backend = backend
+        self.latency = latency
+        self.name_documents = True
+        self.refuse_connections = 0
+        self.submissions: List[int] = []
+
+    async def submit(self, connection_string: str, chunks: Iterable[bytes]):
+        if self.refuse_connections:
+            self.refuse_connections -= 1
+            raise ConnectionRefusedError("eConnect service refused the connection")
+        document = ET.fromstring(b"".join(chunks))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        transactions = document.findall("PMTransactionType")
+        self.submissions.append(len(transactions))
+        database = self.backend.database_for(connection_string)
+        await asyncio.to_thread(self._apply, database, transactions)
+
+    def _apply(self, database: str, transactions: List[ET.Element]):
+        with self.backend._session(database) as connection:
+            for transaction in transactions:
+                header = transaction.find("taPMTransactionInsert")
+                values = {child.tag: child.text or "" for child in header}
+                error = self._validate(connection, values)
+                if error:
+                    number, description = error
+                    identifiers = (
+                        f"\nNode Identifier Parameters: taPMTransactionInsert\n"
+                        f"VCHNUMWK = {values['VCHNUMWK']}\nVENDORID = {values['VENDORID']}"
+                        if self.name_documents else ""
+                    )
+                    raise EConnectError(
+                        f"Error Number = {number} Stored Procedure= taPMTransactionInsert "
+                        f"Error Description = {description}{identifiers}"
+                    )
+                connection.execute(
+                    "INSERT INTO PM10000 (VENDORID, DOCNUMBR, DOCTYPE, DOCDATE, DOCAMNT, CURNCYID, VCHRNMBR, "
+                    "TRXDSCRN, CREATDDT, MODIFDT) VALUES (?, ?, ?, ?, ?, ?, ?, ?, GETDATE(), GETDATE())",
+                    (values["VENDORID"], values["DOCNUMBR"], int(values["DOCTYPE"]), values["DOCDATE"],
+                     values["DOCAMNT"], values.get("CURNCYID", ""), values["VCHNUMWK"], values.get("TRXDSCRN", ""))
+                )
+                for sequence, item in enumerate(transaction.findall("taPMDistribution_Items/taPMDistribution_Items"), 1):
+                    item_values = {child.tag: child.text or "" for child in item}
+                    connection.execute(
+                        "INSERT INTO PM10100 (VENDORID, DOCNUMBR, DOCTYPE, SEQNUMBR, DSTINDX, ACTINDX, DEBITAMT, "
+                        "CRDTAMNT, DISTTYPE, DSTSQNUM) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, ?)",
+                        (values["VENDORID"], values["DOCNUMBR"], int(values["DOCTYPE"]), sequence, sequence,
+                         item_values["DEBITAMT"], item_values["CRDTAMNT"], int(item_values["DISTTYPE"]),
+                         int(item_values["DSTSQNUM"]))
+                    )
+
+    @staticmethod
+    def _validate(connection: sqlite3.Connection, values: Dict[str, str]) -> Optional[tuple]:
+        vendor = connection.execute("SELECT 1 FROM PM00200 WHERE VENDORID = ?", (values["VENDORID"],)).fetchone()
+        if vendor is None:
+            return 1133, "The Vendor ID does not exist in the Vendor Master Table"
+        duplicate = connection.execute(
+            "SELECT 1 FROM PM10000 WHERE VENDORID = ? AND DOCNUMBR = ? AND DOCTYPE = ?",
+            (values["VENDORID"], values["DOCNUMBR"], int(values["DOCTYPE"]))
+        ).fetchone()
+        if duplicate is not None:
+            return 305, ("Document Number (DOCNUMBR) already exists in either the PM Keys master, "
+                         "PM Transaction Work, or PM Transaction History tables")
+        return None
@@ -0,0 +1,312 @@
+"""
+Bulk ingestion of invoices and their line items
+
+Creating invoices one ORM object at a time pays for identity-map bookkeeping,
+attribute events and a separate INSERT round trip per row. The bulk writer
+validates a whole batch up front, builds plain row dictionaries (ids and
+column defaults filled in client-side) and writes them with executemany over
+Core inserts, which SQLAlchemy renders as batched multi-row
+``INSERT ... VALUES ... RETURNING`` statements. Very large batches on Postgres
+are streamed with ``COPY`` instead. Validation, duplicate detection and audit
+logging follow the single-invoice path in ``InvoiceProcessor``.
+"""
+import csv
+import io
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Table, insert, select, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from src.models.invoice import Invoice, InvoiceStatus
+from src.models.invoice_line import InvoiceLine
+from src.models.audit import AuditLog, AuditAction, AuditResourceType
+from services.audit_writer import audit_writer
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+COPY_NULL = "\\N"
+
+
+def invoice_values_from_ocr(ocr_data: Dict[str, Any], company_id: Any, user_id: Any,
+                            file_path: Optional[str]) -> Dict[str, Any]:
+    """Invoice column values for extracted (OCR or imported) invoice data"""
+    return dict(
+        invoice_number=ocr_data["invoice_number"],
+        supplier_name=ocr_data["supplier_name"],
+        supplier_email=ocr_data.get("supplier_email"),
+        supplier_phone=ocr_data.get("supplier_phone"),
+        supplier_address=ocr_data.get("supplier_address"),
+        supplier_tax_id=ocr_data.get("supplier_tax_id"),
+        invoice_date=datetime.strptime(ocr_data["invoice_date"], "%Y-%m-%d").date(),
+        due_date=datetime.strptime(ocr_data["due_date"], "%Y-%m-%d").date() if ocr_data.get("due_date") else None,
+        total_amount=Decimal(str(ocr_data["total_amount"])),
+        currency=ocr_data.get("currency", "USD"),
+        tax_amount=Decimal(str(ocr_data.get("tax_amount", 0))),
+        tax_rate=Decimal(str(ocr_data.get("tax_rate", 0))),
+        subtotal=Decimal(str(ocr_data.get("subtotal", ocr_data["total_amount"]))),
+        total_with_tax=Decimal(str(ocr_data.get("total_with_tax", ocr_data["total_amount"]))),
+        po_number=ocr_data.get("po_number"),
+        receipt_number=ocr_data.get("receipt_number"),
+        department=ocr_data.get("department"),
+        cost_center=ocr_data.get("cost_center"),
+        project_code=ocr_data.get("project_code"),
+        notes=ocr_data.get("notes"),
+        original_file_path=file_path,
+        file_size_bytes=ocr_data.get("processing_metadata", {}).get("file_size_bytes"),
+        company_id=company_id,
+        created_by_id=user_id
+    )
+
+
+def line_values_from_ocr(ocr_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Invoice line column values for the extracted ``line_items``, numbered from 1"""
+    lines = []
+    for number, item in enumerate(ocr_data.get("line_items") or [], start=1):
+        total = Decimal(str(item["total"]))
+        quantity = Decimal(str(item.get("quantity") or 1))
+        lines.append(dict(
+            line_number=number,
+            description=item["description"],
+            quantity=quantity,
+            unit_price=Decimal(str(item["unit_price"])) if item.get("unit_price") is not None else total / quantity,
+            total_amount=total,
+            gl_account=item.get("gl_account"),
+            cost_center=item.get("cost_center"),
+            department=item.get("department"),
+            project_code=item.get("project_code"),
+            tax_rate=Decimal(str(item["tax_rate"])) if item.get("tax_rate") is not None else None,
+            tax_amount=Decimal(str(item["tax_amount"])) if item.get("tax_amount") is not None else None
+        ))
+    return lines
+
+
+@dataclass
+class BulkWriteResult:
+    """Outcome of one bulk write; ``rejected`` items were not written"""
+    created: List[Dict[str, Any]] = field(default_factory=list)
+    rejected: List[Dict[str, Any]] = field(default_factory=list)
+    duplicates: int = 0
+    lines: int = 0
+    method: str = "insert"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "created": len(self.created),
+            "rejected": len(self.rejected),
+            "duplicates": self.duplicates,
+            "lines": self.lines,
+            "method": self.method,
+            "invoices": self.created,
+            "errors": self.rejected
+        }
+
+
+class BulkInvoiceWriter:
+    """Writes batches of invoices and line items with set-based inserts"""
+
+    def __init__(self, validate: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 batch_size: int = None, copy_threshold: int = None):
+        self.validate = validate
+        self.batch_size = batch_size or settings.INVOICE_BULK_BATCH_SIZE
+        self.copy_threshold = copy_threshold if copy_threshold is not None else settings.INVOICE_BULK_COPY_THRESHOLD
+        self._defaults: Dict[str, List[Tuple[str, Callable[[], Any]]]] = {}
+
+    def write(self, session: Session, items: Iterable[Dict[str, Any]], company_id: Any,
+              user_id: Any, source: str = "bulk_import") -> BulkWriteResult:
+        """Validate and insert ``items`` in the session's transaction; the caller commits
+
+        Items are extracted invoice dictionaries in the shape the OCR service
+        returns, optionally with a ``file_path``. Items failing validation are
+        reported in ``rejected`` with their position and errors.
+        """
+        result = BulkWriteResult()
+        company_id, user_id = _as_uuid(company_id), _as_uuid(user_id)
+        invoices, lines = [], []
+
+        for index, item in enumerate(items):
+            validation = self.validate(item)
+            if not validation["is_valid"]:
+                result.rejected.append({
+                    "index": index,
+                    "invoice_number": item.get("invoice_number"),
+                    "errors": validation["errors"]
+                })
+                continue
+
+            invoice = self._with_defaults(Invoice.__table__, invoice_values_from_ocr(
+                item, company_id, user_id, item.get("file_path")
+            ))
+            invoices.append((index, invoice))
+            for line in line_values_from_ocr(item):
+                line["invoice_id"] = invoice["id"]
+                lines.append(self._with_defaults(InvoiceLine.__table__, line))
+
+        if not invoices:
+            return result
+
+        result.duplicates = self._mark_duplicates(session, company_id, [invoice for _, invoice in invoices])
+
+        connection = session.connection()
+        use_copy = connection.dialect.name == "postgresql" and len(invoices) + len(lines) >= self.copy_threshold
+        result.method = "copy" if use_copy else "insert"
+        created_at = {}
+        for chunk in _chunks([invoice for _, invoice in invoices], self.batch_size):
+            created_at.update(self._insert(connection, Invoice.__table__, chunk, use_copy))
+        for chunk in _chunks(lines, self.batch_size * 20):
+            self._insert(connection, InvoiceLine.__table__, chunk, use_copy)
+        result.lines = len(lines)
+
+        for index, invoice in invoices:
+            result.created.append({
+                "index": index,
+                "invoice_id": str(invoice["id"]),
+                "invoice_number": invoice["invoice_number"],
+                "status": invoice["status"].value,
+                "created_at": created_at.get(invoice["id"])
+            })
+
+        self._audit(session, [invoice for _, invoice in invoices], company_id, user_id, source)
+        logger.info(f"Bulk wrote {len(invoices)} invoices and {len(lines)} lines via {result.method} "
+                    f"({len(result.rejected)} rejected, {result.duplicates} duplicates)")
+        return result
+
+    def _with_defaults(self, table: Table, values: Dict[str, Any]) -> Dict[str, Any]:
+        # executemany and COPY need every row to carry the same keys; Python-side
+        # column defaults are applied here because the ORM is not involved
+        defaults = self._defaults.get(table.name)
+        if defaults is None:
+            defaults = []
+            for column in table.columns:
+                if column.default is not None:
+                    default = column.default
+                    if default.is_callable:
+                        defaults.append((column.key, lambda default=default: default.arg(None)))
+                    else:
+                        defaults.append((column.key, lambda default=default: default.arg))
+                elif column.server_default is None:
+                    defaults.append((column.key, lambda: None))
+            self._defaults[table.name] = defaults
+
+        row = dict(values)
+        for key, factory in defaults:
+            if row.get(key) is None:
+                row[key] = factory()
+        return row
+
+    def _mark_duplicates(self, session: Session, company_id: uuid.UUID, invoices: List[Dict[str, Any]]) -> int:
+        """Flag exact (invoice number, supplier) repeats as rejected, like the single-invoice path
+
+        One query per chunk against existing invoices, plus repeats within the
+        batch itself (the first occurrence wins).
+        """
+        duplicates = 0
+        seen: Dict[Tuple[str, str], str] = {}
+        for chunk in _chunks(invoices, self.batch_size):
+            keys = {(invoice["invoice_number"], invoice["supplier_name"]) for invoice in chunk}
+            existing = session.execute(
+                select(Invoice.invoice_number, Invoice.supplier_name, Invoice.id)
+                .where(Invoice.company_id == company_id)
+                .where(tuple_(Invoice.invoice_number, Invoice.supplier_name).in_(list(keys)))
+            ).all()
+            for number, supplier, invoice_id in existing:
+                seen.setdefault((number, supplier), str(invoice_id))
+
+            for invoice in chunk:
+                key = (invoice["invoice_number"], invoice["supplier_name"])
+                if key in seen:
+                    invoice["status"] = InvoiceStatus.REJECTED
+                    invoice["rejection_reason"] = f"Duplicate invoice detected: {seen[key]}"
+                    duplicates += 1
+                else:
+                    seen[key] = str(invoice["id"])
+        return duplicates
+
+    def _insert(self, connection, table: Table, rows: List[Dict[str, Any]], use_copy: bool) -> Dict[Any, Any]:
+        if use_copy:
+            self._copy(connection, table, rows)
+            return {}
+
+        statement = insert(table)
+        dialect = connection.dialect
+        if "created_at" in table.c and dialect.insert_executemany_returning_sort_by_parameter_order:
+            statement = statement.returning(table.c.id, table.c.created_at, sort_by_parameter_order=True)
+            return {row.id: row.created_at for row in connection.execute(statement, rows)}
+        connection.execute(statement, rows)
+        return {}
+
+    def _copy(self, connection, table: Table, rows: List[Dict[str, Any]]):
+        """Stream rows with COPY FROM STDIN (psycopg2) or the binary COPY protocol (asyncpg)"""
+        dialect = connection.dialect
+        columns = list(rows[0].keys())
+        processors = [table.c[key].type.dialect_impl(dialect).bind_processor(dialect) for key in columns]
+
+        def encode(row):
+            return [
+                processor(row[key]) if processor and row[key] is not None else row[key]
+                for key, processor in zip(columns, processors)
+            ]
+
+        driver_connection = connection.connection.driver_connection
+        if dialect.is_async:
+            # Runs inside AsyncSession.run_sync, so the driver coroutine is awaited on the session's loop
+            await_only(driver_connection.copy_records_to_table(
+                table.name, records=[encode(row) for row in rows], columns=columns, schema_name=table.schema
+            ))
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(COPY_NULL if value is None else value for value in encode(row))
+        buffer.seek(0)
+        target = f"{table.schema}.{table.name}" if table.schema else table.name
+        with driver_connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {target} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", buffer
+            )
+
+    def _audit(self, session: Session, invoices: List[Dict[str, Any]], company_id: uuid.UUID,
+               user_id: uuid.UUID, source: str):
+        """One CREATE audit row per invoice
+
+        Rows go to the buffered writer only once the caller's transaction
+        commits, unless the action must be written synchronously, in which case
+        they are inserted in the same transaction.
+        """
+        rows = [
+            audit_writer.build_row(
+                AuditAction.CREATE, AuditResourceType.INVOICE, invoice["id"], company_id,
+                user_id=user_id,
+                details={"description": f"Invoice {invoice['invoice_number']} created by {source}",
+                         "status": invoice["status"].value},
+                user_agent="BulkInvoiceWriter"
+            )
+            for invoice in invoices
+        ]
+        buffered = settings.AUDIT_ASYNC_WRITES_ENABLED and not audit_writer.requires_sync(AuditAction.CREATE)
+        if buffered and audit_writer.enqueue_after_commit(session, rows):
+            return
+
+        for chunk in _chunks(rows, self.batch_size):
+            session.execute(insert(AuditLog.__table__), chunk)
+
+
+def _chunks(rows: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _as_uuid(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            return value
+    return value
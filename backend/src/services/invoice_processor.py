@@ -4,19 +4,21 @@ Invoice Processing Service - Core Business Logic
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta, UTC
-from decimal import Decimal
 import uuid
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select
 
 from src.models.invoice import Invoice, InvoiceStatus, InvoiceType
+from src.models.invoice_line import InvoiceLine
 from src.models.user import User, UserRole
 from src.models.audit import AuditLog, AuditAction, AuditResourceType
 from services.ocr import MockOCRService, AzureOCRService
 from services.simple_ocr import SimpleOCRService
 from services.workflow_engine import workflow_engine, WorkflowStatus
 from services.erp import ERPIntegrationService
+from services.audit_writer import audit_writer
+from services.invoice_bulk_writer import BulkInvoiceWriter, invoice_values_from_ocr, line_values_from_ocr
 from core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -47,7 +49,7 @@ class InvoiceProcessor:
             logger.warning("Advanced ML service not available, using basic processing")
             self.ml_service = None
     
-    async def process_invoice(self, file_path: str, company_id: str, user_id: str, db: Session) -> Dict[str, Any]:
+    async def process_invoice(self, file_path: str, company_id: str, user_id: str, db: AsyncSession) -> Dict[str, Any]:
         """Main invoice processing workflow"""
         try:
             logger.info(f"Starting invoice processing for file: {file_path}")
@@ -67,15 +69,15 @@ class InvoiceProcessor:
             # Step 3: Create invoice record
             invoice = self._create_invoice_from_ocr(ocr_result, company_id, user_id, file_path)
             db.add(invoice)
-            db.commit()
-            db.refresh(invoice)
+            await db.commit()
+            await db.refresh(invoice)
             
             # Step 4: Check for duplicates
             duplicate_check = await self._check_for_duplicates(invoice, company_id, db)
             if duplicate_check["is_duplicate"]:
                 invoice.status = InvoiceStatus.REJECTED
                 invoice.rejection_reason = f"Duplicate invoice detected: {duplicate_check['duplicate_id']}"
-                db.commit()
+                await db.commit()
                 
                 return {
                     "status": "duplicate",
@@ -98,7 +100,7 @@ class InvoiceProcessor:
             workflow_id = workflow.get("workflow_id") if isinstance(workflow, dict) else workflow.workflow_id
             invoice.workflow_id = workflow_id
             invoice.status = InvoiceStatus.PENDING_APPROVAL if next_action == "approval_required" else InvoiceStatus.APPROVED
-            db.commit()
+            await db.commit()
             
             return {
                 "status": "success",
@@ -116,19 +118,19 @@ class InvoiceProcessor:
                 "message": f"Processing failed: {str(e)}"
             }
     
-    async def _run_ai_analysis(self, invoice: Invoice, company_id: str, db: Session) -> Dict[str, Any]:
+    async def _run_ai_analysis(self, invoice: Invoice, company_id: str, db: AsyncSession) -> Dict[str, Any]:
         """Run comprehensive AI analysis on invoice"""
         try:
             if self.ml_service and hasattr(self.ml_service, 'analyze_invoice'):
                 # Get historical data for comparison
-                historical_invoices = db.query(Invoice).filter(
+                historical_invoices = (await db.scalars(select(Invoice).where(
                     Invoice.company_id == company_id,
                     Invoice.id != invoice.id
-                ).limit(100).all()
+                ).limit(100))).all()
                 
                 # Get company settings
                 from src.models.company import Company
-                company = db.query(Company).filter(Company.id == company_id).first()
+                company = await db.scalar(select(Company).where(Company.id == company_id))
                 
                 # Run ML analysis
                 ai_analysis = await self.ml_service.analyze_invoice(
@@ -243,47 +245,23 @@ class InvoiceProcessor:
         }
     
     def _create_invoice_from_ocr(self, ocr_data: Dict[str, Any], company_id: str, user_id: str, file_path: str) -> Invoice:
-        """Create invoice record from OCR data"""
-        invoice = Invoice(
-            invoice_number=ocr_data["invoice_number"],
-            supplier_name=ocr_data["supplier_name"],
-            supplier_email=ocr_data.get("supplier_email"),
-            supplier_phone=ocr_data.get("supplier_phone"),
-            supplier_address=ocr_data.get("supplier_address"),
-            supplier_tax_id=ocr_data.get("supplier_tax_id"),
-            invoice_date=datetime.strptime(ocr_data["invoice_date"], "%Y-%m-%d").date(),
-            due_date=datetime.strptime(ocr_data.get("due_date", ocr_data["invoice_date"]), "%Y-%m-%d").date() if ocr_data.get("due_date") else None,
-            total_amount=Decimal(str(ocr_data["total_amount"])),
-            currency=ocr_data.get("currency", "USD"),
-            tax_amount=Decimal(str(ocr_data.get("tax_amount", 0))),
-            tax_rate=Decimal(str(ocr_data.get("tax_rate", 0))),
-            subtotal=Decimal(str(ocr_data.get("subtotal", ocr_data["total_amount"]))),
-            total_with_tax=Decimal(str(ocr_data.get("total_with_tax", ocr_data["total_amount"]))),
-            po_number=ocr_data.get("po_number"),
-            receipt_number=ocr_data.get("receipt_number"),
-            department=ocr_data.get("department"),
-            cost_center=ocr_data.get("cost_center"),
-            project_code=ocr_data.get("project_code"),
-            notes=ocr_data.get("notes"),
-            original_file_path=file_path,
-            file_size_bytes=ocr_data.get("processing_metadata", {}).get("file_size_bytes"),
-            company_id=company_id,
-            created_by_id=user_id
-        )
+        """Create invoice record, with its line items, from OCR data"""
+        invoice = Invoice(**invoice_values_from_ocr(ocr_data, company_id, user_id, file_path))
+        invoice.line_items = [InvoiceLine(**values) for values in line_values_from_ocr(ocr_data)]
         
         return invoice
     
-    async def _check_for_duplicates(self, invoice: Invoice, company_id: str, db: Session) -> Dict[str, Any]:
+    async def _check_for_duplicates(self, invoice: Invoice, company_id: str, db: AsyncSession) -> Dict[str, Any]:
         """Check for duplicate invoices"""
         # Check for exact invoice number match
-        existing_invoice = db.query(Invoice).filter(
+        existing_invoice = await db.scalar(select(Invoice).where(
             and_(
                 Invoice.invoice_number == invoice.invoice_number,
                 Invoice.supplier_name == invoice.supplier_name,
                 Invoice.company_id == company_id,
                 Invoice.id != invoice.id
             )
-        ).first()
+        ).limit(1))
         
         if existing_invoice:
             return {
@@ -294,7 +272,7 @@ class InvoiceProcessor:
             }
         
         # Check for similar invoices (amount, supplier, date)
-        similar_invoices = db.query(Invoice).filter(
+        similar_invoices = (await db.scalars(select(Invoice).where(
             and_(
                 Invoice.supplier_name == invoice.supplier_name,
                 Invoice.company_id == company_id,
@@ -302,7 +280,7 @@ class InvoiceProcessor:
                 Invoice.total_amount == invoice.total_amount,
                 Invoice.invoice_date == invoice.invoice_date
             )
-        ).all()
+        ))).all()
         
         if similar_invoices:
             return {
@@ -419,7 +397,7 @@ class InvoiceProcessor:
         adapter = self.erp_service.get_adapter("mock")
         return adapter is not None
     
-    async def _post_to_erp(self, invoice: Invoice, company_id: str, db: Session) -> Dict[str, Any]:
+    async def _post_to_erp(self, invoice: Invoice, company_id: str, db: AsyncSession) -> Dict[str, Any]:
         """Post approved invoice to ERP system"""
         try:
             # Get company settings
@@ -612,7 +590,7 @@ class InvoiceProcessor:
             "supplier_anomaly": "v1.0.0"
         }
     
-    def _get_company_settings(self, company_id: str, db: Session) -> Dict[str, Any]:
+    def _get_company_settings(self, company_id: str, db: AsyncSession) -> Dict[str, Any]:
         """Get company ERP settings"""
         # This would fetch from company configuration
         # For now, return default settings
@@ -624,25 +602,28 @@ class InvoiceProcessor:
             "approval_workflow": "standard"
         }
     
-    def _create_audit_log(self, db: Session, user_id: str, company_id: str, 
+    def _create_audit_log(self, db: AsyncSession, user_id: str, company_id: str, 
                           action: AuditAction, resource_type: AuditResourceType, 
                           resource_id: str, description: str):
         """Create audit log entry"""
-        audit_log = AuditLog(
+        row = audit_writer.build_row(
+            action, resource_type, resource_id, company_id,
             user_id=user_id,
-            company_id=company_id,
-            action=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
             details={"description": description},
             ip_address="127.0.0.1",  # Would come from request context
             user_agent="InvoiceProcessor"
         )
-        db.add(audit_log)
+        
+        # Non-critical events go through the buffered writer, off the invoice transaction
+        if (settings.AUDIT_ASYNC_WRITES_ENABLED and not audit_writer.requires_sync(action)
+                and audit_writer.enqueue(row)):
+            return
+        
+        db.add(AuditLog(**row))
         # Don't commit here - let the calling method handle the commit
     
     async def batch_process_invoices(self, file_paths: List[str], company_id: str, 
-                                   user_id: str, db: Session) -> Dict[str, Any]:
+                                   user_id: str, db: AsyncSession) -> Dict[str, Any]:
         """Process multiple invoices in batch"""
         results = []
         successful = 0
@@ -680,16 +661,42 @@ class InvoiceProcessor:
             "results": results
         }
     
-    async def reprocess_invoice(self, invoice_id: str, company_id: str, user_id: str, db: Session) -> Dict[str, Any]:
+    async def bulk_import_invoices(self, items: List[Dict[str, Any]], company_id: str,
+                                   user_id: str, db: AsyncSession) -> Dict[str, Any]:
+        """Create many already-extracted invoices in one transaction
+        
+        Validation, duplicate flagging and CREATE audit entries match
+        ``process_invoice``; AI analysis and workflows are left to the
+        regular processing queue.
+        """
+        writer = BulkInvoiceWriter(self._validate_invoice_data)
+        try:
+            result = await db.run_sync(writer.write, items, company_id, user_id)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Bulk invoice import failed: {str(e)}")
+            return {
+                "status": "error",
+                "message": f"Bulk import failed: {str(e)}"
+            }
+        
+        return {
+            "status": "completed",
+            "total": len(items),
+            **result.to_dict()
+        }
+    
+    async def reprocess_invoice(self, invoice_id: str, company_id: str, user_id: str, db: AsyncSession) -> Dict[str, Any]:
         """Reprocess an existing invoice"""
         try:
             # Get existing invoice
-            invoice = db.query(Invoice).filter(
+            invoice = await db.scalar(select(Invoice).where(
                 and_(
                     Invoice.id == invoice_id,
                     Invoice.company_id == company_id
                 )
-            ).first()
+            ))
             
             if not invoice:
                 return {
@@ -700,7 +707,7 @@ class InvoiceProcessor:
             # Reset status and reprocess
             invoice.status = InvoiceStatus.DRAFT
             invoice.erp_error_message = None
-            db.commit()
+            await db.commit()
             
             # Reprocess
             result = await self.process_invoice(
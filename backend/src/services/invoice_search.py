@@ -0,0 +1,423 @@
+"""
+Full-text invoice search
+
+Invoice numbers, supplier names and line-item descriptions are indexed so a
+search seeks an index instead of scanning the tenant with ``ILIKE``:
+
+- PostgreSQL: a weighted ``tsvector`` column on ``invoices`` kept current by
+  triggers on ``invoices`` and (statement-level, once per affected invoice)
+  ``invoice_lines``, a GIN index over it, and
+  ``pg_trgm`` GIN indexes on supplier names and line descriptions for
+  typo-tolerant matching.
+- SQLite (development): an FTS5 table keyed by the invoice rowid, kept current
+  by triggers. FTS5 has no trigram similarity, so misspelt supplier names are
+  resolved against the tenant's distinct suppliers with ``difflib`` when the
+  index finds nothing.
+
+Databases without the index (fresh test schemas, other dialects) fall back to
+the old ``ILIKE`` scan.
+"""
+import difflib
+import logging
+import re
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List
+
+from sqlalchemy import Float, bindparam, inspect, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from src.models.invoice import Invoice
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Minimum pg_trgm word similarity for a supplier or description to count as a typo match
+TRIGRAM_THRESHOLD = 0.4
+# difflib ratio for the SQLite supplier-name fallback
+FUZZY_CUTOFF = 0.75
+
+
+def search_tokens(term: str) -> List[str]:
+    """Words of a search term, lower-cased, with query syntax stripped"""
+    return [token.lower() for token in _TOKEN.findall(term or "")]
+
+
+POSTGRES_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE invoices ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    # Identifiers and names are indexed without stemming; descriptions use English stemming
+    """
+    CREATE OR REPLACE FUNCTION invoice_search_vector(p_invoice_id uuid, p_invoice_number text, p_supplier_name text)
+    RETURNS tsvector LANGUAGE sql STABLE AS $$
+        SELECT setweight(to_tsvector('simple', coalesce(p_invoice_number, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(p_supplier_name, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(
+                (SELECT string_agg(description, ' ') FROM invoice_lines WHERE invoice_id = p_invoice_id), ''
+            )), 'C')
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION invoices_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector := invoice_search_vector(NEW.id, NEW.invoice_number, NEW.supplier_name);
+        RETURN NEW;
+    END
+    $$
+    """,
+    # Statement-level: a bulk insert of an invoice's lines recomputes its document
+    # once, not once per line (each recompute aggregates all of the lines)
+    """
+    CREATE OR REPLACE FUNCTION invoice_lines_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE invoices SET search_vector = invoice_search_vector(id, invoice_number, supplier_name)
+            WHERE id IN (SELECT invoice_id FROM new_lines);
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE invoices SET search_vector = invoice_search_vector(id, invoice_number, supplier_name)
+            WHERE id IN (SELECT invoice_id FROM old_lines);
+        ELSE
+            UPDATE invoices SET search_vector = invoice_search_vector(id, invoice_number, supplier_name)
+            WHERE id IN (
+                SELECT unnest(ARRAY[o.invoice_id, n.invoice_id])
+                FROM old_lines o JOIN new_lines n ON n.id = o.id
+                WHERE n.description IS DISTINCT FROM o.description OR n.invoice_id IS DISTINCT FROM o.invoice_id
+            );
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS invoices_search_vector ON invoices",
+    """
+    CREATE TRIGGER invoices_search_vector BEFORE INSERT OR UPDATE OF invoice_number, supplier_name
+    ON invoices FOR EACH ROW EXECUTE FUNCTION invoices_search_vector_trigger()
+    """,
+    # Transition tables allow one event per trigger (and no column list), hence three
+    "DROP TRIGGER IF EXISTS invoice_lines_search_vector ON invoice_lines",
+    "DROP TRIGGER IF EXISTS invoice_lines_search_vector_insert ON invoice_lines",
+    "DROP TRIGGER IF EXISTS invoice_lines_search_vector_update ON invoice_lines",
+    "DROP TRIGGER IF EXISTS invoice_lines_search_vector_delete ON invoice_lines",
+    """
+    CREATE TRIGGER invoice_lines_search_vector_insert AFTER INSERT ON invoice_lines
+    REFERENCING NEW TABLE AS new_lines
+    FOR EACH STATEMENT EXECUTE FUNCTION invoice_lines_search_vector_trigger()
+    """,
+    """
+    CREATE TRIGGER invoice_lines_search_vector_update AFTER UPDATE ON invoice_lines
+    REFERENCING OLD TABLE AS old_lines NEW TABLE AS new_lines
+    FOR EACH STATEMENT EXECUTE FUNCTION invoice_lines_search_vector_trigger()
+    """,
+    """
+    CREATE TRIGGER invoice_lines_search_vector_delete AFTER DELETE ON invoice_lines
+    REFERENCING OLD TABLE AS old_lines
+    FOR EACH STATEMENT EXECUTE FUNCTION invoice_lines_search_vector_trigger()
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_invoices_search_vector ON invoices USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS idx_invoices_supplier_trgm ON invoices USING GIN (supplier_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_invoices_number_trgm ON invoices USING GIN (invoice_number gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_invoice_lines_invoice_id ON invoice_lines (invoice_id)",
+    "CREATE INDEX IF NOT EXISTS idx_invoice_lines_description_trgm ON invoice_lines USING GIN (description gin_trgm_ops)",
+]
+
+POSTGRES_BACKFILL = "UPDATE invoices SET search_vector = invoice_search_vector(id, invoice_number, supplier_name)"
+
+POSTGRES_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS invoice_lines_search_vector_insert ON invoice_lines",
+    "DROP TRIGGER IF EXISTS invoice_lines_search_vector_update ON invoice_lines",
+    "DROP TRIGGER IF EXISTS invoice_lines_search_vector_delete ON invoice_lines",
+    "DROP TRIGGER IF EXISTS invoice_lines_search_vector ON invoice_lines",
+    "DROP TRIGGER IF EXISTS invoices_search_vector ON invoices",
+    "DROP FUNCTION IF EXISTS invoice_lines_search_vector_trigger()",
+    "DROP FUNCTION IF EXISTS invoices_search_vector_trigger()",
+    "DROP FUNCTION IF EXISTS invoice_search_vector(uuid, text, text)",
+    "DROP INDEX IF EXISTS idx_invoice_lines_description_trgm",
+    "DROP INDEX IF EXISTS idx_invoices_number_trgm",
+    "DROP INDEX IF EXISTS idx_invoices_supplier_trgm",
+    "DROP INDEX IF EXISTS idx_invoices_search_vector",
+    "ALTER TABLE invoices DROP COLUMN IF EXISTS search_vector",
+]
+
+# Ranked by ts_rank_cd over the prefix query, or by trigram word similarity for
+# misspellings the tsquery cannot match
+POSTGRES_SEARCH = text("""
+    WITH q AS (
+        SELECT to_tsquery('simple', :tsquery) || to_tsquery('english', :tsquery) AS fts
+    )
+    SELECT i.id, GREATEST(
+        ts_rank_cd(i.search_vector, q.fts),
+        word_similarity(:term, i.supplier_name),
+        COALESCE((SELECT MAX(word_similarity(:term, l.description)) FROM invoice_lines l
+                  WHERE l.invoice_id = i.id AND :term <% l.description), 0) * 0.8
+    ) AS rank
+    FROM invoices i, q
+    WHERE i.company_id = :company_id
+      AND (
+          i.search_vector @@ q.fts
+          OR :term <% i.supplier_name
+          OR EXISTS (SELECT 1 FROM invoice_lines l WHERE l.invoice_id = i.id AND :term <% l.description)
+      )
+    ORDER BY rank DESC, i.created_at DESC
+    LIMIT :limit
+""").bindparams(
+    bindparam("company_id", type_=Invoice.__table__.c.company_id.type)
+).columns(id=Invoice.__table__.c.id.type, rank=Float)
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS invoice_search_fts USING fts5(
+        tenant, invoice_number, supplier_name, line_descriptions,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS invoices_search_ai AFTER INSERT ON invoices BEGIN
+        INSERT INTO invoice_search_fts (rowid, tenant, invoice_number, supplier_name, line_descriptions)
+        VALUES (new.rowid, new.company_id, new.invoice_number, new.supplier_name, '');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS invoices_search_au AFTER UPDATE OF invoice_number, supplier_name ON invoices BEGIN
+        UPDATE invoice_search_fts SET invoice_number = new.invoice_number, supplier_name = new.supplier_name
+        WHERE rowid = new.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS invoices_search_ad AFTER DELETE ON invoices BEGIN
+        DELETE FROM invoice_search_fts WHERE rowid = old.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS invoice_lines_search_ai AFTER INSERT ON invoice_lines BEGIN
+        UPDATE invoice_search_fts SET line_descriptions = (
+            SELECT group_concat(description, ' ') FROM invoice_lines WHERE invoice_id = new.invoice_id
+        ) WHERE rowid = (SELECT rowid FROM invoices WHERE id = new.invoice_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS invoice_lines_search_au AFTER UPDATE OF description, invoice_id ON invoice_lines BEGIN
+        UPDATE invoice_search_fts SET line_descriptions = (
+            SELECT group_concat(description, ' ') FROM invoice_lines WHERE invoice_id = old.invoice_id
+        ) WHERE rowid = (SELECT rowid FROM invoices WHERE id = old.invoice_id);
+        UPDATE invoice_search_fts SET line_descriptions = (
+            SELECT group_concat(description, ' ') FROM invoice_lines WHERE invoice_id = new.invoice_id
+        ) WHERE rowid = (SELECT rowid FROM invoices WHERE id = new.invoice_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS invoice_lines_search_ad AFTER DELETE ON invoice_lines BEGIN
+        UPDATE invoice_search_fts SET line_descriptions = (
+            SELECT group_concat(description, ' ') FROM invoice_lines WHERE invoice_id = old.invoice_id
+        ) WHERE rowid = (SELECT rowid FROM invoices WHERE id = old.invoice_id);
+    END
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_invoice_lines_invoice_id ON invoice_lines (invoice_id)",
+    # Distinct supplier names per tenant for the typo fallback
+    "CREATE INDEX IF NOT EXISTS idx_invoices_company_supplier ON invoices (company_id, supplier_name)",
+]
+
+SQLITE_BACKFILL = [
+    "DELETE FROM invoice_search_fts",
+    """
+    INSERT INTO invoice_search_fts (rowid, tenant, invoice_number, supplier_name, line_descriptions)
+    SELECT i.rowid, i.company_id, i.invoice_number, i.supplier_name,
+           COALESCE((SELECT group_concat(l.description, ' ') FROM invoice_lines l WHERE l.invoice_id = i.id), '')
+    FROM invoices i
+    """,
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS invoice_lines_search_ad",
+    "DROP TRIGGER IF EXISTS invoice_lines_search_au",
+    "DROP TRIGGER IF EXISTS invoice_lines_search_ai",
+    "DROP TRIGGER IF EXISTS invoices_search_ad",
+    "DROP TRIGGER IF EXISTS invoices_search_au",
+    "DROP TRIGGER IF EXISTS invoices_search_ai",
+    "DROP INDEX IF EXISTS idx_invoices_company_supplier",
+    "DROP TABLE IF EXISTS invoice_search_fts",
+]
+
+# The tenant column holds the company id, so MATCH intersects with the tenant's
+# rows inside the index. Column weights: tenant, invoice_number, supplier_name,
+# line_descriptions; bm25 is lower-is-better.
+SQLITE_SEARCH = text("""
+    SELECT i.id, -bm25(invoice_search_fts, 0.0, 10.0, 10.0, 2.0) AS rank
+    FROM invoice_search_fts
+    JOIN invoices i ON i.rowid = invoice_search_fts.rowid
+    WHERE invoice_search_fts MATCH :match
+    ORDER BY rank DESC, i.created_at DESC
+    LIMIT :limit
+""").columns(id=Invoice.__table__.c.id.type, rank=Float)
+
+
+class InvoiceSearchIndex:
+    """Creates, backfills and removes the search index for an engine's dialect"""
+
+    SUPPORTED_DIALECTS = ("postgresql", "sqlite")
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    @property
+    def is_supported(self) -> bool:
+        return self.engine.dialect.name in self.SUPPORTED_DIALECTS
+
+    @contextmanager
+    def _connect(self, connection=None):
+        # Alembic revisions pass their own connection; everything else runs in its own transaction
+        if connection is not None:
+            yield connection
+        else:
+            with self.engine.begin() as conn:
+                yield conn
+
+    def is_installed(self, connection=None) -> bool:
+        if not self.is_supported:
+            return False
+        with self._connect(connection) as conn:
+            if conn.dialect.name == "postgresql":
+                columns = {column["name"] for column in inspect(conn).get_columns("invoices")}
+                return "search_vector" in columns
+            return bool(conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'invoice_search_fts'"
+            )).scalar())
+
+    def install(self, connection=None) -> Dict[str, str]:
+        """Create the index and its triggers, backfilling existing invoices on first install"""
+        if not self.is_supported:
+            return {"status": "skipped", "reason": f"search index not supported on {self.engine.dialect.name}"}
+
+        with self._connect(connection) as conn:
+            fresh = not self.is_installed(conn)
+            statements = POSTGRES_INSTALL if conn.dialect.name == "postgresql" else SQLITE_INSTALL
+            for statement in statements:
+                conn.exec_driver_sql(statement)
+            if fresh:
+                self._backfill(conn)
+        invoice_search.clear_cache()
+        return {"status": "installed" if fresh else "updated"}
+
+    def rebuild(self, connection=None):
+        """Recompute every invoice's search document"""
+        with self._connect(connection) as conn:
+            self._backfill(conn)
+
+    def _backfill(self, conn):
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql(POSTGRES_BACKFILL)
+        else:
+            for statement in SQLITE_BACKFILL:
+                conn.exec_driver_sql(statement)
+
+    def uninstall(self, connection=None):
+        if not self.is_supported:
+            return
+        with self._connect(connection) as conn:
+            statements = POSTGRES_UNINSTALL if conn.dialect.name == "postgresql" else SQLITE_UNINSTALL
+            for statement in statements:
+                conn.exec_driver_sql(statement)
+        invoice_search.clear_cache()
+
+
+@dataclass
+class SearchHit:
+    """An invoice matching a search, with its relevance"""
+    invoice: Invoice
+    rank: float
+
+
+class InvoiceSearchService:
+    """Ranked, prefix- and typo-tolerant invoice search scoped to one company"""
+
+    def __init__(self):
+        # Engine URL -> whether the search index exists there
+        self._installed: Dict[str, bool] = {}
+
+    def clear_cache(self):
+        self._installed.clear()
+
+    def _index_available(self, db: Session) -> bool:
+        bind = db.get_bind(clause=Invoice.__table__.select())
+        key = str(bind.url)
+        if key not in self._installed:
+            self._installed[key] = InvoiceSearchIndex(bind).is_installed(db.connection())
+        return self._installed[key]
+
+    def search(self, db: Session, company_id, term: str, limit: int = 20) -> List[SearchHit]:
+        tokens = search_tokens(term)
+        if not tokens:
+            return []
+
+        if not self._index_available(db):
+            return self._scan(db, company_id, term, limit)
+
+        if db.get_bind(clause=Invoice.__table__.select()).dialect.name == "postgresql":
+            # Threshold for the <% operator, scoped to this transaction
+            db.execute(text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+                       {"threshold": str(TRIGRAM_THRESHOLD)})
+            rows = db.execute(POSTGRES_SEARCH, {
+                "tsquery": " & ".join(f"{token}:*" for token in tokens),
+                "term": " ".join(tokens),
+                "company_id": company_id,
+                "limit": limit
+            }).fetchall()
+        else:
+            rows = self._search_fts5(db, company_id, tokens, limit)
+        return self._load(db, company_id, rows)
+
+    def _search_fts5(self, db: Session, company_id, tokens: List[str], limit: int):
+        # Stored as the UUID type stores it on SQLite: 32 hex digits, a single FTS token
+        tenant = f'tenant : "{uuid.UUID(str(company_id)).hex}"'
+        match = " ".join(f'"{token}"*' for token in tokens)
+        rows = db.execute(SQLITE_SEARCH, {"match": f"{tenant} AND ({match})", "limit": limit}).fetchall()
+        if rows:
+            return rows
+
+        # Typo tolerance for supplier names: retry with the closest names this tenant uses
+        suppliers = db.query(Invoice.supplier_name)\
+            .filter(Invoice.company_id == company_id)\
+            .distinct()\
+            .limit(5000)\
+            .all()
+        by_lowered = {name.lower(): name for (name,) in suppliers if name}
+        close = difflib.get_close_matches(" ".join(tokens), list(by_lowered), n=3, cutoff=FUZZY_CUTOFF)
+        if not close:
+            return []
+        match = " OR ".join(
+            "supplier_name : (" + " ".join(f'"{token}"' for token in search_tokens(by_lowered[name])) + ")"
+            for name in close
+        )
+        return db.execute(SQLITE_SEARCH, {"match": f"{tenant} AND ({match})", "limit": limit}).fetchall()
+
+    @staticmethod
+    def _load(db: Session, company_id, rows) -> List[SearchHit]:
+        if not rows:
+            return []
+        ranks = {invoice_id: rank for invoice_id, rank in rows}
+        invoices = db.query(Invoice)\
+            .filter(Invoice.company_id == company_id)\
+            .filter(Invoice.id.in_(list(ranks)))\
+            .all()
+        by_id = {invoice.id: invoice for invoice in invoices}
+        # Keep the ranked order of the search query
+        return [SearchHit(by_id[invoice_id], float(rank or 0)) for invoice_id, rank in ranks.items() if invoice_id in by_id]
+
+    @staticmethod
+    def _scan(db: Session, company_id, term: str, limit: int) -> List[SearchHit]:
+        invoices = db.query(Invoice)\
+            .filter(Invoice.company_id == company_id)\
+            .filter(or_(
+                Invoice.invoice_number.ilike(f"%{term}%"),
+                Invoice.supplier_name.ilike(f"%{term}%")
+            ))\
+            .order_by(Invoice.created_at.desc())\
+            .limit(limit)\
+            .all()
+        return [SearchHit(invoice, 0.0) for invoice in invoices]
+
+
+# Global search service instance
+invoice_search = InvoiceSearchService()
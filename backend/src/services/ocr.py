@@ -7,15 +7,15 @@ from pathlib import Path
 import asyncio
 from datetime import datetime, UTC
 
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
-from azure.core.exceptions import AzureError
-
 from core.config import settings
+from core.lazy import lazy_import
 from src.models.invoice import Invoice
 from src.models.invoice_line import InvoiceLine
 from src.models.audit import AuditLog, AuditAction, AuditResourceType
 
+# The Azure SDK is only loaded once an Azure-backed service is used
+azure_exceptions = lazy_import("azure.core.exceptions")
+
 logger = logging.getLogger(__name__)
 
 class MockOCRService:
@@ -86,6 +86,8 @@ class AzureOCRService:
         if not settings.AZURE_FORM_RECOGNIZER_ENDPOINT or not settings.AZURE_FORM_RECOGNIZER_KEY:
             raise ValueError("Azure Form Recognizer credentials not configured")
         
+        from azure.ai.formrecognizer import DocumentAnalysisClient
+        from azure.core.credentials import AzureKeyCredential
         self.client = DocumentAnalysisClient(
             endpoint=settings.AZURE_FORM_RECOGNIZER_ENDPOINT,
             credential=AzureKeyCredential(settings.AZURE_FORM_RECOGNIZER_KEY)
@@ -112,7 +114,7 @@ class AzureOCRService:
             logger.info(f"Successfully extracted invoice data: {extracted_data.get('invoice_number')}")
             return extracted_data
             
-        except AzureError as e:
+        except azure_exceptions.AzureError as e:
             logger.error(f"Azure OCR error: {e}")
             raise
         except Exception as e:
@@ -1,33 +1,37 @@
 """
 Optimized Database Queries for Production
 """
-from sqlalchemy.orm import Session, joinedload, selectinload
-from sqlalchemy import and_, or_, desc, asc, func, text
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
+from sqlalchemy import and_, desc, asc, func, text
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
 import logging
 
-from models.optimized_models import Invoice, User, Company, InvoiceLine, AuditLog
+from core.pagination import estimate_count, keyset_paginate
+from services.invoice_search import invoice_search
+from src.models.invoice import Invoice
+from src.models.invoice_line import InvoiceLine
+from src.models.user import User
+from src.models.company import Company
+from src.models.audit import AuditLog
 
 logger = logging.getLogger(__name__)
 
+# Sort key for invoice listings; the trailing id makes it unique
+INVOICE_KEYSET = (Invoice.created_at, Invoice.id)
+
 class OptimizedInvoiceQueries:
     """Optimized queries for invoice operations"""
     
     @staticmethod
-    def get_invoices_paginated(
+    def _filtered_invoices(
         db: Session,
         company_id: str,
-        page: int = 1,
-        per_page: int = 20,
         status: Optional[str] = None,
         supplier_name: Optional[str] = None,
         date_from: Optional[date] = None,
         date_to: Optional[date] = None
-    ) -> Dict[str, Any]:
-        """Get paginated invoices with filters"""
-        
-        # Build query with filters
+    ) -> Query:
         query = db.query(Invoice).filter(Invoice.company_id == company_id)
         
         if status:
@@ -42,21 +46,40 @@ class OptimizedInvoiceQueries:
         if date_to:
             query = query.filter(Invoice.invoice_date <= date_to)
         
-        # Get total count
-        total = query.count()
+        return query
+    
+    @staticmethod
+    def get_invoices_paginated(
+        db: Session,
+        company_id: str,
+        cursor: Optional[str] = None,
+        per_page: int = 20,
+        status: Optional[str] = None,
+        supplier_name: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Get a page of invoices, newest first, with filters
         
-        # Apply pagination and ordering
-        invoices = query.order_by(desc(Invoice.created_at))\
-                       .offset((page - 1) * per_page)\
-                       .limit(per_page)\
-                       .all()
+        Pass a page's ``next_cursor`` back as ``cursor`` to fetch the one after
+        it; the cost is the same however deep the page. Raises
+        ``InvalidCursorError`` for cursors not issued by this listing.
+        """
+        query = OptimizedInvoiceQueries._filtered_invoices(
+            db, company_id, status, supplier_name, date_from, date_to
+        )
+        
+        # Seek on (created_at, id) within the tenant: served by idx_invoices_company_created_id
+        page = keyset_paginate(query, INVOICE_KEYSET, cursor, per_page)
+        total, total_is_estimate = estimate_count(db, query)
         
         return {
-            "invoices": invoices,
+            "invoices": page.items,
             "total": total,
-            "page": page,
+            "total_is_estimate": total_is_estimate,
             "per_page": per_page,
-            "pages": (total + per_page - 1) // per_page
+            "next_cursor": page.next_cursor,
+            "has_next": page.has_next
         }
     
     @staticmethod
@@ -114,19 +137,8 @@ class OptimizedInvoiceQueries:
         search_term: str,
         limit: int = 20
     ) -> List[Invoice]:
-        """Search invoices by multiple fields"""
-        search_filter = or_(
-            Invoice.invoice_number.ilike(f"%{search_term}%"),
-            Invoice.supplier_name.ilike(f"%{search_term}%"),
-            Invoice.ocr_data["supplier_name"].astext.ilike(f"%{search_term}%")
-        )
-        
-        return db.query(Invoice)\
-                 .filter(Invoice.company_id == company_id)\
-                 .filter(search_filter)\
-                 .order_by(desc(Invoice.created_at))\
-                 .limit(limit)\
-                 .all()
+        """Search invoices by number, supplier and line items, best match first"""
+        return [hit.invoice for hit in invoice_search.search(db, company_id, search_term, limit)]
 
 class OptimizedUserQueries:
     """Optimized queries for user operations"""
@@ -0,0 +1,465 @@
+"""
+Supplier name -> ERP vendor resolution shared by every ERP integration
+
+Posting an invoice needs the ERP's vendor for the supplier named on it. The
+GP service, the GP/BC adapters and the QuickBooks automation used to work
+that out independently, per invoice, mostly by asking the ERP.
+``VendorResolver`` answers it once per supplier and ERP company:
+
+- supplier names are compared on a normalized key (``vendor_name_key``), so
+  "ACME Widgets, Inc." and "Acme Widgets Ltd" are one supplier;
+- resolved mappings are cached per (ERP type, company) and written through
+  to ``erp_vendor_mappings``, so every worker and restart reuses them;
+- an unmapped name is compared with the company's known vendors through a
+  trigram index (scored by trigram and token overlap). Similar names are
+  only suggestions (``suggest``): a typo and a different supplier score
+  alike, so a fuzzy match is used for posting only above
+  ``VENDOR_FUZZY_ACCEPT_THRESHOLD`` and is never remembered as a mapping;
+- ``resolve_many`` resolves a whole batch: names with the same key share one
+  lookup and distinct suppliers are looked up concurrently.
+
+Each worker's cached mappings are reloaded after ``VENDOR_INDEX_TTL_SECONDS``;
+a correction made with ``remember`` is also published over Redis so other
+workers reload that company's mappings straight away.
+
+Finding or creating the vendor in the ERP stays with each integration, which
+passes it in as ``lookup``.
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from datetime import datetime, UTC
+from typing import Any, Awaitable, Callable, Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.models.vendor_mapping import ERPVendorMapping
+from core.config import settings
+from core.lazy import LazyService
+
+logger = logging.getLogger(__name__)
+
+# Candidates (by shared trigrams) scored in full for each fuzzy lookup
+FUZZY_CANDIDATES = 25
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+_LEGAL_SUFFIXES = {
+    "inc", "incorporated", "ltd", "limited", "llc", "llp", "lp", "corp", "corporation", "co", "company",
+    "plc", "gmbh", "ag", "sa", "bv", "nv", "pty", "srl", "the"
+}
+
+T = TypeVar("T")
+
+
+def vendor_name_key(name: str) -> str:
+    """Vendor name reduced to the words that identify it: 'ACME Widgets, Inc.' -> 'acme widgets'"""
+    words = _NON_WORD.sub(" ", (name or "").lower().replace("&", " and ")).split()
+    significant = [word for word in words if word not in _LEGAL_SUFFIXES]
+    return " ".join(significant or words)[:65]
+
+
+def name_trigrams(key: str) -> Set[str]:
+    """Trigrams of each word padded as pg_trgm does ('  acme ')"""
+    grams = set()
+    for word in key.split():
+        padded = f"  {word} "
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+def name_similarity(key: str, other: str) -> float:
+    """Mean of trigram Jaccard similarity and word Dice coefficient of two name keys
+
+    Trigrams tolerate typos and OCR noise ('acme widget' ~ 'acme widgets');
+    words keep names that merely share letters apart.
+    """
+    if key == other:
+        return 1.0
+    grams, other_grams = name_trigrams(key), name_trigrams(other)
+    if not grams or not other_grams:
+        return 0.0
+    words, other_words = set(key.split()), set(other.split())
+    trigram = len(grams & other_grams) / len(grams | other_grams)
+    dice = 2 * len(words & other_words) / (len(words) + len(other_words))
+    return (trigram + dice) / 2
+
+
+@dataclass(frozen=True)
+class VendorMatch:
+    """The ERP vendor a supplier name resolved to
+
+    ``source`` says how: ``existing`` or ``created`` by the integration's
+    ERP lookup, ``derived`` when the integration computes the reference
+    itself, ``mapped`` from a remembered mapping, ``fuzzy`` from a similar
+    name accepted for posting and ``suggested`` from one below the accept
+    threshold (``score`` is the similarity).
+    """
+    vendor_ref: str
+    vendor_name: str
+    source: str
+    score: float = 1.0
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+VendorLookup = Callable[[str], Awaitable[Optional[VendorMatch]]]
+
+
+class VendorIndex(Generic[T]):
+    """Name keys -> values, with exact lookup and trigram-candidate fuzzy lookup"""
+
+    def __init__(self):
+        self._values: Dict[str, T] = {}
+        self._by_trigram: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get(self, key: str) -> Optional[T]:
+        return self._values.get(key)
+
+    def values(self) -> List[T]:
+        return list(self._values.values())
+
+    def add(self, key: str, value: T, replace_existing: bool = True):
+        if not key or (not replace_existing and key in self._values):
+            return
+        self._values[key] = value
+        for gram in name_trigrams(key):
+            self._by_trigram.setdefault(gram, set()).add(key)
+
+    def best(self, key: str, threshold: float) -> Optional[Tuple[str, T, float]]:
+        """``(key, value, score)`` of the most similar indexed name scoring at least ``threshold``"""
+        if key in self._values:
+            return key, self._values[key], 1.0
+        shared = Counter()
+        for gram in name_trigrams(key):
+            shared.update(self._by_trigram.get(gram, ()))
+        best = None
+        for candidate, _ in shared.most_common(FUZZY_CANDIDATES):
+            score = name_similarity(key, candidate)
+            if score >= threshold and (best is None or score > best[2]):
+                best = (candidate, self._values[candidate], score)
+        return best
+
+
+class VendorResolver:
+    """Resolves supplier names to ERP vendors; mappings cached per (ERP type, company) and persisted
+
+    ``company`` is whatever identifies the company inside the ERP: the GP
+    company database, the BC/Xero company ID, the QuickBooks realm.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[async_sessionmaker] = None,
+        persist: Optional[bool] = None,
+        threshold: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        accept_threshold: Optional[float] = None,
+        ttl: Optional[float] = None,
+        channel: Optional[str] = None
+    ):
+        self._session_factory = session_factory
+        self.persist = settings.VENDOR_RESOLUTION_PERSIST if persist is None else persist
+        self.threshold = settings.VENDOR_MATCH_THRESHOLD if threshold is None else threshold
+        self.accept_threshold = (
+            settings.VENDOR_FUZZY_ACCEPT_THRESHOLD if accept_threshold is None else accept_threshold
+        )
+        self.concurrency = concurrency or settings.VENDOR_RESOLUTION_CONCURRENCY
+        self.ttl = settings.VENDOR_INDEX_TTL_SECONDS if ttl is None else ttl
+        self.channel = channel or settings.VENDOR_MAPPING_INVALIDATION_CHANNEL
+        self._indexes: Dict[Tuple[str, str], VendorIndex[VendorMatch]] = {}
+        self._loaded_at: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.stats = {"mapped": 0, "fuzzy": 0, "suggested": 0, "lookups": 0, "unresolved": 0, "persist_failures": 0,
+                      "reloads": 0, "invalidations": 0}
+
+        # Our own invalidations come back from the channel; they are recognised by origin
+        self._origin = uuid.uuid4().hex
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _session(self) -> AsyncSession:
+        if self._session_factory is None:
+            from core.database import get_async_sessionmaker
+            self._session_factory = get_async_sessionmaker()
+        return self._session_factory()
+
+    def _fresh(self, scope: Tuple[str, str]) -> bool:
+        # Without persistence the cache is the only copy of the mappings; it never expires
+        if scope not in self._indexes:
+            return False
+        return not self.persist or time.monotonic() - self._loaded_at[scope] < self.ttl
+
+    async def _index(self, erp_type: str, company: str) -> VendorIndex[VendorMatch]:
+        scope = (erp_type, str(company))
+        if self._fresh(scope):
+            return self._indexes[scope]
+        async with self._locks.setdefault(scope, asyncio.Lock()):
+            if not self._fresh(scope):
+                index, stale = VendorIndex(), self._indexes.get(scope)
+                if self.persist and not await self._load(scope, index) and stale is not None:
+                    # Keep serving the mappings we have until the database answers again
+                    index = stale
+                elif stale is not None:
+                    self.stats["reloads"] += 1
+                self._indexes[scope] = index
+                self._loaded_at[scope] = time.monotonic()
+        return self._indexes[scope]
+
+    async def _load(self, scope: Tuple[str, str], index: VendorIndex[VendorMatch]) -> bool:
+        try:
+            async with self._session() as session:
+                rows = (await session.execute(
+                    select(ERPVendorMapping).where(
+                        ERPVendorMapping.erp_type == scope[0], ERPVendorMapping.company_key == scope[1]
+                    )
+                )).scalars().all()
+        except Exception as e:
+            # Resolution still works, just without remembered mappings for this company
+            self.stats["persist_failures"] += 1
+            logger.warning(f"Could not load vendor mappings for {scope[0]}/{scope[1]}: {e}")
+            return False
+        # Fuzzy matches remembered by earlier versions are not authoritative
+        rows = [row for row in rows if row.source != "fuzzy"]
+        for row in rows:
+            match = VendorMatch(row.vendor_ref, row.vendor_name or row.supplier_name, row.source, row.score,
+                                row.details or {})
+            index.add(row.name_key, match)
+        for row in rows:
+            index.add(vendor_name_key(row.vendor_name or ""), index.get(row.name_key), replace_existing=False)
+        return True
+
+    def _known(self, index: VendorIndex[VendorMatch], key: str) -> Optional[VendorMatch]:
+        """The mapping for ``key``, or a similar name's scoring at least ``accept_threshold``"""
+        found = index.best(key, self.threshold)
+        if found is None:
+            return None
+        matched_key, match, score = found
+        if matched_key == key:
+            self.stats["mapped"] += 1
+            return replace(match, source="mapped", score=1.0)
+        if score < self.accept_threshold:
+            self.stats["suggested"] += 1
+            logger.info(f"Vendor '{match.vendor_name}' ({score:.2f}) suggested for unmapped supplier key '{key}'")
+            return None
+        self.stats["fuzzy"] += 1
+        return replace(match, source="fuzzy", score=score)
+
+    async def suggest(self, erp_type: str, company: str, supplier_name: str) -> Optional[VendorMatch]:
+        """The known vendor most similar to ``supplier_name``, for review; never posted to or remembered
+
+        A reviewer confirms a suggestion with ``remember``.
+        """
+        key = vendor_name_key(supplier_name)
+        if not key:
+            return None
+        found = (await self._index(erp_type, company)).best(key, self.threshold)
+        if found is None:
+            return None
+        matched_key, match, score = found
+        return replace(match, source="mapped" if matched_key == key else "suggested", score=score)
+
+    async def resolve(
+        self,
+        erp_type: str,
+        company: str,
+        supplier_name: str,
+        lookup: Optional[VendorLookup] = None
+    ) -> Optional[VendorMatch]:
+        """The company's ERP vendor for ``supplier_name``; ``lookup`` (find or create in the ERP) only on a miss"""
+        key = vendor_name_key(supplier_name)
+        if not key:
+            return None
+        index = await self._index(erp_type, company)
+        match = self._known(index, key)
+        if match is None and lookup is not None:
+            self.stats["lookups"] += 1
+            match = await lookup(supplier_name)
+        if match is None:
+            self.stats["unresolved"] += 1
+            return None
+        if match.source not in ("mapped", "fuzzy"):
+            await self._remember(erp_type, company, index, [(key, supplier_name, match)])
+        return match
+
+    async def resolve_many(
+        self,
+        erp_type: str,
+        company: str,
+        supplier_names: Iterable[str],
+        lookup: Optional[VendorLookup] = None
+    ) -> Dict[str, Optional[VendorMatch]]:
+        """``resolve`` for a batch, e.g. every invoice of an upload
+
+        Names already known are answered from the index. The rest are grouped
+        by key ('Acme Widgets Inc', 'ACME WIDGETS LTD'), or by similarity
+        above ``accept_threshold``, so each supplier is looked up once; the
+        groups are looked up ``concurrency`` at a time. New mappings are
+        persisted in one write.
+        """
+        index = await self._index(erp_type, company)
+        results: Dict[str, Optional[VendorMatch]] = {}
+        learned: List[Tuple[str, str, VendorMatch]] = []
+        groups: VendorIndex[List[Tuple[str, str, float]]] = VendorIndex()
+        for name in dict.fromkeys(supplier_names):
+            key = vendor_name_key(name)
+            if not key:
+                results[name] = None
+                continue
+            known = self._known(index, key)
+            if known is not None:
+                results[name] = known
+                continue
+            group = groups.best(key, self.accept_threshold)
+            if group is None:
+                groups.add(key, [(key, name, 1.0)])
+            else:
+                group[1].append((key, name, group[2]))
+
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def resolve_group(members: List[Tuple[str, str, float]]) -> Optional[VendorMatch]:
+            if lookup is None:
+                return None
+            async with slots:
+                self.stats["lookups"] += 1
+                return await lookup(members[0][1])
+
+        member_lists = groups.values()
+        matches = await asyncio.gather(*[resolve_group(members) for members in member_lists])
+        for members, match in zip(member_lists, matches):
+            for position, (key, name, score) in enumerate(members):
+                if match is None:
+                    self.stats["unresolved"] += 1
+                    results[name] = None
+                    continue
+                if score < 1.0:
+                    results[name] = replace(match, source="fuzzy", score=score)
+                    continue
+                results[name] = match
+                learned.append((key, name, match))
+        if learned:
+            await self._remember(erp_type, company, index, learned)
+        return results
+
+    async def remember(self, erp_type: str, company: str, supplier_name: str, match: VendorMatch) -> VendorMatch:
+        """Record a mapping directly, e.g. a user's correction; replaces any earlier one for the name
+
+        Other workers drop their cached mappings for the company and reload them.
+        """
+        key = vendor_name_key(supplier_name)
+        if key and await self._remember(erp_type, company, await self._index(erp_type, company),
+                                        [(key, supplier_name, match)]):
+            await self._publish(erp_type, str(company))
+        return match
+
+    async def _remember(self, erp_type: str, company: str, index: VendorIndex[VendorMatch],
+                        learned: List[Tuple[str, str, VendorMatch]]) -> bool:
+        """Cache ``learned`` and write it through; whether it reached the database"""
+        for key, _, match in learned:
+            index.add(key, match)
+            index.add(vendor_name_key(match.vendor_name), match, replace_existing=False)
+        if not self.persist:
+            return False
+        try:
+            async with self._session() as session:
+                await self._upsert(session, erp_type, str(company), learned)
+                await session.commit()
+        except Exception as e:
+            # The mapping stays cached in this process; it is re-learned elsewhere
+            self.stats["persist_failures"] += 1
+            logger.warning(f"Could not persist {len(learned)} vendor mapping(s) for {erp_type}/{company}: {e}")
+            return False
+        return True
+
+    async def _upsert(self, session: AsyncSession, erp_type: str, company: str,
+                      learned: List[Tuple[str, str, VendorMatch]]):
+        now = datetime.now(UTC)
+        values = list({
+            key: {
+                "erp_type": erp_type, "company_key": company, "name_key": key, "supplier_name": name[:255],
+                "vendor_ref": match.vendor_ref, "vendor_name": (match.vendor_name or "")[:255],
+                "source": match.source, "score": match.score, "details": match.details or None, "updated_at": now
+            }
+            for key, name, match in learned
+        }.values())
+
+        from core.database import upsert_rows
+        await upsert_rows(session, ERPVendorMapping, values)
+
+    def clear(self, erp_type: Optional[str] = None, company: Optional[str] = None):
+        """Drop cached mappings (reloaded from the database on next use)"""
+        for scope in list(self._indexes):
+            if (erp_type is None or scope[0] == erp_type) and (company is None or scope[1] == str(company)):
+                del self._indexes[scope]
+                del self._loaded_at[scope]
+
+    # Cluster-wide invalidation
+
+    async def _publish(self, erp_type: str, company: str):
+        if self._redis is None:
+            return
+        payload = json.dumps({"erp_type": erp_type, "company": company, "origin": self._origin})
+        try:
+            await self._redis.publish(self.channel, payload)
+        except Exception as e:
+            logger.warning(f"Failed to publish vendor mapping invalidation: {e}")
+
+    def _apply(self, message: Dict[str, Any]):
+        if message.get("origin") == self._origin:
+            return
+        self.stats["invalidations"] += 1
+        self.clear(message["erp_type"], message["company"])
+
+    async def start(self, redis_client):
+        """Subscribe to corrections made on other replicas"""
+        if self._task is not None:
+            return
+        self._redis = redis_client
+        pubsub = redis_client.pubsub()
+        await pubsub.subscribe(self.channel)
+        self._task = asyncio.get_running_loop().create_task(self._listen(pubsub))
+        logger.info(f"Vendor resolver listening for mapping changes on {self.channel}")
+
+    async def _listen(self, pubsub):
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                try:
+                    self._apply(json.loads(message["data"]))
+                except Exception as e:
+                    logger.warning(f"Ignoring malformed vendor mapping invalidation: {e}")
+        finally:
+            await pubsub.unsubscribe(self.channel)
+            await pubsub.close()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self._redis = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "companies": len(self._indexes),
+            "mappings": sum(len(index) for index in self._indexes.values()),
+            "listening": self._task is not None,
+            "stats": dict(self.stats)
+        }
+
+
+# Global resolver shared by the GP service, the ERP adapters and the automation engine
+vendor_resolver = LazyService(VendorResolver)
@@ -15,17 +15,15 @@ from decimal import Decimal
 from dataclasses import dataclass
 from enum import Enum
 
-import cv2
-import numpy as np
-from PIL import Image, ImageEnhance, ImageFilter
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
-from azure.core.exceptions import AzureError
-
 from core.config import settings
+from core.lazy import LazyService, lazy_import
 from services.advanced_ml_models import advanced_ml_service, MLModelType
 from src.models.invoice import InvoiceType
 
+# Image libraries are loaded by the first preprocessing call, not at import
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
 logger = logging.getLogger(__name__)
 
 class ProcessingQuality(Enum):
@@ -136,10 +134,12 @@ class WorldClassOCRService:
             "aws": "Amazon Web Services"
         }
 
-    def _initialize_azure_client(self) -> Optional[DocumentAnalysisClient]:
+    def _initialize_azure_client(self) -> Optional[Any]:
         """Initialize Azure Form Recognizer client"""
         try:
             if settings.AZURE_FORM_RECOGNIZER_ENDPOINT and settings.AZURE_FORM_RECOGNIZER_KEY:
+                from azure.ai.formrecognizer import DocumentAnalysisClient
+                from azure.core.credentials import AzureKeyCredential
                 return DocumentAnalysisClient(
                     endpoint=settings.AZURE_FORM_RECOGNIZER_ENDPOINT,
                     credential=AzureKeyCredential(settings.AZURE_FORM_RECOGNIZER_KEY)
@@ -253,7 +253,7 @@ class WorldClassOCRService:
             logger.warning(f"Image preprocessing failed: {e}")
             return file_path  # Return original on error
 
-    def _deskew_image(self, image: np.ndarray) -> np.ndarray:
+    def _deskew_image(self, image: "np.ndarray") -> "np.ndarray":
         """Deskew image to improve OCR accuracy"""
         try:
             # Find lines in the image
@@ -634,5 +634,5 @@ class WorldClassOCRService:
         logger.info(f"Batch processing completed: {len(results)} successful, {len(file_paths) - len(results)} failed")
         return results
 
-# Create service instance
-world_class_ocr_service = WorldClassOCRService()
+# Service instance, constructed on first use
+world_class_ocr_service = LazyService(WorldClassOCRService)
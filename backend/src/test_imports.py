@@ -100,8 +100,8 @@ def test_security_features():
     print("🔍 Testing security features...")
     try:
         from core.security import SecurityManager
-        from core.security_headers import SecurityHeadersMiddleware
-        from core.rate_limiting import RateLimitingMiddleware
+        from core.security_headers import SecurityHeadersHook
+        from core.rate_limiter import RateLimitMiddleware
         
         # Test security manager
         security_manager = SecurityManager()
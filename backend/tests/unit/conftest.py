@@ -0,0 +1,7 @@
+"""
+Shared configuration for the unit tests
+
+Several suites build their tables in throwaway SQLite databases; the models'
+PostgreSQL UUID columns compile there through ``core.sqlite_types``.
+"""
+import src.core.sqlite_types  # noqa: F401
@@ -0,0 +1,132 @@
+"""
+Unit tests for the async database engine and the services migrated to it
+"""
+import asyncio
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core import database
+from src.core.database import Base, async_database_url, create_async_database_engine
+from src.models.invoice import Invoice, InvoiceStatus
+from src.models.user import User  # noqa: F401 - registers the users table for Invoice foreign keys
+from src.models.company import Company  # noqa: F401
+from src.services.fraud_detection import FraudDetectionService, FraudRiskLevel
+
+pytest.importorskip("aiosqlite")
+
+
+def make_invoice(company_id, user_id, **overrides):
+    values = dict(
+        id=uuid.uuid4(), invoice_number=f"INV-{uuid.uuid4().hex[:6]}", supplier_name="Acme",
+        invoice_date=datetime(2026, 3, 2, 10, 30), total_amount=Decimal("1250.00"), subtotal=Decimal("1250.00"),
+        total_with_tax=Decimal("1250.00"), status=InvoiceStatus.DRAFT, company_id=company_id,
+        created_by_id=user_id
+    )
+    values.update(overrides)
+    return Invoice(**values)
+
+
+async def make_sessionmaker(path):
+    engine = create_async_database_engine(f"sqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[Invoice.__table__])
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+class TestAsyncDatabaseURL:
+    """Sync URLs are mapped onto their asyncio drivers"""
+
+    def test_postgres_uses_asyncpg(self):
+        assert async_database_url("postgresql://u:p@db/app").drivername == "postgresql+asyncpg"
+        assert async_database_url("postgresql+psycopg2://u:p@db/app").drivername == "postgresql+asyncpg"
+
+    def test_sqlite_uses_aiosqlite(self):
+        url = async_database_url("sqlite:///./data/app.db")
+        assert url.drivername == "sqlite+aiosqlite"
+        assert url.database == "./data/app.db"
+
+    def test_unknown_backend_rejected(self):
+        with pytest.raises(ValueError):
+            async_database_url("mssql+pyodbc://u:p@gp/TWO")
+
+
+class TestAsyncSessionDependency:
+    """get_async_db hands out AsyncSessions from the shared async engine"""
+
+    def test_yields_async_session(self, monkeypatch):
+        monkeypatch.setattr(database, "database_url", "sqlite://")
+
+        async def scenario():
+            sessions = database.get_async_db()
+            db = await sessions.__anext__()
+            value = (await db.execute(text("SELECT 1"))).scalar()
+            await sessions.aclose()
+            await database.dispose_async_engine()
+            return db, value
+
+        db, value = asyncio.run(scenario())
+        assert isinstance(db, AsyncSession)
+        assert value == 1
+
+
+class TestMigratedServices:
+    """Fraud analysis runs its queries on an AsyncSession"""
+
+    def test_fraud_analysis_on_async_session(self, tmp_path):
+        company_id, user_id = uuid.uuid4(), uuid.uuid4()
+
+        async def scenario():
+            engine, Session = await make_sessionmaker(tmp_path / "app.db")
+            async with Session() as db:
+                db.add_all([make_invoice(company_id, user_id) for _ in range(3)])
+                target = make_invoice(company_id, user_id, total_amount=Decimal("150000.00"))
+                db.add(target)
+                await db.commit()
+
+                result = await FraudDetectionService().analyze_fraud_risk(target, db)
+            await engine.dispose()
+            return result
+
+        result = asyncio.run(scenario())
+        assert result.risk_level in FraudRiskLevel
+        assert any(indicator["type"] == "amount_anomaly" for indicator in result.indicators)
+
+    def test_event_loop_not_blocked_by_queries(self, tmp_path):
+        company_id, user_id = uuid.uuid4(), uuid.uuid4()
+
+        async def scenario():
+            engine, Session = await make_sessionmaker(tmp_path / "app.db")
+            async with Session() as db:
+                db.add_all([make_invoice(company_id, user_id) for _ in range(20)])
+                await db.commit()
+
+            ticks = 0
+            done = asyncio.Event()
+
+            async def ticker():
+                nonlocal ticks
+                while not done.is_set():
+                    ticks += 1
+                    await asyncio.sleep(0)
+
+            async def request():
+                async with Session() as db:
+                    invoice = make_invoice(company_id, user_id)
+                    return await FraudDetectionService()._get_historical_data(invoice, db)
+
+            tick_task = asyncio.create_task(ticker())
+            results = await asyncio.gather(*(request() for _ in range(10)))
+            done.set()
+            await tick_task
+            await engine.dispose()
+            return ticks, results
+
+        ticks, results = asyncio.run(scenario())
+        assert all(len(rows) == 20 for rows in results)
+        # Other tasks ran while the queries were in flight
+        assert ticks > 10
@@ -0,0 +1,149 @@
+"""
+Unit tests for audit log partition management
+"""
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta, UTC
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.config import settings
+from src.core.database import Base
+from src.core.database_migrations import AuditLogPartitionManager
+from src.models.audit import AuditAction, AuditLog, AuditResourceType
+from src.models.user import User  # noqa: F401 - registers the users table for AuditLog foreign keys
+from src.models.company import Company  # noqa: F401
+from services.audit import AuditService
+from services.audit_maintenance import AuditMaintenance
+
+
+class TestAuditLogPartitionManager:
+    """Test partition naming and dialect fallbacks"""
+
+    def test_partition_name_round_trip(self):
+        name = AuditLogPartitionManager.partition_name(date(2026, 3, 1))
+        assert name == "audit_logs_p2026_03"
+        assert AuditLogPartitionManager.partition_month(name) == date(2026, 3, 1)
+
+    def test_partition_month_ignores_other_partitions(self):
+        assert AuditLogPartitionManager.partition_month("audit_logs_default") is None
+
+    def test_next_month_wraps_year(self):
+        assert AuditLogPartitionManager._next_month(date(2026, 12, 1)) == date(2027, 1, 1)
+        assert AuditLogPartitionManager._next_month(date(2026, 1, 1)) == date(2026, 2, 1)
+
+    def test_sqlite_is_noop(self):
+        manager = AuditLogPartitionManager(create_engine("sqlite://"))
+        assert not manager.is_supported
+        assert not manager.is_partitioned()
+        assert manager.ensure_future_partitions() == []
+        assert manager.drop_partitions_before(datetime.now(UTC)) == []
+        assert manager.convert_to_partitioned()["status"] == "skipped"
+
+
+COMPANY_ID = uuid.uuid4()
+OTHER_COMPANY_ID = uuid.uuid4()
+
+
+@pytest.fixture
+def audit_db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[AuditLog.__table__])
+    sessions = sessionmaker(bind=engine)
+    yield sessions
+    engine.dispose()
+
+
+def add_logs(sessions, company_id, days_old, count):
+    timestamp = datetime.now(UTC) - timedelta(days=days_old)
+    with sessions() as session:
+        session.add_all([
+            AuditLog(action=AuditAction.READ, resource_type=AuditResourceType.INVOICE, resource_id=uuid.uuid4(),
+                     company_id=company_id, timestamp=timestamp, details={}, compliance_tags=[])
+            for _ in range(count)
+        ])
+        session.commit()
+
+
+def remaining(sessions):
+    with sessions() as session:
+        return session.scalar(select(func.count()).select_from(AuditLog))
+
+
+class RecordingPartitionManager:
+    def __init__(self, fail_ensure=False):
+        self.fail_ensure = fail_ensure
+        self.cutoffs = []
+
+    def ensure_future_partitions(self):
+        if self.fail_ensure:
+            raise RuntimeError("DDL failed")
+        return ["audit_logs_p2026_05"]
+
+    def drop_partitions_before(self, cutoff):
+        self.cutoffs.append(cutoff)
+        return ["audit_logs_p2024_01"]
+
+
+class TestRetention:
+    """Batched delete fallback and the scheduled maintenance pass"""
+
+    def test_cleanup_old_logs_deletes_one_company_in_batches(self, audit_db):
+        add_logs(audit_db, COMPANY_ID, days_old=400, count=7)
+        add_logs(audit_db, COMPANY_ID, days_old=10, count=2)
+        add_logs(audit_db, OTHER_COMPANY_ID, days_old=400, count=3)
+
+        with audit_db() as session:
+            deleted = asyncio.run(AuditService().cleanup_old_logs(session, COMPANY_ID, retention_days=365,
+                                                                  batch_size=3))
+
+        assert deleted == 7
+        assert remaining(audit_db) == 5
+
+    def test_maintenance_creates_partitions_and_purges(self, audit_db):
+        add_logs(audit_db, COMPANY_ID, days_old=400, count=4)
+        add_logs(audit_db, OTHER_COMPANY_ID, days_old=30, count=2)
+        manager = RecordingPartitionManager()
+        maintenance = AuditMaintenance(session_factory=audit_db, partition_manager=manager)
+
+        with patch.object(settings, "AUDIT_LOG_RETENTION_DAYS", 365), patch.object(settings, "AUDIT_PURGE_BATCH_SIZE", 3):
+            result = maintenance.run_once()
+
+        assert result["partitions_created"] == ["audit_logs_p2026_05"]
+        assert result["retention"]["deleted_rows"] == 4
+        assert remaining(audit_db) == 2
+        assert (datetime.now(UTC) - manager.cutoffs[0]).days == 365
+        assert maintenance.stats == {"runs": 1, "partitions_created": 1, "partitions_dropped": 1,
+                                     "rows_deleted": 4, "failures": 0}
+
+    def test_failed_partition_creation_still_applies_retention(self, audit_db):
+        add_logs(audit_db, COMPANY_ID, days_old=400, count=2)
+        maintenance = AuditMaintenance(session_factory=audit_db,
+                                       partition_manager=RecordingPartitionManager(fail_ensure=True))
+
+        with patch.object(settings, "AUDIT_LOG_RETENTION_DAYS", 365):
+            result = maintenance.run_once()
+
+        assert result["partitions_created"] == [] and result["retention"]["deleted_rows"] == 2
+        assert maintenance.stats["failures"] == 1
+
+    def test_scheduled_task_runs_on_start(self, audit_db):
+        manager = RecordingPartitionManager()
+        maintenance = AuditMaintenance(session_factory=audit_db, partition_manager=manager)
+
+        async def scenario():
+            await maintenance.start(interval=60)
+            for _ in range(100):
+                if maintenance.stats["runs"]:
+                    break
+                await asyncio.sleep(0.01)
+            running = maintenance.status()["running"]
+            await maintenance.stop()
+            return running
+
+        assert asyncio.run(scenario())
+        assert maintenance.stats["runs"] == 1 and not maintenance.status()["running"]
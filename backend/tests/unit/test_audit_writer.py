@@ -0,0 +1,141 @@
+"""
+Unit tests for the buffered audit log writer
+"""
+import asyncio
+import threading
+import uuid
+
+import pytest
+
+from src.models.audit import AuditAction, AuditResourceType
+from src.services.audit_writer import AuditWriter
+
+
+class RecordingSession:
+    """Minimal session double that records bulk inserts"""
+
+    def __init__(self, store, fail=False, threads=None):
+        self.store = store
+        self.fail = fail
+        self.threads = threads
+
+    def execute(self, statement, rows):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        if self.threads is not None:
+            self.threads.append(threading.get_ident())
+        self.store.append(list(rows))
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_row(writer, action=AuditAction.READ):
+    return writer.build_row(
+        action, AuditResourceType.INVOICE, uuid.uuid4(), uuid.uuid4(),
+        details={"description": "test"}
+    )
+
+
+class TestAuditWriter:
+    """Test buffering, bulk flushing and spill/replay"""
+
+    def test_enqueue_rejected_when_not_running(self, tmp_path):
+        writer = AuditWriter(session_factory=lambda: RecordingSession([]), spill_dir=str(tmp_path))
+        assert writer.enqueue(make_row(writer)) is False
+        assert writer.pending() == 0
+
+    def test_sync_actions(self, tmp_path):
+        writer = AuditWriter(spill_dir=str(tmp_path), sync_actions=["approve"])
+        assert writer.requires_sync(AuditAction.APPROVE)
+        assert not writer.requires_sync(AuditAction.READ)
+
+    def test_flush_writes_in_batches(self, tmp_path):
+        batches = []
+        writer = AuditWriter(session_factory=lambda: RecordingSession(batches),
+                             batch_size=10, buffer_size=1000, spill_dir=str(tmp_path))
+        writer._running = True
+        for _ in range(25):
+            writer.enqueue(make_row(writer))
+
+        assert writer.flush() == 25
+        assert [len(batch) for batch in batches] == [10, 10, 5]
+        assert writer.pending() == 0
+
+    def test_full_buffer_flushes_inline_off_the_loop(self, tmp_path):
+        batches = []
+        writer = AuditWriter(session_factory=lambda: RecordingSession(batches),
+                             batch_size=100, buffer_size=5, spill_dir=str(tmp_path))
+        writer._running = True
+        for _ in range(5):
+            writer.enqueue(make_row(writer))
+
+        assert writer.stats["inline_flushes"] == 1
+        assert sum(len(batch) for batch in batches) == 5
+
+    def test_full_buffer_on_the_loop_flushes_in_executor(self, tmp_path):
+        batches, threads = [], []
+        writer = AuditWriter(session_factory=lambda: RecordingSession(batches, threads=threads),
+                             batch_size=100, buffer_size=5, flush_interval=60, spill_dir=str(tmp_path))
+
+        async def scenario():
+            await writer.start()
+            for _ in range(5):
+                writer.enqueue(make_row(writer))
+            overflow = writer._overflow_flush
+            await overflow
+            await writer.stop()
+            return overflow
+
+        overflow = asyncio.run(scenario())
+
+        assert overflow is not None
+        assert writer.stats["overflow_flushes"] == 1 and writer.stats["inline_flushes"] == 0
+        assert sum(len(batch) for batch in batches) == 5
+        assert threading.get_ident() not in threads
+
+    def test_failed_flush_spills_and_replays(self, tmp_path):
+        writer = AuditWriter(session_factory=lambda: RecordingSession([], fail=True),
+                             batch_size=10, spill_dir=str(tmp_path))
+        writer._running = True
+        rows = [make_row(writer) for _ in range(3)]
+        for row in rows:
+            writer.enqueue(row)
+
+        assert writer.flush() == 0
+        assert writer.stats["spilled"] == 3
+        assert len(list(tmp_path.glob("audit-*.jsonl"))) == 1
+
+        batches = []
+        recovered = AuditWriter(session_factory=lambda: RecordingSession(batches),
+                                batch_size=10, spill_dir=str(tmp_path))
+        assert recovered.replay_spilled() == 3
+        replayed = batches[0]
+        assert [row["id"] for row in replayed] == [row["id"] for row in rows]
+        assert replayed[0]["action"] is AuditAction.READ
+        assert replayed[0]["timestamp"] == rows[0]["timestamp"]
+        assert list(tmp_path.glob("audit-*.jsonl")) == []
+
+    def test_background_task_flushes_on_interval_and_stop(self, tmp_path):
+        batches = []
+        writer = AuditWriter(session_factory=lambda: RecordingSession(batches),
+                             batch_size=100, flush_interval=0.01, spill_dir=str(tmp_path))
+
+        async def scenario():
+            await writer.start()
+            writer.enqueue(make_row(writer))
+            await asyncio.sleep(0.1)
+            flushed_by_timer = sum(len(batch) for batch in batches)
+            writer.enqueue(make_row(writer))
+            await writer.stop()
+            return flushed_by_timer
+
+        assert asyncio.run(scenario()) == 1
+        assert sum(len(batch) for batch in batches) == 2
+        assert not writer.is_running
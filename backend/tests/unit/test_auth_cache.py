@@ -0,0 +1,184 @@
+"""
+Unit tests for the verified-token and principal caches
+"""
+import asyncio
+import time
+import uuid
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+# Imported as the application does, so these are the instances its session listeners use
+from core.auth import AuthManager
+from core.auth_cache import AuthCache, auth_cache
+from src.models.user import User, UserRole, UserStatus
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    auth_cache.clear()
+    yield
+    auth_cache.clear()
+
+
+def make_token(**claims):
+    return AuthManager.create_access_token({"sub": str(uuid.uuid4()), "company_id": str(uuid.uuid4()), **claims})
+
+
+def make_user(**overrides):
+    values = dict(
+        id=uuid.uuid4(), email="ada@example.com", username="ada", hashed_password="x", first_name="Ada",
+        last_name="Lovelace", company_id=uuid.uuid4(), role=UserRole.USER, status=UserStatus.ACTIVE
+    )
+    values.update(overrides)
+    return User(**values)
+
+
+class FakeSession:
+    """Just enough of a Session for load_principal"""
+
+    def __init__(self, user):
+        self.user = user
+        self.queries = 0
+
+    def query(self, model):
+        self.queries += 1
+        return self
+
+    def filter(self, *criteria):
+        return self
+
+    def first(self):
+        return self.user
+
+    def merge(self, instance, load=True):
+        assert load is False
+        return instance
+
+
+class TestVerifiedTokenCache:
+    """Signatures are checked once per token lifetime"""
+
+    def test_second_verification_skips_decode(self):
+        token = make_token()
+        with patch("src.core.auth.jwt.decode", wraps=__import__("jose").jwt.decode) as decode:
+            first = AuthManager.verify_token(token)
+            second = AuthManager.verify_token(token)
+
+        assert first == second
+        assert decode.call_count == 1
+
+    def test_revoked_token_is_rejected(self):
+        token = make_token()
+        claims = AuthManager.verify_token(token)
+        auth_cache.revoke_token(token, claims)
+
+        with pytest.raises(HTTPException) as exc_info:
+            AuthManager.verify_token(token)
+        assert exc_info.value.status_code == 401
+
+    def test_entries_do_not_outlive_token(self):
+        cache = AuthCache(maxsize=10, token_ttl=300, principal_ttl=60)
+        cache.put_claims("expired", {"sub": "u", "exp": time.time() - 1})
+        assert cache.get_claims("expired") is None
+
+    def test_cache_is_bounded(self):
+        cache = AuthCache(maxsize=2, token_ttl=300, principal_ttl=60)
+        for token in ("a", "b", "c"):
+            cache.put_claims(token, {"sub": token})
+        assert cache.get_claims("a") is None
+        assert cache.get_claims("c") == {"sub": "c"}
+
+
+class TestPrincipalCache:
+    """The authenticated user is loaded once and merged without a query afterwards"""
+
+    def test_user_query_runs_once(self):
+        user = make_user()
+        db = FakeSession(user)
+
+        first = AuthManager.load_principal(db, str(user.id))
+        second = AuthManager.load_principal(db, str(user.id))
+
+        assert db.queries == 1
+        assert first is user
+        assert second is not user and second.email == user.email
+
+    def test_invalidation_by_user_and_company(self):
+        user = make_user()
+        db = FakeSession(user)
+        AuthManager.load_principal(db, str(user.id))
+
+        auth_cache.invalidate_user(user.id)
+        AuthManager.load_principal(db, str(user.id))
+        auth_cache.invalidate_company(user.company_id)
+        AuthManager.load_principal(db, str(user.id))
+
+        assert db.queries == 3
+
+    def test_inactive_users_are_not_cached(self):
+        user = make_user(status=UserStatus.INACTIVE)
+        db = FakeSession(user)
+        AuthManager.load_principal(db, str(user.id))
+        AuthManager.load_principal(db, str(user.id))
+        assert db.queries == 2
+
+    def test_committed_user_change_evicts(self):
+        Base = declarative_base()
+
+        class UserRow(Base):
+            __tablename__ = "users"
+            id = Column(Integer, primary_key=True)
+            role = Column(String(20))
+
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(UserRow(id=7, role="user"))
+            session.commit()
+
+            with patch.object(auth_cache, "invalidate_user") as invalidate:
+                row = session.get(UserRow, 7)
+                row.role = "admin"
+                session.flush()
+                invalidate.assert_not_called()
+                session.commit()
+
+        invalidate.assert_called_once_with("7")
+
+
+class TestClusterInvalidation:
+    """Evictions are broadcast to every replica over Redis pub/sub"""
+
+    def test_invalidation_reaches_other_replica(self):
+        fakeredis = pytest.importorskip("fakeredis")
+
+        async def scenario():
+            server = fakeredis.FakeServer()
+            here, there = AuthCache(channel="auth:test"), AuthCache(channel="auth:test")
+            await here.start(fakeredis.aioredis.FakeRedis(server=server))
+            await there.start(fakeredis.aioredis.FakeRedis(server=server))
+
+            user = make_user()
+            there.put_principal(user)
+            there.put_claims("token", {"sub": str(user.id)})
+
+            here.invalidate_user(user.id)
+            here.revoke_token("token", {"exp": time.time() + 60})
+            for _ in range(50):
+                await asyncio.sleep(0.02)
+                if there.get_principal(str(user.id)) is None and there.is_revoked("token"):
+                    break
+
+            result = there.get_principal(str(user.id)), there.get_claims("token"), there.is_revoked("token")
+            await here.stop()
+            await there.stop()
+            return result
+
+        principal, claims, revoked = asyncio.run(scenario())
+        assert principal is None
+        assert claims is None
+        assert revoked is True
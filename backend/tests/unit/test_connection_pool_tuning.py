@@ -0,0 +1,222 @@
+"""
+Unit tests for connection pool auto-tuning and load shedding
+"""
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core.config import settings
+from src.core.database_connection import (
+    AdvancedConnectionPool, ConnectionPoolType, PoolSaturatedError, PoolSizeController, PoolWindow,
+    TunableQueuePool
+)
+from src.core.error_handling import ErrorHandler
+from src.core.pool_tuning import PoolAutotuner, TunableAsyncQueuePool
+
+
+def window(checkouts=100, p95=0.0, peak=0, rejected=0):
+    return PoolWindow(checkouts=checkouts, p95_wait_ms=p95, peak_checked_out=peak, rejected=rejected)
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_POOL_SIZE", 2)
+    monkeypatch.setattr(settings, "DATABASE_MAX_OVERFLOW", 1)
+    monkeypatch.setattr(settings, "DATABASE_POOL_TIMEOUT_SECONDS", 0.2)
+    monkeypatch.setattr(settings, "DATABASE_POOL_MAX_WAITING", 1)
+    monkeypatch.setattr(settings, "DATABASE_POOL_TUNE_INTERVAL_SECONDS", 3600)
+    monkeypatch.setattr(settings, "DATABASE_POOL_MIN_SIZE", 2)
+    monkeypatch.setattr(settings, "DATABASE_POOL_MAX_CONNECTIONS", 8)
+    pool = AdvancedConnectionPool(f"sqlite:///{tmp_path / 'pool.db'}", ConnectionPoolType.QUEUE)
+    yield pool
+    pool.close()
+
+
+class TestPoolSizeController:
+    """Capacity grows under wait pressure and shrinks when idle, within bounds"""
+
+    controller = PoolSizeController(min_size=2, max_connections=20, target_wait_ms=50)
+
+    def test_grows_when_waits_exceed_target(self):
+        assert self.controller.decide(4, 4, window(p95=120, peak=8)) == (8, 4, "grow")
+
+    def test_grows_on_rejections_up_to_ceiling(self):
+        assert self.controller.decide(10, 8, window(rejected=3, peak=18)) == (18, 2, "grow")
+        assert self.controller.decide(18, 2, window(rejected=3, peak=20)) == (18, 2, "hold")
+
+    def test_shrinks_when_idle(self):
+        assert self.controller.decide(10, 10, window(p95=1, peak=3)) == (3, 15, "shrink")
+        assert self.controller.decide(2, 0, window(checkouts=0)) == (2, 0, "hold")
+
+    def test_database_limit_caps_capacity(self):
+        assert self.controller.decide(10, 10, window(p95=500, peak=20), db_limit=12) == (10, 2, "limit")
+        assert self.controller.decide(2, 2, window(p95=500, peak=4), db_limit=1) == (2, 0, "limit")
+
+
+class TestTunableQueuePool:
+    """Checkout waits are measured, and a saturated pool sheds instead of queuing"""
+
+    def test_checkout_waits_recorded(self, pool):
+        with pool.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+        wait = pool.get_stats()["checkout_wait"]
+        assert wait["count"] >= 1 and wait["buckets"]["le_inf"] == wait["count"]
+
+    def test_saturated_pool_sheds_fast(self, pool):
+        engine_pool = pool.engine.pool
+        held = [pool.engine.connect() for _ in range(3)]
+        for connection in held:
+            connection.execute(text("SELECT 1"))
+
+        # One request may wait (and time out); the next is refused without waiting
+        waiting = threading.Event()
+        errors = []
+
+        def wait_for_connection():
+            waiting.set()
+            try:
+                pool.engine.connect()
+            except SQLAlchemyTimeoutError as e:
+                errors.append(e)
+
+        waiter = threading.Thread(target=wait_for_connection)
+        waiter.start()
+        waiting.wait()
+        while engine_pool.waiting() == 0 and waiter.is_alive():
+            pass
+        with pytest.raises(PoolSaturatedError):
+            pool.engine.connect()
+        waiter.join()
+
+        assert len(errors) == 1 and not isinstance(errors[0], PoolSaturatedError)
+        for connection in held:
+            connection.close()
+        metrics = engine_pool.metrics.snapshot()
+        assert (metrics["shed"], metrics["timeouts"]) == (1, 1)
+
+    def test_resize_keeps_open_connections(self, pool):
+        engine_pool = pool.engine.pool
+        held = [pool.engine.connect() for _ in range(3)]
+        for connection in held:
+            connection.execute(text("SELECT 1"))
+
+        engine_pool.resize(4, 2)
+        assert (engine_pool.size(), engine_pool.capacity(), engine_pool.checkedout()) == (4, 6, 3)
+        extra = [pool.engine.connect() for _ in range(3)]
+        for connection in extra:
+            connection.execute(text("SELECT 1"))
+        assert engine_pool.checkedout() == 6
+
+        engine_pool.resize(2, 0)
+        for connection in held + extra:
+            connection.close()
+        assert (engine_pool.checkedout(), engine_pool.checkedin()) == (0, 2)
+
+    def test_tune_pool_applies_decision(self, pool):
+        engine_pool = pool.engine.pool
+        engine_pool.metrics.record_rejection(shed=True)
+
+        decision = pool.tune_pool()
+
+        assert decision["reason"] == "grow"
+        assert engine_pool.capacity() == 5 and pool.get_stats()["auto_tuning"]["adjustments"] == 1
+
+    def test_recreated_pool_keeps_metrics(self, pool):
+        engine_pool = pool.engine.pool
+        engine_pool.metrics.record_rejection(shed=True)
+        pool.engine.dispose()
+        assert isinstance(pool.engine.pool, TunableQueuePool)
+        assert pool.engine.pool.metrics.shed == 1
+
+
+class TestServingPoolAutotuner:
+    """The request-serving engine sheds and is resized like the monitored pool"""
+
+    def test_serving_engine_uses_tunable_pool(self):
+        from src.core.database import engine, pool_autotuner
+
+        assert isinstance(engine.pool, TunableQueuePool)
+        assert pool_autotuner.engine is engine
+        assert engine.pool._timeout == settings.DATABASE_POOL_TIMEOUT_SECONDS
+
+    def test_autotuner_resizes_on_interval(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "DATABASE_POOL_MIN_SIZE", 2)
+        monkeypatch.setattr(settings, "DATABASE_POOL_MAX_CONNECTIONS", 8)
+        engine = create_engine(f"sqlite:///{tmp_path / 'serving.db'}", poolclass=TunableQueuePool,
+                               pool_size=2, max_overflow=1)
+        autotuner = PoolAutotuner(engine)
+        engine.pool.metrics.record_rejection(shed=True)
+
+        async def run():
+            await autotuner.start(interval=0.01)
+            while autotuner.tuner.adjustments == 0:
+                await asyncio.sleep(0.01)
+            status = autotuner.status()
+            await autotuner.stop()
+            return status
+
+        status = asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+        assert status["capacity"] == 5 and status["auto_tuning"]["last_decision"]["reason"] == "grow"
+        assert status["auto_tuning"]["enabled"] and not autotuner.status()["auto_tuning"]["enabled"]
+        engine.dispose()
+
+    def test_async_pool_sheds_and_counts_concurrent_waiters(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "DATABASE_POOL_MAX_WAITING", 1)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}", poolclass=TunableAsyncQueuePool,
+                                     pool_size=1, max_overflow=0, pool_timeout=2)
+
+        async def run():
+            held = await engine.connect()
+            # Both checkouts wait on the event loop's thread; the second finds the queue full
+            waiter = asyncio.ensure_future(engine.connect())
+            while engine.pool.waiting() == 0:
+                await asyncio.sleep(0.01)
+            with pytest.raises(PoolSaturatedError):
+                await engine.connect()
+            await held.close()
+            await (await waiter).close()
+            snapshot = engine.pool.metrics.snapshot()
+            await engine.dispose()
+            return snapshot
+
+        snapshot = asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+        assert snapshot["count"] == 2 and snapshot["shed"] == 1
+
+    def test_async_pool_resize_rebounds_its_queue(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}", poolclass=TunableAsyncQueuePool,
+                                     pool_size=2, max_overflow=0)
+
+        async def run():
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            engine.pool.resize(4, 1)
+            capacity, queue_bound = engine.pool.capacity(), engine.pool._pool._queue.maxsize
+            await engine.dispose()
+            return capacity, queue_bound
+
+        assert asyncio.run(run()) == (5, 4)
+
+    def test_async_autotuner_waits_for_its_engine(self):
+        from src.core.database import async_pool_autotuner, engine
+
+        assert async_pool_autotuner.engine is None and async_pool_autotuner.limit_engine is engine
+        assert async_pool_autotuner.status()["capacity"] is None
+
+
+def test_pool_timeout_maps_to_503():
+    request = MagicMock()
+    request.url.path = "/api/v1/invoices"
+    request.method = "GET"
+
+    response = ErrorHandler.create_error_response(PoolSaturatedError("saturated"), request)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(max(1, int(settings.DATABASE_POOL_TIMEOUT_SECONDS)))
@@ -0,0 +1,93 @@
+"""
+Unit tests for the lazily importing ERP adapter registry
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import services.erp_adapters as erp_adapters
+from services.erp_adapters import ERPAdapterRegistry, MockERPAdapter
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+@pytest.fixture
+def no_plugins(monkeypatch):
+    monkeypatch.setattr(erp_adapters, "entry_points", lambda group: [])
+    monkeypatch.setattr(erp_adapters.settings, "ERP_ADAPTER_PLUGINS", {})
+
+
+class TestRegistry:
+    """Lookups by ERP type import the adapter module only when first used"""
+
+    def test_builtins_load_on_first_lookup(self, no_plugins):
+        registry = ERPAdapterRegistry()
+
+        assert "xero" in registry and "sap" not in registry
+        assert sorted(registry) == ["d365_bc", "dynamics_gp", "xero"]
+        assert not registry.is_loaded("xero")
+
+        adapter = registry["xero"]
+        assert adapter.__name__ == "XeroAdapter" and adapter.__module__ == "services.erp_adapters.xero"
+        assert registry.is_loaded("xero") and not registry.is_loaded("dynamics_gp")
+        with pytest.raises(KeyError):
+            registry["sap"]
+
+    def test_register_class_or_spec(self, no_plugins):
+        registry = ERPAdapterRegistry(builtins={})
+        registry.register("legacy", "services.erp_adapters.mock:MockERPAdapter")
+        registry.register("other", MockERPAdapter)
+        registry.register("broken", "json:dumps")
+
+        assert registry["legacy"] is MockERPAdapter and registry["other"] is MockERPAdapter
+        with pytest.raises(TypeError):
+            registry["broken"]
+        registry.unregister("other")
+        assert "other" not in registry
+
+    def test_entry_points_and_settings_plugins(self, monkeypatch):
+        plugins = [SimpleNamespace(name="sage", value="services.erp_adapters.mock:MockERPAdapter")]
+        monkeypatch.setattr(erp_adapters, "entry_points",
+                            lambda group: plugins if group == erp_adapters.ENTRY_POINT_GROUP else [])
+        monkeypatch.setattr(erp_adapters.settings, "ERP_ADAPTER_PLUGINS",
+                            {"xero": "services.erp_adapters.mock:MockERPAdapter"})
+        registry = ERPAdapterRegistry()
+
+        assert registry["sage"] is MockERPAdapter
+        # Configured plugins override the built-in adapter of the same type
+        assert registry["xero"] is MockERPAdapter
+        assert "dynamics_gp" in registry
+
+    def test_integration_service_rejects_unregistered_types(self):
+        from services.erp import ADAPTER_CLASSES, shared_adapter, XeroAdapter
+
+        assert ADAPTER_CLASSES["xero"] is XeroAdapter
+        with pytest.raises(ValueError):
+            shared_adapter("sap", {})
+
+
+@pytest.mark.slow
+def test_single_erp_worker_imports_only_its_adapter(tmp_path):
+    """A worker configured for Xero never imports the GP or Business Central code"""
+    script = (
+        "import json, sys; import services.erp_automation; "
+        "from core.config import settings; from services.erp import ERPIntegrationService; "
+        "settings.XERO_CONFIG = {'base_url': 'https://api.xero.test', 'api_key': 'k', 'company_id': 'ORG'}; "
+        "service = ERPIntegrationService(); "
+        "print(json.dumps(sorted(m for m in sys.modules if m.startswith('services.erp_adapters.') "
+        "or m in ('services.dynamics_gp_integration', 'services.gp_econnect', 'services.enhanced_three_way_match'))))"
+    )
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}",
+               PYTHONPATH=os.pathsep.join([str(BACKEND_DIR / "src"), str(BACKEND_DIR)]))
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        pytest.skip(f"ERP services not importable in this environment: {result.stderr.strip()[-200:]}")
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == [
+        "services.erp_adapters.base", "services.erp_adapters.mock", "services.erp_adapters.xero"
+    ]
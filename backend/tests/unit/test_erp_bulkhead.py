@@ -0,0 +1,228 @@
+"""
+Unit tests for ERP adapter bulkheads and concurrent fan-out in ERPIntegrationService
+"""
+import asyncio
+import time
+import uuid
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from services import erp
+from services.erp import ERPIntegrationService, close_shared_adapters, shared_adapter
+from services.erp_bulkhead import Bulkhead, BulkheadFullError, CircuitBreaker, CircuitOpenError
+from src.models.invoice import Invoice
+
+GP_CONFIG = {"base_url": "https://gp.example.test", "api_key": "key", "company_id": "TWO"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def slow_adapter(delay, result=None):
+    adapter = Mock()
+    adapter.connection_config = {}
+
+    async def respond(*args):
+        await asyncio.sleep(delay)
+        return result or {"status": "healthy", "timestamp": "now"}
+
+    adapter.health_check = AsyncMock(side_effect=respond)
+    adapter.post_invoice = AsyncMock(side_effect=respond)
+    return adapter
+
+
+class TestCircuitBreaker:
+    """Opens after consecutive failures, then lets one probe through"""
+
+    def test_opens_and_recovers_through_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+        clock.now = 10
+        assert breaker.allow() and not breaker.allow()  # a single probe
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+        clock.now = 20
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+
+class TestBulkhead:
+    """Concurrency bound, bounded waiting, timeouts feeding the breaker"""
+
+    def test_limits_concurrency_and_rejects_overflow(self):
+        async def scenario():
+            bulkhead = Bulkhead("gp", max_concurrent=2, max_waiting=1, timeout=1)
+            peak = 0
+
+            async def call():
+                nonlocal peak
+                peak = max(peak, bulkhead.active)
+                await asyncio.sleep(0.05)
+                return {"status": "success"}
+
+            results = await asyncio.gather(*[bulkhead.call(call) for _ in range(4)], return_exceptions=True)
+            return peak, results, bulkhead.status()
+
+        peak, results, status = asyncio.run(scenario())
+
+        assert peak == 2
+        assert sum(isinstance(result, BulkheadFullError) for result in results) == 1
+        assert status["calls"] == 3 and status["rejected"] == 1 and status["state"] == "closed"
+
+    def test_timeouts_open_the_circuit(self):
+        async def scenario():
+            bulkhead = Bulkhead("xero", timeout=0.02, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+            hang = slow_adapter(1).health_check
+            for _ in range(2):
+                with pytest.raises(asyncio.TimeoutError):
+                    await bulkhead.call(hang)
+            with pytest.raises(CircuitOpenError):
+                await bulkhead.call(hang)
+            return hang.await_count, bulkhead.status()
+
+        awaited, status = asyncio.run(scenario())
+
+        assert awaited == 2
+        assert status["state"] == "open" and status["timeouts"] == 2 and status["short_circuited"] == 1
+
+    def test_error_results_count_as_failures(self):
+        async def scenario():
+            bulkhead = Bulkhead("bc", breaker=CircuitBreaker(failure_threshold=1))
+            await bulkhead.call(AsyncMock(return_value={"status": "unhealthy"}))
+            return bulkhead.breaker.state
+
+        assert asyncio.run(scenario()) == CircuitBreaker.OPEN
+
+
+class TestERPIntegrationServiceFanOut:
+    """Health fan-out, health caching and isolation between ERP connections"""
+
+    def test_health_check_all_runs_concurrently_and_is_cached(self):
+        async def scenario():
+            service = ERPIntegrationService()
+            adapters = [slow_adapter(0.1) for _ in range(4)]
+            for index, adapter in enumerate(adapters):
+                service.connection_cache[f"company{index}"] = {"adapter": adapter, "erp_type": "dynamics_gp"}
+
+            started = time.perf_counter()
+            first = await service.health_check_all()
+            elapsed = time.perf_counter() - started
+            second = await service.health_check_all()
+            fresh = await service.health_check_all(use_cache=False)
+            return elapsed, first, second, fresh, [adapter.health_check.await_count for adapter in adapters]
+
+        elapsed, first, second, fresh, calls = asyncio.run(scenario())
+
+        assert elapsed < 0.3
+        assert first == second == fresh and first["company0"]["status"] == "healthy"
+        assert calls == [2, 2, 2, 2]
+
+    def test_slow_erp_times_out_without_stalling_others(self, monkeypatch):
+        monkeypatch.setattr(erp.settings, "ERP_HEALTH_TIMEOUT_SECONDS", 0.05)
+
+        async def scenario():
+            service = ERPIntegrationService()
+            service.connection_cache["stuck"] = {"adapter": slow_adapter(5), "erp_type": "xero"}
+            service.connection_cache["fine"] = {"adapter": slow_adapter(0.01), "erp_type": "dynamics_gp"}
+            started = time.perf_counter()
+            results = await service.health_check_all()
+            return time.perf_counter() - started, results
+
+        elapsed, results = asyncio.run(scenario())
+
+        assert elapsed < 0.5
+        assert results["fine"]["status"] == "healthy"
+        assert results["stuck"]["status"] == "error" and "did not answer" in results["stuck"]["error"]
+
+    def test_posting_fails_fast_once_circuit_opens(self, monkeypatch):
+        monkeypatch.setattr(erp.settings, "ERP_CIRCUIT_FAILURE_THRESHOLD", 2)
+
+        async def scenario():
+            service = ERPIntegrationService()
+            failing = slow_adapter(0, result={"status": "error", "message": "GP down"})
+            service.adapters["dynamics_gp"] = failing
+            invoice = Invoice(id=uuid.uuid4(), invoice_number="INV-1", supplier_name="Acme", total_amount=10)
+            results = [await service.post_invoice("dynamics_gp", invoice, {}) for _ in range(4)]
+            return results, failing.post_invoice.await_count, service.bulkhead_status()["dynamics_gp"]
+
+        results, attempts, status = asyncio.run(scenario())
+
+        assert attempts == 2
+        assert [result["status"] for result in results] == ["error"] * 4
+        assert "circuit open" in results[-1]["message"] and status["short_circuited"] == 2
+
+    def test_service_instances_share_an_adapters_bulkhead(self, monkeypatch):
+        monkeypatch.setattr(erp.settings, "ERP_CIRCUIT_FAILURE_THRESHOLD", 2)
+        monkeypatch.setattr(erp.settings, "ERP_MAX_CONCURRENT_CALLS", 1)
+
+        async def scenario():
+            shared = slow_adapter(0.05, result={"status": "error", "message": "GP down"})
+            services = [ERPIntegrationService() for _ in range(2)]
+            for service in services:
+                service.adapters["dynamics_gp"] = shared
+            invoice = Invoice(id=uuid.uuid4(), invoice_number="INV-1", supplier_name="Acme", total_amount=10)
+            peak = 0
+            post = shared.post_invoice.side_effect
+
+            async def tracking(*args):
+                nonlocal peak
+                peak = max(peak, erp.adapter_bulkhead("dynamics_gp", shared).active)
+                return await post(*args)
+
+            shared.post_invoice.side_effect = tracking
+            await asyncio.gather(*[service.post_invoice("dynamics_gp", invoice, {}) for service in services])
+            # Both failures came through one breaker, so it is open for either instance
+            result = await services[1].post_invoice("dynamics_gp", invoice, {})
+            return peak, result, [service.bulkhead_status()["dynamics_gp"] for service in services]
+
+        peak, result, statuses = asyncio.run(scenario())
+
+        assert peak == 1
+        assert "circuit open" in result["message"]
+        assert statuses[0] == statuses[1] and statuses[0]["state"] == "open"
+
+
+class TestSharedAdapters:
+    """One adapter and HTTP connection pool per distinct connection config"""
+
+    def test_adapters_are_shared_per_config(self):
+        async def scenario():
+            first = shared_adapter("dynamics_gp", dict(GP_CONFIG))
+            same = shared_adapter("dynamics_gp", dict(reversed(list(GP_CONFIG.items()))))
+            other = shared_adapter("dynamics_gp", {**GP_CONFIG, "company_id": "THREE"})
+            await close_shared_adapters()
+            return first, same, other
+
+        first, same, other = asyncio.run(scenario())
+
+        assert first is same and first is not other
+        assert first.client.is_closed and other.client.is_closed
+
+    def test_failed_validation_leaves_the_shared_adapter_open(self, monkeypatch):
+        async def scenario():
+            live = shared_adapter("dynamics_gp", dict(GP_CONFIG))
+            monkeypatch.setattr(type(live), "validate_connection",
+                                AsyncMock(return_value={"status": "error", "message": "bad credentials"}))
+            result = await ERPIntegrationService().validate_erp_configuration("dynamics_gp", dict(GP_CONFIG))
+            still_shared = shared_adapter("dynamics_gp", dict(GP_CONFIG)) is live
+            open_after = not live.client.is_closed
+            await close_shared_adapters()
+            return result, still_shared, open_after
+
+        result, still_shared, open_after = asyncio.run(scenario())
+
+        assert result["status"] == "error"
+        assert still_shared and open_after
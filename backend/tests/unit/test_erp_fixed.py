@@ -161,7 +161,7 @@ class TestMicrosoftDynamicsGPAdapter:
         connection_config = get_test_connection_config("dynamics_gp")
         
         # Mock the httpx client to avoid actual network calls
-        with patch('src.services.erp.httpx.AsyncClient') as mock_client_class:
+        with patch('services.erp_adapters.dynamics_gp.httpx.AsyncClient') as mock_client_class:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -275,7 +275,7 @@ class TestD365BCAdapter:
         """Test successful D365BC invoice posting"""
         connection_config = get_test_connection_config("dynamics_365_bc")
         
-        with patch('src.services.erp.httpx.AsyncClient') as mock_client:
+        with patch('services.erp_adapters.d365_bc.httpx.AsyncClient') as mock_client:
             mock_response = Mock()
             mock_response.status_code = 201
             mock_response.json.return_value = {
@@ -359,7 +359,7 @@ class TestXeroAdapter:
         """Test successful Xero invoice posting"""
         connection_config = get_test_connection_config("xero")
         
-        with patch('src.services.erp.httpx.AsyncClient') as mock_client:
+        with patch('services.erp_adapters.xero.httpx.AsyncClient') as mock_client:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
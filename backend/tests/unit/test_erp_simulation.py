@@ -0,0 +1,140 @@
+"""
+Unit tests for the simulated ERP backends and the ERP load driver
+"""
+import asyncio
+import random
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from src.models.invoice import Invoice
+from services import erp
+from services.erp_simulation import (
+    COMPANY_SETTINGS, SIMULATED_ERPS, SimulatedERP, SimulationProfile, percentile, run_integration_load,
+    run_sync_queue_load, seed_invoices, synthetic_invoices
+)
+
+FAST = dict(latency_ms=1, latency_p95_ms=3)
+
+
+@pytest.fixture
+def simulation_db(tmp_path):
+    path = tmp_path / "simulation.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 30})
+    yield engine, f"sqlite+aiosqlite:///{path}"
+    engine.dispose()
+
+
+def run_queue_load(simulation_db, server, invoices, **options):
+    engine, async_url = simulation_db
+    seed_invoices(engine, invoices)
+
+    async def run():
+        async_engine = create_async_engine(async_url, connect_args={"timeout": 30})
+        try:
+            sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+            return await run_sync_queue_load(server, invoices, engine, sessions, drain_timeout=20, **options)
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(run()), engine
+
+
+class TestSimulatedERP:
+    """Latency distribution, rate limiting and API shapes the adapters understand"""
+
+    def test_latency_matches_profile(self):
+        profile = SimulationProfile(latency_ms=100, latency_p95_ms=400)
+        rng = random.Random(7)
+        samples = [profile.sample_latency(rng) for _ in range(5000)]
+        assert percentile(samples, 50) == pytest.approx(0.1, rel=0.1)
+        assert percentile(samples, 95) == pytest.approx(0.4, rel=0.15)
+
+    @pytest.mark.parametrize("kind", SIMULATED_ERPS)
+    def test_adapters_round_trip(self, kind):
+        async def scenario():
+            server = SimulatedERP(kind, SimulationProfile(**FAST))
+            adapter = server.adapter()
+            try:
+                health = await adapter.health_check()
+                invoice = synthetic_invoices(1, seed=1)[0]
+                posted = await adapter.post_invoice(invoice, COMPANY_SETTINGS[kind])
+                status = await adapter.get_invoice_status(posted["erp_doc_id"])
+                changes = await adapter.get_invoice_changes(None, 10)
+                return health, posted, status, changes, server.status()
+            finally:
+                await adapter.client.aclose()
+
+        health, posted, status, changes, simulated = asyncio.run(scenario())
+
+        assert health["status"] == "healthy"
+        assert posted["status"] == "success" and posted["erp_doc_id"].startswith("SIM-")
+        assert status["status"].lower() in ("posted", "authorised")
+        assert [change["erp_doc_id"] for change in changes] == [posted["erp_doc_id"]]
+        assert simulated["documents"] == 1 and simulated["responses"] == {200: 4}
+
+    def test_rate_limit_answers_429_with_retry_after(self):
+        async def scenario():
+            server = SimulatedERP("xero", SimulationProfile(latency_ms=0, rate_limit=1, burst=3, retry_after_seconds=2))
+            adapter = server.adapter()
+            try:
+                responses = [await adapter.client.get("/Organisation") for _ in range(5)]
+            finally:
+                await adapter.client.aclose()
+            return responses
+
+        responses = asyncio.run(scenario())
+
+        assert [response.status_code for response in responses] == [200, 200, 200, 429, 429]
+        assert responses[-1].headers["Retry-After"] == "2"
+
+
+class TestLoadDriver:
+    """Integration service and sync queue replays report what the ERP saw"""
+
+    def test_integration_replay_reports_failures_without_retrying(self):
+        server = SimulatedERP("d365_bc", SimulationProfile(error_rate=0.3, seed=3, **FAST))
+
+        report = asyncio.run(run_integration_load(server, synthetic_invoices(30, seed=3), rate=300))
+
+        assert report.succeeded + report.failed == 30 and 0 < report.failed < 30
+        assert server.responses[503] == report.failed
+        assert report.retry_amplification == 1.0
+        data = report.as_dict()
+        assert data["latency_ms"]["p50"] <= data["latency_ms"]["p95"] <= data["latency_ms"]["p99"]
+        assert data["bulkhead"]["calls"] == 30
+
+    def test_sync_queue_retries_until_posted(self, simulation_db):
+        server = SimulatedERP("d365_bc", SimulationProfile(error_rate=0.3, seed=4, **FAST))
+
+        report, engine = run_queue_load(simulation_db, server, synthetic_invoices(20, seed=4), workers=4,
+                                        max_attempts=20, backoff_base=0.01, backoff_max=0.05)
+
+        assert report.succeeded == 20 and report.failed == 0
+        assert server.responses[503] > 0 and report.retry_amplification > 1
+        assert report.details["queue"]["retried"] == server.responses[503]
+        assert len(report.latencies) == 20
+        with Session(engine) as db:
+            posted = db.query(Invoice).filter(Invoice.posted_to_erp == True).count()
+        assert posted == 20
+
+    @pytest.mark.parametrize("kind", ["d365_bc", "xero"])
+    def test_lost_responses_do_not_duplicate_documents(self, simulation_db, monkeypatch, kind):
+        # Keep the circuit closed so every retry reaches the ERP
+        monkeypatch.setattr(erp.settings, "ERP_CIRCUIT_FAILURE_THRESHOLD", 1000)
+        server = SimulatedERP(kind, SimulationProfile(lost_response_rate=0.5, seed=5, **FAST))
+
+        report, _ = run_queue_load(simulation_db, server, synthetic_invoices(10, seed=5), workers=2,
+                                   max_attempts=20, backoff_base=0.01, backoff_max=0.05)
+
+        assert report.succeeded == 10
+        assert server.stats["lost_responses"] > 0
+        assert report.erp["documents"] == 10 and report.erp["duplicate_documents"] == 0
+
+    def test_sync_queue_load_needs_an_http_posted_erp(self, simulation_db):
+        server = SimulatedERP("dynamics_gp", SimulationProfile(**FAST))
+
+        with pytest.raises(ValueError):
+            run_queue_load(simulation_db, server, synthetic_invoices(1, seed=6))
@@ -0,0 +1,312 @@
+"""
+Unit tests for bulk ERP document-status reconciliation
+"""
+import asyncio
+import hashlib
+import hmac
+import uuid
+from datetime import date, datetime, timedelta, UTC
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.core.database import Base
+from src.models.erp_sync import ERPStatusWatermark, ERPSyncJob, ERPSyncJobStatus
+from src.models.invoice import Invoice, InvoiceStatus
+from src.models.user import User  # noqa: F401 - registers the users table for Invoice foreign keys
+from src.models.company import Company  # noqa: F401
+from services.erp import ERPAdapter, ERPIntegrationService, MockERPAdapter
+from services.erp_status_sync import (
+    ERPStatusReconciler, company_webhook_secret, parse_erp_timestamp, verify_webhook_signature,
+    webhook_timestamp_fresh
+)
+
+
+COMPANY_ID = uuid.uuid4()
+OTHER_COMPANY_ID = uuid.uuid4()
+
+
+@pytest.fixture
+def app_db(tmp_path):
+    path = tmp_path / "app.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(
+        engine, tables=[Invoice.__table__, ERPSyncJob.__table__, ERPStatusWatermark.__table__]
+    )
+    engine.dispose()
+    return f"sqlite+aiosqlite:///{path}"
+
+
+def invoice(doc_id, status=InvoiceStatus.APPROVED, company_id=COMPANY_ID, erp_type="mock", connection="default",
+            **values):
+    return Invoice(
+        id=uuid.uuid4(), invoice_number=f"INV-{doc_id}", supplier_name="Acme", invoice_date=date(2026, 3, 1),
+        total_amount=Decimal("10.00"), subtotal=Decimal("10.00"), total_with_tax=Decimal("10.00"),
+        status=status, company_id=company_id, created_by_id=uuid.uuid4(), erp_document_id=doc_id,
+        erp_type=erp_type, erp_connection_key=connection, **values
+    )
+
+
+def run_reconciler(app_db, scenario, rows=(), **options):
+    async def run():
+        engine = create_async_engine(app_db)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            async with sessions() as session:
+                session.add_all(rows)
+                await session.commit()
+            service = ERPIntegrationService()
+            return await scenario(ERPStatusReconciler(service, sessions, **options), service, sessions)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+async def erp_statuses(sessions):
+    async with sessions() as session:
+        rows = await session.execute(select(Invoice.erp_document_id, Invoice.erp_status, Invoice.status,
+                                            Invoice.posted_to_erp))
+        return {row[0]: row[1:] for row in rows}
+
+
+class PollOnlyAdapter(ERPAdapter):
+    """An ERP without a modified-since query; counts batched lookups"""
+
+    erp_type = "legacy"
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.batches = []
+
+    async def health_check(self):
+        return {"status": "healthy"}
+
+    async def post_invoice(self, invoice, company_settings):
+        return {"status": "success"}
+
+    async def get_invoice_status(self, erp_document_id):
+        raise AssertionError("per-document status lookups are not used")
+
+    async def validate_connection(self):
+        return {"status": "success"}
+
+    async def get_invoice_statuses(self, erp_document_ids):
+        self.batches.append(list(erp_document_ids))
+        return [{"erp_doc_id": doc_id, "status": self.statuses[doc_id], "modified_at": None}
+                for doc_id in erp_document_ids if doc_id in self.statuses]
+
+
+class TestHelpers:
+    def test_parses_erp_timestamps(self):
+        expected = datetime(2026, 3, 1, 12, 0, tzinfo=UTC)
+        assert parse_erp_timestamp("2026-03-01T12:00:00Z") == expected
+        assert parse_erp_timestamp("2026-03-01T12:00:00") == expected
+        assert parse_erp_timestamp(f"/Date({int(expected.timestamp() * 1000)}+0000)/") == expected
+        assert parse_erp_timestamp("yesterday") is None
+
+    def test_webhook_signature(self):
+        body = b'{"events": []}'
+        digest = hmac.new(b"s3cret", body, hashlib.sha256)
+        assert verify_webhook_signature("s3cret", body, digest.hexdigest())
+        assert verify_webhook_signature("s3cret", body, "sha256=" + digest.hexdigest())
+        assert not verify_webhook_signature("s3cret", body + b" ", digest.hexdigest())
+        assert not verify_webhook_signature("s3cret", body, None)
+
+    def test_timestamped_signatures_expire(self):
+        body = b'{"events": []}'
+        digest = hmac.new(b"s3cret", b"1772366400." + body, hashlib.sha256).hexdigest()
+        assert verify_webhook_signature("s3cret", body, digest, "1772366400")
+        # A replay cannot move the timestamp without breaking the signature
+        assert not verify_webhook_signature("s3cret", body, digest, "1772366999")
+        assert webhook_timestamp_fresh("1772366400", tolerance=300, now=1772366400 + 299)
+        assert not webhook_timestamp_fresh("1772366400", tolerance=300, now=1772366400 + 301)
+        assert not webhook_timestamp_fresh(None) and not webhook_timestamp_fresh("soon")
+
+    def test_company_webhook_secrets_differ(self, monkeypatch):
+        monkeypatch.setattr("services.erp_status_sync.settings.ERP_WEBHOOK_SECRET", "master")
+        assert company_webhook_secret(COMPANY_ID) != company_webhook_secret(OTHER_COMPANY_ID)
+        assert company_webhook_secret(COMPANY_ID) == company_webhook_secret(str(COMPANY_ID))
+        monkeypatch.setattr("services.erp_status_sync.settings.ERP_WEBHOOK_SECRET", None)
+        assert company_webhook_secret(COMPANY_ID) is None
+
+
+class TestReconciliation:
+    """Watermarked change feeds, bulk updates and the batched polling fallback"""
+
+    def test_pages_change_feed_and_advances_watermark(self, app_db):
+        base = datetime(2026, 3, 1, 9, 0, tzinfo=UTC)
+        rows = [invoice(f"DOC-{i}") for i in range(5)] + [invoice("DOC-X", status=InvoiceStatus.PENDING_APPROVAL)]
+
+        async def scenario(reconciler, service, sessions):
+            mock = service.adapters["mock"]
+            for i in range(5):
+                mock.posted_invoices[f"DOC-{i}"] = {"status": "posted",
+                                                    "posted_at": (base + timedelta(minutes=i)).isoformat()}
+            mock.posted_invoices["DOC-X"] = {"status": "paid", "posted_at": (base + timedelta(minutes=9)).isoformat()}
+            first = await reconciler.reconcile_all()
+            requests_first = reconciler.stats["erp_requests"]
+            again = await reconciler.reconcile_all()
+            async with sessions() as session:
+                watermark = await session.get(ERPStatusWatermark, ("mock", "default"))
+            return first, again, requests_first, watermark, await erp_statuses(sessions)
+
+        first, again, requests, watermark, statuses = run_reconciler(app_db, scenario, rows, page_size=2,
+                                                                     overlap_seconds=0)
+
+        assert first == {"mock": 6} and again == {"mock": 0}
+        assert requests == 4  # pages of 2, 2, 2 and an empty one
+        assert parse_erp_timestamp(watermark.watermark) == base + timedelta(minutes=9)
+        assert watermark.documents_updated == 6
+        assert statuses["DOC-0"] == ("posted", InvoiceStatus.POSTED_TO_ERP, True)
+        # Only approved invoices move to posted; others keep their workflow status
+        assert statuses["DOC-X"] == ("paid", InvoiceStatus.PENDING_APPROVAL, True)
+
+    def test_voided_documents_are_unposted(self, app_db):
+        rows = [invoice("DOC-1", status=InvoiceStatus.POSTED_TO_ERP, erp_type="xero", posted_to_erp=True)]
+
+        async def scenario(reconciler, service, sessions):
+            updated = await reconciler.apply_changes("xero", [{"erp_doc_id": "DOC-1", "status": "VOIDED"},
+                                                              {"erp_doc_id": "UNKNOWN", "status": "PAID"}],
+                                                     connection_key="default")
+            async with sessions() as session:
+                row = (await session.execute(select(Invoice).where(Invoice.erp_document_id == "DOC-1"))).scalar_one()
+            return updated, row
+
+        updated, row = run_reconciler(app_db, scenario, rows)
+
+        assert updated == 1
+        assert row.erp_status == "voided" and not row.posted_to_erp
+        assert row.erp_error_message == "Document voided in xero"
+
+    def test_falls_back_to_batched_lookups_of_tracked_documents(self, app_db):
+        rows = [invoice(f"DOC-{i}", erp_type="legacy") for i in range(5)] + [
+            invoice("DOC-DONE", erp_type="legacy", erp_status="paid")
+        ]
+        jobs = [
+            ERPSyncJob(idempotency_key=f"job-{row.erp_document_id}", invoice_id=row.id, company_id=COMPANY_ID,
+                       erp_type="legacy", status=ERPSyncJobStatus.COMPLETED.value)
+            for row in rows
+        ]
+        adapter = PollOnlyAdapter({f"DOC-{i}": "paid" if i % 2 else "open" for i in range(5)})
+
+        async def scenario(reconciler, service, sessions):
+            service.adapters = {"legacy": adapter}
+            first = await reconciler.reconcile_all()
+            second = await reconciler.reconcile_all()
+            return first, second, await erp_statuses(sessions)
+
+        first, second, statuses = run_reconciler(app_db, scenario, rows + jobs, batch_size=2)
+
+        assert first == {"legacy": 5} and second == {"legacy": 0}
+        assert [len(batch) for batch in adapter.batches[:3]] == [2, 2, 1]
+        # Paid documents are final and no longer polled
+        assert sorted(adapter.batches[3] + adapter.batches[4]) == ["DOC-0", "DOC-2", "DOC-4"]
+        assert "DOC-DONE" not in sum(adapter.batches, [])
+        assert statuses["DOC-1"][0] == "paid" and statuses["DOC-2"][0] == "open"
+
+    def test_webhook_push_applies_events_and_looks_up_bare_ids(self, app_db):
+        rows = [invoice("DOC-1"), invoice("DOC-2")]
+
+        async def scenario(reconciler, service, sessions):
+            mock = service.adapters["mock"] = MockERPAdapter()
+            mock.posted_invoices["DOC-2"] = {"status": "posted", "posted_at": datetime.now(UTC).isoformat()}
+            updated = await reconciler.push("mock", str(COMPANY_ID),
+                                            {"events": [{"erp_doc_id": "DOC-1", "status": "Paid"},
+                                                        {"document_id": "DOC-2"}]})
+            with pytest.raises(ValueError):
+                await reconciler.push("mock", str(COMPANY_ID), {"events": "nope"})
+            return updated, await erp_statuses(sessions)
+
+        updated, statuses = run_reconciler(app_db, scenario, rows)
+
+        assert updated == 2
+        assert statuses["DOC-1"][0] == "paid" and statuses["DOC-2"][0] == "posted"
+
+
+    def test_older_changes_do_not_overwrite_newer_ones(self, app_db):
+        paid_at = datetime(2026, 3, 2, 9, 0, tzinfo=UTC)
+
+        def at(hours):
+            return (paid_at + timedelta(hours=hours)).isoformat()
+        rows = [invoice("DOC-1", erp_type="xero"), invoice("DOC-2", erp_type="xero")]
+
+        async def scenario(reconciler, service, sessions):
+            first = await reconciler.apply_changes("xero", [
+                {"erp_doc_id": "DOC-1", "status": "PAID", "modified_at": at(0)},
+                # The same document twice in one page: the later change wins
+                {"erp_doc_id": "DOC-2", "status": "PAID", "modified_at": at(0)},
+                {"erp_doc_id": "DOC-2", "status": "AUTHORISED", "modified_at": at(-1)}
+            ], connection_key="default")
+            # A late webhook and a replayed delivery carry older modification times
+            late = await reconciler.push("xero", str(COMPANY_ID), {"events": [
+                {"erp_doc_id": "DOC-1", "status": "AUTHORISED", "modified_at": at(-2)},
+                {"erp_doc_id": "DOC-2", "status": "PAID", "modified_at": at(0)}
+            ]})
+            voided = await reconciler.apply_changes("xero", [
+                {"erp_doc_id": "DOC-1", "status": "VOIDED", "modified_at": at(1)}
+            ], connection_key="default")
+            return first, late, voided, await erp_statuses(sessions)
+
+        first, late, voided, statuses = run_reconciler(app_db, scenario, rows)
+
+        assert (first, late, voided) == (2, 0, 1)
+        assert statuses["DOC-1"][0] == "voided" and statuses["DOC-2"][0] == "paid"
+
+
+class TestTenantScoping:
+    """Document IDs are only unique per ERP tenant; updates never cross companies or ERPs"""
+
+    def test_shared_document_id_only_updates_the_reporting_company(self, app_db):
+        rows = [
+            invoice("INV-0001", erp_type="xero", connection=str(COMPANY_ID)),
+            invoice("INV-0001", erp_type="xero", connection=str(OTHER_COMPANY_ID), company_id=OTHER_COMPANY_ID),
+            invoice("INV-0001", erp_type="d365_bc", connection="default")
+        ]
+
+        class FeedAdapter(PollOnlyAdapter):
+            async def get_invoice_changes(self, since, limit):
+                return [] if self.batches else [{"erp_doc_id": "INV-0001", "status": "VOIDED", "modified_at": None}]
+
+        async def scenario(reconciler, service, sessions):
+            service.adapters = {}
+            service.connection_cache[str(COMPANY_ID)] = {"erp_type": "xero", "adapter": FeedAdapter({})}
+            pulled = await reconciler.reconcile_all()
+            pushed = await reconciler.push("xero", str(OTHER_COMPANY_ID),
+                                           [{"erp_doc_id": "INV-0001", "status": "PAID"}])
+            with pytest.raises(ValueError):
+                await reconciler.apply_changes("xero", [{"erp_doc_id": "INV-0001", "status": "PAID"}])
+            async with sessions() as session:
+                rows = (await session.execute(
+                    select(Invoice.company_id, Invoice.erp_type, Invoice.erp_status)
+                )).all()
+            return pulled, pushed, {(row[0], row[1]): row[2] for row in rows}
+
+        pulled, pushed, statuses = run_reconciler(app_db, scenario, rows)
+
+        assert pulled == {f"company:{COMPANY_ID}": 1} and pushed == 1
+        assert statuses[(COMPANY_ID, "xero")] == "voided"
+        assert statuses[(OTHER_COMPANY_ID, "xero")] == "paid"
+        assert statuses[(COMPANY_ID, "d365_bc")] is None
+
+    def test_settings_adapter_only_updates_invoices_posted_through_it(self, app_db):
+        rows = [invoice("DOC-1", connection="default"), invoice("DOC-1", connection=str(OTHER_COMPANY_ID),
+                                                               company_id=OTHER_COMPANY_ID)]
+
+        async def scenario(reconciler, service, sessions):
+            service.adapters["mock"].posted_invoices["DOC-1"] = {"status": "paid",
+                                                                 "posted_at": datetime.now(UTC).isoformat()}
+            await reconciler.reconcile_all()
+            return await erp_statuses_by_company(sessions)
+
+        statuses = run_reconciler(app_db, scenario, rows)
+
+        assert statuses == {COMPANY_ID: "paid", OTHER_COMPANY_ID: None}
+
+
+async def erp_statuses_by_company(sessions):
+    async with sessions() as session:
+        rows = await session.execute(select(Invoice.company_id, Invoice.erp_status))
+        return dict(rows.all())
@@ -0,0 +1,343 @@
+"""
+Unit tests for the outbox-driven ERP sync queue
+"""
+import asyncio
+import time
+import uuid
+from datetime import date
+from decimal import Decimal
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from src.core.database import Base
+from src.models.audit import AuditLog
+from src.models.company import Company
+from src.models.erp_sync import ERPSyncJob, ERPSyncJobStatus
+from src.models.invoice import Invoice, InvoiceStatus
+from src.models.invoice_line import InvoiceLine
+from src.models.user import User
+import services.erp_automation as erp_automation
+from services.erp import MockERPAdapter
+from services.erp_adapters.xero import XeroAdapter
+from services.erp_sync_queue import (
+    ERPSyncPermanentError, ERPSyncQueue, TokenBucket, backoff_delay, idempotency_key
+)
+
+INVOICE = uuid.UUID("11111111-1111-1111-1111-111111111111")
+COMPANY = uuid.UUID("22222222-2222-2222-2222-222222222222")
+
+
+@pytest.fixture
+def outbox_db(tmp_path):
+    path = tmp_path / "outbox.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[ERPSyncJob.__table__])
+    yield engine, f"sqlite+aiosqlite:///{path}"
+    engine.dispose()
+
+
+def run_queue(outbox_db, handler, scenario, **options):
+    engine, async_url = outbox_db
+
+    async def run():
+        async_engine = create_async_engine(async_url)
+        options.setdefault("workers", {"dynamics_gp": 2, "xero": 1})
+        options.setdefault("rate_limits", {})
+        options.setdefault("poll_interval", 30.0)
+        queue = ERPSyncQueue(handler, async_sessionmaker(async_engine, expire_on_commit=False), **options)
+        try:
+            return await scenario(queue, engine)
+        finally:
+            await queue.stop()
+            await async_engine.dispose()
+
+    return asyncio.run(run())
+
+
+def enqueue(queue, engine, erp_types, invoice_id=INVOICE):
+    with Session(engine) as db:
+        jobs = queue.enqueue(db, invoice_id, COMPANY, erp_types)
+        db.commit()
+        return [job.idempotency_key for job in jobs]
+
+
+def jobs_by_key(engine):
+    with Session(engine) as db:
+        return {job.idempotency_key: job for job in db.scalars(select(ERPSyncJob))}
+
+
+async def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+class TestPacing:
+    """Backoff schedule and token-bucket rate limiting"""
+
+    def test_backoff_is_capped_full_jitter(self):
+        assert backoff_delay(1, 2.0, 60.0, rng=lambda: 1.0) == 2.0
+        assert backoff_delay(4, 2.0, 60.0, rng=lambda: 1.0) == 16.0
+        assert backoff_delay(10, 2.0, 60.0, rng=lambda: 1.0) == 60.0
+        assert backoff_delay(10, 2.0, 60.0, rng=lambda: 0.25) == 15.0
+
+    def test_token_bucket_paces_to_rate(self):
+        async def scenario():
+            bucket = TokenBucket(rate=50.0, capacity=1)
+            started = time.perf_counter()
+            for _ in range(6):
+                await bucket.acquire()
+            return time.perf_counter() - started
+
+        # One token up front, then five more at 50/s
+        assert 0.08 <= asyncio.run(scenario()) < 0.5
+
+
+class TestERPSyncQueue:
+    """Enqueue in the caller's transaction; per-ERP workers with retries and dead letters"""
+
+    def test_enqueue_is_idempotent_and_transactional(self, outbox_db):
+        async def scenario(queue, engine):
+            with Session(engine) as db:
+                queue.enqueue(db, INVOICE, COMPANY, ["dynamics_gp"])
+                db.rollback()
+            assert jobs_by_key(engine) == {}
+
+            first = enqueue(queue, engine, ["dynamics_gp", "xero"])
+            again = enqueue(queue, engine, ["dynamics_gp", "xero"])
+            return first, again, jobs_by_key(engine)
+
+        first, again, jobs = run_queue(outbox_db, None, scenario)
+
+        assert first == [idempotency_key("dynamics_gp", INVOICE), idempotency_key("xero", INVOICE)]
+        assert again == []
+        assert {job.status for job in jobs.values()} == {ERPSyncJobStatus.PENDING.value}
+
+    def test_commit_wakes_workers_immediately(self, outbox_db):
+        handled = []
+
+        async def handler(job):
+            handled.append((job.erp_type, job.idempotency_key, time.perf_counter()))
+            return {"status": "success", "erp_doc_id": "PM000042"}
+
+        async def scenario(queue, engine):
+            await queue.start()
+            await asyncio.sleep(0.05)  # workers are idle, waiting on the 30s poll
+            committed = time.perf_counter()
+            enqueue(queue, engine, ["dynamics_gp", "xero"])
+            await wait_for(lambda: queue.stats["completed"] == 2)
+            return committed, jobs_by_key(engine)
+
+        committed, jobs = run_queue(outbox_db, handler, scenario)
+
+        assert sorted(erp for erp, _, _ in handled) == ["dynamics_gp", "xero"]
+        assert max(at for _, _, at in handled) - committed < 0.5
+        job = jobs[idempotency_key("dynamics_gp", INVOICE)]
+        assert job.status == ERPSyncJobStatus.COMPLETED.value and job.attempts == 1
+        assert job.result["erp_doc_id"] == "PM000042" and job.locked_by is None
+
+    def test_failures_retry_with_backoff_then_dead_letter(self, outbox_db):
+        calls = {"dynamics_gp": 0, "xero": 0}
+        dead = []
+
+        async def handler(job):
+            calls[job.erp_type] += 1
+            if job.erp_type == "xero":
+                raise ConnectionError("Xero unavailable")
+            if calls["dynamics_gp"] < 3:
+                return {"status": "error", "message": "GP busy"}
+            return {"status": "success"}
+
+        async def on_dead_letter(job, error):
+            dead.append((job.idempotency_key, job.attempts, error))
+
+        async def scenario(queue, engine):
+            await queue.start()
+            enqueue(queue, engine, ["dynamics_gp", "xero"])
+            await wait_for(lambda: queue.stats["completed"] == 1 and queue.stats["dead_lettered"] == 1)
+            before = jobs_by_key(engine)
+            requeued = await queue.requeue(erp_type="xero")
+            await wait_for(lambda: queue.stats["dead_lettered"] == 2)
+            return before, requeued
+
+        before, requeued = run_queue(outbox_db, handler, scenario, max_attempts=3,
+                                     backoff_base=0.01, backoff_max=0.05, on_dead_letter=on_dead_letter)
+
+        gp = before[idempotency_key("dynamics_gp", INVOICE)]
+        xero = before[idempotency_key("xero", INVOICE)]
+        assert gp.status == ERPSyncJobStatus.COMPLETED.value and gp.attempts == 3
+        assert xero.status == ERPSyncJobStatus.DEAD_LETTER.value and xero.attempts == 3
+        assert "Xero unavailable" in xero.last_error
+        assert requeued == 1 and calls["xero"] == 6
+        assert dead[0] == (idempotency_key("xero", INVOICE), 3, "ConnectionError: Xero unavailable")
+
+    def test_permanent_errors_and_reviews_are_terminal(self, outbox_db):
+        second_invoice = uuid.uuid4()
+
+        async def handler(job):
+            if job.invoice_id == INVOICE:
+                raise ERPSyncPermanentError("Invoice no longer exists")
+            return {"status": "partial_match", "message": "Quantity variance"}
+
+        async def scenario(queue, engine):
+            await queue.start()
+            enqueue(queue, engine, ["dynamics_gp"])
+            enqueue(queue, engine, ["dynamics_gp"], invoice_id=second_invoice)
+            await wait_for(lambda: queue.stats["dead_lettered"] + queue.stats["needs_review"] == 2)
+            return jobs_by_key(engine), await queue.backlog()
+
+        jobs, backlog = run_queue(outbox_db, handler, scenario, max_attempts=5)
+
+        assert jobs[idempotency_key("dynamics_gp", INVOICE)].attempts == 1
+        review = jobs[idempotency_key("dynamics_gp", second_invoice)]
+        assert review.status == ERPSyncJobStatus.NEEDS_REVIEW.value and review.result["status"] == "partial_match"
+        assert backlog == {"dynamics_gp": {"dead_letter": 1, "needs_review": 1}}
+
+    def test_leases_are_exclusive_and_expire(self, outbox_db):
+        async def scenario(queue, engine):
+            enqueue(queue, engine, ["dynamics_gp"])
+            first, second = await asyncio.gather(queue.claim("dynamics_gp", "a"), queue.claim("dynamics_gp", "b"))
+            claimed = first or second
+            assert (first is None) != (second is None)
+            assert await queue.claim("dynamics_gp", "c") is None
+
+            # The holder crashed: once the lease runs out the job is claimable again
+            with Session(engine) as db:
+                db.execute(update(ERPSyncJob).values(locked_until=claimed.next_attempt_at))
+                db.commit()
+            reclaimed = await queue.claim("dynamics_gp", "c")
+
+            # The original holder can no longer record an outcome
+            await queue.process(claimed)
+            return reclaimed, jobs_by_key(engine)
+
+        async def handler(job):
+            return {"status": "success"}
+
+        reclaimed, jobs = run_queue(outbox_db, handler, scenario)
+
+        assert reclaimed.locked_by == "c" and reclaimed.attempts == 2
+        job = jobs[idempotency_key("dynamics_gp", INVOICE)]
+        assert job.status == ERPSyncJobStatus.IN_PROGRESS.value and job.locked_by == "c"
+
+    def test_slow_erp_does_not_hold_up_others(self, outbox_db):
+        release = asyncio.Event()
+
+        async def handler(job):
+            if job.erp_type == "xero":
+                await release.wait()
+            return {"status": "success"}
+
+        async def scenario(queue, engine):
+            await queue.start()
+            enqueue(queue, engine, ["xero"])
+            for _ in range(4):
+                enqueue(queue, engine, ["dynamics_gp"], invoice_id=uuid.uuid4())
+            await wait_for(lambda: queue.stats["completed"] == 4)
+            release.set()
+            await wait_for(lambda: queue.stats["completed"] == 5)
+            return True
+
+        assert run_queue(outbox_db, handler, scenario)
+
+
+class RecordingERPAdapter(MockERPAdapter):
+    """Mock ERP that records the settings of every post"""
+
+    def __init__(self):
+        super().__init__("RecordingERP")
+        self.posts = []
+
+    async def post_invoice(self, invoice, company_settings):
+        self.posts.append(company_settings)
+        return await super().post_invoice(invoice, company_settings)
+
+
+@pytest.fixture
+def automation_db(tmp_path, monkeypatch):
+    path = tmp_path / "automation.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[
+        Company.__table__, User.__table__, Invoice.__table__, InvoiceLine.__table__, AuditLog.__table__
+    ])
+    with Session(engine) as db:
+        db.add(Company(id=COMPANY, name="Acme Holdings", email="ap@acme.test"))
+        db.add(Invoice(
+            id=INVOICE, invoice_number="INV-1", supplier_name="Acme", invoice_date=date(2026, 3, 1),
+            total_amount=Decimal("10.00"), subtotal=Decimal("10.00"), total_with_tax=Decimal("10.00"),
+            status=InvoiceStatus.APPROVED, company_id=COMPANY, created_by_id=uuid.uuid4()
+        ))
+        db.commit()
+    engine.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    automation = erp_automation.ERPAutomationService(async_sessionmaker(async_engine, expire_on_commit=False))
+    adapter = RecordingERPAdapter()
+    automation.erp_service.adapters["sap"] = adapter
+    monkeypatch.setattr(automation, "_get_erp_config", lambda company: {"sap_enabled": True, "sap": {}})
+    yield automation, adapter, f"sqlite:///{path}"
+    asyncio.run(async_engine.dispose())
+
+
+def sync_job(attempts, last_error=None):
+    return ERPSyncJob(
+        id=uuid.uuid4(), erp_type="sap", invoice_id=INVOICE, company_id=COMPANY,
+        idempotency_key=idempotency_key("sap", INVOICE), attempts=attempts, last_error=last_error
+    )
+
+
+class TestAutomationHandler:
+    """The automation engine's outbox handler"""
+
+    def test_posts_with_the_idempotency_key_and_records_the_document(self, automation_db):
+        automation, adapter, url = automation_db
+
+        result = asyncio.run(automation._process_sync_job(sync_job(attempts=1)))
+
+        assert result["status"] == "success"
+        assert [post["idempotency_key"] for post in adapter.posts] == ["sap:" + str(INVOICE)]
+        engine = create_engine(url)
+        with Session(engine) as db:
+            invoice = db.get(Invoice, INVOICE)
+            assert invoice.posted_to_erp and invoice.erp_document_id == result["erp_doc_id"]
+            assert invoice.erp_type == "sap"
+            assert db.scalar(select(func.count()).select_from(AuditLog)) == 1
+        engine.dispose()
+
+    def test_retry_finds_the_earlier_post_instead_of_posting_again(self, automation_db):
+        automation, adapter, _ = automation_db
+
+        first = asyncio.run(automation._process_sync_job(sync_job(attempts=1)))
+        # The first attempt's response was lost, so the queue retries the job
+        retried = asyncio.run(automation._process_sync_job(sync_job(attempts=2, last_error="ReadTimeout")))
+
+        assert len(adapter.posts) == 1
+        assert retried["method"] == "already_posted" and retried["erp_doc_id"] == first["erp_doc_id"]
+
+    def test_xero_sends_the_key_as_its_idempotency_header(self):
+        requests = []
+
+        def respond(request):
+            requests.append(request)
+            return httpx.Response(200, json={"Bills": [{"BillID": "bill-1"}]})
+
+        async def post():
+            adapter = XeroAdapter({"base_url": "https://xero.test", "api_key": "key", "company_id": "c"})
+            await adapter.client.aclose()
+            adapter.client = httpx.AsyncClient(base_url="https://xero.test", transport=httpx.MockTransport(respond))
+            invoice = Invoice(id=INVOICE, invoice_number="INV-1", supplier_name="Acme",
+                              invoice_date=date(2026, 3, 1), total_amount=Decimal("10.00"))
+            try:
+                return await adapter.post_invoice(invoice, {"xero_tenant_id": "t", "idempotency_key": "xero:1"})
+            finally:
+                await adapter.client.aclose()
+
+        result = asyncio.run(post())
+
+        assert result["status"] == "success", result
+        assert requests[0].headers["Idempotency-Key"] == "xero:1"
@@ -0,0 +1,154 @@
+"""
+Unit tests for the pooled Dynamics GP connection layer, against the mock GP backend
+"""
+import asyncio
+import time
+from decimal import Decimal
+
+import pytest
+
+from services.dynamics_gp_integration import DynamicsGPIntegration
+from services.gp_connection_pool import GPConnectionPool, GPPoolTimeoutError
+from services.gp_mock_backend import MockGPBackend
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = MockGPBackend(tmp_path / "gp")
+    backend.create_company("TWO", "Fabrikam, Inc.", next_pm_number=42)
+    backend.add_vendor("TWO", "ACME0001", "Acme Widgets Ltd")
+    backend.add_purchase_order("TWO", "PO-1001", "ACME0001", [
+        {"description": "Widget", "quantity": 10, "unit_cost": 50.0},
+        {"description": "Gadget", "quantity": 2, "unit_cost": 250.0}
+    ])
+    backend.add_receipt("TWO", "RCT-1", "PO-1001", "ACME0001", [{"quantity": 10, "unit_cost": 50.0}])
+    return backend
+
+
+def run_with_gp(backend, scenario, **config):
+    async def run():
+        gp = DynamicsGPIntegration(connector=backend.connector)
+        gp.gp_config.update(config)
+        try:
+            for company in await gp.get_company_databases():
+                await gp._create_connection_pool(company)
+            return await scenario(gp)
+        finally:
+            gp.close()
+
+    return asyncio.run(run())
+
+
+class TestGPConnectionPool:
+    """Bounded checkout with reuse, health checks and recycling"""
+
+    def test_reuses_connections(self, backend):
+        pool = GPConnectionPool("TWO", lambda: backend.connect("TWO"), max_size=2)
+        for _ in range(3):
+            with pool.connection() as connection:
+                connection.execute("SELECT 1")
+        assert backend.connections_opened == 1
+        assert pool.status()["idle"] == 1
+
+    def test_times_out_when_exhausted(self, backend):
+        pool = GPConnectionPool("TWO", lambda: backend.connect("TWO"), max_size=1, timeout=0.05)
+        held = pool.acquire()
+        with pytest.raises(GPPoolTimeoutError):
+            pool.acquire()
+        pool.release(held)
+        with pool.connection():
+            pass
+
+    def test_replaces_stale_and_old_connections(self, backend):
+        pool = GPConnectionPool("TWO", lambda: backend.connect("TWO"), max_size=1, ping_after_seconds=0)
+        entry = pool.acquire()
+        pool.release(entry)
+        entry.connection.close()  # the server dropped the session while idle
+
+        with pool.connection() as connection:
+            assert connection.execute("SELECT 1").fetchone()[0] == 1
+        assert pool.stats["failed_pings"] == 1
+
+        pool.recycle_seconds = 0
+        with pool.connection():
+            pass
+        assert pool.stats["recycled"] == 1 and backend.connections_opened == 3
+
+    def test_disconnect_errors_drop_connection(self, backend):
+        pool = GPConnectionPool("TWO", lambda: backend.connect("TWO"), max_size=1)
+
+        class OperationalError(Exception):
+            pass
+
+        with pytest.raises(OperationalError):
+            with pool.connection():
+                raise OperationalError("08S01 Communication link failure")
+        assert pool.status()["open"] == 0 and pool.stats["invalidated"] == 1
+
+
+class TestDynamicsGPOnPool:
+    """Service lookups run on the GP worker threads through the per-company pools"""
+
+    def test_lookups_use_pooled_connections(self, backend):
+        async def scenario(gp):
+            po = await gp._find_gp_purchase_order({"vendor_name": "Acme", "total_amount": 1010}, "TWO")
+            shipments = await gp._find_gp_shipments_for_po("PO-1001", "TWO")
+            direct = await gp._find_gp_purchase_order({}, "TWO", po_number="PO-1001")
+            return po, shipments, direct, gp.get_connection_stats()
+
+        po, shipments, direct, stats = run_with_gp(backend, scenario)
+
+        assert po.po_number == "PO-1001" and po.total_amount == Decimal("1000.0")
+        assert [line["quantity"] for line in po.line_items] == [Decimal("10"), Decimal("2")]
+        assert [shipment["receipt_number"] for shipment in po.shipments] == ["RCT-1"]
+        assert shipments[0].line_items[0]["total"] == Decimal("500.0")
+        assert direct.vendor_id == "ACME0001"
+        # One system database connection, one reused company connection
+        assert backend.connections_opened == 2
+        assert stats["TWO"]["created"] == 1
+
+    def test_writes_commit_through_pool(self, backend):
+        async def scenario(gp):
+            first = await gp._generate_document_number("PM", "TWO")
+            second = await gp._generate_document_number("PM", "TWO")
+            vendor = await gp._ensure_vendor_exists("Globex Corporation", "TWO")
+            transaction = await gp._create_payables_transaction(
+                {"invoice_number": "INV-9", "total_amount": 100.0, "invoice_date": "2026-01-05"},
+                vendor, {"accounts_payable": "2000-00", "expense_accounts": ["5000-00"], "tax_account": "2200-00"},
+                "TWO"
+            )
+            posted = await gp._post_payables_transaction(transaction, "TWO")
+            return first, second, vendor, posted
+
+        first, second, vendor, posted = run_with_gp(backend, scenario)
+
+        assert (first, second) == ("PM000042", "PM000043")
+        assert vendor["status"] == "created"
+        assert posted["status"] == "success" and posted["document_number"] == "PM000044"
+        assert len(backend.query("TWO", "SELECT * FROM PM10100 WHERE DOCNUMBR = ?", "PM000044")) == 2
+
+    def test_event_loop_stays_responsive(self, tmp_path):
+        backend = MockGPBackend(tmp_path / "slow", latency=0.05)
+        backend.create_company("TWO")
+        backend.add_vendor("TWO", "ACME0001", "Acme Widgets Ltd")
+
+        async def scenario(gp):
+            ticks = 0
+            lookups = asyncio.gather(*[gp._ensure_vendor_exists("Acme", "TWO") for _ in range(8)])
+
+            async def tick():
+                nonlocal ticks
+                while not lookups.done():
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            started = time.perf_counter()
+            results, _ = await asyncio.gather(lookups, tick())
+            return results, ticks, time.perf_counter() - started, gp.get_connection_stats()["TWO"]
+
+        results, ticks, elapsed, stats = run_with_gp(backend, scenario, connection_pool_size=4)
+
+        assert all(result["vendor_id"] == "ACME0001" for result in results)
+        # Eight 50ms lookups over four connections: about two rounds, with the loop free meanwhile
+        assert elapsed < 0.3 and ticks >= 5
+        assert stats["created"] <= 4
@@ -0,0 +1,122 @@
+"""
+Unit tests for block allocation of GP document numbers, against the mock GP backend
+"""
+import asyncio
+
+import pytest
+
+from services.dynamics_gp_integration import DynamicsGPIntegration
+from services.gp_document_numbers import DocumentNumberError
+from services.gp_mock_backend import MockGPBackend
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = MockGPBackend(tmp_path / "gp")
+    backend.create_company("TWO", next_pm_number=42)
+    backend.add_vendor("TWO", "ACME0001", "Acme Widgets Ltd")
+    return backend
+
+
+def next_number(backend):
+    return backend.query("TWO", "SELECT NXTNUMBR FROM SY00500 WHERE SERIES = 4")[0].NXTNUMBR
+
+
+def run_with_gps(backend, scenario, workers=1, block_size=10):
+    """Run ``scenario(*gps)`` with one GP service per simulated worker process"""
+    async def run():
+        gps = [DynamicsGPIntegration(connector=backend.connector) for _ in range(workers)]
+        try:
+            for gp in gps:
+                gp.document_numbers.block_size = block_size
+                for company in await gp.get_company_databases():
+                    await gp._create_connection_pool(company)
+            return await scenario(*gps)
+        finally:
+            for gp in gps:
+                gp.close()
+
+    return asyncio.run(run())
+
+
+def test_numbers_come_from_one_reserved_block(backend):
+    async def scenario(gp):
+        numbers = [await gp._generate_document_number("PM", "TWO") for _ in range(5)]
+        return numbers, next_number(backend), gp.document_numbers.stats["reservations"]
+
+    numbers, sy00500, reservations = run_with_gps(backend, scenario)
+
+    assert numbers == ["PM000042", "PM000043", "PM000044", "PM000045", "PM000046"]
+    assert (sy00500, reservations) == (52, 1)
+
+
+def test_bulk_take_reserves_a_larger_block(backend):
+    async def scenario(gp):
+        first = await gp.document_numbers.take("TWO", "PM", 3)
+        bulk = await gp.document_numbers.take("TWO", "PM", 25)
+        return first, bulk, next_number(backend)
+
+    first, bulk, sy00500 = run_with_gps(backend, scenario)
+
+    assert first == ["PM000042", "PM000043", "PM000044"]
+    assert bulk[:7] == [f"PM0000{n}" for n in range(45, 52)] and bulk[7] == "PM000052"
+    assert len(set(first + bulk)) == 28 and sy00500 == 70
+
+
+def test_concurrent_workers_never_share_numbers(backend):
+    async def scenario(*gps):
+        requests = [gp._generate_document_number("PM", "TWO") for gp in gps for _ in range(15)]
+        return await asyncio.gather(*requests)
+
+    numbers = run_with_gps(backend, scenario, workers=3, block_size=4)
+
+    assert len(numbers) == len(set(numbers)) == 45
+
+
+def test_failed_posting_releases_its_number(backend):
+    async def scenario(gp):
+        transaction = await gp._create_payables_transaction(
+            {"invoice_number": "INV-1", "total_amount": 100.0, "invoice_date": "2026-01-05"},
+            {"vendor_id": "ACME0001", "vendor_name": "Acme"},
+            {"accounts_payable": "2000-00", "expense_accounts": [], "tax_account": "2200-00"},
+            "TWO"
+        )
+        transaction["gl_distributions"].append({"sequence": 9})  # incomplete row, the insert fails
+        failed = await gp._post_payables_transaction(transaction, "TWO")
+        return transaction["document_number"], failed, await gp._generate_document_number("PM", "TWO")
+
+    number, failed, reused = run_with_gps(backend, scenario)
+
+    assert failed["status"] == "error"
+    assert reused == number == "PM000042"
+    assert backend.query("TWO", "SELECT * FROM PM10000") == []
+
+
+def test_unused_tail_returned_on_close(backend):
+    async def scenario(gp):
+        await gp._generate_document_number("PM", "TWO")
+        return next_number(backend)
+
+    assert run_with_gps(backend, scenario) == 52
+    assert next_number(backend) == 43
+
+
+def test_tail_kept_when_gp_moved_on(backend):
+    async def scenario(gp):
+        await gp._generate_document_number("PM", "TWO")
+        # Someone entered a transaction in GP after our reservation
+        backend.execute("TWO", "UPDATE SY00500 SET NXTNUMBR = NXTNUMBR + 1 WHERE SERIES = 4")
+
+    run_with_gps(backend, scenario)
+
+    assert next_number(backend) == 53
+
+
+def test_missing_numbering_record_raises(backend):
+    backend.execute("TWO", "DELETE FROM SY00500")
+
+    async def scenario(gp):
+        return await gp._generate_document_number("PM", "TWO")
+
+    with pytest.raises(DocumentNumberError):
+        run_with_gps(backend, scenario)
@@ -0,0 +1,172 @@
+"""
+Unit tests for batched eConnect posting, against the mock GP backend
+"""
+import asyncio
+import uuid
+import xml.etree.ElementTree as ET
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from services.dynamics_gp_integration import DynamicsGPIntegration, GPMatchResult, GPMatchingType
+from services.enhanced_three_way_match import MatchStatus
+from services.gp_econnect import (
+    EConnectDocument, EConnectError, EConnectServiceTransport, iter_econnect_envelope
+)
+from services.gp_mock_backend import MockGPBackend
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = MockGPBackend(tmp_path / "gp")
+    backend.create_company("TWO", next_pm_number=100)
+    backend.add_vendor("TWO", "ACME0001", "Acme Widgets Ltd")
+    return backend
+
+
+def match_result(invoice_number, vendor_id="ACME0001", amount=100.0, **accounts):
+    return GPMatchResult(
+        match_id=str(uuid.uuid4()),
+        match_type=GPMatchingType.TWO_WAY,
+        status=MatchStatus.PERFECT_MATCH,
+        confidence_score=0.99,
+        invoice_data={"invoice_number": invoice_number, "vendor_id": vendor_id, "total_amount": amount,
+                      "tax_amount": 10.0, "invoice_date": "2026-09-30"},
+        po_data=None,
+        shipment_data=[],
+        variances=[],
+        total_variance=Decimal("0"),
+        auto_approval_eligible=True,
+        gp_posting_required=True,
+        suggested_gl_accounts=accounts,
+        audit_trail=[]
+    )
+
+
+def run_posting(backend, scenario, batch_size=3):
+    econnect = backend.econnect()
+
+    async def run():
+        gp = DynamicsGPIntegration(connector=backend.connector, econnect_transport=econnect)
+        gp.econnect.batch_size = batch_size
+        gp.econnect.retry_delay = 0
+        try:
+            for company in await gp.get_company_databases():
+                await gp._create_connection_pool(company)
+            return await scenario(gp, econnect)
+        finally:
+            gp.close()
+
+    return asyncio.run(run())
+
+
+def posted_vouchers(backend):
+    return sorted(row.VCHRNMBR for row in backend.query("TWO", "SELECT VCHRNMBR FROM PM10000"))
+
+
+def test_envelope_is_streamed_and_escaped():
+    documents = [
+        EConnectDocument(key=str(n), batch_number="B1", voucher_number=f"PM{n:06d}", vendor_id="A&B <CO>",
+                         document_number=f"INV-{n}", document_date="2026-09-30", amount=Decimal("12.5"))
+        for n in range(40)
+    ]
+
+    chunks = list(iter_econnect_envelope(documents, chunk_size=1024))
+
+    assert len(chunks) > 1
+    envelope = ET.fromstring(b"".join(chunks))
+    headers = envelope.findall("PMTransactionType/taPMTransactionInsert")
+    assert len(headers) == 40
+    assert headers[0].findtext("VENDORID") == "A&B <CO>" and headers[0].findtext("DOCAMNT") == "12.50"
+    assert headers[0].findtext("CREATEDIST") == "1"
+
+
+def test_posts_in_bounded_batches(backend):
+    async def scenario(gp, econnect):
+        return await gp.post_invoices_to_gp(
+            [match_result(f"INV-{n}", accounts_payable="2000-00", expense="5000-00", tax_account="2200-00")
+             for n in range(7)],
+            "TWO"
+        )
+
+    results = run_posting(backend, scenario)
+
+    assert [result["status"] for result in results] == ["success"] * 7
+    assert [result["gp_document_number"] for result in results] == [f"PM{n:06d}" for n in range(100, 107)]
+    assert posted_vouchers(backend) == [f"PM{n:06d}" for n in range(100, 107)]
+    distributions = backend.query("TWO", "SELECT DISTTYPE, DEBITAMT, CRDTAMNT FROM PM10100 WHERE DOCNUMBR = 'INV-0'")
+    assert [(row.DISTTYPE, row.DEBITAMT, row.CRDTAMNT) for row in distributions] == [
+        (2, 0, 100), (6, 90, 0), (10, 10, 0)
+    ]
+
+
+def test_rejected_invoice_is_isolated_from_its_batch(backend):
+    async def scenario(gp, econnect):
+        invoices = [match_result(f"INV-{n}") for n in range(5)]
+        invoices[2] = match_result("INV-2", vendor_id="NOSUCHVENDOR")
+        results = await gp.post_invoices_to_gp(invoices, "TWO")
+        return results, econnect.submissions, await gp._generate_document_number("PM", "TWO")
+
+    results, submissions, next_voucher = run_posting(backend, scenario, batch_size=5)
+
+    assert [result["status"] for result in results] == ["success", "success", "error", "success", "success"]
+    assert "Vendor ID does not exist" in results[2]["error"]
+    # One rejected submission, then the rest of the batch without the named document
+    assert submissions == [5, 4]
+    assert len(posted_vouchers(backend)) == 4
+    assert next_voucher == "PM000102"
+
+
+def test_unnamed_errors_are_isolated_by_halves(backend):
+    async def scenario(gp, econnect):
+        await gp.post_invoices_to_gp([match_result("INV-3")], "TWO")
+        econnect.name_documents = False
+        econnect.submissions.clear()
+        results = await gp.post_invoices_to_gp([match_result(f"INV-{n}") for n in range(4)], "TWO")
+        return results, econnect.submissions
+
+    results, submissions = run_posting(backend, scenario, batch_size=4)
+
+    assert [result["status"] for result in results] == ["success", "success", "success", "error"]
+    assert "already exists" in results[3]["error"]
+    assert submissions == [4, 2, 2, 1, 1]
+    assert len(posted_vouchers(backend)) == 4
+
+
+def test_refused_connections_are_retried(backend):
+    async def scenario(gp, econnect):
+        econnect.refuse_connections = 1
+        result = await gp.post_invoice_to_gp(match_result("INV-1"), "TWO", "econnect")
+        return result, gp.econnect.stats["retries"]
+
+    result, retries = run_posting(backend, scenario)
+
+    assert result["status"] == "success" and result["gp_document_number"] == "PM000100"
+    assert retries == 1
+
+
+def test_service_transport_streams_soap_and_maps_faults():
+    requests = []
+
+    def handler(request):
+        requests.append(request.content)
+        fault = b"<s:Fault><faultstring>Error Number = 1133 VCHNUMWK = PM000001</faultstring></s:Fault>"
+        return httpx.Response(500, content=fault)
+
+    async def submit():
+        transport = EConnectServiceTransport("http://gp/eConnect")
+        transport._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        document = EConnectDocument(key="1", batch_number="B1", voucher_number="PM000001", vendor_id="ACME",
+                                    document_number="INV-1", document_date="2026-09-30", amount=Decimal("5"))
+        try:
+            await transport.submit("DATABASE=TWO;", iter_econnect_envelope([document]))
+        finally:
+            await transport.close()
+
+    with pytest.raises(EConnectError, match="1133"):
+        asyncio.run(submit())
+
+    body = ET.fromstring(requests[0])
+    inner = body.find(".//{http://tempuri.org/}xml").text
+    assert ET.fromstring(inner).findtext("PMTransactionType/taPMTransactionInsert/VCHNUMWK") == "PM000001"
@@ -0,0 +1,241 @@
+"""
+Unit tests for the local GP master-data mirror, against the mock GP backend
+"""
+import asyncio
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import core.database as core_database
+from src.core.database import Base
+from src.models.gp_mirror import GPMirrorPurchaseOrder, GPMirrorPurchaseOrderLine, GPMirrorSyncState, GPMirrorVendor
+import services.dynamics_gp_integration as gp_integration
+from services.dynamics_gp_integration import DynamicsGPIntegration
+from services.gp_mirror import GPMasterDataMirror, MIRROR_TABLES, vendor_name_key
+from services.gp_mock_backend import MockGPBackend
+
+TABLES = [table.model.__table__ for table in MIRROR_TABLES] + [GPMirrorSyncState.__table__]
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = MockGPBackend(tmp_path / "gp")
+    backend.create_company("TWO", "Fabrikam, Inc.")
+    backend.add_vendor("TWO", "ACME0001", "Acme Widgets Ltd")
+    backend.add_vendor("TWO", "GLOBEX001", "Globex Corporation")
+    backend.add_vendor("TWO", "INITECH01", "Initech LLC")
+    backend.add_purchase_order("TWO", "PO-1001", "ACME0001", [
+        {"description": "Widget", "quantity": 10, "unit_cost": 50.0},
+        {"description": "Gadget", "quantity": 2, "unit_cost": 250.0}
+    ])
+    backend.add_purchase_order("TWO", "PO-1002", "ACME0001", [{"quantity": 1, "unit_cost": 5000.0}])
+    backend.add_receipt("TWO", "RCT-1", "PO-1001", "ACME0001", [{"quantity": 10, "unit_cost": 50.0}])
+    return backend
+
+
+@pytest.fixture
+def mirror_db(tmp_path):
+    path = tmp_path / "mirror.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=TABLES)
+    engine.dispose()
+    return f"sqlite+aiosqlite:///{path}"
+
+
+def run_with_mirror(backend, mirror_db, scenario, **options):
+    async def run():
+        engine = create_async_engine(mirror_db)
+        gp = DynamicsGPIntegration(connector=backend.connector)
+        mirror = GPMasterDataMirror(gp, async_sessionmaker(engine, expire_on_commit=False), **options)
+        gp.master_data = mirror
+        try:
+            for company in await gp.get_company_databases():
+                await gp._create_connection_pool(company)
+            return await scenario(gp, mirror, engine)
+        finally:
+            gp.close()
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+def count_gp_calls(gp):
+    calls = []
+    run_gp = gp._run_gp
+
+    async def counting(company_db, work, *args):
+        calls.append(work.__name__)
+        return await run_gp(company_db, work, *args)
+
+    gp._run_gp = counting
+    return calls
+
+
+async def scalar(engine, query):
+    async with engine.connect() as connection:
+        return (await connection.execute(query)).scalar()
+
+
+def test_vendor_name_key():
+    assert vendor_name_key("ACME Widgets, Inc.") == "acme widgets"
+    assert vendor_name_key("Smith & Sons Co") == "smith and sons"
+    assert vendor_name_key("The Company") == "the company"
+
+
+class TestMirrorSync:
+    """Initial load, incremental change tracking and deletion reconciliation"""
+
+    def test_initial_sync_copies_all_tables(self, backend, mirror_db):
+        async def scenario(gp, mirror, engine):
+            assert not await mirror.is_ready("TWO")
+            changed = await mirror.sync_company("TWO")
+            vendor = await scalar(engine, select(GPMirrorVendor.name_key).where(GPMirrorVendor.vendor_id == "ACME0001"))
+            return changed, vendor, await mirror.is_ready("TWO")
+
+        changed, name_key, ready = run_with_mirror(backend, mirror_db, scenario)
+
+        assert changed == {"PM00200": 3, "POP10100": 2, "POP10110": 3, "POP10300": 1, "POP10310": 1}
+        assert name_key == "acme widgets" and ready
+
+    def test_incremental_sync_reads_only_changed_rows(self, backend, mirror_db):
+        async def scenario(gp, mirror, engine):
+            await mirror.sync_company("TWO")
+            backend.execute("TWO", "UPDATE POP10100 SET SUBTOTAL = ? WHERE PONUMBER = ?", 1100.0, "PO-1001")
+            backend.add_vendor("TWO", "UMBRELLA1", "Umbrella Corp")
+            changed = await mirror.sync_company("TWO")
+            subtotal = await scalar(
+                engine, select(GPMirrorPurchaseOrder.subtotal).where(GPMirrorPurchaseOrder.po_number == "PO-1001")
+            )
+            return changed, subtotal
+
+        changed, subtotal = run_with_mirror(backend, mirror_db, scenario, lookback_seconds=0)
+
+        assert changed == {"PM00200": 1, "POP10100": 1, "POP10110": 0, "POP10300": 0, "POP10310": 0}
+        assert subtotal == Decimal("1100")
+
+    def test_large_sync_stays_under_bind_parameter_limit(self, backend, mirror_db, monkeypatch):
+        monkeypatch.setattr(core_database, "MAX_BIND_PARAMETERS", 100)
+        for number in range(200):
+            backend.add_vendor("TWO", f"BULK{number:04d}", f"Bulk Supplier {number}")
+
+        async def scenario(gp, mirror, engine):
+            inserts = []
+
+            @event.listens_for(engine.sync_engine, "before_cursor_execute")
+            def record(conn, cursor, statement, parameters, context, executemany):
+                if statement.startswith("INSERT INTO gp_mirror_vendors"):
+                    inserts.append(len(parameters))
+
+            changed = await mirror.sync_company("TWO")
+            return changed, inserts, await scalar(engine, select(func.count()).select_from(GPMirrorVendor))
+
+        changed, inserts, vendors = run_with_mirror(backend, mirror_db, scenario)
+
+        assert changed["PM00200"] == vendors == 203
+        assert len(inserts) > 1 and max(inserts) <= 100
+
+    def test_lookback_catches_late_committed_rows(self, backend, mirror_db):
+        async def scenario(gp, mirror, engine):
+            await mirror.sync_company("TWO")
+            async with engine.connect() as connection:
+                watermark = (await connection.execute(select(func.max(GPMirrorSyncState.last_row_ts)))).scalar()
+            # Stamped before the watermark, but committed after the last pass read past it
+            backend.add_vendor("TWO", "LATE0001", "Late Supplies", DEX_ROW_TS=watermark - timedelta(seconds=5))
+            changed = await mirror.sync_company("TWO")
+            return changed["PM00200"], await mirror.find_vendor("TWO", "Late Supplies")
+
+        copied, vendor = run_with_mirror(backend, mirror_db, scenario, lookback_seconds=60)
+
+        assert copied >= 1 and vendor["vendor_id"] == "LATE0001"
+
+    def test_reconcile_removes_rows_deleted_in_gp(self, backend, mirror_db):
+        async def scenario(gp, mirror, engine):
+            await mirror.sync_company("TWO")
+            # GP moves completed POs to history tables
+            backend.execute("TWO", "DELETE FROM POP10110 WHERE PONUMBER = ?", "PO-1002")
+            backend.execute("TWO", "DELETE FROM POP10100 WHERE PONUMBER = ?", "PO-1002")
+            await mirror.sync_company("TWO", reconcile=False)
+            before = await scalar(engine, select(func.count()).select_from(GPMirrorPurchaseOrder))
+            await mirror.sync_company("TWO", reconcile=True)
+            after = await scalar(engine, select(func.count()).select_from(GPMirrorPurchaseOrder))
+            lines = await scalar(engine, select(func.count()).select_from(GPMirrorPurchaseOrderLine))
+            return before, after, lines
+
+        assert run_with_mirror(backend, mirror_db, scenario) == (2, 1, 2)
+
+
+class TestMirrorLookups:
+    """Matching lookups are served from the mirror once a company is synced"""
+
+    def test_vendor_matching(self, backend, mirror_db):
+        async def scenario(gp, mirror, engine):
+            await mirror.sync_company("TWO")
+            names = ["GLOBEX CORP.", "globex001", "Acme", "Initek", "Zenith Supplies"]
+            return [await mirror.find_vendor("TWO", name) for name in names]
+
+        exact, by_id, contained, fuzzy, missing = run_with_mirror(backend, mirror_db, scenario)
+
+        assert exact["vendor_id"] == by_id["vendor_id"] == "GLOBEX001"
+        assert contained["vendor_id"] == "ACME0001" and contained["status"] == "existing"
+        assert fuzzy["vendor_id"] == "INITECH01"
+        assert missing is None
+
+    def test_matching_does_not_query_gp(self, backend, mirror_db):
+        async def scenario(gp, mirror, engine):
+            await mirror.sync_company("TWO")
+            calls = count_gp_calls(gp)
+            po = await gp._find_gp_purchase_order({"vendor_name": "ACME WIDGETS", "total_amount": 1010}, "TWO")
+            shipments = await gp._find_gp_shipments_for_po("PO-1001", "TWO")
+            vendor = await gp._ensure_vendor_exists("Acme Widgets Limited", "TWO")
+            return po, shipments, vendor, calls
+
+        po, shipments, vendor, calls = run_with_mirror(backend, mirror_db, scenario)
+
+        assert calls == []
+        assert po.po_number == "PO-1001" and po.total_amount == Decimal("1000")
+        assert [line["quantity"] for line in po.line_items] == [Decimal("10"), Decimal("2")]
+        assert [shipment["receipt_number"] for shipment in po.shipments] == ["RCT-1"]
+        assert shipments[0].line_items[0]["total"] == Decimal("500")
+        assert vendor["vendor_id"] == "ACME0001"
+
+    def test_falls_back_to_gp_when_not_mirrored(self, backend, mirror_db):
+        async def scenario(gp, mirror, engine):
+            calls = count_gp_calls(gp)
+            before_sync = await gp._find_gp_purchase_order({}, "TWO", po_number="PO-1001")
+            await mirror.sync_company("TWO")
+            backend.add_purchase_order("TWO", "PO-2000", "GLOBEX001", [{"quantity": 1, "unit_cost": 10.0}])
+            calls.clear()
+            new_po = await gp._find_gp_purchase_order({}, "TWO", po_number="PO-2000")
+            new_vendor = await gp._ensure_vendor_exists("Hooli", "TWO")
+            return before_sync, new_po, new_vendor, calls
+
+        before_sync, new_po, new_vendor, calls = run_with_mirror(backend, mirror_db, scenario)
+
+        assert before_sync.po_number == "PO-1001"
+        assert new_po.vendor_id == "GLOBEX001"
+        # Vendor creation still goes to GP
+        assert new_vendor["status"] == "created"
+        assert calls == ["_query_purchase_order", "_query_ensure_vendor"]
+
+    def test_automation_matches_from_the_shared_mirror(self, backend, mirror_db, monkeypatch):
+        from services.erp_automation import ERPAutomationService
+
+        async def scenario(gp, mirror, engine):
+            await mirror.sync_company("TWO")
+            # The automation engine must use the GP service the mirror is attached to
+            monkeypatch.setitem(gp_integration.dynamics_gp_integration.__dict__, "_instance", gp)
+            automation = ERPAutomationService()
+            calls = count_gp_calls(gp)
+            po = await automation.dynamics_gp._find_gp_purchase_order(
+                {"vendor_name": "ACME WIDGETS", "total_amount": 1010}, "TWO", "PO-1001"
+            )
+            shipments = await automation.dynamics_gp._find_gp_shipments_for_po("PO-1001", "TWO")
+            return automation.dynamics_gp.master_data is mirror, po, shipments, calls
+
+        shared, po, shipments, calls = run_with_mirror(backend, mirror_db, scenario)
+
+        assert shared and calls == []
+        assert po.po_number == "PO-1001" and [shipment.shipment_number for shipment in shipments] == ["RCT-1"]
@@ -107,10 +107,11 @@ class TestMiddleware:
     
     def test_multi_tenant_middleware_configured(self):
         """Test that MultiTenant middleware is configured"""
-        # Check if MultiTenant middleware is in the middleware stack
-        middleware_classes = [middleware.cls for middleware in app.user_middleware]
-        from src.core.middleware import MultiTenantMiddleware
-        assert MultiTenantMiddleware in middleware_classes
+        # Tenant context runs as a hook in the ASGI pipeline; compare by name since
+        # main.py imports core modules both as ``core.*`` and ``src.core.*``
+        pipelines = [middleware for middleware in app.user_middleware if middleware.cls.__name__ == "ASGIPipeline"]
+        assert pipelines
+        assert "MultiTenantHook" in [type(hook).__name__ for hook in pipelines[0].options["hooks"]]
 
 class TestResponseHeaders:
     """Test response headers and timing"""
@@ -0,0 +1,18 @@
+"""
+Unit tests for the deploy-time schema creation script
+"""
+from sqlalchemy import create_engine, inspect
+
+from init_db import create_schema
+
+
+def test_creates_every_model_table_on_sqlite(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    try:
+        create_schema(engine)
+        tables = set(inspect(engine).get_table_names())
+    finally:
+        engine.dispose()
+
+    assert {"users", "companies", "invoices", "invoice_lines", "audit_logs", "erp_sync_outbox"} <= tables
+    assert "invoice_search_fts" in tables
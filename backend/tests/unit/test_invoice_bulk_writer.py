@@ -0,0 +1,200 @@
+"""
+Unit tests for bulk invoice ingestion
+"""
+import asyncio
+import os
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.database import Base
+from src.models.audit import AuditLog, AuditAction
+from src.models.invoice import Invoice, InvoiceStatus
+from src.models.invoice_line import InvoiceLine
+from src.models.user import User  # noqa: F401 - registers the users table for Invoice foreign keys
+from src.models.company import Company  # noqa: F401
+from services.audit_writer import audit_writer
+from services.invoice_bulk_writer import BulkInvoiceWriter
+from services.invoice_processor import InvoiceProcessor
+
+TABLES = [Invoice.__table__, InvoiceLine.__table__, AuditLog.__table__]
+
+
+def extracted_invoice(number, supplier="Acme Widgets", lines=2, **overrides):
+    data = {
+        "invoice_number": number,
+        "supplier_name": supplier,
+        "invoice_date": (date.today() - timedelta(days=10)).isoformat(),
+        "total_amount": 100.0 * lines,
+        "line_items": [
+            {"description": f"Widget {i}", "quantity": 2, "unit_price": 50.0, "total": 100.0}
+            for i in range(lines)
+        ]
+    }
+    data.update(overrides)
+    return data
+
+
+@pytest.fixture
+def processor():
+    return InvoiceProcessor()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine, tables=TABLES)
+    yield engine
+    engine.dispose()
+
+
+class TestBulkInvoiceWriter:
+    """Set-based writes keep the single-invoice semantics"""
+
+    def test_writes_invoices_lines_and_audit(self, engine, processor):
+        company_id, user_id = uuid.uuid4(), uuid.uuid4()
+        db = sessionmaker(bind=engine)()
+        writer = BulkInvoiceWriter(processor._validate_invoice_data, batch_size=2)
+
+        result = writer.write(db, [extracted_invoice(f"INV-{i}") for i in range(5)], company_id, str(user_id))
+        db.commit()
+
+        assert (len(result.created), result.lines, result.method) == (5, 10, "insert")
+        assert all(created["created_at"] is not None for created in result.created)
+        invoice = db.scalar(select(Invoice).where(Invoice.invoice_number == "INV-3"))
+        assert invoice.status == InvoiceStatus.DRAFT and invoice.created_by_id == user_id
+        assert invoice.ocr_data == {} and invoice.tags == []
+        assert [line.line_number for line in sorted(invoice.line_items, key=lambda line: line.line_number)] == [1, 2]
+        assert invoice.line_items[0].unit_price == Decimal("50.00")
+
+        audit = db.scalars(select(AuditLog).where(AuditLog.resource_id == invoice.id)).all()
+        assert [entry.action for entry in audit] == [AuditAction.CREATE]
+        db.close()
+
+    def test_invalid_items_rejected_with_errors(self, engine, processor):
+        db = sessionmaker(bind=engine)()
+        items = [extracted_invoice("INV-1"), extracted_invoice("INV-2", total_amount=-5), {"supplier_name": "X"}]
+
+        result = BulkInvoiceWriter(processor._validate_invoice_data).write(db, items, uuid.uuid4(), uuid.uuid4())
+        db.commit()
+
+        assert [created["index"] for created in result.created] == [0]
+        assert [rejected["index"] for rejected in result.rejected] == [1, 2]
+        assert "Total amount must be greater than 0" in result.rejected[0]["errors"]
+        assert db.scalar(select(func.count()).select_from(Invoice)) == 1
+        db.close()
+
+    def test_duplicates_flagged_rejected(self, engine, processor):
+        company_id = uuid.uuid4()
+        db = sessionmaker(bind=engine)()
+        writer = BulkInvoiceWriter(processor._validate_invoice_data)
+        first = writer.write(db, [extracted_invoice("INV-1")], company_id, uuid.uuid4())
+        db.commit()
+
+        result = writer.write(db, [extracted_invoice("INV-1"), extracted_invoice("INV-2"), extracted_invoice("INV-2")],
+                              company_id, uuid.uuid4())
+        db.commit()
+
+        assert result.duplicates == 2
+        assert [created["status"] for created in result.created] == ["rejected", "draft", "rejected"]
+        rejected = db.scalar(select(Invoice).where(Invoice.id == uuid.UUID(result.created[0]["invoice_id"])))
+        assert rejected.rejection_reason == f"Duplicate invoice detected: {first.created[0]['invoice_id']}"
+        db.close()
+
+
+    def test_buffered_audit_rows_wait_for_commit(self, engine, processor, monkeypatch):
+        monkeypatch.setattr(audit_writer, "_running", True)
+        monkeypatch.setattr(audit_writer, "_buffer", type(audit_writer._buffer)())
+        writer = BulkInvoiceWriter(processor._validate_invoice_data)
+        db = sessionmaker(bind=engine)()
+
+        writer.write(db, [extracted_invoice("INV-1"), extracted_invoice("INV-2")], uuid.uuid4(), uuid.uuid4())
+        assert audit_writer.pending() == 0
+        db.rollback()
+        assert audit_writer.pending() == 0
+
+        writer.write(db, [extracted_invoice("INV-3")], uuid.uuid4(), uuid.uuid4())
+        db.commit()
+        assert audit_writer.pending() == 1
+        assert db.scalar(select(func.count()).select_from(AuditLog)) == 0
+        db.close()
+
+
+class TestInvoiceProcessorBulkImport:
+    """The processor entry point runs the writer on an AsyncSession"""
+
+    def test_bulk_import_invoices(self, tmp_path, processor):
+        async def run():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+            async with AsyncSession(engine) as db:
+                result = await processor.bulk_import_invoices(
+                    [extracted_invoice("A-1"), extracted_invoice("A-2", invoice_date="not-a-date")],
+                    str(uuid.uuid4()), str(uuid.uuid4()), db
+                )
+                lines = await db.scalar(select(func.count()).select_from(InvoiceLine))
+            await engine.dispose()
+            return result, lines
+
+        result, lines = asyncio.run(run())
+        assert (result["status"], result["total"], result["created"], result["rejected"]) == ("completed", 2, 1, 1)
+        assert lines == 2
+
+    def test_single_invoice_path_builds_lines(self, processor):
+        invoice = processor._create_invoice_from_ocr(extracted_invoice("S-1", lines=3), uuid.uuid4(), uuid.uuid4(), "x.pdf")
+        assert [line.line_number for line in invoice.line_items] == [1, 2, 3]
+        assert invoice.line_items[0].total_amount == Decimal("100.0")
+
+
+@pytest.mark.slow
+class TestBulkIngestionBenchmark:
+    """Bulk writer against the per-object ORM path
+
+    Ingests ``BULK_BENCHMARK_INVOICES`` invoices (10,000 for the reference run)
+    with ``BULK_BENCHMARK_LINES`` line items each (default 20) through both
+    paths and reports throughput. Skipped unless the variable is set.
+    """
+
+    def test_bulk_vs_orm(self, tmp_path, processor):
+        count = int(os.environ.get("BULK_BENCHMARK_INVOICES", "0"))
+        if not count:
+            pytest.skip("set BULK_BENCHMARK_INVOICES to run the ingestion benchmark")
+        lines = int(os.environ.get("BULK_BENCHMARK_LINES", "20"))
+        items = [extracted_invoice(f"INV-{i:06d}", supplier=f"Supplier {i % 50}", lines=lines) for i in range(count)]
+        company_id, user_id = uuid.uuid4(), uuid.uuid4()
+
+        orm_engine = create_engine(f"sqlite:///{tmp_path / 'orm.db'}")
+        Base.metadata.create_all(orm_engine, tables=TABLES)
+        db = sessionmaker(bind=orm_engine)()
+        began = time.perf_counter()
+        for item in items:
+            # What process_invoice does per file: validate, add, commit
+            assert processor._validate_invoice_data(item)["is_valid"]
+            db.add(processor._create_invoice_from_ocr(item, company_id, user_id, None))
+            db.commit()
+        orm_seconds = time.perf_counter() - began
+        db.close()
+        orm_engine.dispose()
+
+        bulk_engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+        Base.metadata.create_all(bulk_engine, tables=TABLES)
+        db = sessionmaker(bind=bulk_engine)()
+        began = time.perf_counter()
+        result = BulkInvoiceWriter(processor._validate_invoice_data).write(db, items, company_id, user_id)
+        db.commit()
+        bulk_seconds = time.perf_counter() - began
+        written = db.scalar(select(func.count()).select_from(InvoiceLine))
+        db.close()
+        bulk_engine.dispose()
+
+        print(f"\n{count} invoices x {lines} lines: orm={orm_seconds:.1f}s bulk={bulk_seconds:.1f}s "
+              f"({orm_seconds / bulk_seconds:.1f}x)")
+        assert len(result.created) == count and written == count * lines
+        assert bulk_seconds < orm_seconds
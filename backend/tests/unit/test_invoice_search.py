@@ -0,0 +1,200 @@
+"""
+Unit tests for the full-text invoice search index (SQLite FTS5 flavour)
+"""
+import os
+import statistics
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from src.core.database import Base
+from src.models.invoice import Invoice, InvoiceStatus
+from src.models.invoice_line import InvoiceLine
+from src.models.user import User  # noqa: F401 - registers the users table for Invoice foreign keys
+from src.models.company import Company  # noqa: F401
+from services.invoice_search import InvoiceSearchIndex, InvoiceSearchService, search_tokens
+
+
+def make_engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[Invoice.__table__, InvoiceLine.__table__])
+    return engine
+
+
+def make_invoice(company_id, supplier_name, invoice_number, created_at=None):
+    return Invoice(
+        id=uuid.uuid4(), invoice_number=invoice_number, supplier_name=supplier_name,
+        invoice_date=date(2026, 3, 2), total_amount=Decimal("100.00"), subtotal=Decimal("100.00"),
+        total_with_tax=Decimal("100.00"), status=InvoiceStatus.DRAFT, company_id=company_id,
+        created_by_id=uuid.uuid4(), created_at=created_at or datetime(2026, 3, 2, 9, 0)
+    )
+
+
+def add_line(db, invoice, description, line_number=1):
+    db.add(InvoiceLine(
+        id=uuid.uuid4(), invoice_id=invoice.id, line_number=line_number, description=description,
+        quantity=Decimal("1"), unit_price=Decimal("100.00"), total_amount=Decimal("100.00")
+    ))
+
+
+@pytest.fixture
+def search_db(tmp_path):
+    engine = make_engine(tmp_path / "app.db")
+    InvoiceSearchIndex(engine).install()
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+class TestSearchTokens:
+    """Query syntax never reaches the index"""
+
+    def test_operators_stripped(self):
+        assert search_tokens('Acme "Widgets" OR* (NEAR)') == ["acme", "widgets", "or", "near"]
+        assert search_tokens("  ") == []
+
+
+class TestIndexMaintenance:
+    """Triggers keep the index in step with invoices and line items"""
+
+    def test_install_backfills_existing_invoices(self, tmp_path):
+        engine = make_engine(tmp_path / "app.db")
+        company_id = uuid.uuid4()
+        db = sessionmaker(bind=engine)()
+        db.add(make_invoice(company_id, "Northwind Traders", "NW-1001"))
+        db.commit()
+
+        index = InvoiceSearchIndex(engine)
+        assert not index.is_installed()
+        assert index.install() == {"status": "installed"}
+        assert index.install() == {"status": "updated"}
+
+        hits = InvoiceSearchService().search(db, company_id, "northwind")
+        assert [hit.invoice.invoice_number for hit in hits] == ["NW-1001"]
+        db.close()
+        engine.dispose()
+
+    def test_updates_and_deletes_are_indexed(self, search_db):
+        company_id = uuid.uuid4()
+        invoice = make_invoice(company_id, "Contoso", "C-1")
+        search_db.add(invoice)
+        search_db.commit()
+
+        invoice.supplier_name = "Fabrikam"
+        add_line(search_db, invoice, "Hydraulic pump assembly")
+        search_db.commit()
+
+        service = InvoiceSearchService()
+        assert service.search(search_db, company_id, "contoso") == []
+        assert [hit.invoice.id for hit in service.search(search_db, company_id, "fabrikam")] == [invoice.id]
+        assert [hit.invoice.id for hit in service.search(search_db, company_id, "hydraulic")] == [invoice.id]
+
+        search_db.delete(invoice)
+        search_db.query(InvoiceLine).filter(InvoiceLine.invoice_id == invoice.id).delete()
+        search_db.commit()
+        count = search_db.execute(text("SELECT count(*) FROM invoice_search_fts")).scalar()
+        assert count == 0
+
+
+class TestSearch:
+    """Ranked, prefix- and typo-tolerant, tenant-scoped results"""
+
+    def test_ranking_prefix_and_tenant_scope(self, search_db):
+        company_id, other_company = uuid.uuid4(), uuid.uuid4()
+        supplier = make_invoice(company_id, "Acme Widgets", "INV-2001")
+        line_only = make_invoice(company_id, "Globex", "INV-2002")
+        search_db.add_all([supplier, line_only, make_invoice(other_company, "Acme Widgets", "INV-9")])
+        search_db.flush()
+        add_line(search_db, line_only, "Replacement widgets for acme press")
+        search_db.commit()
+
+        service = InvoiceSearchService()
+        hits = service.search(search_db, company_id, "widg")
+        # Supplier-name matches outrank line-item matches
+        assert [hit.invoice.id for hit in hits] == [supplier.id, line_only.id]
+        assert hits[0].rank > hits[1].rank
+
+        assert [hit.invoice.id for hit in service.search(search_db, company_id, "INV-2002")] == [line_only.id]
+
+    def test_misspelt_supplier_found(self, search_db):
+        company_id = uuid.uuid4()
+        invoice = make_invoice(company_id, "Wingtip Toys", "W-1")
+        search_db.add(invoice)
+        search_db.commit()
+
+        hits = InvoiceSearchService().search(search_db, company_id, "wingtpi toys")
+        assert [hit.invoice.id for hit in hits] == [invoice.id]
+
+    def test_falls_back_to_scan_without_index(self, tmp_path):
+        engine = make_engine(tmp_path / "plain.db")
+        db = sessionmaker(bind=engine)()
+        company_id = uuid.uuid4()
+        db.add(make_invoice(company_id, "Litware", "L-1"))
+        db.commit()
+
+        hits = InvoiceSearchService().search(db, company_id, "litw")
+        assert [hit.invoice.supplier_name for hit in hits] == ["Litware"]
+        db.close()
+        engine.dispose()
+
+
+@pytest.mark.slow
+class TestSearchBenchmark:
+    """Search latency at scale
+
+    Seeds ``SEARCH_BENCHMARK_ROWS`` invoices (1,000,000 for the reference run)
+    spread over 100 tenants and reports p50/p95 latency for typical queries.
+    Skipped unless the variable is set.
+    """
+
+    SUPPLIERS = ["Acme Widgets", "Northwind Traders", "Contoso Ltd", "Fabrikam Inc", "Wingtip Toys",
+                 "Litware Systems", "Globex Corporation", "Tailspin Aviation", "Adventure Works", "Proseware"]
+    QUERIES = ["acme", "north", "INV-0042", "fabrikam widgets", "tailspn", "hydraulic"]
+
+    def test_search_latency(self, tmp_path):
+        rows = int(os.environ.get("SEARCH_BENCHMARK_ROWS", "0"))
+        if not rows:
+            pytest.skip("set SEARCH_BENCHMARK_ROWS to run the search benchmark")
+        max_p95_ms = float(os.environ.get("SEARCH_BENCHMARK_MAX_P95_MS", "250"))
+
+        engine = make_engine(tmp_path / "bench.db")
+        InvoiceSearchIndex(engine).install()
+        companies = [uuid.uuid4() for _ in range(100)]
+        start = datetime(2025, 1, 1)
+        with engine.begin() as conn:
+            batch = []
+            for i in range(rows):
+                batch.append({
+                    "id": uuid.uuid4(), "invoice_number": f"INV-{i:07d}",
+                    "supplier_name": self.SUPPLIERS[i % len(self.SUPPLIERS)],
+                    "invoice_date": date(2025, 1, 1), "subtotal": Decimal("100.00"),
+                    "total_amount": Decimal("100.00"), "total_with_tax": Decimal("100.00"),
+                    "status": InvoiceStatus.DRAFT, "company_id": companies[i % len(companies)],
+                    "created_by_id": companies[0], "created_at": start + timedelta(seconds=i)
+                })
+                if len(batch) == 10000 or i == rows - 1:
+                    conn.execute(Invoice.__table__.insert(), batch)
+                    batch = []
+
+        db = sessionmaker(bind=engine)()
+        service = InvoiceSearchService()
+        timings = []
+        for _ in range(5):
+            for query in self.QUERIES:
+                began = time.perf_counter()
+                service.search(db, companies[7], query)
+                timings.append((time.perf_counter() - began) * 1000)
+        db.close()
+        engine.dispose()
+
+        timings.sort()
+        p50 = statistics.median(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"\ninvoice search over {rows} invoices: p50={p50:.1f}ms p95={p95:.1f}ms")
+        assert p95 < max_p95_ms
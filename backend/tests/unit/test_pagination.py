@@ -0,0 +1,127 @@
+"""
+Unit tests for keyset pagination, cursors and bounded counts
+"""
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.database import Base
+from src.core.pagination import (
+    InvalidCursorError, decode_cursor, encode_cursor, estimate_count, keyset_paginate
+)
+from src.models.invoice import Invoice, InvoiceStatus
+from src.models.user import User  # noqa: F401 - registers the users table for Invoice foreign keys
+from src.models.company import Company  # noqa: F401
+from services.optimized_queries import INVOICE_KEYSET, OptimizedInvoiceQueries
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine, tables=[Invoice.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def add_invoices(db, company_id, count, **overrides):
+    start = datetime(2026, 1, 1, 9, 0)
+    invoices = []
+    for i in range(count):
+        values = dict(
+            id=uuid.uuid4(), invoice_number=f"INV-{i:05d}", supplier_name="Acme",
+            invoice_date=start.date(), total_amount=Decimal("100.00"), subtotal=Decimal("100.00"),
+            total_with_tax=Decimal("100.00"), status=InvoiceStatus.DRAFT, company_id=company_id,
+            created_by_id=uuid.uuid4(),
+            # Pairs of rows share a timestamp so the id tie-breaker is exercised
+            created_at=start + timedelta(minutes=i // 2)
+        )
+        values.update(overrides)
+        invoices.append(Invoice(**values))
+    db.add_all(invoices)
+    db.commit()
+    return invoices
+
+
+class TestCursor:
+    """Cursors round-trip typed sort keys and reject foreign input"""
+
+    def test_round_trip(self):
+        key = (datetime(2026, 3, 2, 10, 30, 15, 120), uuid.uuid4())
+        assert decode_cursor(INVOICE_KEYSET, encode_cursor(INVOICE_KEYSET, key)) == key
+
+    def test_malformed_cursor_rejected(self):
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(INVOICE_KEYSET, "not-a-cursor")
+
+    def test_cursor_from_other_listing_rejected(self):
+        cursor = encode_cursor((Invoice.invoice_date, Invoice.id), (datetime(2026, 1, 1), uuid.uuid4()))
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(INVOICE_KEYSET, cursor)
+
+
+class TestKeysetPaginate:
+    """Walking the cursors visits every row exactly once, newest first"""
+
+    def test_pages_cover_result_set(self, db):
+        company_id = uuid.uuid4()
+        invoices = add_invoices(db, company_id, 25)
+        add_invoices(db, uuid.uuid4(), 5)
+
+        query = db.query(Invoice).filter(Invoice.company_id == company_id)
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = keyset_paginate(query, INVOICE_KEYSET, cursor, limit=10)
+            seen.extend(page.items)
+            pages += 1
+            if not page.has_next:
+                assert page.next_cursor is None
+                break
+            cursor = page.next_cursor
+
+        assert pages == 3
+        assert len({invoice.id for invoice in seen}) == 25
+        expected = sorted(invoices, key=lambda invoice: (invoice.created_at, invoice.id.hex), reverse=True)
+        assert [invoice.id for invoice in seen] == [invoice.id for invoice in expected]
+
+
+class TestEstimateCount:
+    """Counts are exact up to the limit and flagged as estimates beyond it"""
+
+    def test_exact_below_limit(self, db):
+        company_id = uuid.uuid4()
+        add_invoices(db, company_id, 8)
+        query = db.query(Invoice).filter(Invoice.company_id == company_id)
+        assert estimate_count(db, query, exact_limit=10) == (8, False)
+
+    def test_bounded_above_limit(self, db):
+        company_id = uuid.uuid4()
+        add_invoices(db, company_id, 30)
+        query = db.query(Invoice).filter(Invoice.company_id == company_id)
+        # SQLite has no planner estimate, so the bounded count is reported as a lower bound
+        assert estimate_count(db, query, exact_limit=10) == (11, True)
+
+
+class TestOptimizedInvoiceQueries:
+    """The invoice listing uses cursors and filters"""
+
+    def test_get_invoices_paginated(self, db):
+        company_id = uuid.uuid4()
+        add_invoices(db, company_id, 6)
+        add_invoices(db, company_id, 4, status=InvoiceStatus.APPROVED)
+
+        first = OptimizedInvoiceQueries.get_invoices_paginated(db, company_id, per_page=3, status=InvoiceStatus.DRAFT)
+        assert first["total"] == 6 and not first["total_is_estimate"]
+        assert first["has_next"]
+
+        second = OptimizedInvoiceQueries.get_invoices_paginated(
+            db, company_id, cursor=first["next_cursor"], per_page=3, status=InvoiceStatus.DRAFT
+        )
+        assert not second["has_next"]
+        ids = {invoice.id for invoice in first["invoices"] + second["invoices"]}
+        assert len(ids) == 6
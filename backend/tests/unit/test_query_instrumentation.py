@@ -0,0 +1,159 @@
+"""
+Unit tests for per-request query instrumentation and N+1 detection
+"""
+import asyncio
+
+import anyio
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from src.core.asgi_pipeline import ASGIPipeline
+from src.core.query_instrumentation import (
+    UNMATCHED_ENDPOINT, QueryInstrumentation, QueryInstrumentationHook, current_query_stats, fingerprint
+)
+
+
+def make_engine(instrumentation):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    instrumentation.instrument_engine(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO items (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+    return engine
+
+
+def n_plus_one(engine, rows=12):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT id FROM items"))
+        for item_id in range(rows):
+            conn.execute(text("SELECT name FROM items WHERE id = :id"), {"id": item_id})
+
+
+class TestFingerprint:
+    """Statements differing only in values share a fingerprint"""
+
+    def test_literals_and_parameters_are_stripped(self):
+        assert fingerprint("SELECT * FROM t WHERE id = 5 AND name = 'x'") == \
+            fingerprint("SELECT * FROM t  WHERE id = 7 AND name = 'it''s'")
+        assert fingerprint("SELECT * FROM t WHERE id = %(id_1)s") == fingerprint("SELECT * FROM t WHERE id = $1")
+
+    def test_in_lists_collapse(self):
+        assert fingerprint("SELECT * FROM t WHERE id IN (?, ?, ?)") == fingerprint("SELECT * FROM t WHERE id IN (?)")
+        assert "IN (...)" in fingerprint("SELECT * FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s)")
+
+    def test_casts_and_identifiers_survive(self):
+        assert fingerprint("SELECT col1::text FROM anon_1") == "SELECT col1::text FROM anon_1"
+
+
+class TestRequestStats:
+    """Statements are attributed to the request that issued them"""
+
+    def test_repeated_statement_flagged(self):
+        instrumentation = QueryInstrumentation(n_plus_one_threshold=10, enabled=True)
+        engine = make_engine(instrumentation)
+
+        token = instrumentation.begin_request()
+        n_plus_one(engine)
+        stats = instrumentation.end_request(token, "GET", "/api/v1/items")
+
+        assert stats.count == 13
+        assert stats.total_time > 0
+        [(statement, count)] = stats.repeated(10)
+        assert count == 12 and "WHERE id = ?" in statement
+        assert current_query_stats() is None
+
+        [row] = instrumentation.report()
+        assert row["endpoint"] == "GET /api/v1/items"
+        assert row["n_plus_one_requests"] == 1
+        assert row["worst_count"] == 12
+
+    def test_queries_outside_requests_not_attributed(self):
+        instrumentation = QueryInstrumentation(n_plus_one_threshold=10, enabled=True)
+        engine = make_engine(instrumentation)
+        n_plus_one(engine)
+        assert instrumentation.report() == []
+
+    def test_async_engine_statements_counted(self):
+        pytest.importorskip("aiosqlite")
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        instrumentation = QueryInstrumentation(enabled=True)
+
+        async def scenario():
+            engine = create_async_engine("sqlite+aiosqlite://")
+            instrumentation.instrument_engine(engine.sync_engine)
+            token = instrumentation.begin_request()
+            async with engine.connect() as conn:
+                for _ in range(3):
+                    await conn.execute(text("SELECT 1"))
+            stats = instrumentation.end_request(token, "GET", "/api/v1/analytics/kpis")
+            await engine.dispose()
+            return stats
+
+        assert asyncio.run(scenario()).count == 3
+
+
+class TestQueryInstrumentationHook:
+    """The pipeline hook scopes stats per request and exposes them in debug mode"""
+
+    def _call(self, hook, app, path="/api/v1/items"):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": path, "headers": [], "query_string": b""}
+        asyncio.run(ASGIPipeline(app, [hook])(scope, receive, send))
+        return {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+
+    def test_headers_count_threadpool_queries(self):
+        instrumentation = QueryInstrumentation(n_plus_one_threshold=10, enabled=True)
+        engine = make_engine(instrumentation)
+
+        async def app(scope, receive, send):
+            # Sync endpoints run in the threadpool; the context variable follows them
+            await anyio.to_thread.run_sync(n_plus_one, engine)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        headers = self._call(QueryInstrumentationHook(instrumentation, expose_headers=True), app)
+
+        assert headers["x-db-query-count"] == "13"
+        assert float(headers["x-db-query-time-ms"]) > 0
+        assert headers["x-db-n-plus-one"] == "12"
+        assert instrumentation.report()[0]["requests"] == 1
+
+    def test_headers_hidden_outside_debug(self):
+        instrumentation = QueryInstrumentation(enabled=True)
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        headers = self._call(QueryInstrumentationHook(instrumentation, expose_headers=False), app)
+        assert not any(name.startswith("x-db-") for name in headers)
+        assert instrumentation.report()[0]["avg_queries"] == 0
+
+    def test_endpoints_keyed_by_route_template(self):
+        instrumentation = QueryInstrumentation(enabled=True)
+
+        class Route:
+            path = "/api/v1/items/{item_id}"
+
+        async def app(scope, receive, send):
+            # The router records the matched route in the scope; unknown paths match none
+            if scope["path"].startswith("/api/v1/items/"):
+                scope["route"] = Route()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        hook = QueryInstrumentationHook(instrumentation, expose_headers=False)
+        for path in ("/api/v1/items/1", "/api/v1/items/2", "/wp-login.php", "/.env", "/admin/1"):
+            self._call(hook, app, path)
+
+        requests = {row["endpoint"]: row["requests"] for row in instrumentation.report()}
+        assert requests == {"GET /api/v1/items/{item_id}": 2, f"GET {UNMATCHED_ENDPOINT}": 3}
@@ -0,0 +1,74 @@
+"""
+Unit tests for the local lease-based rate limiting tier
+"""
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis.aioredis")
+pytest.importorskip("lupa")
+
+from src.core.rate_limiter import LocalRateLimitTier
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestLocalRateLimitTier:
+    """Quota is leased from Redis in batches and spent without network I/O"""
+
+    def test_lease_size_follows_error_budget(self):
+        tier = LocalRateLimitTier(fakeredis.FakeRedis(), error_budget=0.05, max_lease=100)
+        assert tier.lease_size(5) == 1
+        assert tier.lease_size(1000) == 50
+        assert tier.lease_size(100000) == 100
+
+    def test_requests_admitted_from_local_lease(self):
+        async def scenario():
+            tier = LocalRateLimitTier(fakeredis.FakeRedis(), error_budget=0.1, reconcile_interval=60)
+            results = [await tier.check("fixed_window", "rl:fixed:a", 100, window=60) for _ in range(25)]
+            await tier.stop()
+            return tier, results
+
+        tier, results = run(scenario())
+        assert all(r["allowed"] for r in results)
+        assert tier.stats["leases"] == 3
+        assert tier.stats["local_admits"] == 25
+
+    def test_global_limit_holds_across_processes(self):
+        async def scenario():
+            shared = fakeredis.FakeRedis()
+            tiers = [LocalRateLimitTier(shared, error_budget=0.2, reconcile_interval=60) for _ in range(2)]
+            allowed = 0
+            for i in range(60):
+                result = await tiers[i % 2].check("sliding_window", "rl:sliding:a", 20, window=60)
+                allowed += result["allowed"]
+            for tier in tiers:
+                await tier.stop()
+            return allowed
+
+        assert run(scenario()) == 20
+
+    def test_unused_quota_is_released(self):
+        async def scenario():
+            redis_client = fakeredis.FakeRedis()
+            tier = LocalRateLimitTier(redis_client, error_budget=0.1, reconcile_interval=60)
+            await tier.check("fixed_window", "rl:fixed:b", 100, window=3600)
+            leased = int(await redis_client.get("rl:fixed:b"))
+            await tier.stop()
+            return leased, int(await redis_client.get("rl:fixed:b"))
+
+        leased, after_release = run(scenario())
+        assert leased == 10
+        assert after_release == 1
+
+    def test_token_bucket_release_restores_tokens(self):
+        async def scenario():
+            redis_client = fakeredis.FakeRedis()
+            tier = LocalRateLimitTier(redis_client, error_budget=0.5, reconcile_interval=60)
+            await tier.check("token_bucket", "rl:bucket:c", 10, refill_rate=0.001)
+            await tier.stop()
+            return float(await redis_client.hget("rl:bucket:c", "tokens"))
+
+        assert run(scenario()) == pytest.approx(9, abs=0.1)
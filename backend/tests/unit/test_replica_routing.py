@@ -0,0 +1,144 @@
+"""
+Unit tests for read-replica routing, lag fallback and read-your-writes stickiness
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.core.asgi_pipeline import ASGIPipeline
+from src.core.replica_routing import ReadYourWritesHook, ReplicaRouter, _request_scope
+from src.core import replica_routing
+
+
+def make_database(path, source):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, source TEXT)"))
+        conn.execute(text("INSERT INTO items (id, source) VALUES (1, :source)"), {"source": source})
+    return engine
+
+
+@pytest.fixture
+def databases(tmp_path):
+    primary = make_database(tmp_path / "primary.db", "primary")
+    make_database(tmp_path / "replica.db", "replica")
+    router = ReplicaRouter([f"sqlite:///{tmp_path / 'replica.db'}"], max_lag=5, sticky_seconds=30)
+    yield primary, router
+    asyncio.run(router.stop())
+    primary.dispose()
+
+
+def read_source(db):
+    return db.execute(text("SELECT source FROM items WHERE id = 1")).scalar()
+
+
+class TestRouting:
+    """Reads go to a replica, writes to the primary"""
+
+    def test_reads_use_replica_and_writes_use_primary(self, databases):
+        primary, router = databases
+        db = router.read_session(primary=primary)
+        assert read_source(db) == "replica"
+
+        db.execute(text("INSERT INTO items (id, source) VALUES (2, 'written')"))
+        db.commit()
+        # Once the session has written, its reads follow it to the primary
+        assert read_source(db) == "primary"
+        db.close()
+
+        with primary.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM items")).scalar() == 2
+
+    def test_without_replicas_everything_uses_primary(self, databases):
+        primary, _ = databases
+        db = ReplicaRouter([]).read_session(primary=primary)
+        assert read_source(db) == "primary"
+        db.close()
+
+
+class TestLagFallback:
+    """Lagging or unreachable replicas are skipped"""
+
+    def test_lagging_replica_skipped(self, databases):
+        primary, router = databases
+        router.replicas[0].lag = 30
+        db = router.read_session(primary=primary)
+        assert read_source(db) == "primary"
+        assert router.stats["lagging_skips"] == 1
+        db.close()
+
+    def test_unreachable_replica_skipped_until_it_recovers(self, databases, tmp_path):
+        primary, router = databases
+        router.refresh_lag()
+        assert router.replicas[0].healthy and router.replicas[0].lag == 0
+
+        broken = ReplicaRouter([f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"])
+        broken.refresh_lag()
+        assert not broken.replicas[0].healthy
+        assert broken.choose() is None
+        assert broken.status()["replicas"][0]["healthy"] is False
+
+
+class TestReadYourWrites:
+    """A user's writes keep their reads on the primary for a while"""
+
+    def test_sticky_key_reads_primary(self, databases):
+        primary, router = databases
+        router.mark_write("user-1")
+        assert router.is_sticky("user-1")
+
+        db = router.read_session("user-1", primary=primary)
+        assert read_source(db) == "primary"
+        db.close()
+
+        db = router.read_session("user-2", primary=primary)
+        assert read_source(db) == "replica"
+        db.close()
+
+    def test_hook_marks_user_after_write(self, databases, monkeypatch):
+        primary, router = databases
+        monkeypatch.setattr(replica_routing, "replica_router", router)
+
+        async def app(scope, receive, send):
+            db = router.read_session(primary=primary)
+            db.execute(text("UPDATE items SET source = 'updated' WHERE id = 1"))
+            db.commit()
+            db.close()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            pass
+
+        scope = {"type": "http", "method": "POST", "path": "/api/v1/invoices", "headers": [],
+                 "query_string": b"", "state": {"user_id": "user-1"}}
+        asyncio.run(ASGIPipeline(app, [ReadYourWritesHook()])(scope, receive, send))
+
+        assert router.is_sticky("user-1")
+        assert _request_scope.get() is None
+
+
+class TestAsyncRouting:
+    """Async read sessions route the same way"""
+
+    def test_async_session_reads_replica(self, databases, tmp_path):
+        pytest.importorskip("aiosqlite")
+        from src.core.database import create_async_database_engine
+
+        _, router = databases
+
+        async def scenario():
+            primary = create_async_database_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+            async with router.async_read_session(primary=primary) as db:
+                before = (await db.execute(text("SELECT source FROM items WHERE id = 1"))).scalar()
+                await db.execute(text("INSERT INTO items (id, source) VALUES (2, 'written')"))
+                await db.commit()
+                after = (await db.execute(text("SELECT source FROM items WHERE id = 1"))).scalar()
+            await primary.dispose()
+            return before, after
+
+        assert asyncio.run(scenario()) == ("replica", "primary")
@@ -0,0 +1,290 @@
+"""
+Unit tests for the shared supplier -> ERP vendor resolver
+"""
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.core.database import Base
+from src.models.vendor_mapping import ERPVendorMapping
+from services.dynamics_gp_integration import DynamicsGPIntegration
+from services.erp import MicrosoftDynamicsGPAdapter
+from services.gp_mock_backend import MockGPBackend
+from services.vendor_resolution import VendorIndex, VendorMatch, VendorResolver, name_similarity, vendor_name_key
+
+
+@pytest.fixture
+def mapping_db(tmp_path):
+    path = tmp_path / "mappings.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[ERPVendorMapping.__table__])
+    engine.dispose()
+    return f"sqlite+aiosqlite:///{path}"
+
+
+def run_with_resolver(mapping_db, scenario, **options):
+    async def run():
+        engine = create_async_engine(mapping_db)
+        try:
+            def resolver(**overrides):
+                return VendorResolver(async_sessionmaker(engine, expire_on_commit=False), **options, **overrides)
+            return await scenario(resolver, engine)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+class CountingLookup:
+    """ERP lookup stand-in: every supplier is a new vendor named after it"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.names = []
+
+    async def __call__(self, name):
+        self.names.append(name)
+        await asyncio.sleep(self.delay)
+        return VendorMatch(f"V{len(self.names):03d}", name, "created", details={"vendor_id": f"V{len(self.names):03d}"})
+
+
+async def mapping_count(engine):
+    async with engine.connect() as connection:
+        return (await connection.execute(select(func.count()).select_from(ERPVendorMapping))).scalar()
+
+
+class TestVendorIndex:
+    """Normalized keys, trigram + token similarity"""
+
+    def test_similarity_tolerates_typos_not_different_names(self):
+        assert vendor_name_key("ACME Widgets, Inc.") == vendor_name_key("Acme Widgets Ltd") == "acme widgets"
+        assert name_similarity("acme widget", "acme widgets") > 0.55
+        assert name_similarity("acme rockets", "acme widgets") < 0.55
+        assert name_similarity("globex", "hooli") == 0.0
+
+    def test_best_candidate(self):
+        index = VendorIndex()
+        for key in ("acme widgets", "acme rockets", "initech systems", "globex"):
+            index.add(key, key.upper())
+
+        assert index.best("acme widgets", 0.55) == ("acme widgets", "ACME WIDGETS", 1.0)
+        assert index.best("acme widgetz", 0.55)[1] == "ACME WIDGETS"
+        assert index.best("initech systms", 0.55)[1] == "INITECH SYSTEMS"
+        assert index.best("umbrella", 0.55) is None
+
+
+class TestVendorResolver:
+    """Mapping cache, fuzzy reuse, write-through persistence and batches"""
+
+    def test_resolves_once_then_serves_from_mappings(self, mapping_db):
+        lookup = CountingLookup()
+
+        async def scenario(resolver, engine):
+            resolver = resolver()
+            first = await resolver.resolve("dynamics_gp", "TWO", "Acme Widgets Ltd", lookup)
+            same = await resolver.resolve("dynamics_gp", "TWO", "ACME WIDGETS, INC.", lookup)
+            typo = await resolver.resolve("dynamics_gp", "TWO", "Acme Widget", lookup)
+            other_company = await resolver.resolve("dynamics_gp", "THREE", "Acme Widgets Ltd", lookup)
+            return first, same, typo, other_company, await mapping_count(engine)
+
+        first, same, typo, other_company, persisted = run_with_resolver(mapping_db, scenario, accept_threshold=0.6)
+
+        assert lookup.names == ["Acme Widgets Ltd", "Acme Widgets Ltd"]
+        assert (first.source, same.source, typo.source) == ("created", "mapped", "fuzzy")
+        assert first.vendor_ref == same.vendor_ref == typo.vendor_ref == "V001"
+        assert other_company.vendor_ref == "V002"
+        # The accepted fuzzy match is not remembered as a mapping
+        assert persisted == 2
+
+    def test_mappings_survive_restart(self, mapping_db):
+        lookup = CountingLookup()
+
+        async def scenario(resolver, engine):
+            await resolver().resolve("d365_bc", "CRONUS", "Globex Corporation", lookup)
+            restarted = resolver()
+            again = await restarted.resolve("d365_bc", "CRONUS", "globex", lookup)
+            return again, restarted.stats
+
+        again, stats = run_with_resolver(mapping_db, scenario)
+
+        assert len(lookup.names) == 1
+        assert again.vendor_ref == "V001" and again.source == "mapped" and again.details == {"vendor_id": "V001"}
+        assert stats["mapped"] == 1 and stats["lookups"] == 0
+
+    def test_batch_groups_near_duplicates_and_looks_up_concurrently(self, mapping_db):
+        lookup = CountingLookup(delay=0.05)
+
+        async def scenario(resolver, engine):
+            resolver = resolver()
+            await resolver.resolve("dynamics_gp", "TWO", "Hooli", lookup)
+            names = ["Acme Widgets Inc", "ACME WIDGET", "Globex", "Globex Corporation", "Initech", "Hooli XYZ",
+                     "Hooli", "Acme Widgets Inc", ""]
+            started = time.perf_counter()
+            results = await resolver.resolve_many("dynamics_gp", "TWO", names, lookup)
+            return results, time.perf_counter() - started, await mapping_count(engine)
+
+        results, elapsed, persisted = run_with_resolver(mapping_db, scenario, accept_threshold=0.6)
+
+        assert lookup.names == ["Hooli", "Acme Widgets Inc", "Globex", "Initech"]
+        assert elapsed < 0.15
+        assert results["ACME WIDGET"].vendor_ref == results["Acme Widgets Inc"].vendor_ref
+        assert results["ACME WIDGET"].source == "fuzzy"
+        assert results["Globex Corporation"].vendor_ref == results["Globex"].vendor_ref
+        assert results["Hooli"].source == "mapped" and results["Hooli XYZ"].vendor_ref == "V001"
+        assert results[""] is None
+        assert persisted == 4
+
+    def test_similar_names_are_suggestions_not_mappings(self, mapping_db):
+        lookup = CountingLookup()
+
+        async def scenario(resolver, engine):
+            resolver = resolver()
+            logistics = await resolver.resolve("dynamics_gp", "TWO", "North Star Logistics Group", lookup)
+            lighting = await resolver.resolve("dynamics_gp", "TWO", "North Star Lighting Group", lookup)
+            batch = await resolver.resolve_many("dynamics_gp", "TWO",
+                                                ["Acme Widgets Inc", "ACME WIDGET", "Acme Widgets Ltd"], lookup)
+            suggestion = await resolver.suggest("dynamics_gp", "TWO", "North Star Logistic Group")
+            return logistics, lighting, batch, suggestion, resolver.stats, await mapping_count(engine)
+
+        logistics, lighting, batch, suggestion, stats, persisted = run_with_resolver(mapping_db, scenario)
+
+        # ~0.63 similar, but a different supplier: looked up in the ERP, not posted to North Star Logistics
+        assert lighting.vendor_ref != logistics.vendor_ref and lighting.source == "created"
+        assert batch["Acme Widgets Ltd"].vendor_ref == batch["Acme Widgets Inc"].vendor_ref
+        assert batch["ACME WIDGET"].vendor_name == "ACME WIDGET" and batch["ACME WIDGET"].source == "created"
+        assert lookup.names == ["North Star Logistics Group", "North Star Lighting Group", "Acme Widgets Inc",
+                                "ACME WIDGET"]
+        assert suggestion.source == "suggested" and suggestion.vendor_ref == logistics.vendor_ref
+        assert stats["suggested"] >= 1 and stats["fuzzy"] == 0
+        assert persisted == 4
+
+    def test_fuzzy_mappings_from_earlier_versions_are_ignored(self, mapping_db):
+        lookup = CountingLookup()
+
+        async def scenario(resolver, engine):
+            async with async_sessionmaker(engine)() as session:
+                session.add(ERPVendorMapping(erp_type="xero", company_key="ORG", name_key="north star lighting group",
+                                             supplier_name="North Star Lighting Group", vendor_ref="V-LOGISTICS",
+                                             vendor_name="North Star Logistics Group", source="fuzzy", score=0.63))
+                await session.commit()
+            return await resolver().resolve("xero", "ORG", "North Star Lighting Group", lookup)
+
+        match = run_with_resolver(mapping_db, scenario)
+
+        assert match.source == "created" and lookup.names == ["North Star Lighting Group"]
+
+    def test_persistence_failure_keeps_resolving(self):
+        def broken_session():
+            raise ConnectionError("database unavailable")
+
+        async def scenario():
+            resolver = VendorResolver(broken_session)
+            lookup = CountingLookup()
+            first = await resolver.resolve("xero", "ORG", "Initech", lookup)
+            second = await resolver.resolve("xero", "ORG", "Initech LLC", lookup)
+            return first, second, lookup.names, resolver.stats
+
+        first, second, looked_up, stats = asyncio.run(scenario())
+
+        assert first.vendor_ref == second.vendor_ref and looked_up == ["Initech"]
+        assert stats["persist_failures"] == 2
+
+
+    def test_cached_mappings_expire(self, mapping_db):
+        lookup = CountingLookup()
+
+        async def scenario(resolver, engine):
+            here, there = resolver(), resolver(ttl=0)
+            before = await there.resolve("xero", "ORG", "Globex", lookup)
+            await here.remember("xero", "ORG", "Globex", VendorMatch("V900", "Globex Corporation", "existing"))
+            return before, await there.resolve("xero", "ORG", "Globex", lookup), there.stats
+
+        before, after, stats = run_with_resolver(mapping_db, scenario)
+
+        assert (before.vendor_ref, after.vendor_ref) == ("V001", "V900")
+        assert stats["reloads"] >= 1
+
+    def test_corrections_reach_other_workers(self, mapping_db):
+        fakeredis = pytest.importorskip("fakeredis")
+        lookup = CountingLookup()
+
+        async def scenario(resolver, engine):
+            server = fakeredis.FakeServer()
+            here, there = resolver(channel="vendors:test"), resolver(channel="vendors:test")
+            await here.start(fakeredis.aioredis.FakeRedis(server=server))
+            await there.start(fakeredis.aioredis.FakeRedis(server=server))
+            try:
+                before = await there.resolve("d365_bc", "CRONUS", "Globex", lookup)
+                await here.remember("d365_bc", "CRONUS", "Globex", VendorMatch("V900", "Globex Corp", "existing"))
+                for _ in range(50):
+                    await asyncio.sleep(0.02)
+                    if there.stats["invalidations"]:
+                        break
+                after = await there.resolve("d365_bc", "CRONUS", "Globex", lookup)
+            finally:
+                await here.stop()
+                await there.stop()
+            return before, after, here.stats, there.stats
+
+        before, after, here_stats, there_stats = run_with_resolver(mapping_db, scenario)
+
+        assert (before.vendor_ref, after.vendor_ref) == ("V001", "V900")
+        assert there_stats["invalidations"] == 1 and here_stats["invalidations"] == 0
+        assert len(lookup.names) == 1
+
+
+class TestResolverIntegrations:
+    """GP service and ERP adapters resolve through the shared resolver"""
+
+    def test_gp_vendor_lookup_runs_once_per_supplier(self, tmp_path, mapping_db):
+        backend = MockGPBackend(tmp_path / "gp")
+        backend.create_company("TWO", "Fabrikam, Inc.")
+        backend.add_vendor("TWO", "ACME0001", "Acme Widgets Ltd")
+
+        async def scenario(resolver, engine):
+            gp = DynamicsGPIntegration(connector=backend.connector, vendor_resolver=resolver())
+            for company in await gp.get_company_databases():
+                await gp._create_connection_pool(company)
+            calls = []
+            run_gp = gp._run_gp
+
+            async def counting(company_db, work, *args):
+                calls.append(work.__name__)
+                return await run_gp(company_db, work, *args)
+
+            gp._run_gp = counting
+            try:
+                existing = await gp._ensure_vendor_exists("Acme Widgets Ltd", "TWO")
+                again = await gp._ensure_vendor_exists("ACME WIDGETS LIMITED", "TWO")
+                batch = await gp.ensure_vendors_exist(["Acme Widgets Ltd", "Hooli", "Hooli Inc"], "TWO")
+                return existing, again, batch, calls
+            finally:
+                gp.close()
+
+        existing, again, batch, calls = run_with_resolver(mapping_db, scenario)
+
+        assert calls == ["_query_ensure_vendor", "_query_ensure_vendor"]
+        assert existing["vendor_id"] == again["vendor_id"] == batch["Acme Widgets Ltd"]["vendor_id"] == "ACME0001"
+        assert again["status"] == "existing"
+        assert batch["Hooli"]["status"] == "created"
+        assert batch["Hooli Inc"]["vendor_id"] == batch["Hooli"]["vendor_id"]
+
+    def test_adapter_vendor_ids_follow_mappings(self):
+        async def scenario():
+            adapter = MicrosoftDynamicsGPAdapter({"base_url": "https://gp.example.test", "api_key": "k",
+                                                  "company_id": "TWO"})
+            adapter.vendor_resolver = VendorResolver(persist=False)
+            first = await adapter.resolve_vendor("Acme Widgets Ltd")
+            variant = await adapter.resolve_vendor("ACME Widgets, Inc.")
+            batch = await adapter.resolve_vendors(["Acme Widgets Ltd", "Globex"])
+            await adapter.client.aclose()
+            return first, variant, batch
+
+        first, variant, batch = asyncio.run(scenario())
+
+        assert first.vendor_ref == "VENDOR-ACME-WIDGE" and first.source == "derived"
+        assert variant.vendor_ref == first.vendor_ref and variant.source == "mapped"
+        assert batch["Globex"].vendor_ref == "VENDOR-GLOBEX"